@@ -0,0 +1,433 @@
+# carga_resultados.py - carga em massa dos resultados (CSV / raspador) via COPY
+#
+# importar_dados_debug() e importar_megasena() faziam 1 INSERT por concurso
+# pela Session (~3500 round-trips na Lotofácil). Aqui, por loteria:
+#
+#   1. cada registro (linha do CSV ou dict do raspar_loteria.parse_*) é
+#      validado e ganha, na mesma passada, as colunas derivadas:
+#         data_norm (DATE), soma, pares, mask (bitmask, ver core/bitmask.py)
+#   2. os registros vão em lotes para uma tabela temporária via
+#      COPY ... FROM STDIN (psycopg2 copy_expert)
+#   3. 1 único INSERT ... SELECT ... ON CONFLICT (concurso) DO UPDATE
+#      (DISTINCT ON: concurso repetido no CSV → vale a última linha)
+#
+# Tudo numa transação: ou entra a carga inteira, ou nada.
+# A tabela da Lotomania (resultados_oficiais_lm) é criada se não existir.
+#
+# Uso:
+#   from admin.carga_resultados import carregar, carregar_csv
+#   resumo = carregar_csv("lotofacil")                 # loteria.csv inteiro
+#   resumo = carregar("megasena", registros)           # dicts do raspador
+#   resumo["novos"]     → concursos acima do último do banco
+#   resumo["concursos"] → todos os concursos da carga (p/ atualizar_hits)
+#   hits=True também regrava o artefato de scores da Lotofácil
+#   (atualizar_scores_lf → modelo_llm_max/scores_lf.py)
+#
+#   (de dentro de admin/)
+#   python carga_resultados.py --loteria all
+#   python carga_resultados.py --loteria megasena --csv mega/loteriamega.csv
+
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import time
+
+from sqlalchemy import text
+
+from db import engine, session_scope
+import schema_cache
+import cache_consultas
+from modelo_llm_max.core import bitmask
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOTE_COPY = 5000
+
+# Dias oficiais da Mega-Sena (igual resultados_m.py): só vale p/ concursos novos
+DIAS_OFICIAIS_MS = {1, 3, 5}  # terça, quinta, sábado
+
+
+def _int(valor) -> int:
+    if valor is None or str(valor).strip() == "":
+        return 0
+    return int(float(str(valor).replace(",", ".")))
+
+
+def _float(valor) -> float:
+    if valor is None or str(valor).strip() == "":
+        return 0.0
+    return float(str(valor).replace(",", "."))
+
+
+def _premiacao_megasena(rec) -> str:
+    """Campos fora do básico → JSON (mesmo formato do resultados_m.py)."""
+    return json.dumps({
+        "cidade_uf": rec.get("Cidade / UF"),
+        "rateio_6": rec.get("Rateio 6 acertos"),
+        "ganhadores_5": rec.get("Ganhadores 5 acertos"),
+        "rateio_5": rec.get("Rateio 5 acertos"),
+        "ganhadores_4": rec.get("Ganhadores 4 acertos"),
+        "rateio_4": rec.get("Rateio 4 acertos"),
+        "acumulado_6": rec.get("Acumulado 6 acertos"),
+        "estimativa": rec.get("Estimativa prêmio"),
+        "acumulado_especial": rec.get("Acumulado Sorteio Especial Mega da Virada"),
+        "observacao": rec.get("Observação"),
+    }, ensure_ascii=False)
+
+
+def _premiacao_lotomania(rec) -> str:
+    return json.dumps({
+        "acumulado": rec.get("Acumulado"),
+        "estimativa": rec.get("Estimativa prêmio"),
+        "observacao": rec.get("Observação"),
+    }, ensure_ascii=False)
+
+
+# loteria → tabela, nº de bolas, coluna de data do CSV, formato gravado em
+# "data" e colunas extras (coluna, tipo na staging, registro → valor)
+LOTERIAS = {
+    "lotofacil": {
+        "tabela": "resultados_oficiais",
+        "hits": "LF",
+        "bolas": 15,
+        "csv": os.path.join(BASE_DIR, "loteria.csv"),
+        "col_data": "Data Sorteio",
+        "data_texto": "%d/%m/%Y",        # legado grava o texto do CSV
+        "extras": (
+            [(f"ganhadores_{k}", "INTEGER", lambda r, k=k: _int(r.get(f"Ganhadores {k} acertos")))
+             for k in (15, 14, 13, 12, 11)]
+            + [(f"rateio{k}", "NUMERIC", lambda r, k=k: _float(r.get(f"Rateio {k} acertos")))
+               for k in (15, 14, 13, 12, 11)]
+        ),
+    },
+    "megasena": {
+        "tabela": "resultados_oficiais_m",
+        "hits": "MS",
+        "bolas": 6,
+        "csv": os.path.join(BASE_DIR, "mega", "loteriamega.csv"),
+        "col_data": "Data do Sorteio",
+        "data_texto": "%Y-%m-%d",
+        "dias_oficiais": DIAS_OFICIAIS_MS,
+        "extras": [
+            ("acumulou", "BOOLEAN", lambda r: str(r.get("Ganhadores 6 acertos", "0")).strip() == "0"),
+            ("arrecadacao_total", "NUMERIC", lambda r: _float(r.get("Arrecadação Total"))),
+            ("premiacao_json", "JSONB", _premiacao_megasena),
+        ],
+    },
+    "lotomania": {
+        "tabela": "resultados_oficiais_lm",
+        "hits": None,
+        "bolas": 20,
+        "csv": os.path.join(BASE_DIR, "lotomania", "loteriamania.csv"),
+        "col_data": "Data do Sorteio",
+        "data_texto": "%Y-%m-%d",
+        "extras": (
+            [(f"ganhadores_{k}", "INTEGER", lambda r, k=k: _int(r.get(f"Ganhadores {k} acertos")))
+             for k in (20, 19, 18, 17, 0)]
+            + [(f"rateio{k}", "NUMERIC", lambda r, k=k: _float(r.get(f"Rateio {k} acertos")))
+               for k in (20, 19, 18, 17, 0)]
+            + [("arrecadacao_total", "NUMERIC", lambda r: _float(r.get("Arrecadação Total"))),
+               ("premiacao_json", "JSONB", _premiacao_lotomania)]
+        ),
+    },
+}
+
+DDL_LOTOMANIA = """
+    CREATE TABLE IF NOT EXISTS resultados_oficiais_lm (
+        concurso          INTEGER PRIMARY KEY,
+        data              DATE,
+        {bolas},
+        {extras}
+    )
+"""
+
+
+def _loteria(loteria: str) -> str:
+    chave = bitmask.ALIAS.get(str(loteria).upper(), str(loteria).lower())
+    if chave not in LOTERIAS:
+        raise ValueError(f"Loteria inválida: {loteria}")
+    return chave
+
+
+def _colunas(chave: str) -> list:
+    """(coluna, tipo na staging) na ordem do COPY."""
+    cfg = LOTERIAS[chave]
+    cols = [("concurso", "INTEGER"), ("data", "TEXT")]
+    cols += [(f"n{i}", "SMALLINT") for i in range(1, cfg["bolas"] + 1)]
+    cols += [(nome, tipo) for nome, tipo, _ in cfg["extras"]]
+    cols += [("data_norm", "DATE"), ("soma", "SMALLINT"), ("pares", "SMALLINT")]
+    cols += [(c, bitmask.sql_tipo(chave)) for c in bitmask.COLUNAS[chave]]
+    return cols
+
+
+# ------------------------------------------------------------
+# Schema: tabela da Lotomania, colunas derivadas, índice único
+# ------------------------------------------------------------
+def _tem_unico_concurso(db, tabela: str) -> bool:
+    return db.execute(text("""
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = to_regclass(:t)
+          AND i.indisunique
+          AND i.indnkeyatts = 1
+          AND a.attname = 'concurso'
+        LIMIT 1
+    """), {"t": tabela}).first() is not None
+
+
+def preparar_tabela(loteria: str):
+    """Cria a tabela (Lotomania), as colunas derivadas e o índice único em concurso."""
+    chave = _loteria(loteria)
+    cfg = LOTERIAS[chave]
+    tabela = cfg["tabela"]
+    with session_scope(statement_timeout=0) as db:
+        if chave == "lotomania":
+            db.execute(text(DDL_LOTOMANIA.format(
+                bolas=",\n        ".join(f"n{i} SMALLINT" for i in range(1, cfg["bolas"] + 1)),
+                extras=",\n        ".join(f"{nome} {tipo}" for nome, tipo, _ in cfg["extras"]),
+            )))
+        db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS data_norm DATE"))
+        db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS soma SMALLINT"))
+        db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS pares SMALLINT"))
+        for c in bitmask.COLUNAS[chave]:
+            db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS {c} {bitmask.sql_tipo(chave)}"))
+        if not _tem_unico_concurso(db, tabela):
+            # ON CONFLICT (concurso) exige índice único
+            db.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{tabela}_concurso ON {tabela} (concurso)"))
+    schema_cache.invalidar()
+
+
+def _tipos_destino(cur, tabela: str) -> dict:
+    """coluna → tipo real na tabela (o merge faz cast explícito para ele)."""
+    cur.execute("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+    """, (tabela,))
+    return dict(cur.fetchall())
+
+
+# ------------------------------------------------------------
+# Registro → linha da staging (validação + derivadas)
+# ------------------------------------------------------------
+def _parse_data(valor):
+    s = str(valor or "").strip()
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(s[:10], fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida: {valor!r}")
+
+
+def _linhas(chave: str, registros, ordem_inicial: int = 0, ultimo: int = 0):
+    """
+    Converte um lote de registros em linhas da staging (listas), já com as
+    derivadas; a máscara sai de 1 pack_many por lote.
+    Retorna (linhas, invalidos, ignorados).
+    """
+    cfg = LOTERIAS[chave]
+    lot = bitmask.LOTERIAS[chave]
+    menor, maior = lot["menor"], lot["menor"] + lot["n"] - 1
+    bolas = cfg["bolas"]
+    dias = cfg.get("dias_oficiais")
+
+    linhas, dezenas, invalidos, ignorados = [], [], 0, 0
+    for rec in registros:
+        try:
+            concurso = int(rec["Concurso"])
+            dz = [int(rec[f"Bola{i}"]) for i in range(1, bolas + 1)]
+            if any(d < menor or d > maior for d in dz):
+                raise ValueError(f"dezena fora de {menor}..{maior}: {dz}")
+            data = _parse_data(rec[cfg["col_data"]])
+            linha = [ordem_inicial + len(linhas) + invalidos + ignorados, concurso,
+                     data.strftime(cfg["data_texto"])] + dz
+            linha += [f(rec) for _, _, f in cfg["extras"]]
+            linha += [data.isoformat(), sum(dz), sum(1 for d in dz if d % 2 == 0)]
+        except Exception as e:
+            print(f"[carga] {chave}: registro inválido ({e}): {dict(rec).get('Concurso')}")
+            invalidos += 1
+            continue
+        if dias is not None and concurso > ultimo and data.weekday() not in dias:
+            # resultados_m.py: concurso novo fora do dia oficial não entra
+            print(f"⚠ Ignorado (não é dia oficial): {concurso} - {data}")
+            ignorados += 1
+            continue
+        linhas.append(linha)
+        dezenas.append(dz)
+
+    masks = bitmask.pack_many(dezenas, chave)
+    for linha, m in zip(linhas, masks):
+        linha.extend(int(x) for x in (m if m.ndim else [m]))
+    return linhas, invalidos, ignorados
+
+
+def _copy(cur, tabela_tmp: str, colunas: list, linhas: list):
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    for linha in linhas:
+        w.writerow(linha)
+    buf.seek(0)
+    sql = f"COPY {tabela_tmp} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)"
+    if hasattr(cur, "copy_expert"):       # psycopg2
+        cur.copy_expert(sql, buf)
+    else:                                 # psycopg 3
+        with cur.copy(sql) as cp:
+            cp.write(buf.getvalue())
+
+
+# ------------------------------------------------------------
+# Carga
+# ------------------------------------------------------------
+def carregar(loteria: str, registros, preparar: bool = True, hits: bool = False) -> dict:
+    """
+    Carrega `registros` (dicts no formato do CSV da Caixa) em massa.
+    hits=True recalcula palpites_hits de todos os concursos da carga (LF/MS):
+    novos, corrigidos e os já existentes (palpites salvos depois da carga
+    anterior); CSV inteiro → backfill completo.
+    Retorna {"lidos", "invalidos", "ignorados", "gravados", "novos", "concursos", "segundos"}.
+    """
+    chave = _loteria(loteria)
+    cfg = LOTERIAS[chave]
+    tabela = cfg["tabela"]
+    if preparar:
+        preparar_tabela(chave)
+
+    cols = _colunas(chave)
+    nomes = [c for c, _ in cols]
+    tmp = f"tmp_carga_{tabela}"
+
+    inicio = time.time()
+    resumo = {"lidos": 0, "invalidos": 0, "ignorados": 0, "gravados": 0, "novos": [], "concursos": []}
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        # '29/09/2003' (texto legado) → DATE sem ambiguidade no cast do merge
+        cur.execute("SET LOCAL datestyle TO 'ISO, DMY'")
+        # COPY + merge numa transação só: sem o statement_timeout das páginas
+        cur.execute("SET LOCAL statement_timeout = 0")
+        cur.execute(f"SELECT COALESCE(MAX(concurso), 0) FROM {tabela}")
+        ultimo = int(cur.fetchone()[0] or 0)
+        tipos = _tipos_destino(cur, tabela)
+
+        cur.execute(
+            f"CREATE TEMP TABLE {tmp} (ordem BIGINT, "
+            + ", ".join(f"{c} {t}" for c, t in cols)
+            + ") ON COMMIT DROP"
+        )
+
+        lote = []
+        novos = set()
+        tocados = set()
+
+        def _enviar():
+            linhas, inval, ignor = _linhas(chave, lote, resumo["lidos"], ultimo)
+            resumo["lidos"] += len(lote)
+            resumo["invalidos"] += inval
+            resumo["ignorados"] += ignor
+            novos.update(ln[1] for ln in linhas if ln[1] > ultimo)
+            tocados.update(ln[1] for ln in linhas)
+            if linhas:
+                _copy(cur, tmp, ["ordem"] + nomes, linhas)
+            lote.clear()
+
+        for rec in registros:
+            lote.append(rec)
+            if len(lote) >= LOTE_COPY:
+                _enviar()
+        if lote:
+            _enviar()
+
+        destino = [c for c in nomes if c in tipos]
+        atualiza = ",\n                ".join(f"{c} = EXCLUDED.{c}" for c in destino if c != "concurso")
+        cur.execute(f"""
+            INSERT INTO {tabela} ({", ".join(destino)})
+            SELECT {", ".join(f"s.{c}::{tipos[c]}" for c in destino)}
+            FROM (
+                SELECT DISTINCT ON (concurso) *
+                FROM {tmp}
+                ORDER BY concurso, ordem DESC
+            ) s
+            ON CONFLICT (concurso) DO UPDATE SET
+                {atualiza}
+        """)
+        resumo["gravados"] = cur.rowcount
+        raw.commit()
+        resumo["novos"] = sorted(novos)
+        resumo["concursos"] = sorted(tocados)
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    resumo["segundos"] = round(time.time() - inicio, 3)
+    print(f"[carga] {tabela}: {resumo['gravados']} concursos gravados "
+          f"({len(resumo['novos'])} novos, {resumo['invalidos']} inválidos, "
+          f"{resumo['ignorados']} ignorados) em {resumo['segundos']:.2f}s")
+
+    if cfg["hits"] and resumo["gravados"]:
+        # concursos novos/corrigidos → páginas em cache leem de novo
+        cache_consultas.registrar_carga(cfg["hits"])
+
+    if hits and cfg["hits"] and resumo["concursos"]:
+        from palpites_hits import atualizar_hits
+
+        atualizar_hits(cfg["hits"], concursos=resumo["concursos"])
+    if hits and chave == "lotofacil" and resumo["novos"]:
+        atualizar_scores_lf()
+    return resumo
+
+
+def atualizar_scores_lf() -> bool:
+    """
+    Regrava o artefato de scores da Lotofácil (modelo_llm_max/scores_lf.py)
+    com o histórico do banco, para o app não cair no Keras a cada concurso
+    novo. Precisa de TensorFlow; falha só vai para o log.
+    """
+    try:
+        from modelo_llm_max import scores_lf
+
+        bolas = ", ".join(f"n{i}" for i in range(1, 16))
+        with session_scope() as db:
+            rows = db.execute(text(f"SELECT concurso, {bolas} FROM resultados_oficiais ORDER BY concurso")).fetchall()
+        if not rows:
+            return False
+        scores_lf.exportar_scores(scores_lf.rows_25bin([r[1:] for r in rows]), int(rows[-1][0]))
+        return True
+    except Exception as e:
+        print(f"⚠️ [carga] scores da Lotofácil não regravados ({e}); o app usa o Keras até a próxima exportação")
+        return False
+
+
+def ler_csv(caminho: str):
+    """Gerador de linhas (dict) do CSV — o arquivo não é lido inteiro."""
+    with open(caminho, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def carregar_csv(loteria: str, caminho: str = None, preparar: bool = True, hits: bool = False) -> dict:
+    chave = _loteria(loteria)
+    caminho = caminho or LOTERIAS[chave]["csv"]
+    print(f"[carga] {chave}: lendo {caminho}")
+    return carregar(chave, ler_csv(caminho), preparar=preparar, hits=hits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga em massa (COPY) dos resultados oficiais.")
+    parser.add_argument("--loteria", choices=sorted(LOTERIAS) + ["all"], default="all")
+    parser.add_argument("--csv", default=None, help="CSV alternativo (só com uma loteria)")
+    parser.add_argument("--sem_hits", action="store_true", help="não recalcula palpites_hits")
+    args = parser.parse_args()
+
+    loterias = sorted(LOTERIAS) if args.loteria == "all" else [args.loteria]
+    for chave in loterias:
+        carregar_csv(chave, args.csv if len(loterias) == 1 else None, hits=not args.sem_hits)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
 # db.py
+# Reexporta o engine único do processo (db_pool.py na raiz do projeto).
+# Vale para "from db import Session" (scripts rodando de admin/).
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import sys
 
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _RAIZ not in sys.path:
+    sys.path.insert(0, _RAIZ)
 
-if not DATABASE_URL:
-    raise ValueError("❌ DATABASE_URL não encontrado...")
+from db_pool import (  # noqa: E402,F401
+    DATABASE_URL,
+    engine,
+    Session,
+    get_engine,
+    session_scope,
+    definir_timeout,
+    metricas_pool,
+    STATEMENT_TIMEOUT_MS,
+)
@@ -11,6 +11,7 @@ import os
 from datetime import datetime
 from sqlalchemy import text
 from db import Session
+import estatisticas_mensais
 
 from app.services.email_service import enviar_email_brevo
 
@@ -28,66 +29,32 @@ TEMPLATE_ESTATISTICAS = 13  # ID do template no Brevo
 
 def gerar_estatisticas_usuario(db, user_id: int, mes: int, ano: int) -> dict:
     """
-    Calcula estatísticas reais do usuário usando palpites_hits.
+    Calcula estatísticas reais do usuário usando palpites_hits
+    (1 consulta agregada — ver estatisticas_mensais.py).
     """
+    return estatisticas_mensais.estatisticas_usuario(db, user_id, mes, ano)
 
-    # -------------------------
-    # Palpites gerados
-    # -------------------------
-    total_lf = db.execute(text("""
-        SELECT COUNT(*) FROM palpites
-        WHERE id_usuario = :uid
-          AND EXTRACT(MONTH FROM data) = :mes
-          AND EXTRACT(YEAR FROM data) = :ano
-    """), {"uid": user_id, "mes": mes, "ano": ano}).scalar() or 0
-
-    total_ms = db.execute(text("""
-        SELECT COUNT(*) FROM palpites_m
-        WHERE id_usuario = :uid
-          AND EXTRACT(MONTH FROM data) = :mes
-          AND EXTRACT(YEAR FROM data) = :ano
-    """), {"uid": user_id, "mes": mes, "ano": ano}).scalar() or 0
-
-    total_palpites = total_lf + total_ms
-
-    # -------------------------
-    # Acertos consolidados
-    # -------------------------
-    acertos_lf = db.execute(text("""
-        SELECT COUNT(*) FROM palpites_hits
-        WHERE id_usuario = :uid
-          AND loteria = 'LF'
-          AND acertos >= 11
-          AND EXTRACT(MONTH FROM data) = :mes
-          AND EXTRACT(YEAR FROM data) = :ano
-    """), {"uid": user_id, "mes": mes, "ano": ano}).scalar() or 0
-
-    acertos_ms = db.execute(text("""
-        SELECT COUNT(*) FROM palpites_hits
-        WHERE id_usuario = :uid
-          AND loteria = 'MS'
-          AND acertos >= 2
-          AND EXTRACT(MONTH FROM data) = :mes
-          AND EXTRACT(YEAR FROM data) = :ano
-    """), {"uid": user_id, "mes": mes, "ano": ano}).scalar() or 0
-
-    total_acertos = acertos_lf + acertos_ms
-
-    # -------------------------
-    # Eficiência (%)
-    # -------------------------
-    if total_palpites > 0:
-        eficiencia = round((total_acertos / total_palpites) * 100)
-    else:
-        eficiencia = 0
 
+def montar_params(nome_usuario: str, stats: dict, mes: int, ano: int) -> dict:
+    """params do template TEMPLATE_ESTATISTICAS."""
     return {
-        "total_palpites": total_palpites,
-        "palpites_validos": total_palpites,
-        "palpites_com_acerto": total_acertos,
-        "acertos_lotofacil": acertos_lf,
-        "acertos_megasena": acertos_ms,
-        "percentual_eficiencia": eficiencia
+        "NOME_USUARIO": nome_usuario,
+        "MES_REFERENCIA": f"{mes:02d}/{ano}",
+
+        "TOTAL_PALPITES": stats["total_palpites"],
+        "PALPITES_VALIDOS": stats["palpites_validos"],
+        "PALPITES_COM_ACERTO": stats["palpites_com_acerto"],
+
+        "ACERTOS_LOTOFACIL": stats["acertos_lotofacil"],
+        "ACERTOS_MEGASENA": stats["acertos_megasena"],
+
+        "PERCENTUAL_EFICIENCIA": stats["percentual_eficiencia"],
+
+        "APP_URL": os.getenv(
+            "APP_BASE_URL",
+            "https://faixabet9.streamlit.app"
+        ),
+        "ANO_ATUAL": datetime.now().year
     }
 
 
@@ -122,25 +89,7 @@ def enviar_email_estatisticas_usuario(
 
         stats = gerar_estatisticas_usuario(db, user_id, mes, ano)
 
-    params = {
-        "NOME_USUARIO": user.usuario,
-        "MES_REFERENCIA": f"{mes:02d}/{ano}",
-
-        "TOTAL_PALPITES": stats["total_palpites"],
-        "PALPITES_VALIDOS": stats["palpites_validos"],
-        "PALPITES_COM_ACERTO": stats["palpites_com_acerto"],
-
-        "ACERTOS_LOTOFACIL": stats["acertos_lotofacil"],
-        "ACERTOS_MEGASENA": stats["acertos_megasena"],
-
-        "PERCENTUAL_EFICIENCIA": stats["percentual_eficiencia"],
-
-        "APP_URL": os.getenv(
-            "APP_BASE_URL",
-            "https://faixabet9.streamlit.app"
-        ),
-        "ANO_ATUAL": datetime.now().year
-    }
+    params = montar_params(user.usuario, stats, mes, ano)
 
     return enviar_email_brevo(
         destinatario_email=user.email,
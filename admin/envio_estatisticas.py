@@ -0,0 +1,162 @@
+# envio_estatisticas.py - envio mensal das estatísticas para todos os usuários
+#
+# Antes: enviar_email_estatisticas_usuario por usuário → 1 SELECT do usuário
+# + 4 COUNT(*) + 1 POST no Brevo, em série. Aqui:
+#   1) UMA consulta agregada (estatisticas_mensais.sql_mes: GROUP BY
+#      id_usuario em palpites, palpites_m e palpites_hits) lida em streaming
+#      (cursor do servidor, lotes de --lote linhas);
+#   2) cada lote vai para uma fila; uma thread envia em paralelo via
+#      enviar_emails_brevo_lote (messageVersions) enquanto o próximo lote é lido;
+#   3) checkpoint: cada envio aceito é gravado em envios_estatisticas
+#      (id_usuario, periodo). A consulta ignora quem já está lá, então rodar
+#      de novo após uma interrupção retoma de onde parou sem reenviar.
+#   4) de brinde, apaga as linhas de cotas_uso de períodos encerrados
+#      (cotas.limpar_expirados).
+#
+# Uso (de dentro de admin/):
+#   python envio_estatisticas.py --mes 1 --ano 2026
+#   python envio_estatisticas.py --mes 1 --ano 2026 --ativos --simular
+
+import argparse
+import queue
+import threading
+import time
+
+from sqlalchemy import text
+
+from db import session_scope
+import schema_cache
+import estatisticas_mensais
+import cotas
+from app.services.email_service import enviar_emails_brevo_lote
+from app.services.email_estatisticas_user import TEMPLATE_ESTATISTICAS, montar_params
+
+LOTE_PADRAO = 500
+FILA_MAX = 2            # lotes lidos à frente do envio
+
+DDL = """
+    CREATE TABLE IF NOT EXISTS envios_estatisticas (
+        id_usuario  INTEGER   NOT NULL,
+        periodo     DATE      NOT NULL,
+        enviado_em  TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id_usuario, periodo)
+    )
+"""
+
+# WHERE extra de sql_mes: com e-mail e ainda não enviado no período
+_FILTRO = """
+    COALESCE(u.email, '') <> ''
+    AND NOT EXISTS (
+        SELECT 1 FROM envios_estatisticas e
+        WHERE e.id_usuario = u.id AND e.periodo = :ini
+    )
+"""
+_FILTRO_ATIVOS = " AND (lf.n IS NOT NULL OR ms.n IS NOT NULL)"
+
+
+def criar_tabela():
+    with session_scope() as db:
+        db.execute(text(DDL))
+    schema_cache.invalidar()
+
+
+def _registrar(ids: list, ini):
+    """Checkpoint dos enviados (1 INSERT; repetir é inofensivo)."""
+    if not ids:
+        return
+    with session_scope() as db:
+        db.execute(text("""
+            INSERT INTO envios_estatisticas (id_usuario, periodo)
+            SELECT uid, :ini FROM unnest(CAST(:ids AS INTEGER[])) AS t(uid)
+            ON CONFLICT (id_usuario, periodo) DO NOTHING
+        """), {"ids": [int(i) for i in ids], "ini": ini})
+
+
+def _enviar_lote(linhas: list, mes: int, ano: int, ini) -> tuple:
+    """Envia um lote e grava o checkpoint dos aceitos. Retorna (enviados, falhas)."""
+    envios = [{
+        "email": r.email,
+        "nome": r.usuario,
+        "params": montar_params(r.usuario, estatisticas_mensais.estatisticas(r), mes, ano),
+    } for r in linhas]
+    status = enviar_emails_brevo_lote(envios, TEMPLATE_ESTATISTICAS)
+    ok = [r.id for r, s in zip(linhas, status) if s["ok"]]
+    _registrar(ok, ini)
+    falhas = [s for s in status if not s["ok"]]
+    if falhas:
+        print(f"⚠️ {len(falhas)} falhas no lote (ex.: {falhas[0]['email']}: {falhas[0]['erro']})")
+    return len(ok), len(falhas)
+
+
+def enviar_mes(mes: int, ano: int, lote: int = LOTE_PADRAO, ativos: bool = False, simular: bool = False) -> dict:
+    """
+    Envia as estatísticas de mes/ano para todos os usuários pendentes.
+    ativos=True → só quem gerou palpites no mês; simular=True → só conta.
+    Retorna {"lidos", "enviados", "falhas", "segundos"}.
+    """
+    if mes < 1 or mes > 12:
+        raise ValueError("Mês inválido")
+    criar_tabela()
+    if not simular:
+        # job mensal: aproveita para apagar contadores de cota de períodos encerrados
+        cotas.limpar_expirados()
+
+    params = estatisticas_mensais.parametros(mes, ano)
+    sql = estatisticas_mensais.sql_mes(filtro=_FILTRO + (_FILTRO_ATIVOS if ativos else ""))
+    totais = {"lidos": 0, "enviados": 0, "falhas": 0}
+    fila = queue.Queue(maxsize=FILA_MAX)
+    inicio = time.time()
+
+    def consumidor():
+        while True:
+            linhas = fila.get()
+            if linhas is None:
+                return
+            try:
+                enviados, falhas = _enviar_lote(linhas, mes, ano, params["ini"])
+            except Exception as e:
+                # lote sem checkpoint → volta na próxima execução
+                print(f"❌ Erro no lote ({len(linhas)} usuários): {e}")
+                enviados, falhas = 0, len(linhas)
+            totais["enviados"] += enviados
+            totais["falhas"] += falhas
+            print(f"📨 {totais['enviados']} enviados / {totais['lidos']} lidos ({time.time() - inicio:.1f}s)")
+
+    t = None
+    if not simular:
+        t = threading.Thread(target=consumidor, name="envio_estatisticas", daemon=True)
+        t.start()
+    try:
+        # cursor aberto durante todo o envio: sem o statement_timeout das páginas
+        with session_scope(statement_timeout=0) as db:
+            result = db.execute(text(sql), params, execution_options={"stream_results": True})
+            for parte in result.partitions(max(1, int(lote))):
+                linhas = list(parte)
+                totais["lidos"] += len(linhas)
+                if t is not None:
+                    fila.put(linhas)
+    finally:
+        if t is not None:
+            fila.put(None)
+            t.join()
+
+    totais["segundos"] = round(time.time() - inicio, 2)
+    print(f"[estatísticas] {mes:02d}/{ano}: {totais['lidos']} pendentes, {totais['enviados']} enviados, "
+          f"{totais['falhas']} falhas{' (simulação)' if simular else ''} em {totais['segundos']}s")
+    return totais
+
+
+def main():
+    hoje = time.localtime()
+    parser = argparse.ArgumentParser(description="Envia as estatísticas mensais para todos os usuários.")
+    parser.add_argument("--mes", type=int, default=hoje.tm_mon - 1 or 12)
+    parser.add_argument("--ano", type=int, default=hoje.tm_year - (1 if hoje.tm_mon == 1 else 0))
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO)
+    parser.add_argument("--ativos", action="store_true", help="só usuários com palpites no mês")
+    parser.add_argument("--simular", action="store_true", help="só conta os pendentes, não envia")
+    args = parser.parse_args()
+    enviar_mes(args.mes, args.ano, lote=args.lote, ativos=args.ativos, simular=args.simular)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+# migracoes.py - migrações versionadas do schema (datas normalizadas + índices)
+#
+# Cada migração tem uma versão ("001", "002", ...) e é registrada em
+# schema_migracoes ao terminar; as já aplicadas não rodam de novo.
+# Todas são idempotentes (IF NOT EXISTS / WHERE ... IS NULL), então rodar de
+# novo após uma falha no meio é seguro.
+#
+#   001  resultados_oficiais[_m|_lm].data_norm DATE (backfill do texto misto
+#        'DD/MM/YYYY' | 'YYYY-MM-DD') + índice (data_norm)
+#   002  palpites / palpites_m: data_norm DATE (tipo convertido se preciso,
+#        backfill, DEFAULT CURRENT_DATE) + índices (id_usuario, data),
+#        (id_usuario, data_norm) e (data_norm)
+#   003  palpite_dezena_freq: frequência das dezenas por (loteria, dezena, dia),
+#        mantida por trigger em palpites / palpites_m (frequencia_palpites.py)
+#   004  palpites_hits: tabela, colunas e índices (antes o DDL rodava a cada
+#        atualizar_hits, com ALTER TABLE travando as leituras do dashboard)
+#        + backfill completo de LF e MS (atualizar_hits sem filtro)
+#   005  palpite_dezena_freq: reinstala com o trigger de UPDATE e travas em
+#        ordem (dezena, dia); a reconstrução corrige o que já tiver divergido
+#
+# Com isso os filtros viram intervalos semiabertos indexáveis
+# (data >= :ini AND data < :fim, ver periodos.py) em vez de
+# DATE_PART/EXTRACT/DATE(col)/CASE regex na coluna.
+#
+# --verificar roda EXPLAIN das consultas reescritas (com enable_seqscan=off:
+# se o predicado não for indexável, o plano continua em Seq Scan) e falha
+# se alguma não usar índice.
+#
+#   (de dentro de admin/)
+#   python migracoes.py               aplica as pendentes
+#   python migracoes.py --listar
+#   python migracoes.py --verificar
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from db import engine, session_scope, STATEMENT_TIMEOUT_MS
+import schema_cache
+import periodos
+import frequencia_palpites
+
+LOTE_PADRAO = 5000
+
+RESULTADOS = ("resultados_oficiais", "resultados_oficiais_m", "resultados_oficiais_lm")
+
+# tabela de palpites → candidatas a coluna de horário (mesma ordem do app)
+PALPITES = {
+    "palpites": ("data", "created_at"),
+    "palpites_m": ("created_at", "data", "dt", "timestamp"),
+}
+
+DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migracoes (
+        versao      VARCHAR(10) PRIMARY KEY,
+        descricao   TEXT        NOT NULL,
+        aplicada_em TIMESTAMP   NOT NULL DEFAULT NOW(),
+        segundos    REAL
+    )
+"""
+
+
+def _sql_data(col: str) -> str:
+    """Texto misto / timestamp / date → DATE (NULL se não reconhecer)."""
+    return f"""
+        CASE
+            WHEN {col}::text ~ '^\\d{{4}}-\\d{{2}}-\\d{{2}}' THEN to_date(left({col}::text, 10), 'YYYY-MM-DD')
+            WHEN {col}::text ~ '^\\d{{2}}/\\d{{2}}/\\d{{4}}' THEN to_date(left({col}::text, 10), 'DD/MM/YYYY')
+            ELSE NULL
+        END
+    """
+
+
+def _tipo_coluna(db, tabela: str, coluna: str):
+    return db.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :t AND column_name = :c
+    """), {"t": tabela, "c": coluna}).scalar()
+
+
+def _coluna_horario(tabela: str):
+    for c in PALPITES[tabela]:
+        if schema_cache.tem_coluna(tabela, c):
+            return c
+    return None
+
+
+def _criar_indices(indices):
+    """CREATE INDEX CONCURRENTLY (fora de transação: não trava as escritas)."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # sem transação não há SET LOCAL: desliga e devolve o padrão do pool
+        conn.execute(text("SET statement_timeout = 0"))
+        try:
+            for nome, tabela, cols in indices:
+                inicio = time.time()
+                conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nome} ON {tabela} ({cols})"))
+                print(f"[migracoes] índice {nome} ({tabela}: {cols}) em {time.time() - inicio:.2f}s")
+        finally:
+            conn.execute(text(f"SET statement_timeout = {int(STATEMENT_TIMEOUT_MS)}"))
+
+
+def _backfill(tabela: str, col: str, lote: int) -> int:
+    """data_norm IS NULL → data de `col`, em lotes (commit por lote)."""
+    chave = "id" if schema_cache.tem_coluna(tabela, "id") else "concurso"
+    sql = text(f"""
+        UPDATE {tabela} t
+        SET data_norm = {_sql_data(f"t.{col}")}
+        WHERE t.{chave} IN (
+            SELECT s.{chave} FROM {tabela} s
+            WHERE s.data_norm IS NULL
+              AND {_sql_data(f"s.{col}")} IS NOT NULL
+            ORDER BY s.{chave}
+            LIMIT :lote
+        )
+    """)
+    total = 0
+    while True:
+        with session_scope(statement_timeout=0) as db:
+            n = db.execute(sql, {"lote": int(lote)}).rowcount
+        total += n
+        if n < lote:
+            break
+    return total
+
+
+# ------------------------------------------------------------
+# Migrações
+# ------------------------------------------------------------
+def _m001_resultados(lote: int):
+    for tabela in RESULTADOS:
+        if not schema_cache.existe_tabela(tabela):
+            continue
+        with session_scope(statement_timeout=0) as db:
+            db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS data_norm DATE"))
+        schema_cache.invalidar()
+        n = _backfill(tabela, "data", lote)
+        print(f"[migracoes] {tabela}: {n} data_norm preenchidas")
+        _criar_indices([(f"ix_{tabela}_data_norm", tabela, "data_norm")])
+
+
+def _m002_palpites(lote: int):
+    for tabela in PALPITES:
+        if not schema_cache.existe_tabela(tabela):
+            continue
+        with session_scope(statement_timeout=0) as db:
+            db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS data_norm DATE"))
+            tipo = _tipo_coluna(db, tabela, "data_norm")
+            if tipo != "date":
+                # versões antigas gravavam data_norm como texto/timestamp
+                print(f"[migracoes] {tabela}.data_norm: {tipo} → date")
+                db.execute(text(
+                    f"ALTER TABLE {tabela} ALTER COLUMN data_norm TYPE DATE USING {_sql_data('data_norm')}"
+                ))
+            # inserts com NOW() na coluna de horário → mesma data
+            db.execute(text(f"ALTER TABLE {tabela} ALTER COLUMN data_norm SET DEFAULT CURRENT_DATE"))
+        schema_cache.invalidar()
+
+        ts = _coluna_horario(tabela)
+        indices = [
+            (f"ix_{tabela}_data_norm", tabela, "data_norm"),
+            (f"ix_{tabela}_usuario_data_norm", tabela, "id_usuario, data_norm"),
+        ]
+        if ts:
+            n = _backfill(tabela, ts, lote)
+            print(f"[migracoes] {tabela}: {n} data_norm preenchidas a partir de {ts}")
+            indices.insert(0, (f"ix_{tabela}_usuario_{ts}", tabela, f"id_usuario, {ts}"))
+        _criar_indices(indices)
+
+
+def _m003_frequencia(lote: int):
+    # depende de data_norm (002): o trigger fixa as colunas ao ser criado
+    for loteria, (tabela, _, _) in frequencia_palpites.LOTERIAS.items():
+        if schema_cache.existe_tabela(tabela):
+            frequencia_palpites.instalar(loteria)
+
+
+def _m004_palpites_hits(lote: int):
+    # o dashboard e as estatísticas só leem palpites_hits: cria e já preenche
+    from palpites_hits import criar_tabela, atualizar_hits, LOTERIAS as HITS
+
+    criar_tabela()
+    for loteria, (tbl_palpites, tbl_res, _) in HITS.items():
+        if schema_cache.existe_tabela(tbl_palpites) and schema_cache.existe_tabela(tbl_res):
+            atualizar_hits(loteria)
+
+
+MIGRACOES = [
+    ("001", "data_norm DATE + índice nos resultados oficiais", _m001_resultados),
+    ("002", "data_norm DATE + índices (id_usuario, data) nos palpites", _m002_palpites),
+    ("003", "agregado palpite_dezena_freq + trigger nos palpites", _m003_frequencia),
+    ("004", "palpites_hits: tabela, colunas, índices + backfill", _m004_palpites_hits),
+    ("005", "palpite_dezena_freq: trigger de UPDATE + ordem das travas", _m003_frequencia),
+]
+
+
+def aplicadas() -> dict:
+    with session_scope() as db:
+        db.execute(text(DDL))
+        rows = db.execute(text("SELECT versao, aplicada_em FROM schema_migracoes")).fetchall()
+    return {r.versao: r.aplicada_em for r in rows}
+
+
+def migrar(lote: int = LOTE_PADRAO, ate: str = None) -> list:
+    """Aplica as migrações pendentes em ordem (até `ate`, se informado)."""
+    feitas = aplicadas()
+    novas = []
+    for versao, descricao, funcao in MIGRACOES:
+        if ate is not None and versao > ate:
+            break
+        if versao in feitas:
+            continue
+        print(f"[migracoes] {versao}: {descricao}")
+        inicio = time.time()
+        funcao(lote)
+        segundos = time.time() - inicio
+        with session_scope() as db:
+            db.execute(text("""
+                INSERT INTO schema_migracoes (versao, descricao, segundos)
+                VALUES (:v, :d, :s)
+                ON CONFLICT (versao) DO NOTHING
+            """), {"v": versao, "d": descricao, "s": segundos})
+        print(f"[migracoes] {versao}: ok em {segundos:.2f}s")
+        novas.append(versao)
+    schema_cache.invalidar()
+    return novas
+
+
+# ------------------------------------------------------------
+# Regressão de planos (EXPLAIN)
+# ------------------------------------------------------------
+def _consultas() -> list:
+    """(nome, tabela, sql, params) — mesmas formas usadas no app."""
+    hoje = date.today()
+    ini_mes, fim_mes = periodos.mes(hoje.year, hoje.month)
+    ini_dia, fim_dia = periodos.dia(hoje)
+    out = [
+        ("palpites do usuário no mês", "palpites",
+         "SELECT COUNT(*) FROM palpites WHERE id_usuario = :uid AND data >= :ini AND data < :fim",
+         {"uid": 1, "ini": ini_mes, "fim": fim_mes}),
+        ("historico_palpites (LF)", "palpites",
+         "SELECT id FROM palpites WHERE id_usuario = :uid AND data >= :ini AND data < :fim",
+         {"uid": 1, "ini": ini_mes, "fim": fim_mes}),
+        ("dashboard palpites no mês", "palpites",
+         "SELECT COUNT(*) FROM palpites WHERE id_usuario = :uid "
+         "AND data_norm >= date_trunc('month', CURRENT_DATE)::date "
+         "AND data_norm < (date_trunc('month', CURRENT_DATE) + INTERVAL '1 month')::date",
+         {"uid": 1}),
+        ("notificações: palpites do dia", "palpites",
+         "SELECT id FROM palpites WHERE data_norm = :d",
+         {"d": hoje}),
+        ("estatísticas mensais (palpites_hits)", "palpites_hits",
+         "SELECT COUNT(*) FROM palpites_hits WHERE id_usuario = :uid AND loteria = 'LF' "
+         "AND acertos >= 11 AND data >= :ini AND data < :fim",
+         {"uid": 1, "ini": ini_mes, "fim": fim_mes}),
+        ("evolucao_30_dias", "palpites_hits",
+         "SELECT data, COUNT(*) FROM palpites_hits WHERE id_usuario = :uid AND loteria = 'LF' "
+         "AND data >= CURRENT_DATE - 29 GROUP BY data",
+         {"uid": 1}),
+    ]
+    ts = _coluna_horario("palpites_m")
+    if ts:
+        out += [
+            ("historico_palpites (MS)", "palpites_m",
+             f"SELECT id FROM palpites_m WHERE id_usuario = :uid AND {ts} >= :ini AND {ts} < :fim",
+             {"uid": 1, "ini": ini_mes, "fim": fim_mes}),
+            ("limite diário (MS)", "palpites_m",
+             f"SELECT COUNT(*) FROM palpites_m WHERE id_usuario = :uid AND {ts} >= :ini AND {ts} < :fim",
+             {"uid": 1, "ini": ini_dia, "fim": fim_dia}),
+        ]
+    for tabela in RESULTADOS:
+        out.append((f"resultado por data ({tabela})", tabela,
+                    f"SELECT * FROM {tabela} WHERE data_norm = :d", {"d": hoje}))
+    return out
+
+
+def _nos(plano: dict):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def verificar_planos() -> list:
+    """
+    EXPLAIN de cada consulta com enable_seqscan=off. Retorna
+    [(nome, ok, tipos de nó na tabela)]; ok = algum Index/Bitmap scan e
+    nenhum Seq Scan na tabela alvo.
+    """
+    resultado = []
+    for nome, tabela, sql, params in _consultas():
+        if not schema_cache.existe_tabela(tabela) or ("data_norm" in sql and not schema_cache.tem_coluna(tabela, "data_norm")):
+            resultado.append((nome, None, ["tabela/coluna ausente"]))
+            continue
+        with session_scope() as db:
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+            bruto = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+        plano = (json.loads(bruto) if isinstance(bruto, str) else bruto)[0]["Plan"]
+        tipos = [n["Node Type"] for n in _nos(plano) if n.get("Relation Name") == tabela]
+        ok = any("Index" in t for t in tipos) and "Seq Scan" not in tipos
+        resultado.append((nome, ok, tipos))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações versionadas do schema (datas + índices).")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO)
+    parser.add_argument("--ate", default=None, help="aplica só até esta versão")
+    parser.add_argument("--listar", action="store_true")
+    parser.add_argument("--verificar", action="store_true", help="EXPLAIN: consultas usam índice?")
+    args = parser.parse_args()
+
+    if args.listar:
+        feitas = aplicadas()
+        for versao, descricao, _ in MIGRACOES:
+            print(f"{versao}  {'✔ ' + str(feitas[versao]) if versao in feitas else '⏳ pendente':<30}  {descricao}")
+        return
+
+    if args.verificar:
+        falhas = 0
+        for nome, ok, tipos in verificar_planos():
+            marca = "➖" if ok is None else "✔" if ok else "❌"
+            print(f"{marca} {nome}: {', '.join(tipos)}")
+            falhas += ok is False
+        sys.exit(1 if falhas else 0)
+
+    migrar(args.lote, args.ate)
+
+
+if __name__ == "__main__":
+    main()
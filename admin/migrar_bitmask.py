@@ -0,0 +1,98 @@
+# migrar_bitmask.py - colunas "mask" (dezenas em bits) + backfill
+#
+# Adiciona e preenche:
+#   palpites.mask              INTEGER  (Lotofácil, 25 bits)
+#   palpites_m.mask            BIGINT   (Mega-Sena, 60 bits)
+#   resultados_oficiais.mask   INTEGER
+#   resultados_oficiais_m.mask BIGINT
+#
+# Depois disso, acertos = bit_count(p.mask & r.mask) — ver
+# modelo_llm_max/core/bitmask.py (sql_hits / hits vetorizado em NumPy).
+#
+# Idempotente: só preenche linhas com mask IS NULL, em lotes.
+#   (de dentro de admin/)
+#   python migrar_bitmask.py
+#   python migrar_bitmask.py --lote 20000
+
+import argparse
+import time
+
+from sqlalchemy import text
+
+from db import session_scope
+import schema_cache
+from modelo_llm_max.core import bitmask
+
+# tabela → (loteria, origem das dezenas: "texto" | n_bolas)
+TABELAS = {
+    "palpites": ("LF", "texto"),
+    "palpites_m": ("MS", "texto"),
+    "resultados_oficiais": ("LF", 15),
+    "resultados_oficiais_m": ("MS", 6),
+}
+
+LOTE_PADRAO = 5000
+
+
+def _expr_mask(tabela: str) -> str:
+    loteria, origem = TABELAS[tabela]
+    if origem == "texto":
+        if schema_cache.tem_coluna(tabela, "dezenas") and schema_cache.tem_coluna(tabela, "numeros"):
+            col = "COALESCE(t.dezenas, t.numeros)"
+        else:
+            col = "t.dezenas" if schema_cache.tem_coluna(tabela, "dezenas") else "t.numeros"
+        return bitmask.sql_pack(col, loteria)
+    return bitmask.sql_pack_colunas([f"t.n{i}" for i in range(1, origem + 1)], loteria)
+
+
+def adicionar_colunas():
+    with session_scope() as db:
+        for tabela, (loteria, _) in TABELAS.items():
+            if not schema_cache.existe_tabela(tabela):
+                continue
+            db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS mask {bitmask.sql_tipo(loteria)}"))
+    schema_cache.invalidar()
+
+
+def preencher(tabela: str, lote: int = LOTE_PADRAO) -> int:
+    """Backfill de mask IS NULL em lotes (commit por lote). Retorna linhas atualizadas."""
+    if not schema_cache.tem_coluna(tabela, "mask"):
+        return 0
+    chave = "id" if schema_cache.tem_coluna(tabela, "id") else "concurso"
+    sql = text(f"""
+        UPDATE {tabela} t
+        SET mask = {_expr_mask(tabela)}
+        WHERE t.{chave} IN (
+            SELECT {chave} FROM {tabela}
+            WHERE mask IS NULL
+            ORDER BY {chave}
+            LIMIT :lote
+        )
+    """)
+    total = 0
+    while True:
+        with session_scope() as db:
+            n = db.execute(sql, {"lote": int(lote)}).rowcount
+        total += n
+        if n < lote:
+            break
+    return total
+
+
+def migrar(lote: int = LOTE_PADRAO):
+    adicionar_colunas()
+    for tabela in TABELAS:
+        inicio = time.time()
+        n = preencher(tabela, lote)
+        print(f"[bitmask] {tabela}: {n} linhas preenchidas em {time.time() - inicio:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adiciona e preenche colunas mask (bitmask de dezenas).")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO)
+    args = parser.parse_args()
+    migrar(args.lote)
+
+
+if __name__ == "__main__":
+    main()
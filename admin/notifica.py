@@ -11,6 +11,8 @@ from datetime import date, timedelta
 from sqlalchemy import text
 
 from db import Session
+import schema_cache
+import periodos
 from utils.email_service import enviar_email
 
 
@@ -27,11 +29,23 @@ def processar_notificacoes_acertos():
 
     try:
         # 1️⃣ Resultado oficial
-        res = db.execute(text("""
+        # data TEXT misto; data_norm (DATE) pode estar NULL em linhas antigas
+        data_legado = """
+            CASE
+                WHEN data ~ '^\\d{4}-\\d{2}-\\d{2}$' THEN to_date(data, 'YYYY-MM-DD')
+                WHEN data ~ '^\\d{2}/\\d{2}/\\d{4}$' THEN to_date(data, 'DD/MM/YYYY')
+                ELSE NULL
+            END
+        """
+        if schema_cache.tem_coluna("resultados_oficiais", "data_norm"):
+            filtro = f"data_norm = :data OR (data_norm IS NULL AND {data_legado} = :data)"
+        else:
+            filtro = f"{data_legado} = :data"
+        res = db.execute(text(f"""
             SELECT n1,n2,n3,n4,n5,n6,n7,n8,n9,n10,
                    n11,n12,n13,n14,n15
             FROM resultados_oficiais
-            WHERE data = :data
+            WHERE {filtro}
         """), {"data": ontem}).fetchone()
 
         if not res:
@@ -41,6 +55,7 @@ def processar_notificacoes_acertos():
         resultado = set(res)
 
         # 2️⃣ Palpites não notificados
+        ini, fim = periodos.dia(ontem)
         palpites = db.execute(text("""
             SELECT
                 p.id,
@@ -50,13 +65,14 @@ def processar_notificacoes_acertos():
                 u.nome
             FROM palpites p
             JOIN usuarios u ON u.id = p.id_usuario
-            WHERE DATE(p.data) = :data
+            WHERE p.data >= :ini
+              AND p.data <  :fim
               AND NOT EXISTS (
                   SELECT 1
                   FROM notificacoes_palpite n
                   WHERE n.id_palpite = p.id
               )
-        """), {"data": ontem}).fetchall()
+        """), {"ini": ini, "fim": fim}).fetchall()
 
         if not palpites:
             st.info("Nenhum palpite pendente para notificação.")
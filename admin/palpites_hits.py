@@ -0,0 +1,222 @@
+# palpites_hits.py - materializa acertos de cada palpite em palpites_hits
+#
+# Antes o dashboard recalculava os acertos a cada page view, cruzando
+# palpites × resultados por to_char/regex e fazendo unnest do texto "numeros"
+# (nenhum índice utilizável). Agora, quando um concurso entra no banco,
+# os acertos de TODOS os palpites daquela data são calculados em 1 INSERT ...
+# SELECT e gravados (upsert) em palpites_hits. O dashboard só lê daqui.
+#
+# Uso:
+#   from admin.palpites_hits import atualizar_hits
+#   atualizar_hits("LF", concursos=[3500])      # após importar resultados
+#
+#   (de dentro de admin/)
+#   python palpites_hits.py --loteria LF --ultimos 5
+#   python palpites_hits.py --loteria MS --todos    (backfill)
+
+import argparse
+import time
+
+from sqlalchemy import text
+
+from db import session_scope
+import schema_cache
+import cache_consultas
+from modelo_llm_max.core import bitmask
+
+# loteria → (tabela de palpites, tabela de resultados, qtd de bolas)
+LOTERIAS = {
+    "LF": ("palpites", "resultados_oficiais", 15),
+    "MS": ("palpites_m", "resultados_oficiais_m", 6),
+}
+
+DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS palpites_hits (
+        id_palpite  BIGINT      NOT NULL,
+        loteria     VARCHAR(2)  NOT NULL,
+        concurso    INTEGER     NOT NULL,
+        id_usuario  INTEGER,
+        data        DATE,
+        acertos     SMALLINT    NOT NULL,
+        atualizado_em TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """,
+    # tabela pré-existente (versões antigas) pode não ter todas as colunas
+    "ALTER TABLE palpites_hits ADD COLUMN IF NOT EXISTS id_palpite BIGINT",
+    "ALTER TABLE palpites_hits ADD COLUMN IF NOT EXISTS concurso INTEGER",
+    "ALTER TABLE palpites_hits ADD COLUMN IF NOT EXISTS atualizado_em TIMESTAMP DEFAULT NOW()",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_palpites_hits_lot_palpite ON palpites_hits (loteria, id_palpite)",
+    "CREATE INDEX IF NOT EXISTS ix_palpites_hits_user_lot_data ON palpites_hits (id_usuario, loteria, data)",
+    "CREATE INDEX IF NOT EXISTS ix_palpites_hits_lot_concurso ON palpites_hits (loteria, concurso)",
+]
+
+# data do resultado: TEXT 'DD/MM/YYYY' | 'YYYY-MM-DD...' ou DATE
+# (só para linhas sem data_norm — ver admin/migracoes.py)
+_SQL_DATA_RES = """
+    CASE
+        WHEN r.data::text ~ '^\\d{2}/\\d{2}/\\d{4}$' THEN to_date(r.data::text, 'DD/MM/YYYY')
+        WHEN r.data::text ~ '^\\d{4}-\\d{2}-\\d{2}' THEN to_date(left(r.data::text, 10), 'YYYY-MM-DD')
+        ELSE NULL
+    END
+"""
+
+
+# colunas que o upsert grava (tabela antiga sem alguma delas → criar_tabela)
+COLUNAS = ("id_palpite", "loteria", "concurso", "id_usuario", "data", "acertos", "atualizado_em")
+
+
+def criar_tabela():
+    """DDL completo (ALTER trava a tabela mesmo sem mudar nada): migração 004."""
+    with session_scope(statement_timeout=0) as db:
+        for ddl in DDL:
+            db.execute(text(ddl))
+    schema_cache.invalidar()
+
+
+def garantir_tabela():
+    """Só roda o DDL se a tabela/coluna ainda não existir (consulta o schema_cache)."""
+    if not all(schema_cache.tem_coluna("palpites_hits", c) for c in COLUNAS):
+        criar_tabela()
+
+
+def _coluna_numeros(tbl_palpites: str) -> str:
+    """LF antigo tem 'dezenas' e 'numeros'; usa o que existir."""
+    if schema_cache.tem_coluna(tbl_palpites, "dezenas") and schema_cache.tem_coluna(tbl_palpites, "numeros"):
+        return "COALESCE(p.dezenas, p.numeros)"
+    if schema_cache.tem_coluna(tbl_palpites, "dezenas"):
+        return "p.dezenas"
+    return "p.numeros"
+
+
+def _sql_acertos(tbl_palpites: str, tbl_res: str, loteria: str) -> str:
+    """
+    Com as colunas mask (admin/migrar_bitmask.py): bit_count(p.mask & r.mask),
+    caindo para a máscara montada do texto nas linhas ainda sem mask.
+    Sem as colunas: contagem via unnest do texto (legado).
+    """
+    if schema_cache.tem_coluna(tbl_palpites, "mask") and schema_cache.tem_coluna(tbl_res, "mask"):
+        mask_p = f"COALESCE(p.mask, {bitmask.sql_pack(_coluna_numeros(tbl_palpites), loteria)})"
+        return f"bit_count(({mask_p} & r.mask)::bit({64 if bitmask.sql_tipo(loteria) == 'BIGINT' else 32}))"
+    return f"""(
+            SELECT COUNT(*)
+            FROM unnest(regexp_split_to_array(NULLIF(trim({_coluna_numeros(tbl_palpites)}), ''), '[,\\s]+')) AS d(txt)
+            WHERE d.txt ~ '^\\d+$'
+              AND (d.txt::int) = ANY(r.bolas)
+        )"""
+
+
+def _sql_upsert(loteria: str, filtro_concurso: str, filtro_palpites: str = "") -> str:
+    tbl_palpites, tbl_res, n_bolas = LOTERIAS[loteria]
+    cols_bolas = [f"r.n{i}" for i in range(1, n_bolas + 1)]
+    mask_r = (
+        f"COALESCE(r.mask, {bitmask.sql_pack_colunas(cols_bolas, loteria)})"
+        if schema_cache.tem_coluna(tbl_res, "mask") else "NULL"
+    )
+    data_r = (
+        f"COALESCE(r.data_norm, {_SQL_DATA_RES})"
+        if schema_cache.tem_coluna(tbl_res, "data_norm") else _SQL_DATA_RES
+    )
+    return f"""
+    WITH r AS (
+        SELECT r.concurso, {data_r} AS dt, ARRAY[{", ".join(cols_bolas)}] AS bolas, {mask_r} AS mask
+        FROM {tbl_res} r
+        {filtro_concurso}
+    )
+    INSERT INTO palpites_hits (id_palpite, loteria, concurso, id_usuario, data, acertos, atualizado_em)
+    SELECT
+        p.id, :loteria, r.concurso, p.id_usuario, r.dt,
+        {_sql_acertos(tbl_palpites, tbl_res, loteria)},
+        NOW()
+    FROM r
+    JOIN {tbl_palpites} p
+      ON p.data_norm::date = r.dt
+    WHERE r.dt IS NOT NULL {filtro_palpites}
+    ON CONFLICT (loteria, id_palpite) DO UPDATE SET
+        concurso = EXCLUDED.concurso,
+        id_usuario = EXCLUDED.id_usuario,
+        data = EXCLUDED.data,
+        acertos = EXCLUDED.acertos,
+        atualizado_em = EXCLUDED.atualizado_em
+    """
+
+
+def atualizar_hits(loteria: str, concursos=None, ultimos: int = None, id_usuario: int = None) -> int:
+    """
+    Recalcula (set-based) os acertos dos palpites das datas dos concursos
+    informados e faz upsert em palpites_hits.
+
+    - concursos=[...] → só esses concursos
+    - ultimos=N       → os N concursos mais recentes
+    - nenhum dos dois → backfill completo
+    - id_usuario      → só os palpites desse usuário (página, após salvar;
+                        o chamador registra a escrita no cache_consultas)
+    Retorna o número de linhas gravadas.
+    """
+    loteria = loteria.upper()
+    if loteria not in LOTERIAS:
+        raise ValueError(f"Loteria inválida: {loteria}")
+    tbl_res = LOTERIAS[loteria][1]
+
+    params = {"loteria": loteria}
+    if concursos is not None:
+        concursos = [int(c) for c in concursos]
+        if not concursos:
+            return 0
+        filtro = "WHERE r.concurso = ANY(:concursos)"
+        params["concursos"] = concursos
+    elif ultimos:
+        filtro = f"WHERE r.concurso > (SELECT MAX(concurso) FROM {tbl_res}) - :ultimos"
+        params["ultimos"] = int(ultimos)
+    else:
+        filtro = ""
+
+    filtro_palpites = ""
+    if id_usuario is not None:
+        filtro_palpites = "AND p.id_usuario = :uid"
+        params["uid"] = int(id_usuario)
+
+    garantir_tabela()
+    inicio = time.time()
+    # job/carga sem limite; a chamada da página fica com o timeout do pool
+    with session_scope(statement_timeout=None if id_usuario is not None else 0) as db:
+        total = db.execute(text(_sql_upsert(loteria, filtro, filtro_palpites)), params).rowcount
+    print(f"[palpites_hits] {loteria}: {total} palpites atualizados em {time.time() - inicio:.2f}s")
+    if total and id_usuario is None:
+        cache_consultas.registrar_carga(loteria)
+    return total
+
+
+def atualizar_hits_usuario(loteria: str, id_usuario: int) -> int:
+    """
+    Chamado pela página depois de salvar palpites: se o concurso mais
+    recente já saiu na data deles (palpite salvo depois da carga do dia),
+    conta os acertos na hora — a carga não volta a esse concurso.
+    Só os palpites do usuário; falha só vai para o log.
+    """
+    try:
+        return atualizar_hits(loteria, ultimos=1, id_usuario=id_usuario)
+    except Exception as e:
+        print(f"⚠️ [palpites_hits] {loteria} uid={id_usuario}: não atualizado ({e})")
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materializa acertos em palpites_hits.")
+    parser.add_argument("--loteria", choices=sorted(LOTERIAS), required=True)
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--concursos", default=None, help="lista separada por vírgula")
+    grupo.add_argument("--ultimos", type=int, default=None)
+    grupo.add_argument("--todos", action="store_true", help="backfill completo")
+    args = parser.parse_args()
+
+    if args.todos:
+        atualizar_hits(args.loteria)
+    elif args.concursos:
+        atualizar_hits(args.loteria, concursos=[c for c in args.concursos.split(",") if c.strip()])
+    else:
+        atualizar_hits(args.loteria, ultimos=args.ultimos or 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,20 +20,44 @@ Pronto para expansão para:
   ➕ Quina
   ➕ Dupla Sena
 
+Incremental de verdade:
+  - ao lado de cada CSV fica um índice pequeno (<csv>.idx.json) com o
+    último concurso e o tamanho do arquivo (offset) na última gravação;
+    se o CSV não foi mexido por fora, nada é relido;
+  - concursos novos são ANEXADOS no fim do arquivo (O(1) por concurso),
+    sem reler/ordenar/reescrever o CSV inteiro;
+  - os concursos faltantes são buscados em paralelo (pool limitado,
+    requests.Session compartilhada, retry com backoff) e gravados em ordem.
+
+Uso:
+  python raspar_loteria.py                        (menu)
+  python raspar_loteria.py --loteria all --workers 4
+  CAIXA_API_BASE=http://127.0.0.1:8000/api python raspar_loteria.py --loteria lotofacil
+  python raspar_loteria.py --loteria all --banco  (+ carga no Postgres via COPY)
+
 Autor: fAIxaBet® — Atualização incremental inteligente.
 """
 
 import requests
+import argparse
 import csv
+import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 
+# base trocável (ex.: servidor local de teste)
+_API_RAIZ = os.getenv("CAIXA_API_BASE", "https://servicebus2.caixa.gov.br/portaldeloterias/api").rstrip("/")
 API_BASE = {
-    "lotofacil": "https://servicebus2.caixa.gov.br/portaldeloterias/api/lotofacil",
-    "megasena":  "https://servicebus2.caixa.gov.br/portaldeloterias/api/megasena",
-    "lotomania": "https://servicebus2.caixa.gov.br/portaldeloterias/api/lotomania"
+    "lotofacil": f"{_API_RAIZ}/lotofacil",
+    "megasena":  f"{_API_RAIZ}/megasena",
+    "lotomania": f"{_API_RAIZ}/lotomania"
 }
 CSV_FILE = {
     "lotofacil": "loteria.csv",
@@ -41,18 +65,122 @@ CSV_FILE = {
     "lotomania": os.path.join("lotomania", "loteriamania.csv"),
 }
 
+WORKERS_PADRAO = int(os.getenv("RASPAR_WORKERS", "4"))
+TIMEOUT = 20
+
+
+# ----------------------------------------------------
+# ÍNDICE DO CSV (último concurso + offset)
+# ----------------------------------------------------
+def _caminho_indice(csv_path):
+    return csv_path + ".idx.json"
+
+
+def _varrer_csv(csv_path):
+    """Uma passada em streaming: (header, maior concurso)."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        ultimo = 0
+        for r in reader:
+            try:
+                ultimo = max(ultimo, int(r["Concurso"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return reader.fieldnames or [], ultimo
+
+
+def _gravar_indice(csv_path, ultimo, fieldnames):
+    idx = {"ultimo": int(ultimo), "offset": os.path.getsize(csv_path), "fieldnames": list(fieldnames)}
+    tmp = _caminho_indice(csv_path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(idx, f, ensure_ascii=False)
+    os.replace(tmp, _caminho_indice(csv_path))
+    return idx
+
+
+def ler_indice(csv_path):
+    """
+    Índice válido do CSV: lido do .idx.json se o arquivo continua com o
+    tamanho registrado; senão reconstruído com uma varredura em streaming.
+    """
+    if not os.path.exists(csv_path):
+        return {"ultimo": 0, "offset": 0, "fieldnames": []}
+    try:
+        with open(_caminho_indice(csv_path), encoding="utf-8") as f:
+            idx = json.load(f)
+        if idx.get("offset") == os.path.getsize(csv_path):
+            return idx
+    except (OSError, ValueError):
+        pass
+    fieldnames, ultimo = _varrer_csv(csv_path)
+    return _gravar_indice(csv_path, ultimo, fieldnames)
+
 
 # ----------------------------------------------------
 # AUXILIAR → LÊ O ÚLTIMO CONCURSO DO CSV
 # ----------------------------------------------------
 def ultimo_csv(csv_path):
-    if not os.path.exists(csv_path): 
-        return 0
-    with open(csv_path, newline='', encoding='utf-8') as f:
-        rows = list(csv.DictReader(f))
-    if not rows:
-        return 0
-    return max(int(r["Concurso"]) for r in rows)
+    return int(ler_indice(csv_path)["ultimo"])
+
+
+# ----------------------------------------------------
+# GRAVAÇÃO (append O(1); reescrita só em casos raros)
+# ----------------------------------------------------
+def _reescrever_csv(csv_path, fieldnames, rec=None):
+    """
+    Caminho lento (antigo): relê, completa/remove colunas para o header
+    novo, insere `rec` em ordem e regrava. Só usado para migrar header ou
+    inserir concurso fora de ordem.
+    """
+    try:
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    except FileNotFoundError:
+        rows = []
+    rows = [{c: r.get(c, "") for c in fieldnames} for r in rows]
+
+    if rec is not None:
+        if any(str(r.get("Concurso")) == str(rec["Concurso"]) for r in rows):
+            return False
+        rows.append(rec)
+        rows.sort(key=lambda x: int(x["Concurso"]))
+
+    tmp = csv_path + ".tmp"
+    with open(tmp, "w", newline='', encoding='utf-8') as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w.writeheader()
+        w.writerows(rows)
+    os.replace(tmp, csv_path)
+    _gravar_indice(csv_path, max((int(r["Concurso"]) for r in rows), default=0), fieldnames)
+    return True
+
+
+def anexar_csv(csv_path, rec, fieldnames):
+    """
+    Grava `rec` no CSV. Concurso maior que o último → append no fim
+    (O(1)). Retorna False se o concurso já existe.
+    """
+    rec = {c: rec.get(c, "") for c in fieldnames}
+    idx = ler_indice(csv_path)
+
+    if idx["fieldnames"] and idx["fieldnames"] != list(fieldnames):
+        # header antigo: migra uma única vez
+        _reescrever_csv(csv_path, fieldnames)
+        idx = ler_indice(csv_path)
+
+    concurso = int(rec["Concurso"])
+    if concurso <= int(idx["ultimo"]):
+        return _reescrever_csv(csv_path, fieldnames, rec)
+
+    novo = not os.path.exists(csv_path) or idx["offset"] == 0
+    with open(csv_path, "a", newline='', encoding='utf-8') as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames)
+        if novo:
+            w.writeheader()
+        w.writerow(rec)
+    _gravar_indice(csv_path, concurso, fieldnames)
+    return True
+
 
 # ----------------------------------------------------
 # SALVAR MEGA-SENA
@@ -77,24 +205,10 @@ def salvar_csv_megasena(csv_path, rec):
     "Acumulado Sorteio Especial Mega da Virada","Observação"
 ]
 
-    try:
-        with open(csv_path, newline='', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-    except FileNotFoundError:
-        rows = []
-
-    if any(str(r["Concurso"]) == str(rec["Concurso"]) for r in rows):
+    if not anexar_csv(csv_path, rec, fieldnames):
         print(f"⚠️ Concurso {rec['Concurso']} já existe. Pulando.")
         return False
 
-    rows.append(rec)
-    rows.sort(key=lambda x: int(x["Concurso"]))
-
-    with open(csv_path, "w", newline='', encoding='utf-8') as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        w.writerows(rows)
-
     print(f"✅ Inserido concurso {rec['Concurso']} no CSV Mega-Sena.")
     return True
 
@@ -209,43 +323,57 @@ def salvar_csv_lotomania(csv_path, rec):
 ]
 
 
-    try:
-        with open(csv_path, newline='', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-    except FileNotFoundError:
-        rows = []
-
-    if any(str(r["Concurso"]) == str(rec["Concurso"]) for r in rows):
+    if not anexar_csv(csv_path, rec, fieldnames):
         print(f"⚠️ Concurso {rec['Concurso']} já existe. Pulando.")
         return False
 
-    rows.append(rec)
-    rows.sort(key=lambda x: int(x["Concurso"]))
-
-    with open(csv_path, "w", newline='', encoding='utf-8') as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        w.writerows(rows)
-
     print(f"✅ Inserido concurso {rec['Concurso']} no CSV Lotomania.")
     return True
 
 
 # ----------------------------------------------------
-# FETCH COM RETRY
+# FETCH COM RETRY (Session compartilhada + backoff)
 # ----------------------------------------------------
+_sessoes = {}     # tentativas → requests.Session
+_sessao_lock = threading.Lock()
+
+
+def obter_sessao(workers=WORKERS_PADRAO, tentativas=5):
+    """
+    requests.Session compartilhada por política de retry (`tentativas`):
+    pool de conexões = workers (da 1ª chamada), retry com backoff
+    exponencial em erro de conexão/leitura e em 429/5xx (no máx. 2 por status,
+    para "ainda não publicado" não travar a sondagem).
+    """
+    with _sessao_lock:
+        if tentativas not in _sessoes:
+            retry = Retry(
+                total=tentativas, connect=tentativas, read=tentativas, status=2,
+                backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"]), raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=max(1, workers), pool_maxsize=max(1, workers), max_retries=retry)
+            s = requests.Session()
+            s.headers.update(HEADERS)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _sessoes[tentativas] = s
+        return _sessoes[tentativas]
+
+
 def fetch_concurso(loteria, num, tentativas=5):
-    url = f"{API_BASE[loteria]}/{num}"
-    for t in range(1, tentativas+1):
-        try:
-            r = requests.get(url, headers=HEADERS, timeout=20)
-            if r.status_code == 200:
-                return r.json(), 200
-            return None, r.status_code
-        except:
-            print(f"⏳ Timeout ao buscar {num} (tentativa {t}/{tentativas})")
-            time.sleep(t * 2)
-    return None, None# ================= INTERFACE BONITA ===================
+    """(json, status) do concurso `num` (num=None → último publicado)."""
+    url = API_BASE[loteria] if num is None else f"{API_BASE[loteria]}/{num}"
+    try:
+        r = obter_sessao(tentativas=tentativas).get(url, timeout=TIMEOUT)
+        if r.status_code == 200:
+            return r.json(), 200
+        return None, r.status_code
+    except (requests.RequestException, ValueError) as e:
+        print(f"⏳ Falha ao buscar {num} após {tentativas} tentativas: {e}")
+    return None, None
+
+# ================= INTERFACE BONITA ===================
 
 def clear():
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -328,51 +456,88 @@ def salvar_csv_lotofacil(csv_path, rec):
         "Ganhadores 11 acertos","Rateio 11 acertos"
     ]
 
-    # tenta ler CSV existente
-    try:
-        with open(csv_path, newline='', encoding='utf-8') as f:
-            rows = list(csv.DictReader(f))
-    except FileNotFoundError:
-        rows = []
-
-    # ATUALIZAÇÃO AUTOMÁTICA DO HEADER
-    # se o CSV antigo não tinha os campos novos, eles serão incluídos com ""
-    for r in rows:
-        for c in fieldnames:
-            if c not in r:
-                r[c] = ""
-        # remove colunas velhas que não existem mais
-        remove_cols = [k for k in r.keys() if k not in fieldnames]
-        for k in remove_cols:
-            r.pop(k, None)
-
-    # evita duplicar concurso
-    if any(str(r.get("Concurso")) == str(rec["Concurso"]) for r in rows):
+    # append no fim; header antigo é migrado uma única vez (campos novos
+    # entram com "", colunas velhas saem) e duplicados são ignorados
+    if not anexar_csv(csv_path, rec, fieldnames):
         print(f"⚠️ Concurso {rec['Concurso']} já existe no CSV.")
         return False
 
-    # garante campos no registro novo
-    for c in fieldnames:
-        if c not in rec:
-            rec[c] = ""
+    print(f"✅ CSV Lotofácil atualizado (Concurso {rec['Concurso']}).")
+    return True
 
-    rows.append(rec)
-    rows.sort(key=lambda x: int(x["Concurso"]))
 
-    # salva com o header completo
-    with open(csv_path, "w", newline='', encoding='utf-8') as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        w.writerows(rows)
+# ----------------------------------------------------
+# ATUALIZAÇÃO INCREMENTAL (busca paralela, gravação em ordem)
+# ----------------------------------------------------
+ROTINAS = {
+    "lotofacil": (parse_lotofacil, salvar_csv_lotofacil),
+    "megasena":  (parse_megasena, salvar_csv_megasena),
+    "lotomania": (parse_lotomania, salvar_csv_lotomania),
+}
 
-    print(f"✅ CSV Lotofácil atualizado (Concurso {rec['Concurso']}).")
-    return True
+
+def _ultimo_publicado(loteria):
+    """Número do último concurso publicado (None se a API não informar)."""
+    dados, _ = fetch_concurso(loteria, None, tentativas=2)
+    try:
+        return int(dados["numero"]) if dados else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def atualizar_loteria(loteria, workers=WORKERS_PADRAO, registros=None):
+    """
+    Busca todos os concursos após o último do CSV e anexa em ordem.
+    Com o último publicado conhecido, baixa o intervalo inteiro com
+    `workers` requisições simultâneas; senão sonda em janelas de
+    `workers` até o primeiro concurso inexistente. Retorna quantos gravou.
+    `registros` (lista) recebe os registros gravados (p/ carga_resultados).
+    """
+    parse, salvar = ROTINAS[loteria]
+    csv_path = CSV_FILE[loteria]
+    dirpath = os.path.dirname(csv_path)
+
+    # Só criar diretório se ele existir (Mega e Lotomania têm pastas, Lotofácil não)
+    if dirpath:
+        os.makedirs(dirpath, exist_ok=True)
+
+    ultimo = ultimo_csv(csv_path)
+    atual = ultimo + 1
+    print(f"📄 Último concurso registrado: {ultimo}")
+    print(f"🔍 Buscando a partir do concurso {atual}...\n")
+
+    workers = max(1, int(workers))
+    obter_sessao(workers)
+    publicado = _ultimo_publicado(loteria)
+    if publicado is not None and publicado < atual:
+        print("⛔ Sem novos concursos publicados.")
+        return 0
+
+    gravados = 0
+    janela = workers * 8 if publicado is not None else workers
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        while publicado is None or atual <= publicado:
+            fim = atual + janela if publicado is None else min(atual + janela, publicado + 1)
+            nums = list(range(atual, fim))
+            # map preserva a ordem: grava até o primeiro buraco
+            for num, (dados, status) in zip(nums, ex.map(lambda n: fetch_concurso(loteria, n), nums)):
+                if dados is None:
+                    print(f"⛔ Concurso {num} indisponível (status {status}).")
+                    return gravados
+                rec = parse(dados)
+                if salvar(csv_path, rec):
+                    gravados += 1
+                    if registros is not None:
+                        registros.append(rec)
+            atual = fim
+
+    return gravados
 
 
 # ----------------------------------------------------
 # EXECUÇÃO
 # ----------------------------------------------------
-if __name__ == "__main__":
+def _menu_interativo():
     while True:
         clear()
         titulo()
@@ -400,91 +565,40 @@ if __name__ == "__main__":
         if op == "all":
             for loteria in ["lotofacil", "megasena", "lotomania"]:
                 print(f"\n🟦 Atualizando: {loteria.upper()} ...\n")
-
-                csv_path = CSV_FILE[loteria]
-                dirpath = os.path.dirname(csv_path)
-
-                # Só criar diretório se ele existir (Mega e Lotomania têm pastas, Lotofácil não)
-                if dirpath:
-                    os.makedirs(dirpath, exist_ok=True)
-
-
-                ultimo = ultimo_csv(csv_path)
-                atual = ultimo + 1
-
-                print(f"📄 Último concurso registrado: {ultimo}")
-                print(f"🔍 Buscando a partir do {atual}...\n")
-
-                while True:
-                    dados, status = fetch_concurso(loteria, atual)
-
-                    if dados is None:
-                        print("⛔ Sem novos concursos (ainda não publicado).")
-                        break
-
-                    if loteria == "lotofacil":
-                        rec = parse_lotofacil(dados)
-                        salvar_csv_lotofacil(csv_path, rec)
-
-                    elif loteria == "megasena":
-                        rec = parse_megasena(dados)
-                        salvar_csv_megasena(csv_path, rec)
-
-                    elif loteria == "lotomania":
-                        rec = parse_lotomania(dados)
-                        salvar_csv_lotomania(csv_path, rec)
-                    elif loteria == "lotomania":
-                        rec = parse_lotomania(dados)
-                        salvar_csv_lotomania(csv_path, rec)
-
-
-                    atual += 1
-                    time.sleep(0.4)
+                atualizar_loteria(loteria)
 
             print("\n✅ Todas as loterias foram atualizadas!")
             input("\nPressione ENTER para voltar ao menu...")
             continue
 
         # rodar apenas uma loteria
-        loteria = op
-        csv_path = CSV_FILE[loteria]
-        dirpath = os.path.dirname(csv_path)
-
-        # Só criar diretório se ele existir (Mega e Lotomania têm pastas, Lotofácil não)
-        if dirpath:
-            os.makedirs(dirpath, exist_ok=True)
-
         clear()
         titulo()
-        print(f"🟩 Atualizando somente {loteria.upper()}...\n")
-
-        ultimo = ultimo_csv(csv_path)
-        atual = ultimo + 1
-
-        print(f"📄 Último concurso registrado: {ultimo}")
-        print(f"🔍 Buscando a partir do concurso {atual}...\n")
-
-        while True:
-            dados, status = fetch_concurso(loteria, atual)
-
-            if dados is None:
-                print("⛔ Sem novos concursos publicados.")
-                break
-
-            if loteria == "lotofacil":
-                rec = parse_lotofacil(dados)
-                salvar_csv_lotofacil(csv_path, rec)
-
-            elif loteria == "megasena":
-                rec = parse_megasena(dados)
-                salvar_csv_megasena(csv_path, rec)
-
-            elif loteria == "lotomania":
-                rec = parse_lotomania(dados)
-                salvar_csv_lotomania(csv_path, rec)
-
-            atual += 1
-            time.sleep(0.4)
+        print(f"🟩 Atualizando somente {op.upper()}...\n")
+        atualizar_loteria(op)
 
         print("\n✅ Atualização concluída!")
         input("\nPressione ENTER para voltar ao menu...")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza os CSVs de resultados da Caixa (incremental).")
+    parser.add_argument("--loteria", choices=sorted(ROTINAS) + ["all"], default=None,
+                        help="sem --loteria abre o menu interativo")
+    parser.add_argument("--workers", type=int, default=WORKERS_PADRAO)
+    parser.add_argument("--banco", action="store_true",
+                        help="carrega os concursos novos no Postgres (COPY, carga_resultados.py)")
+    args = parser.parse_args()
+
+    if args.loteria is None:
+        _menu_interativo()
+    else:
+        for loteria in (sorted(ROTINAS) if args.loteria == "all" else [args.loteria]):
+            print(f"\n🟦 Atualizando: {loteria.upper()} ...\n")
+            novos = []
+            n = atualizar_loteria(loteria, args.workers, registros=novos)
+            print(f"✅ {loteria}: {n} concurso(s) gravado(s).")
+            if args.banco and novos:
+                from carga_resultados import carregar
+
+                carregar(loteria, novos, hits=True)
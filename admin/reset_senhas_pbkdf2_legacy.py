@@ -3,20 +3,11 @@
 # Usa DATABASE_URL do .env
 # trocamos de nome em 18/12 pq elepoderia esta gerando bug nas senhas
 
-import os
-from dotenv import load_dotenv
 from passlib.hash import pbkdf2_sha256
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-# Carrega variáveis do .env
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("❌ DATABASE_URL não encontrado no arquivo .env")
-
-# Conecta ao banco
-engine = create_engine(DATABASE_URL)
+# Engine único do processo (admin/db.py → db_pool, lê o .env da raiz)
+from db import engine
 
 # Defina a nova senha padrão
 NOVA_SENHA = "faixab123"
@@ -4,6 +4,8 @@ import json
 import datetime
 from sqlalchemy import text
 from db import Session
+from palpites_hits import atualizar_hits
+from carga_resultados import carregar_csv
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 print("DEBUG BASE_DIR:", BASE_DIR)
@@ -119,52 +121,34 @@ def inserir_resultado(db, r):
 # 5. Função Principal
 # ============================================================
 def importar_megasena(caminho_csv=None):
+    """
+    Carrega o CSV inteiro via COPY + 1 upsert (carga_resultados.py).
+    Concursos novos fora dos dias oficiais continuam sendo ignorados.
+    """
     if caminho_csv is None:
        caminho_csv = os.path.join(BASE_DIR, "mega", "loteriamega.csv")
 
     print("🟩 Importando Mega-Sena...")
     print(f"📄 Usando CSV: {caminho_csv}")
 
-    dados = carregar_csv_megasena(caminho_csv)
-
-    if not dados:
-        print("❌ Nenhum registro válido encontrado.")
-        return
-
-    dados.sort(key=lambda x: x["concurso"])
-
-    ultimo_db = obter_ultimo_concurso_db()
-    print(f"📌 Último concurso no banco: {ultimo_db}")
-
-    novos = [d for d in dados if d["concurso"] > ultimo_db]
-
-    if not novos:
-        print("✔ Nenhum concurso novo encontrado.")
-        return
-
-    db = Session()
-    inseridos = 0
-
     try:
-        for r in novos:
-            if not dia_valido(r["data"]):
-                print(f"⚠ Ignorado (não é dia oficial): {r['concurso']} - {r['data']}")
-                continue
-
-            inserir_resultado(db, r)
-            inseridos += 1
-            print(f"✔ Inserido concurso {r['concurso']}")
-
-        db.commit()
-
+        resumo = carregar_csv("megasena", caminho_csv)
     except Exception as e:
-        db.rollback()
         print(f"❌ ERRO ao inserir: {e}")
+        return
 
-    finally:
-        db.close()
+    if not resumo["gravados"]:
+        print("❌ Nenhum registro válido encontrado.")
+        return
+
+    print(f"🟩 Finalizado — {resumo['gravados']} concursos gravados, {len(resumo['novos'])} novos.")
 
-    print(f"🟩 Finalizado — {inseridos} concursos inseridos.")
+    # Acertos dos palpites das datas de todos os concursos da carga
+    if resumo["concursos"]:
+        try:
+            atualizar_hits("MS", concursos=resumo["concursos"])
+        except Exception as e:
+            print(f"❌ Falha ao atualizar palpites_hits: {e}")
 
 
 # Execução direta
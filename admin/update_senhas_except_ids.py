@@ -2,19 +2,10 @@
 # 🔒 Atualiza senha de todos usuários, exceto IDs específicos
 # Usa DATABASE_URL do .env
 
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-# Carrega variáveis do .env
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("❌ DATABASE_URL não encontrado no arquivo .env")
-
-# Conecta ao banco
-engine = create_engine(DATABASE_URL)
+# Engine único do processo (admin/db.py → db_pool, lê o .env da raiz)
+from db import engine
 
 # Hash fornecido (pbkdf2_sha256 já gerado)
 NOVO_HASH = "$pbkdf2-sha256$29000$SCklBMAYgzCmdC5FaM0Zgw$YAe818Fqwjk/vc/62iu1QWE24.VyCOaxr9yCIqs074c"
@@ -4,6 +4,7 @@
 import streamlit as st
 from sqlalchemy import text
 from db import Session
+import schema_cache
 from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
 import logging
@@ -27,13 +28,7 @@ def _format_date(value):
 
 
 def _table_exists(db, table_name: str) -> bool:
-    return bool(db.execute(text("""
-        SELECT 1
-        FROM information_schema.tables
-        WHERE table_schema = 'public'
-          AND table_name = :t
-        LIMIT 1
-    """), {"t": table_name}).scalar())
+    return schema_cache.existe_tabela(table_name)
 
 
 def _pick_hits_table(db):
@@ -66,8 +61,8 @@ def _render_faixas(title: str, faixas_dict: dict, total_ref: int):
 
 def _calcular_estatisticas_reais(db, user_id: int, mes: int, ano: int):
     """
-    Calcula estatísticas REAIS via queries diretas em palpites/resultados.
-    Substitui a dependência de 'palpites_hits' que estava vazia.
+    Estatísticas por faixa de acerto lidas de palpites_hits
+    (mantida por admin/palpites_hits.py a cada concurso importado).
     """
     stats = {
         "lf": {str(x): 0 for x in [11, 12, 13, 14, 15]},
@@ -77,64 +72,20 @@ def _calcular_estatisticas_reais(db, user_id: int, mes: int, ano: int):
     }
 
     try:
-        # --- LOTOFÁCIL ---
-        # Cruza palpites com resultados pela data (normalizada)
-        q_lf = text("""
-            WITH base AS (
-                SELECT
-                    p.id,
-                    (SELECT COUNT(*) 
-                     FROM unnest(regexp_split_to_array(NULLIF(trim(COALESCE(p.dezenas, p.numeros)),''),'[,\\s]+')) d(txt)
-                     WHERE d.txt ~ '^\\d+$' 
-                       AND d.txt::int IN (r.n1,r.n2,r.n3,r.n4,r.n5,r.n6,r.n7,r.n8,r.n9,r.n10,r.n11,r.n12,r.n13,r.n14,r.n15)
-                    ) as acertos
-                FROM palpites p
-                JOIN resultados_oficiais r ON r.data = p.data_norm
-                WHERE p.id_usuario = :uid
-                  AND EXTRACT(MONTH FROM CAST(p.created_at AS DATE)) = :m
-                  AND EXTRACT(YEAR FROM CAST(p.created_at AS DATE)) = :a
-            )
-            SELECT acertos, COUNT(*) as qtd
-            FROM base
-            GROUP BY acertos
-        """)
-        
-        rows_lf = db.execute(q_lf, {"uid": user_id, "m": mes, "a": ano}).fetchall()
-        for r in rows_lf:
-            acertos = r.acertos
-            qtd = r.qtd
-            stats["total_validacoes_lf"] += qtd
-            if acertos in [11, 12, 13, 14, 15]:
-                 stats["lf"][str(acertos)] += qtd
-
-        # --- MEGA-SENA ---
-        q_ms = text("""
-            WITH base AS (
-                SELECT
-                    p.id,
-                    (SELECT COUNT(*) 
-                     FROM unnest(regexp_split_to_array(NULLIF(trim(p.numeros),''),'[,\\s]+')) d(txt)
-                     WHERE d.txt ~ '^\\d+$' 
-                       AND d.txt::int IN (r.n1,r.n2,r.n3,r.n4,r.n5,r.n6)
-                    ) as acertos
-                FROM palpites_m p
-                JOIN resultados_oficiais_m r ON r.data = p.data_norm
-                WHERE p.id_usuario = :uid
-                  AND EXTRACT(MONTH FROM CAST(p.created_at AS DATE)) = :m
-                  AND EXTRACT(YEAR FROM CAST(p.created_at AS DATE)) = :a
-            )
-            SELECT acertos, COUNT(*) as qtd
-            FROM base
-            GROUP BY acertos
-        """)
-        
-        rows_ms = db.execute(q_ms, {"uid": user_id, "m": mes, "a": ano}).fetchall()
-        for r in rows_ms:
-            acertos = r.acertos
-            qtd = r.qtd
-            stats["total_validacoes_ms"] += qtd
-            if acertos in [4, 5, 6]:
-                 stats["ms"][str(acertos)] += qtd
+        rows = db.execute(text("""
+            SELECT loteria, acertos, COUNT(*) AS qtd
+            FROM palpites_hits
+            WHERE id_usuario = :uid
+              AND data >= make_date(:a, :m, 1)
+              AND data <  make_date(:a, :m, 1) + INTERVAL '1 month'
+            GROUP BY loteria, acertos
+        """), {"uid": user_id, "m": mes, "a": ano}).fetchall()
+
+        for r in rows:
+            chave = "lf" if r.loteria == "LF" else "ms"
+            stats[f"total_validacoes_{chave}"] += r.qtd
+            if str(r.acertos) in stats[chave]:
+                stats[chave][str(r.acertos)] += r.qtd
 
         return stats, None
 
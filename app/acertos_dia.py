@@ -3,6 +3,8 @@ from datetime import datetime, date
 import argparse
 from sqlalchemy import text
 from db import Session
+import schema_cache
+from modelo_llm_max.core import bitmask
 from tabulate import tabulate
 
 def parse_num_list(value):
@@ -47,9 +49,7 @@ def fetch_resultado(data_ref):
 def fetch_palpites(data_ref, tipo, user_id=None):
     db = Session()
     try:
-        has_numeros = db.execute(text("""
-        SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='palpites' AND column_name='numeros')
-        """)).scalar()
+        has_numeros = schema_cache.tem_coluna("palpites", "numeros")
         num_col = "numeros" if has_numeros else "dezenas"
         sql = f"""
         SELECT p.id, p.id_usuario, p.{num_col} AS nums, p.modelo, {sql_date_expr('p','data')} AS data_norm
@@ -79,11 +79,14 @@ def comparar(data_ref, tipo, user_id=None):
         print("⚠️ Nenhum palpite encontrado.")
         return
     nums_oficiais = set(res["numeros"])
+    qtds = bitmask.hits(
+        bitmask.pack_many([p["numeros"] for p in palpites], "lotofacil"),
+        bitmask.pack(res["numeros"], "lotofacil"),
+    )
     rows = []
-    for p in palpites:
-        acertos = nums_oficiais.intersection(p["numeros"])
-        qtd = len(acertos)
+    for p, qtd in zip(palpites, qtds.tolist()):
         if 11 <= qtd <= 15:
+            acertos = nums_oficiais.intersection(p["numeros"])
             rows.append([p["id"], p["id_usuario"], p["modelo"], qtd,
                          ",".join(f"{n:02d}" for n in sorted(p["numeros"])),
                          ",".join(f"{n:02d}" for n in sorted(acertos))])
@@ -6,11 +6,11 @@
 
 import streamlit as st
 from datetime import date
-from sqlalchemy import text
 import pandas as pd
 import altair as alt
 
-from db import Session
+from db import Session  # noqa: F401  (coloca a raiz no sys.path)
+import cache_consultas
 
 
 # =====================================================
@@ -140,7 +140,7 @@ def sql_date_expr(alias: str, col: str) -> str:
 # =====================================================
 # 📦 Fetchers (sem data::date direto)
 # =====================================================
-def fetch_resultado(db, lottery: str, data_ref: date):
+def fetch_resultado(v: dict, lottery: str, data_ref: date):
     if lottery == "LOTOFACIL":
         table = "resultados_oficiais"
         date_col = "data"
@@ -163,7 +163,8 @@ def fetch_resultado(db, lottery: str, data_ref: date):
     ORDER BY {concurso_col} DESC
     LIMIT 1
     """
-    row = db.execute(text(sql), {"d": data_ref.isoformat()}).fetchone()
+    lot = "LF" if lottery == "LOTOFACIL" else "MS"
+    row = cache_consultas.consultar(sql, {"d": data_ref.isoformat()}, v, (lot,), modo="one")
     if not row:
         return None
 
@@ -176,7 +177,7 @@ def fetch_resultado(db, lottery: str, data_ref: date):
     return {"concurso": int(row.concurso), "data": row.data_norm, "numeros": nums, "table": table}
 
 
-def fetch_palpites(db, lottery: str, data_ref: date, tipo: str, user_id: int | None):
+def fetch_palpites(v: dict, lottery: str, data_ref: date, tipo: str, user_id: int | None):
     if lottery == "LOTOFACIL":
         table = "palpites"
         date_col = "data"
@@ -197,7 +198,9 @@ def fetch_palpites(db, lottery: str, data_ref: date, tipo: str, user_id: int | N
         params["uid"] = user_id
 
     sql += " ORDER BY id DESC"
-    return db.execute(text(sql), params).fetchall()
+    # admin vê palpites de todos ("global": janela curta); as escritas do
+    # próprio usuário invalidam na hora ("usuario")
+    return cache_consultas.consultar(sql, params, v, ("usuario", "global"))
 
 
 def parse_numbers(raw):
@@ -331,89 +334,86 @@ def main():
         st.caption("Selecione os filtros no menu lateral e clique em **Analisar acertos**.")
         return
 
-    db = Session()
-    try:
-        res = fetch_resultado(db, lottery, data_escolhida)
-        if not res:
-            st.warning("Resultado oficial não encontrado para a data/loteria informada.")
-            return
-
-        rows = fetch_palpites(db, lottery, data_escolhida, tipo, user_id)
-        if not rows:
-            st.info("Nenhum palpite encontrado para essa data (com os filtros atuais).")
-            return
-
-        oficiais = set(res["numeros"])
-        dados = []
-
-        for r in rows:
-            nums = parse_numbers(r.numeros)
-            hits = sorted(oficiais.intersection(nums))
-            dados.append(
-                {
-                    "id": int(r.id),
-                    "id_usuario": int(r.id_usuario) if r.id_usuario is not None else None,
-                    "modelo": str(r.modelo) if r.modelo is not None else "—",
-                    "qtd_acertos": len(hits),
-                    "numeros": " ".join(f"{n:02d}" for n in sorted(nums)),
-                    "acertos": " ".join(f"{n:02d}" for n in hits),
-                }
-            )
-
-        df = pd.DataFrame(dados).sort_values(["qtd_acertos", "id"], ascending=[False, False])
-
-        df_faixa = df[(df["qtd_acertos"] >= min_hit) & (df["qtd_acertos"] <= max_hit)]
-        total = len(df)
-        winners = len(df_faixa)
-        best = int(df["qtd_acertos"].max()) if total else 0
-        avg = float(df["qtd_acertos"].mean()) if total else 0.0
-
-        # Card principal
-        st.markdown(
-            f"""
-            <div class="fb-card">
-                <b>📅 {data_escolhida.strftime('%d/%m/%Y')} • Concurso #{res['concurso']}</b><br>
-                <span style="opacity:.75">Números sorteados:</span>
-                <span class="nums">{", ".join(f"{n:02d}" for n in sorted(res["numeros"]))}</span><br><br>
-                <b>Palpites no dia:</b> {total} &nbsp; | &nbsp;
-                <b>Na faixa:</b> {winners} &nbsp; | &nbsp;
-                <b>Melhor hit:</b> {best} &nbsp; | &nbsp;
-                <b>Média:</b> {avg:.2f}
-            </div>
-            """,
-            unsafe_allow_html=True,
+    v = cache_consultas.versao(user_id)
+
+    res = fetch_resultado(v, lottery, data_escolhida)
+    if not res:
+        st.warning("Resultado oficial não encontrado para a data/loteria informada.")
+        return
+
+    rows = fetch_palpites(v, lottery, data_escolhida, tipo, user_id)
+    if not rows:
+        st.info("Nenhum palpite encontrado para essa data (com os filtros atuais).")
+        return
+
+    oficiais = set(res["numeros"])
+    dados = []
+
+    for r in rows:
+        nums = parse_numbers(r.numeros)
+        hits = sorted(oficiais.intersection(nums))
+        dados.append(
+            {
+                "id": int(r.id),
+                "id_usuario": int(r.id_usuario) if r.id_usuario is not None else None,
+                "modelo": str(r.modelo) if r.modelo is not None else "—",
+                "qtd_acertos": len(hits),
+                "numeros": " ".join(f"{n:02d}" for n in sorted(nums)),
+                "acertos": " ".join(f"{n:02d}" for n in hits),
+            }
         )
 
-        tab1, tab2, tab3 = st.tabs(["📌 Resumo", "🧾 Detalhes", "⬇️ Exportar"])
-
-        with tab1:
-            st.markdown("#### 📈 Distribuição (apenas faixa selecionada)")
-            chart_faixa(df_faixa[["qtd_acertos"]].copy())
-
-            st.markdown("#### 🏅 Palpites na faixa")
-            if df_faixa.empty:
-                st.info("Nenhum palpite dentro da faixa selecionada.")
-            else:
-                st.dataframe(df_faixa, use_container_width=True, hide_index=True)
-
-        with tab2:
-            st.markdown("#### 🔎 Todos os palpites (ordenado por acertos)")
-            st.dataframe(df, use_container_width=True, hide_index=True)
-
-        with tab3:
-            st.markdown("#### ⬇️ Exportar CSV")
-            csv = df.to_csv(index=False).encode("utf-8")
-            st.download_button(
-                "Baixar CSV",
-                data=csv,
-                file_name=f"acertos_{lottery.lower()}_{data_escolhida.isoformat()}.csv",
-                mime="text/csv",
-                use_container_width=True,
-            )
-            st.caption(f"Fonte resultados: `{res.get('table','?')}`")
-
-    finally:
-        db.close()
+    df = pd.DataFrame(dados).sort_values(["qtd_acertos", "id"], ascending=[False, False])
+
+    df_faixa = df[(df["qtd_acertos"] >= min_hit) & (df["qtd_acertos"] <= max_hit)]
+    total = len(df)
+    winners = len(df_faixa)
+    best = int(df["qtd_acertos"].max()) if total else 0
+    avg = float(df["qtd_acertos"].mean()) if total else 0.0
+
+    # Card principal
+    st.markdown(
+        f"""
+        <div class="fb-card">
+            <b>📅 {data_escolhida.strftime('%d/%m/%Y')} • Concurso #{res['concurso']}</b><br>
+            <span style="opacity:.75">Números sorteados:</span>
+            <span class="nums">{", ".join(f"{n:02d}" for n in sorted(res["numeros"]))}</span><br><br>
+            <b>Palpites no dia:</b> {total} &nbsp; | &nbsp;
+            <b>Na faixa:</b> {winners} &nbsp; | &nbsp;
+            <b>Melhor hit:</b> {best} &nbsp; | &nbsp;
+            <b>Média:</b> {avg:.2f}
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    tab1, tab2, tab3 = st.tabs(["📌 Resumo", "🧾 Detalhes", "⬇️ Exportar"])
+
+    with tab1:
+        st.markdown("#### 📈 Distribuição (apenas faixa selecionada)")
+        chart_faixa(df_faixa[["qtd_acertos"]].copy())
+
+        st.markdown("#### 🏅 Palpites na faixa")
+        if df_faixa.empty:
+            st.info("Nenhum palpite dentro da faixa selecionada.")
+        else:
+            st.dataframe(df_faixa, use_container_width=True, hide_index=True)
+
+    with tab2:
+        st.markdown("#### 🔎 Todos os palpites (ordenado por acertos)")
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
+    with tab3:
+        st.markdown("#### ⬇️ Exportar CSV")
+        csv = df.to_csv(index=False).encode("utf-8")
+        st.download_button(
+            "Baixar CSV",
+            data=csv,
+            file_name=f"acertos_{lottery.lower()}_{data_escolhida.isoformat()}.csv",
+            mime="text/csv",
+            use_container_width=True,
+        )
+        st.caption(f"Fonte resultados: `{res.get('table','?')}`")
 
 
 if __name__ == "__main__":
@@ -11,6 +11,10 @@ from collections import defaultdict
 import streamlit as st
 from sqlalchemy import text
 from app.db import Session
+import schema_cache
+import cache_consultas
+import frequencia_palpites
+import periodos
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, date
 
@@ -90,22 +94,24 @@ def _fmt_date_br(x):
 
 # -------------------- [4] DASHBOARD PRINCIPAL --------------------
 
-def grafico_frequencia_palpites():
-    db = Session()
-    try:
-        result = db.execute(text("SELECT numeros FROM palpites"))
-        rows = result.fetchall()
-        df = pd.DataFrame(rows, columns=["numeros"])
-    finally:
-        db.close()
-
-    todos_numeros = df["numeros"].dropna().apply(lambda x: list(map(int, x.split(","))))
-    todos_numeros = pd.Series([num for sublist in todos_numeros for num in sublist])
-    frequencia = todos_numeros.value_counts().sort_index()
-    df_freq = pd.DataFrame({"Número": frequencia.index, "Frequência": frequencia.values})
+def grafico_frequencia_palpites(loteria="LF", dias=None):
+    """
+    Frequência das dezenas nos palpites de todos os usuários. A contagem
+    vem pronta do banco (palpite_dezena_freq, ver frequencia_palpites.py):
+    25/60 linhas em vez da tabela de palpites inteira.
+    dias=(ini, fim) → só palpites desse intervalo fechado.
+    """
+    params = {"loteria": loteria}
+    if dias:
+        params["ini"], params["fim"] = periodos.dias(*dias)
+    rows = cache_consultas.consultar(
+        frequencia_palpites.sql_frequencias(loteria, periodo=bool(dias)),
+        params, cache_consultas.versao(), ("global",),
+    )
+    df_freq = pd.DataFrame(rows, columns=["Número", "Frequência"])
 
     fig, ax = plt.subplots(figsize=(7, 3.5))
-    sns.barplot(data=df_freq, x="Número", y="Frequência", palette="Blues", ax=ax)
+    ax.bar(df_freq["Número"], df_freq["Frequência"], color="#6C63FF")
     ax.set_title("Frequência nos Palpites dos Usuários", fontsize=14)
     ax.set_xlabel("Números")
     ax.set_ylabel("Frequência")
@@ -191,125 +197,51 @@ def mostrar_telemetria():
     finally:
         db.close()
 
-def _dezenas_acertos_sql(qtd_dezenas: int, tbl_palpites: str, tbl_res: str) -> str:
+def _dezenas_acertos_sql() -> str:
     """
-    Retorna SQL que:
-    - pega palpites do usuário
-    - junta com resultado oficial pela data (dd/mm/yyyy)
-    - calcula acertos via LATERAL + unnest da coluna dezenas
-    Requisitos:
-    - palpites(… created_at, dezenas int[] …)
-    - resultados_oficiais(… data texto dd/mm/yyyy OU data date; ajuste abaixo)
+    Resumo de acertos do usuário lido de palpites_hits (materializada por
+    admin/palpites_hits.py a cada concurso novo) — sem join por data nem
+    parsing do texto "numeros" por page view.
+    Parâmetros: :uid, :loteria ('LF'|'MS'), :min_premio
     """
-    # Observação:
-    # No seu código, você usa resultados_oficiais.data como algo formatável.
-    # Vou cruzar por to_char(created_at,'DD/MM/YYYY') = to_char(r.data,'DD/MM/YYYY')
-    # Se r.data for texto dd/mm/yyyy, a comparação vira: to_char(created_at,'DD/MM/YYYY') = r.data
-
-    dezenas_cols = ", ".join([f"r.n{i}" for i in range(1, qtd_dezenas + 1)])
-
-    return f"""
-    WITH base AS (
-        SELECT
-            p.id,
-            p.created_at::date AS dt,
-            h.acertos
-        FROM {tbl_palpites} p
-        JOIN {tbl_res} r
-          ON to_char(p.created_at, 'DD/MM/YYYY') = 
-             CASE 
-               WHEN pg_typeof(r.data)::text = 'text' THEN r.data
-               ELSE to_char(r.data::date, 'DD/MM/YYYY')
-             END
-        CROSS JOIN LATERAL (
-            SELECT COUNT(*) AS acertos
-            FROM unnest(p.dezenas) AS d(num)
-            WHERE d.num = ANY(ARRAY[{dezenas_cols}])
-        ) h
-        WHERE p.id_usuario = :uid
-    )
+    return """
     SELECT
         COUNT(*) AS avaliados,
-        MAX(acertos) AS melhor,
-        AVG(acertos)::numeric(10,2) AS media,
-        COUNT(*) FILTER (WHERE dt >= date_trunc('month', CURRENT_DATE)::date AND acertos >= :min_premio) AS premiaveis_mes,
+        COALESCE(MAX(acertos), 0) AS melhor,
+        ROUND(COALESCE(AVG(acertos), 0)::numeric, 2) AS media,
+        COUNT(*) FILTER (
+            WHERE data >= date_trunc('month', CURRENT_DATE)::date
+              AND acertos >= :min_premio
+        ) AS premiaveis_mes,
         COUNT(*) FILTER (WHERE acertos >= :min_premio) AS premiaveis_total,
-        AVG(acertos) FILTER (WHERE dt >= CURRENT_DATE - INTERVAL '30 days')::numeric(10,2) AS media_30d,
-        AVG(acertos) FILTER (WHERE dt <  CURRENT_DATE - INTERVAL '30 days' AND dt >= CURRENT_DATE - INTERVAL '60 days')::numeric(10,2) AS media_30d_prev
-    FROM base;
+        ROUND(AVG(acertos) FILTER (
+            WHERE data >= CURRENT_DATE - INTERVAL '30 days'
+        )::numeric, 2) AS media_30d,
+        ROUND(AVG(acertos) FILTER (
+            WHERE data < CURRENT_DATE - INTERVAL '30 days'
+              AND data >= CURRENT_DATE - INTERVAL '60 days'
+        )::numeric, 2) AS media_30d_prev
+    FROM palpites_hits
+    WHERE id_usuario = :uid
+      AND loteria = :loteria;
     """
 
-def mostrar_analise_acertos_topo(user_id: int, loteria=None, loteria_ativa=None):
-    from sqlalchemy import text
-    from db import Session
-
+def mostrar_analise_acertos_topo(user_id: int, loteria=None, loteria_ativa=None, versao_dados=None):
     lot = (loteria_ativa or loteria or st.session_state.get("loteria") or "").lower().strip()
 
     # ---- LOTOFÁCIL (corrigido) ----
     if lot in ("lotofacil", "loto-facil", "loto fácil", "lotofácil", "lf"):
 
-        sql = """
-        WITH r_norm AS (
-            SELECT
-                -- normaliza data do resultado (TEXT) para DATE com segurança
-                CASE
-                    WHEN r.data ~ '^\\d{2}/\\d{2}/\\d{4}$' THEN to_date(r.data, 'DD/MM/YYYY')
-                    WHEN r.data ~ '^\\d{4}-\\d{2}-\\d{2}$' THEN to_date(r.data, 'YYYY-MM-DD')
-                    ELSE NULL
-                END AS r_dt,
-                r.n1,r.n2,r.n3,r.n4,r.n5,
-                r.n6,r.n7,r.n8,r.n9,r.n10,
-                r.n11,r.n12,r.n13,r.n14,r.n15
-            FROM resultados_oficiais r
-        ),
-        base AS (
-            SELECT
-                p.id,
-                p.data_norm AS p_dt,
-                h.acertos
-            FROM palpites p
-            JOIN r_norm r
-              ON r.r_dt = p.data_norm
-            CROSS JOIN LATERAL (
-                SELECT COUNT(*) AS acertos
-                FROM unnest(
-                    regexp_split_to_array(
-                        NULLIF(trim(COALESCE(p.dezenas, p.numeros)), ''),
-                        '[,\\s]+'
-                    )
-                ) AS d(txt)
-                WHERE NULLIF(d.txt,'') IS NOT NULL
-                  AND d.txt ~ '^\\d+$'
-                  AND (d.txt::int) = ANY(ARRAY[
-                      r.n1,r.n2,r.n3,r.n4,r.n5,
-                      r.n6,r.n7,r.n8,r.n9,r.n10,
-                      r.n11,r.n12,r.n13,r.n14,r.n15
-                  ])
-            ) h
-            WHERE p.id_usuario = :uid
-              AND p.data_norm IS NOT NULL
-              AND r.r_dt IS NOT NULL
-        )
-        SELECT
-            COUNT(*) AS avaliados,
-            COALESCE(MAX(acertos), 0) AS melhor,
-            ROUND(COALESCE(AVG(acertos), 0)::numeric, 2) AS media,
-            COUNT(*) FILTER (
-                WHERE p_dt >= date_trunc('month', CURRENT_DATE)::date
-                  AND acertos >= 11
-            ) AS premiaveis_mes,
-            COUNT(*) FILTER (WHERE acertos >= 11) AS premiaveis_total
-        FROM base;
-        """
+        sql = _dezenas_acertos_sql()
 
-        db = Session()
         try:
-            row = db.execute(text(sql), {"uid": user_id}).fetchone()
+            row = cache_consultas.consultar(
+                sql, {"uid": user_id, "loteria": "LF", "min_premio": 11},
+                versao_dados, ("LF", "dia"), modo="one",
+            )
         except Exception as e:
             st.warning(f"⚠️ Não foi possível calcular a análise de acertos: {e}")
             return
-        finally:
-            db.close()
 
         if not row or row.avaliados == 0:
             st.info("Ainda não há palpites avaliáveis.")
@@ -324,51 +256,16 @@ def mostrar_analise_acertos_topo(user_id: int, loteria=None, loteria_ativa=None)
         return
 
     if lot in ("mega-sena", "megasena", "ms"):
-        sql = """
-        WITH base AS (
-            SELECT
-                p.id,
-                p.data_norm AS p_dt,
-                h.acertos
-            FROM palpites_m p
-            JOIN resultados_oficiais_m r
-            ON r.data = p.data_norm
-            CROSS JOIN LATERAL (
-                SELECT COUNT(*) AS acertos
-                FROM unnest(
-                    regexp_split_to_array(
-                        NULLIF(trim(p.numeros), ''),
-                        '[,\\s]+'
-                    )
-                ) AS d(txt)
-                WHERE d.txt ~ '^\\d+$'
-                AND (d.txt::int) = ANY (
-                    ARRAY[r.n1, r.n2, r.n3, r.n4, r.n5, r.n6]
-                )
-            ) h
-            WHERE p.id_usuario = :uid
-            AND p.data_norm IS NOT NULL
-        )
-        SELECT
-            COUNT(*) AS avaliados,
-            COALESCE(MAX(acertos), 0) AS melhor,
-            ROUND(COALESCE(AVG(acertos), 0)::numeric, 2) AS media,
-            COUNT(*) FILTER (
-                WHERE p_dt >= date_trunc('month', CURRENT_DATE)::date
-                AND acertos >= 4
-            ) AS premiaveis_mes,
-            COUNT(*) FILTER (WHERE acertos >= 4) AS premiaveis_total
-        FROM base;
-        """
+        sql = _sql_analise_acertos_megasena()
 
-        db = Session()
         try:
-            row = db.execute(text(sql), {"uid": user_id}).fetchone()
+            row = cache_consultas.consultar(
+                sql, {"uid": user_id, "loteria": "MS", "min_premio": 4},
+                versao_dados, ("MS", "dia"), modo="one",
+            )
         except Exception as e:
             st.warning(f"⚠️ Não foi possível calcular a análise de acertos (Mega-Sena): {e}")
             return
-        finally:
-            db.close()
 
         if not row or row.avaliados == 0:
             st.info("Ainda não há palpites avaliáveis para Mega-Sena.")
@@ -389,47 +286,39 @@ def mostrar_analise_acertos_topo(user_id: int, loteria=None, loteria_ativa=None)
 
 
 def _sql_analise_acertos_megasena() -> str:
+    return _dezenas_acertos_sql()
+
+def _sql_evolucao_30_dias() -> str:
+    """Palpites/dia e média de acertos nos últimos 30 dias (palpites_hits)."""
     return """
-    WITH base AS (
+    WITH dias AS (
+        SELECT generate_series(
+            CURRENT_DATE - INTERVAL '29 days',
+            CURRENT_DATE,
+            INTERVAL '1 day'
+        )::date AS dia
+    ),
+    dados AS (
         SELECT
-            p.id,
-            p.data_norm AS dt,
-            h.acertos
-        FROM palpites_m p
-        JOIN resultados_oficiais_m r
-          ON p.data_norm = r.data
-        CROSS JOIN LATERAL (
-            SELECT COUNT(*) AS acertos
-            FROM unnest(string_to_array(p.dezenas, ',')::int[]) AS d(num)
-            WHERE d.num = ANY(ARRAY[
-                r.n1, r.n2, r.n3, r.n4, r.n5, r.n6
-            ])
-        ) h
-        WHERE p.id_usuario = :uid
+            data AS dia,
+            COUNT(*) AS total_palpites,
+            AVG(acertos) AS media_acertos
+        FROM palpites_hits
+        WHERE id_usuario = :uid
+          AND loteria = :loteria
+          AND data >= CURRENT_DATE - INTERVAL '29 days'
+        GROUP BY data
     )
     SELECT
-        COUNT(*) AS avaliados,
-        COALESCE(MAX(acertos), 0) AS melhor,
-        ROUND(AVG(acertos)::numeric, 2) AS media,
-        COUNT(*) FILTER (
-            WHERE dt >= date_trunc('month', CURRENT_DATE)::date
-              AND acertos >= :min_premio
-        ) AS premiaveis_mes,
-        COUNT(*) FILTER (WHERE acertos >= :min_premio) AS premiaveis_total,
-        ROUND(AVG(acertos) FILTER (
-            WHERE dt >= CURRENT_DATE - INTERVAL '30 days'
-        )::numeric, 2) AS media_30d,
-        ROUND(AVG(acertos) FILTER (
-            WHERE dt < CURRENT_DATE - INTERVAL '30 days'
-              AND dt >= CURRENT_DATE - INTERVAL '60 days'
-        )::numeric, 2) AS media_30d_prev
-    FROM base;
+        d.dia,
+        COALESCE(x.total_palpites, 0) AS total,
+        ROUND(COALESCE(x.media_acertos, 0), 2) AS media
+    FROM dias d
+    LEFT JOIN dados x ON x.dia = d.dia
+    ORDER BY d.dia;
     """
 
-def evolucao_30_dias(user_id: int, loteria=None, loteria_ativa=None):
-    from sqlalchemy import text
-    from db import Session
-
+def evolucao_30_dias(user_id: int, loteria=None, loteria_ativa=None, versao_dados=None):
     lot = (loteria_ativa or loteria or st.session_state.get("loteria") or "").lower().strip()
 
     # =========================================================
@@ -437,58 +326,17 @@ def evolucao_30_dias(user_id: int, loteria=None, loteria_ativa=None):
     # =========================================================
     if lot in ("mega-sena", "megasena", "ms"):
 
-        sql = """
-        WITH dias AS (
-            SELECT generate_series(
-                CURRENT_DATE - INTERVAL '29 days',
-                CURRENT_DATE,
-                INTERVAL '1 day'
-            )::date AS dia
-        ),
-        dados AS (
-            SELECT
-                p.data_norm AS dia,
-                COUNT(*) AS total_palpites,
-                AVG(h.acertos) AS media_acertos
-            FROM palpites_m p
-            JOIN resultados_oficiais_m r
-              ON r.data = p.data_norm
-            CROSS JOIN LATERAL (
-                SELECT COUNT(*) AS acertos
-                FROM unnest(
-                    regexp_split_to_array(
-                        NULLIF(trim(p.numeros), ''),
-                        '[,\\s]+'
-                    )
-                ) AS d(txt)
-                WHERE d.txt ~ '^\\d+$'
-                  AND (d.txt::int) = ANY (
-                      ARRAY[r.n1, r.n2, r.n3, r.n4, r.n5, r.n6]
-                  )
-            ) h
-            WHERE p.id_usuario = :uid
-              AND p.data_norm >= CURRENT_DATE - INTERVAL '29 days'
-            GROUP BY p.data_norm
-        )
-        SELECT
-            d.dia,
-            COALESCE(x.total_palpites, 0) AS total,
-            ROUND(COALESCE(x.media_acertos, 0), 2) AS media
-        FROM dias d
-        LEFT JOIN dados x ON x.dia = d.dia
-        ORDER BY d.dia;
-        """
+        sql = _sql_evolucao_30_dias()
 
-        db = Session()
         try:
-            rows = db.execute(text(sql), {"uid": user_id}).fetchall()
+            rows = cache_consultas.consultar(
+                sql, {"uid": user_id, "loteria": "MS"}, versao_dados, ("MS", "dia"),
+            )
         except Exception as e:
             return {
                 "permitido": False,
                 "erro": str(e)
             }
-        finally:
-            db.close()
 
         return {
             "permitido": True,
@@ -508,77 +356,17 @@ def evolucao_30_dias(user_id: int, loteria=None, loteria_ativa=None):
     # =========================================================
     if lot in ("lotofacil", "lotofácil", "loto-facil", "lf"):
 
-        sql = """
-        WITH r_norm AS (
-            SELECT
-                CASE
-                    WHEN r.data ~ '^\\d{2}/\\d{2}/\\d{4}$'
-                        THEN to_date(r.data, 'DD/MM/YYYY')
-                    WHEN r.data ~ '^\\d{4}-\\d{2}-\\d{2}$'
-                        THEN to_date(r.data, 'YYYY-MM-DD')
-                    ELSE NULL
-                END AS r_dt,
-                r.n1,r.n2,r.n3,r.n4,r.n5,
-                r.n6,r.n7,r.n8,r.n9,r.n10,
-                r.n11,r.n12,r.n13,r.n14,r.n15
-            FROM resultados_oficiais r
-        ),
-        dias AS (
-            SELECT generate_series(
-                CURRENT_DATE - INTERVAL '29 days',
-                CURRENT_DATE,
-                INTERVAL '1 day'
-            )::date AS dia
-        ),
-        dados AS (
-            SELECT
-                p.data_norm AS dia,
-                COUNT(*) AS total_palpites,
-                AVG(h.acertos) AS media_acertos
-            FROM palpites p
-            JOIN r_norm r
-              ON r.r_dt = p.data_norm
-            CROSS JOIN LATERAL (
-                SELECT COUNT(*) AS acertos
-                FROM unnest(
-                    regexp_split_to_array(
-                        NULLIF(trim(COALESCE(p.dezenas, p.numeros)), ''),
-                        '[,\\s]+'
-                    )
-                ) AS d(txt)
-                WHERE d.txt ~ '^\\d+$'
-                  AND (d.txt::int) = ANY (
-                      ARRAY[
-                          r.n1,r.n2,r.n3,r.n4,r.n5,
-                          r.n6,r.n7,r.n8,r.n9,r.n10,
-                          r.n11,r.n12,r.n13,r.n14,r.n15
-                      ]
-                  )
-            ) h
-            WHERE p.id_usuario = :uid
-              AND p.data_norm >= CURRENT_DATE - INTERVAL '29 days'
-              AND r.r_dt IS NOT NULL
-            GROUP BY p.data_norm
-        )
-        SELECT
-            d.dia,
-            COALESCE(x.total_palpites, 0) AS total,
-            ROUND(COALESCE(x.media_acertos, 0), 2) AS media
-        FROM dias d
-        LEFT JOIN dados x ON x.dia = d.dia
-        ORDER BY d.dia;
-        """
+        sql = _sql_evolucao_30_dias()
 
-        db = Session()
         try:
-            rows = db.execute(text(sql), {"uid": user_id}).fetchall()
+            rows = cache_consultas.consultar(
+                sql, {"uid": user_id, "loteria": "LF"}, versao_dados, ("LF", "dia"),
+            )
         except Exception as e:
             return {
                 "permitido": False,
                 "erro": str(e)
             }
-        finally:
-            db.close()
 
         return {
             "permitido": True,
@@ -634,6 +422,9 @@ def mostrar_dashboard():
 
     loteria_ativa = _norm_loteria(raw_loteria)
 
+    # versão dos dados (1 consulta): tudo abaixo sai do cache até ela mudar
+    v = cache_consultas.versao(user_id)
+
     st.markdown("### O que você quer ver primeiro aqui?")
     op = st.radio(
         "Escolha a visão principal do topo:",
@@ -655,13 +446,14 @@ def mostrar_dashboard():
     if op.startswith("🏆"):
         mostrar_analise_acertos_topo(
             user_id=user_id,
-            loteria_ativa=loteria_ativa
+            loteria_ativa=loteria_ativa,
+            versao_dados=v
         )
 
     elif op.startswith("📈"):
         st.subheader("📈 Evolução (últimos 30 dias)")
 
-        result = evolucao_30_dias(user_id)
+        result = evolucao_30_dias(user_id, versao_dados=v)
 
         # 🔓 ADMIN SEMPRE VÊ TUDO
         if tipo == "A":
@@ -747,52 +539,49 @@ def mostrar_dashboard():
         TBL_RES = "resultados_oficiais_m"
         QTD_DEZENAS = 6
         loteria_label = "Mega-Sena"
+        LOT = "MS"
     else:
         TBL_RES = "resultados_oficiais"
         QTD_DEZENAS = 15
         loteria_label = "Lotofácil"
+        LOT = "LF"
 
     # -------------------------------
     # 🔹 Coleta dados principais
     # -------------------------------
-    db = Session()
-    try:
-        # Palpites (por usuário)
-        palpites_lf_user = db.execute(
-            text("SELECT COUNT(*) FROM palpites WHERE id_usuario = :uid"),
-            {"uid": user_id},
-        ).scalar() or 0
-
-        palpites_ms_user = db.execute(
-            text("SELECT COUNT(*) FROM palpites_m WHERE id_usuario = :uid"),
-            {"uid": user_id},
-        ).scalar() or 0
-
-        # Totais plataforma (somado)
-        total_palpites_plataforma = (
-            (db.execute(text("SELECT COUNT(*) FROM palpites")).scalar() or 0)
-            + (db.execute(text("SELECT COUNT(*) FROM palpites_m")).scalar() or 0)
-        )
-
-        # Estatísticas do usuário (mantive como estava: palpites = lotofácil)
-        # define tabela de palpites conforme a loteria ativa
-        TBL_PALPITES = "palpites_m" if loteria_ativa == "megasena" else "palpites"
-
-        total_user_dia = db.execute(text(f"""
-            SELECT COUNT(*) FROM {TBL_PALPITES}
-            WHERE id_usuario = :uid
-            AND DATE(data_norm) = CURRENT_DATE
-        """), {"uid": user_id}).scalar() or 0
-
-        total_user_mes = db.execute(text(f"""
-            SELECT COUNT(*) FROM {TBL_PALPITES}
-            WHERE id_usuario = :uid
-            AND EXTRACT(MONTH FROM data_norm) = EXTRACT(MONTH FROM CURRENT_DATE)
-            AND EXTRACT(YEAR FROM data_norm) = EXTRACT(YEAR FROM CURRENT_DATE)
-        """), {"uid": user_id}).scalar() or 0
-
-    finally:
-        db.close()
+    # Palpites (por usuário)
+    palpites_lf_user = cache_consultas.consultar(
+        "SELECT COUNT(*) FROM palpites WHERE id_usuario = :uid",
+        {"uid": user_id}, v, ("usuario",), modo="scalar",
+    ) or 0
+
+    palpites_ms_user = cache_consultas.consultar(
+        "SELECT COUNT(*) FROM palpites_m WHERE id_usuario = :uid",
+        {"uid": user_id}, v, ("usuario",), modo="scalar",
+    ) or 0
+
+    # Totais plataforma (somado) — muda com escrita de qualquer usuário
+    total_palpites_plataforma = cache_consultas.consultar(
+        "SELECT (SELECT COUNT(*) FROM palpites) + (SELECT COUNT(*) FROM palpites_m)",
+        {}, v, ("global",), modo="scalar",
+    ) or 0
+
+    # Estatísticas do usuário (mantive como estava: palpites = lotofácil)
+    # define tabela de palpites conforme a loteria ativa
+    TBL_PALPITES = "palpites_m" if loteria_ativa == "megasena" else "palpites"
+
+    total_user_dia = cache_consultas.consultar(f"""
+        SELECT COUNT(*) FROM {TBL_PALPITES}
+        WHERE id_usuario = :uid
+        AND data_norm = CURRENT_DATE
+    """, {"uid": user_id}, v, ("usuario", "dia"), modo="scalar") or 0
+
+    total_user_mes = cache_consultas.consultar(f"""
+        SELECT COUNT(*) FROM {TBL_PALPITES}
+        WHERE id_usuario = :uid
+        AND data_norm >= date_trunc('month', CURRENT_DATE)::date
+        AND data_norm <  (date_trunc('month', CURRENT_DATE) + INTERVAL '1 month')::date
+    """, {"uid": user_id}, v, ("usuario", "dia"), modo="scalar") or 0
 
     # -------------------------------
     # 🔹 Cards principais (mantidos)
@@ -855,16 +644,12 @@ def mostrar_dashboard():
     # -------------------------------
     st.subheader(f"Resultados Oficiais — {loteria_label}")
 
-    db = Session()
-    try:
-        concursos = db.execute(text(f"""
-            SELECT concurso, data
-            FROM {TBL_RES}
-            ORDER BY concurso DESC
-            LIMIT 50
-        """)).fetchall()
-    finally:
-        db.close()
+    concursos = cache_consultas.consultar(f"""
+        SELECT concurso, data
+        FROM {TBL_RES}
+        ORDER BY concurso DESC
+        LIMIT 50
+    """, {}, v, (LOT,))
 
     if not concursos:
         st.warning("Nenhum resultado encontrado.")
@@ -887,25 +672,24 @@ def mostrar_dashboard():
     )
 
     # Busca resultado do concurso selecionado (na tabela correta)
-    db = Session()
     try:
-        resultado = db.execute(text(f"""
+        resultado = cache_consultas.consultar(f"""
             SELECT {campos}, data, concurso
             FROM {TBL_RES}
             WHERE concurso = :c
             LIMIT 1
-        """), {"c": concurso_num}).fetchone()
+        """, {"c": concurso_num}, v, (LOT,), modo="one")
     except Exception as e:
         # Fallback se sua tabela Mega usar d1..d6 em vez de n1..n6
         if loteria_ativa == "megasena":
             try:
                 campos_alt = "d1,d2,d3,d4,d5,d6"
-                resultado = db.execute(text(f"""
+                resultado = cache_consultas.consultar(f"""
                     SELECT {campos_alt}, data, concurso
                     FROM {TBL_RES}
                     WHERE concurso = :c
                     LIMIT 1
-                """), {"c": concurso_num}).fetchone()
+                """, {"c": concurso_num}, v, (LOT,), modo="one")
                 QTD_DEZENAS = 6
             except Exception as e2:
                 st.error(f"Erro ao ler resultados da Mega-Sena em {TBL_RES}: {e2}")
@@ -913,8 +697,6 @@ def mostrar_dashboard():
         else:
             st.error(f"Erro ao ler resultados em {TBL_RES}: {e}")
             return
-    finally:
-        db.close()
 
     if not resultado:
         st.warning("Resultado não encontrado para o concurso selecionado.")
@@ -962,19 +744,12 @@ def mostrar_dashboard():
         except Exception:
             return str(v)
 
-    def _detect_premiacao_cols(db, table_name: str, faixas: list[int]):
+    def _detect_premiacao_cols(table_name: str, faixas: list[int]):
         """
         Detecta automaticamente colunas de ganhadores e rateio (valor) na tabela.
         Retorna dict: {faixa_int: {"ganh": "col", "rateio": "col"}}
         """
-        cols = db.execute(text("""
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-              AND table_name = :t
-        """), {"t": table_name}).fetchall()
-
-        colnames = [c[0] for c in cols]
+        colnames = list(schema_cache.colunas(table_name))
 
         # Heurísticas de nome (bem tolerantes)
         # - ganhadores: ganh, ganhadores, qtd_ganhadores, n_ganhadores, vencedores, etc.
@@ -1014,112 +789,107 @@ def mostrar_dashboard():
 
     st.markdown("### 🏅 Premiação do concurso (ganhadores e rateio)")
 
-    db = Session()
-    try:
-        premiacao_rows = []
+    premiacao_rows = []
 
-        if loteria_ativa == "lotofacil":
-            faixas = [11, 12, 13, 14, 15]
-        else:
-            faixas = [4, 5, 6]
+    if loteria_ativa == "lotofacil":
+        faixas = [11, 12, 13, 14, 15]
+    else:
+        faixas = [4, 5, 6]
 
-        # 1) Detecta colunas reais na tabela
-        cols_map = _detect_premiacao_cols(db, TBL_RES, faixas)
+    # 1) Detecta colunas reais na tabela
+    cols_map = _detect_premiacao_cols(TBL_RES, faixas)
+
+    # 2) Se achou colunas, monta SELECT dinâmico com nomes reais
+    if cols_map:
+        select_parts = []
+        for f in faixas:
+            if f in cols_map:
+                gcol = cols_map[f]["ganh"]
+                rcol = cols_map[f]["rateio"]
+                # aspas duplas para colunas com underscore/maiusc/minusc
+                select_parts.append(f'"{gcol}" AS ganh_{f}')
+                select_parts.append(f'"{rcol}" AS rateio_{f}')
+
+        sqlp = f"""
+            SELECT {", ".join(select_parts)}
+            FROM {TBL_RES}
+            WHERE concurso = :c
+            LIMIT 1
+        """
+
+        rowp = cache_consultas.consultar(sqlp, {"c": concurso_num}, v, (LOT,), modo="one")
+        if rowp:
+            rowd = dict(rowp._mapping)
 
-        # 2) Se achou colunas, monta SELECT dinâmico com nomes reais
-        if cols_map:
-            select_parts = []
             for f in faixas:
-                if f in cols_map:
-                    gcol = cols_map[f]["ganh"]
-                    rcol = cols_map[f]["rateio"]
-                    # aspas duplas para colunas com underscore/maiusc/minusc
-                    select_parts.append(f'"{gcol}" AS ganh_{f}')
-                    select_parts.append(f'"{rcol}" AS rateio_{f}')
-
-            sqlp = f"""
-                SELECT {", ".join(select_parts)}
+                g = rowd.get(f"ganh_{f}")
+                r = rowd.get(f"rateio_{f}")
+                if g is None and r is None:
+                    continue
+                premiacao_rows.append({
+                    "Faixa": f"{f} acertos",
+                    "Ganhadores": int(g) if g is not None else 0,
+                    "Rateio": _fmt_brl(r),
+                })
+
+    # 3) Fallback (Mega) via premiacao_json, se existir (não quebra)
+    if (not premiacao_rows) and (loteria_ativa == "megasena"):
+        try:
+            rowj = cache_consultas.consultar(f"""
+                SELECT premiacao_json
                 FROM {TBL_RES}
                 WHERE concurso = :c
                 LIMIT 1
-            """
-
-            rowp = db.execute(text(sqlp), {"c": concurso_num}).fetchone()
-            if rowp:
-                rowd = dict(rowp._mapping)
-
-                for f in faixas:
-                    g = rowd.get(f"ganh_{f}")
-                    r = rowd.get(f"rateio_{f}")
-                    if g is None and r is None:
-                        continue
-                    premiacao_rows.append({
-                        "Faixa": f"{f} acertos",
-                        "Ganhadores": int(g) if g is not None else 0,
-                        "Rateio": _fmt_brl(r),
-                    })
-
-        # 3) Fallback (Mega) via premiacao_json, se existir (não quebra)
-        if (not premiacao_rows) and (loteria_ativa == "megasena"):
-            try:
-                rowj = db.execute(text(f"""
-                    SELECT premiacao_json
-                    FROM {TBL_RES}
-                    WHERE concurso = :c
-                    LIMIT 1
-                """), {"c": concurso_num}).fetchone()
-
-                if rowj and rowj[0]:
-                    pj = rowj[0]
-                    if isinstance(pj, str):
-                        import json
-                        pj = json.loads(pj)
-
-                    # tenta formatos comuns
-                    if isinstance(pj, dict):
-                        # CASO 1: Estrutura aninhada "premiacoes": [...]
-                        if "premiacoes" in pj and isinstance(pj["premiacoes"], list):
-                            for it in pj["premiacoes"]:
-                                fx = str(it.get("faixa") or it.get("descricao") or it.get("nome") or "").strip()
-                                ganh = it.get("ganhadores")
-                                val = it.get("valor") or it.get("rateio")
-                                if fx:
-                                    premiacao_rows.append({
-                                        "Faixa": fx,
-                                        "Ganhadores": int(ganh) if ganh is not None else 0,
-                                        "Rateio": _fmt_brl(val),
-                                    })
-                        
-                        # CASO 2: Chaves diretas (flat) ex: "ganhadores_4", "rateio_4"
-                        else:
-                            # Tenta faixas numéricas de 4 a 6 (Mega) ou generaliza
-                            found_flat = False
-                            for f_num in [6, 5, 4]:
-                                g_key = f"ganhadores_{f_num}"
-                                r_key = f"rateio_{f_num}"
-                                
-                                # Se alguma chave existir
-                                if (g_key in pj) or (r_key in pj):
-                                    found_flat = True
-                                    g_val = pj.get(g_key)
-                                    r_val = pj.get(r_key)
-                                    
-                                    # Monta nome da faixa
-                                    nome_faixa = {6: "Sena", 5: "Quina", 4: "Quadra"}.get(f_num, f"{f_num} acertos")
-                                    
-                                    premiacao_rows.append({
-                                        "Faixa": nome_faixa,
-                                        "Ganhadores": int(g_val) if g_val else 0,
-                                        "Rateio": _fmt_brl(r_val),
-                                    })
+            """, {"c": concurso_num}, v, (LOT,), modo="one")
+
+            if rowj and rowj[0]:
+                pj = rowj[0]
+                if isinstance(pj, str):
+                    import json
+                    pj = json.loads(pj)
+
+                # tenta formatos comuns
+                if isinstance(pj, dict):
+                    # CASO 1: Estrutura aninhada "premiacoes": [...]
+                    if "premiacoes" in pj and isinstance(pj["premiacoes"], list):
+                        for it in pj["premiacoes"]:
+                            fx = str(it.get("faixa") or it.get("descricao") or it.get("nome") or "").strip()
+                            ganh = it.get("ganhadores")
+                            val = it.get("valor") or it.get("rateio")
+                            if fx:
+                                premiacao_rows.append({
+                                    "Faixa": fx,
+                                    "Ganhadores": int(ganh) if ganh is not None else 0,
+                                    "Rateio": _fmt_brl(val),
+                                })
+                    
+                    # CASO 2: Chaves diretas (flat) ex: "ganhadores_4", "rateio_4"
+                    else:
+                        # Tenta faixas numéricas de 4 a 6 (Mega) ou generaliza
+                        found_flat = False
+                        for f_num in [6, 5, 4]:
+                            g_key = f"ganhadores_{f_num}"
+                            r_key = f"rateio_{f_num}"
                             
-                            # Se não achou 4/5/6, tenta iterar chaves genéricas se necessário
-                            pass
-            except Exception:
-                pass
-
-    finally:
-        db.close()
+                            # Se alguma chave existir
+                            if (g_key in pj) or (r_key in pj):
+                                found_flat = True
+                                g_val = pj.get(g_key)
+                                r_val = pj.get(r_key)
+                                
+                                # Monta nome da faixa
+                                nome_faixa = {6: "Sena", 5: "Quina", 4: "Quadra"}.get(f_num, f"{f_num} acertos")
+                                
+                                premiacao_rows.append({
+                                    "Faixa": nome_faixa,
+                                    "Ganhadores": int(g_val) if g_val else 0,
+                                    "Rateio": _fmt_brl(r_val),
+                                })
+                        
+                        # Se não achou 4/5/6, tenta iterar chaves genéricas se necessário
+                        pass
+        except Exception:
+            pass
 
     if premiacao_rows:
         df_prem = pd.DataFrame(premiacao_rows)
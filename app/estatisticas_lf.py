@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+estatisticas_lf.py – motor estatístico da Lotofácil (v9)
+
+Substitui o antigo _stats_pack() do palpites_legacy.py.
+
+- Histórico mantido como matriz binária (N, 25) uint8 (1 linha por concurso,
+  ordem cronológica).
+- Frequência global/recente = 1 redução (X.sum(axis=0)).
+- Coocorrência 25x25 = X.T @ X (diagonal zerada, igual ao legado).
+- Atualização incremental: cada concurso novo é escrito na próxima linha de
+  um buffer pré-alocado (capacidade dobra quando enche, custo amortizado
+  O(1)), soma sua linha na frequência e seu produto externo (rank 1) na
+  coocorrência — sem copiar o histórico nem recarregar a tabela inteira.
+
+A checagem por concursos novos no banco acontece no máximo a cada
+STATS_REFRESH_SECONDS (env FAIXABET_STATS_REFRESH, padrão 300s), para não
+fazer round-trip a cada chamada de scores_correlacao().
+"""
+
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+from sqlalchemy import text
+
+from app.db import Session
+
+N_DEZENAS = 25
+N_BOLAS = 15
+RECENCIA_PADRAO = 100
+
+STATS_REFRESH_SECONDS = float(os.getenv("FAIXABET_STATS_REFRESH", "300"))
+
+_COLS_BOLAS = ", ".join(f"n{i}" for i in range(1, N_BOLAS + 1))
+
+# --- estado global do processo (1 por worker Streamlit) ---
+_lock = threading.Lock()
+_buf = None               # (capacidade, 25) uint8 – linhas [0, _n) em uso
+_n = 0                    # concursos no histórico
+_freq = None              # (25,) int64  – soma de X
+_cooc = None              # (25, 25) int64 – X.T @ X com diagonal 0
+_ultimo_concurso = None
+_ultima_checagem = 0.0
+
+
+def rows_para_matriz(rows) -> np.ndarray:
+    """Converte linhas (n1..n15) em matriz binária (N, 25) uint8."""
+    bolas = np.asarray(rows, dtype=np.int16).reshape(-1, N_BOLAS)
+    X = np.zeros((bolas.shape[0], N_DEZENAS), dtype=np.uint8)
+    if bolas.size:
+        X[np.arange(bolas.shape[0])[:, None], bolas - 1] = 1
+    return X
+
+
+def _coocorrencia(X: np.ndarray) -> np.ndarray:
+    Xi = X.astype(np.int64, copy=False)
+    c = Xi.T @ Xi
+    np.fill_diagonal(c, 0)
+    return c
+
+
+def _buscar_concursos(desde=None):
+    """Busca (concurso, n1..n15) em ordem cronológica; desde=None → tudo."""
+    sql = f"""
+        SELECT concurso, {_COLS_BOLAS}
+        FROM resultados_oficiais
+        {"WHERE concurso > :ult" if desde is not None else ""}
+        ORDER BY concurso ASC
+    """
+    db = Session()
+    try:
+        params = {"ult": int(desde)} if desde is not None else {}
+        return db.execute(text(sql), params).fetchall()
+    finally:
+        db.close()
+
+
+def _anexar(novos: np.ndarray):
+    """Copia `novos` para o fim do buffer, dobrando a capacidade se preciso."""
+    global _buf, _n
+    fim = _n + novos.shape[0]
+    if _buf is None or fim > _buf.shape[0]:
+        cap = max(fim, 2 * (_buf.shape[0] if _buf is not None else 0), 64)
+        maior = np.zeros((cap, N_DEZENAS), dtype=np.uint8)
+        if _n:
+            maior[:_n] = _buf[:_n]
+        _buf = maior
+    _buf[_n:fim] = novos
+    _n = fim
+
+
+def _carregar_tudo():
+    global _buf, _n, _freq, _cooc, _ultimo_concurso
+    rows = _buscar_concursos()
+    if not rows:
+        raise RuntimeError("Sem registros em resultados_oficiais (Lotofácil).")
+
+    X = rows_para_matriz([r[1:] for r in rows])
+    _buf, _n = None, 0
+    _anexar(X)
+    _freq = X.sum(axis=0, dtype=np.int64)
+    _cooc = _coocorrencia(X)
+    _ultimo_concurso = int(rows[-1][0])
+    logging.info(f"[estatisticas_lf] carregado: {X.shape[0]} concursos (último={_ultimo_concurso})")
+
+
+def adicionar_concursos(rows):
+    """
+    Aplica concursos novos ao estado (O(1) amortizado por sorteio).
+    rows: iterável de (concurso, n1..n15) em ordem cronológica.
+    """
+    global _freq, _cooc, _ultimo_concurso
+    rows = [r for r in rows if _ultimo_concurso is None or int(r[0]) > _ultimo_concurso]
+    if not rows:
+        return 0
+
+    novos = rows_para_matriz([r[1:] for r in rows])
+    _anexar(novos)
+    if _freq is None:
+        _freq = novos.sum(axis=0, dtype=np.int64)
+        _cooc = _coocorrencia(novos)
+    else:
+        for x in novos.astype(np.int64):
+            _freq += x
+            # rank 1: x xᵀ, sem a diagonal (x é binário → diagonal = x)
+            _cooc += np.outer(x, x)
+            _cooc[np.diag_indices(N_DEZENAS)] -= x
+    _ultimo_concurso = int(rows[-1][0])
+    logging.info(f"[estatisticas_lf] +{len(rows)} concurso(s) (último={_ultimo_concurso})")
+    return len(rows)
+
+
+def atualizar(force: bool = False):
+    """
+    Garante o estado carregado e aplica concursos novos do banco.
+    Respeita STATS_REFRESH_SECONDS, exceto com force=True.
+    """
+    global _ultima_checagem
+    agora = time.monotonic()
+    if not force and _n and (agora - _ultima_checagem) < STATS_REFRESH_SECONDS:
+        return
+
+    with _lock:
+        if not force and _n and (agora - _ultima_checagem) < STATS_REFRESH_SECONDS:
+            return
+        if not _n:
+            _carregar_tudo()
+        else:
+            try:
+                adicionar_concursos(_buscar_concursos(desde=_ultimo_concurso))
+            except Exception as e:
+                logging.warning(f"[estatisticas_lf] falha ao buscar concursos novos: {e}")
+        _ultima_checagem = agora
+
+
+def historico() -> np.ndarray:
+    """Matriz (N, 25) uint8 em ordem cronológica (view do buffer; não alterar)."""
+    atualizar()
+    return _buf[:_n]
+
+
+def ultimo_concurso():
+    atualizar()
+    return _ultimo_concurso
+
+
+def freq_global() -> np.ndarray:
+    """Vetor (25,) com a frequência histórica de cada dezena."""
+    atualizar()
+    return _freq
+
+
+def freq_recente(recencia: int = RECENCIA_PADRAO) -> np.ndarray:
+    """Vetor (25,) com a frequência nos últimos `recencia` concursos."""
+    atualizar()
+    return _buf[max(0, _n - int(recencia)):_n].sum(axis=0, dtype=np.int64)
+
+
+def coocorrencia() -> np.ndarray:
+    """Matriz (25, 25) de coocorrência par-a-par (diagonal 0)."""
+    atualizar()
+    return _cooc
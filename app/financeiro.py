@@ -3,6 +3,7 @@ import requests
 from datetime import datetime
 from sqlalchemy.sql import text
 from app.db import Session
+import cotas
 import webbrowser
 
 BACKEND_URL = "https://backend-v8.onrender.com"
@@ -117,6 +118,8 @@ def exibir_aba_financeiro():
                     # 2. Marca todos os client_plans ativos como inativos
                     db.execute(text("UPDATE client_plans SET ativo = false WHERE id_client = :uid AND ativo = true"), {"uid": user_id})
                     db.commit()
+                    # limite de palpites do plano novo vale já (cache de cotas)
+                    cotas.invalidar_planos(user_id)
 
                     # Atualiza session_state
                     st.session_state.usuario["id_plano"] = 1
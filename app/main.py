@@ -25,7 +25,7 @@ def main():
     from app.db import Session
     from app.dashboard import mostrar_dashboard
     from app.auth import verificar_senha, logout
-    from services.email_service import enviar_email_reset_manual, enviar_email_reset
+    from services.email_service import enviar_email_reset_manual, enviar_email_reset, enviar_em_segundo_plano
     from notificacoes.notifica import tela_notificacoes_acertos
     from app.perfil import editar_perfil
     from app.financeiro import exibir_aba_financeiro
@@ -365,7 +365,8 @@ def main():
                                 "APP_BASE_URL", "http://localhost:8501"
                             )
                             link = f"{base_url}/?reset=1&token={tok}"
-                            enviar_email_reset(user_email, link)
+                            # envio na fila do processo: a tela não espera o Brevo
+                            enviar_em_segundo_plano(enviar_email_reset, user_email, link)
 
                     st.rerun()
                 finally:
@@ -57,9 +57,14 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 import streamlit.components.v1 as components
-from sqlalchemy import text, create_engine
+from sqlalchemy import text
 
-from app.db import Session
+from app.db import Session, get_engine, session_scope
+import schema_cache
+import periodos
+import cotas
+import cache_consultas
+from app import estatisticas_lf
 
 # --- LS16: ensemble inteligente (tenta usar modelo_llm_max/ensemble.py)
 try:
@@ -68,6 +73,13 @@ except Exception:
     _fxb_ls16_ensemble = None
 
 from modelo_llm_max.utils_ls_loader import carregar_modelo_ls
+from modelo_llm_max.core.combinacoes_index import obter_index
+from modelo_llm_max.scores_lf import carregar_scores as carregar_scores_lf
+from modelo_llm_max.scores_lf import janela as janela_scores_lf
+from modelo_llm_max.core.runtime_numpy import carregar_se_exportado
+from modelo_llm_max.core.bitmask import pack as pack_bitmask
+from modelo_llm_max.core.ensemble_pesos import carregar_pesos
+from modelo_llm_max.core.features import atraso_atual, soma_pares
 
 # (opcional) deixa o layout wide, mas não resolve o flash sozinho
 
@@ -102,21 +114,10 @@ def _log_warn(msg):
 def get_conn():
     """
     Retorna conexão SQLAlchemy com o banco PostgreSQL (Neon.tech).
-    Usa variáveis de ambiente: DATABASE_URL, POSTGRES_URL ou PG_URI.
+    Usa o engine único do processo (db_pool) — não cria pool novo por chamada.
     """
-    db_url = (
-        os.getenv("DATABASE_URL")
-        or os.getenv("POSTGRES_URL")
-        or os.getenv("PG_URI")
-    )
-
-    if not db_url:
-        st.error("❌ Variável de conexão DATABASE_URL não encontrada no ambiente atual.")
-        return None
-
     try:
-        engine = create_engine(db_url)
-        return engine.connect()
+        return get_engine().connect()
     except Exception as e:
         st.error(f"Erro ao conectar ao banco de dados: {e}")
         return None
@@ -125,20 +126,12 @@ def get_conn():
 # FUNÇÕES AUXILIARES
 # =========================
 def _existing_cols(table_name: str) -> set:
-    """Retorna o conjunto de nomes de colunas existentes."""
-    db = Session()
+    """Retorna o conjunto de nomes de colunas existentes (schema_cache)."""
     try:
-        rows = db.execute(text("""
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_name = :t
-        """), {"t": table_name}).fetchall()
-        return {r[0] for r in rows} if rows else set()
+        return set(schema_cache.colunas(table_name))
     except Exception as e:
         _log_warn(f"Erro ao buscar colunas da tabela {table_name}: {e}")
         return set()
-    finally:
-        db.close()
 
 # ================== [MODEL BRIDGE] LS14 / LS15 / LS16 ==================
 
@@ -146,93 +139,31 @@ def _existing_cols(table_name: str) -> set:
 BASE_DIR = os.getcwd()
 # -------- Estatístico (freq + recência + correlação) --------
 
-def _carregar_df_lotofacil():
-    """
-    Fonte oficial PRD: banco.
-    Retorna (df, bolas) compatível com _stats_pack().
-    """
-    db = Session()
-    try:
-        rows = db.execute(text("""
-            SELECT
-                data,
-                n1, n2, n3, n4, n5,
-                n6, n7, n8, n9, n10,
-                n11, n12, n13, n14, n15
-            FROM resultados_oficiais
-            ORDER BY data DESC
-        """)).fetchall()
-
-        if not rows:
-            raise RuntimeError("Sem registros em resultados_oficiais (Lotofácil).")
-
-        bolas = [f"Bola{i}" for i in range(1, 16)]
-        df = pd.DataFrame(rows, columns=["data"] + bolas)
-
-        # padroniza como o legado esperava: '01'..'25'
-        for b in bolas:
-            df[b] = df[b].astype(int).astype(str).str.zfill(2)
-
-        return df, bolas
-    finally:
-        db.close()
-
-@lru_cache(maxsize=1)
-def _stats_pack(recencia=100):
-    df, bolas = _carregar_df_lotofacil()
-
-    # Frequência global
-    todas = df[bolas].values.flatten()
-    freq_global = pd.Series(todas).value_counts().sort_index()
-    freq_global = {int(k): int(v) for k, v in freq_global.items()}
-
-    # Frequência recente
-    subset = df.head(recencia) if len(df) > recencia else df
-    todas_rec = subset[bolas].values.flatten()
-    freq_rec = pd.Series(todas_rec).value_counts().sort_index()
-    freq_rec = {int(k): int(v) for k, v in freq_rec.items()}
-
-    # Correlação (coocorrência par-a-par)
-    nums_df = df[bolas].apply(pd.to_numeric)
-    corr = pd.DataFrame(0, index=range(1, 26), columns=range(1, 26))
-    for _, row in nums_df.iterrows():
-        arr = row.values
-        for i in range(15):
-            for j in range(i+1, 15):
-                a, b = int(arr[i]), int(arr[j])
-                corr.loc[a, b] += 1
-                corr.loc[b, a] += 1
-
-    return freq_global, freq_rec, corr, df, bolas
-
 def scores_estatisticos(alpha_hist=0.7, alpha_recent=0.3):
     """
     Frequência histórica + recência (vetor 25 normalizado).
     """
-    freq_global, freq_rec, _, _, _ = _stats_pack()
-    v = np.zeros(25, dtype=float)
-    for d in range(1, 26):
-        g = float(freq_global.get(d, 0))
-        r = float(freq_rec.get(d, 0))
-        v[d-1] = alpha_hist * g + alpha_recent * r
-    return _normalize_probs(v)
+    g = estatisticas_lf.freq_global().astype(float)
+    r = estatisticas_lf.freq_recente().astype(float)
+    return _normalize_probs(alpha_hist * g + alpha_recent * r)
 
 def scores_correlacao(boost_from=set()):
     """
     Coocorrência: soma linhas da matriz de coocorrência para dezenas 'boost_from'.
     """
-    _, _, corr, _, _ = _stats_pack()
     if not boost_from:
         return np.ones(25, dtype=float) / 25.0
-    s = np.zeros(25, dtype=float)
+    idx = []
     for b in boost_from:
         try:
             bi = int(b)
             if 1 <= bi <= 25:
-                s += np.asarray(corr.loc[bi].values, dtype=float)
+                idx.append(bi - 1)
         except Exception:
             continue
-    s = np.maximum(s, 0.0)
+    if not idx:
+        return _normalize_probs(np.zeros(25, dtype=float))
+    s = estatisticas_lf.coocorrencia()[idx].sum(axis=0).astype(float)
     return _normalize_probs(s)
 
 # cache global para evitar loop recursivo
@@ -241,12 +172,16 @@ _IN_SCORES_LS16 = False         # flag de reentrância para LS16
 _LS15_CACHE = None              # cache de vetor (25,) vindo do LS15
 _LOADED_METAS = {}              # cache de modelos carregados por (model_name, models_dir, mtime)
 
-@lru_cache(maxsize=1)
 def combinacoes_ja_sorteadas():
-    """Set de tuplas(15) com todas as combinações já sorteadas (para veto)."""
-    _, _, _, df, bolas = _stats_pack()
-    usados = set(tuple(sorted(map(int, r[bolas].values))) for _, r in df.iterrows())
-    return usados
+    """
+    Índice (rank combinatório) de todas as combinações já sorteadas (para veto).
+    Aceita `tuple(comb) in usados` e usados.contains_many(lote (M, 15)).
+    """
+    def _carregar():
+        X = estatisticas_lf.historico()
+        return np.nonzero(X)[1].reshape(-1, 15) + 1
+
+    return obter_index("lotofacil", estatisticas_lf.ultimo_concurso(), _carregar)
 
 
 # -------- Adapters LS14 / LS15 (não quebram se modelo não estiver pronto) --------
@@ -264,21 +199,34 @@ def prepare_seq(T: int):
     return base.reshape(1, T, 25)
 
 
+def _scores_artefato(model_name: str):
+    """
+    Scores (n_modelos, 25) do artefato offline (modelo_llm_max/scores_lf.py).
+    None se não existir ou estiver atrás do último concurso → usar Keras.
+    """
+    try:
+        concurso = estatisticas_lf.ultimo_concurso()
+    except Exception:
+        concurso = None
+    r = carregar_scores_lf(model_name, concurso_min=concurso)
+    return None if r is None else r[1]
+
 def _score_from_ls(model_name: str):
-    metas = carregar_modelo_ls(model_name)
     print(">>> ENTROU 1 _score_from_ls")
 
-    if not metas:
-        return np.zeros(25, dtype=float)
+    # 1) artefato pré-computado (sem TensorFlow)
+    preds = _scores_artefato(model_name)
 
-    # usa ensemble simples de todos os modelos carregados
-    acc = np.zeros(25, dtype=float)
-    for m in metas:
-        model = m["model"]
-        T = m["expected_seq_len"]
-        seq = prepare_seq(T)   # sua função já existente
+    # 2) fallback: Keras (cada modelo roda 1x por concurso — ver _predicoes_por_modelo)
+    if preds is None:
+        metas = carregar_modelo_ls(model_name)
+        if not metas:
+            return np.zeros(25, dtype=float)
+        preds = _predicoes_por_modelo(metas)
 
-        pred = model.predict(seq, verbose=0)[0]
+    # usa ensemble simples de todos os modelos
+    acc = np.zeros(25, dtype=float)
+    for pred in preds:
         if pred.sum() > 0 and np.all(np.isfinite(pred)):
             acc += pred
 
@@ -362,7 +310,7 @@ def gerar_palpite_estatistico_paridade(limite=15):
 # SALVAR PALPITE — versão final (coluna 'numeros' padrão oficial)
 # ================================================================
 
-def salvar_palpite(palpite, modelo, extras_meta=None):
+def salvar_palpite(palpite, modelo, extras_meta=None, contar=True):
     # ✅ Validação: LS16 nunca deve salvar palpite vazio
     if not palpite or len(palpite) < 15:
         _log_warn("⚠️ Palpite LS16 inválido — não será salvo no banco.")
@@ -456,6 +404,11 @@ def salvar_palpite(palpite, modelo, extras_meta=None):
             base_cols.append("data_norm")
             params["data_norm"] = date.today().isoformat()  # agora 'date' está importado
 
+        # ✅ bitmask das dezenas (acertos = bit_count(mask & resultado.mask))
+        if "mask" in cols:
+            base_cols.append("mask")
+            params["mask"] = pack_bitmask(palpite, "lotofacil")
+
         placeholders = [("NOW()" if c == ts_col else f":{c}") for c in base_cols]
         sql = f"""
             INSERT INTO palpites ({', '.join(base_cols)})
@@ -466,11 +419,16 @@ def salvar_palpite(palpite, modelo, extras_meta=None):
         new_id = result.scalar()
         db.commit()
 
-        # 🔹 Atualiza contador diário do plano
-        try:
-            atualizar_contador_palpites(id_usuario)
-        except Exception as e:
-            _log_warn(f"Falha ao atualizar contador de palpites: {e}")
+        # 🔹 Atualiza contador diário do plano (em lote: contar=False + 1 chamada no fim)
+        if contar:
+            try:
+                atualizar_contador_palpites(id_usuario)
+            except Exception as e:
+                _log_warn(f"Falha ao atualizar contador de palpites: {e}")
+            from admin.palpites_hits import atualizar_hits_usuario
+
+            atualizar_hits_usuario("LF", id_usuario)
+            cache_consultas.registrar_escrita(id_usuario)
 
         _log_info(f"✅ Palpite salvo com sucesso! ID={new_id} (modelo={modelo}, usuario={id_usuario})")
         return new_id
@@ -903,16 +861,14 @@ def _prepare_inputs_for_model_meta(meta, ultimos_full):
 
     return np.expand_dims(seq, axis=0)  # (1, T, 25)
 
-def _ultimos_sorteios_para_modelo(limit=50):
+def _ultimos_sorteios_para_modelo(limit=50, versao_dados=None):
     try:
-        db = Session()
-        rows = db.execute(text("""
+        rows = cache_consultas.consultar("""
             SELECT n1,n2,n3,n4,n5,n6,n7,n8,n9,n10,n11,n12,n13,n14,n15
             FROM resultados_oficiais
             ORDER BY data DESC
             LIMIT :lim
-        """), {"lim": limit}).fetchall()
-        db.close()
+        """, {"lim": limit}, versao_dados or cache_consultas.versao(), ("LF",))
         if not rows:
             return []
         jogos = [[int(x) for x in row if x is not None] for row in rows]
@@ -936,8 +892,16 @@ def _parse_weights_from_env(default="recent:0.5,mid:0.3,global:0.2"):
     """
     Lê os pesos de ensemble a partir da variável de ambiente ENSEMBLE_WEIGHTS.
     Exemplo: ENSEMBLE_WEIGHTS="recent:0.6,mid:0.3,global:0.1"
-    """
-    raw = os.getenv("ENSEMBLE_WEIGHTS", default)
+    Sem a variável, usa os pesos otimizados em models/ensemble/lf_grupos.json
+    (modelo_llm_max/core/ensemble_pesos.py) e, sem o arquivo, o default.
+    """
+    raw = os.getenv("ENSEMBLE_WEIGHTS")
+    if raw is None:
+        pesos, _ = carregar_pesos("lf_grupos")
+        if pesos:
+            total = sum(pesos.values())
+            return {k: v / total for k, v in pesos.items()}
+        raw = default
     parts = [p.strip() for p in raw.split(",") if ":" in p]
     weights = {}
     for p in parts:
@@ -953,6 +917,15 @@ def _parse_weights_from_env(default="recent:0.5,mid:0.3,global:0.2"):
 
     return {k: v / total for k, v in weights.items()}
 
+def _ensemble_temperature():
+    """ENSEMBLE_TEMPERATURE; sem a variável, a temperatura otimizada junto com os pesos."""
+    raw = os.getenv("ENSEMBLE_TEMPERATURE")
+    if raw is None and not os.getenv("ENSEMBLE_WEIGHTS"):
+        _, temp = carregar_pesos("lf_grupos")
+        if temp:
+            return float(temp)
+    return float(raw or "1.0")
+
 def combinar_modelos_com_pesos(predicoes_por_grupo, temperature=1.0):
     """
     Recebe um dicionário {grupo: vetor_predição(25,)} e aplica:
@@ -1008,7 +981,7 @@ def ensemble_predict(models_list, X_inputs):
         raise ValueError("Nenhuma predição válida obtida dos modelos.")
 
     # --- Novo ensemble calibrado ---
-    temperature = float(os.getenv("ENSEMBLE_TEMPERATURE", "1.0"))
+    temperature = _ensemble_temperature()
 
     # Determina grupo de cada modelo, se possível
     preds_por_grupo = {}
@@ -1216,17 +1189,11 @@ def _calc_features_from_window(ultimos):
     seq_bin = np.array([to_binary(j) for j in ultimos], dtype=np.float32)
     window = len(ultimos)
     freq_vec = seq_bin.sum(axis=0) / float(window)
-    atraso_vec = np.zeros(25, dtype=np.float32)
-    for d in range(1, 26):
-        atraso = 0
-        for jogo in reversed(ultimos):
-            atraso += 1
-            if d in jogo:
-                break
-        atraso_vec[d - 1] = min(atraso, window) / float(window)
-    last = ultimos[-1]
-    soma = sum(last) / (25.0 * 15.0)
-    pares = sum(1 for x in last if x % 2 == 0) / 15.0
+    # atraso: concursos desde a última aparição (nunca saiu: window)
+    atraso_vec = np.minimum(atraso_atual(seq_bin, inicial=0), window) / float(window)
+    soma, pares = soma_pares(np.asarray(ultimos[-1:]))
+    soma = soma[0] / (25.0 * 15.0)
+    pares = pares[0] / 15.0
     global_vec = np.array([soma, pares], dtype=np.float32)
     return seq_bin, freq_vec.astype(np.float32), atraso_vec.astype(np.float32), global_vec
 
@@ -1245,33 +1212,31 @@ def obter_limite_dezenas_por_plano(tipo_plano):
     finally:
         db.close()
 
-def atualizar_contador_palpites(id_usuario: int):
+def atualizar_contador_palpites(id_usuario: int, n: int = 1):
     """
-    Incrementa o contador de palpites do dia em client_plans.palpites_dia_usado
-    para o plano ativo do usuário.
+    Incrementa em `n` o contador de palpites do dia em
+    client_plans.palpites_dia_usado para o plano ativo do usuário
+    (1 UPDATE por lote de palpites, não por palpite).
 
     Obs:
     - Usa a coluna correta: palpites_dia_usado (não palpites_usados_dia)
     - Não bloqueia o fluxo em caso de erro (apenas loga warning)
     """
-    db = Session()
     try:
-        db.execute(text("""
-            UPDATE client_plans
-            SET palpites_dia_usado = COALESCE(palpites_dia_usado, 0) + 1
-            WHERE id_client = :id
-              AND ativo = TRUE
-              AND (
-                    data_expira_plan IS NULL
-                    OR DATE(data_expira_plan) >= CURRENT_DATE
-                  )
-        """), {"id": id_usuario})
-        db.commit()
+        with session_scope() as db:
+            db.execute(text("""
+                UPDATE client_plans
+                SET palpites_dia_usado = COALESCE(palpites_dia_usado, 0) + :n
+                WHERE id_client = :id
+                  AND ativo = TRUE
+                  AND (
+                        data_expira_plan IS NULL
+                        OR DATE(data_expira_plan) >= CURRENT_DATE
+                      )
+            """), {"id": id_usuario, "n": int(n)})
     except Exception as e:
         logging.warning(f"Erro ao atualizar contador de palpites (modo teste): {e}")
         # em modo teste não vamos estourar erro na tela
-    finally:
-        db.close()
 
 def gerar_palpite_pares_impares(limite=15):
     num_pares = limite // 2
@@ -1280,14 +1245,13 @@ def gerar_palpite_pares_impares(limite=15):
     impares = random.sample(range(1, 26, 2), num_impares)
     return sorted(pares + impares)
 
-def gerar_palpite_estatistico(limite=15):
-    db = Session()
+def gerar_palpite_estatistico(limite=15, versao_dados=None):
+    """versao_dados: cache_consultas.versao() já lida pelo chamador (loops leem 1x)."""
     try:
-        resultados = db.execute(text("""
+        resultados = cache_consultas.consultar("""
             SELECT n1,n2,n3,n4,n5,n6,n7,n8,n9,n10,n11,n12,n13,n14,n15
             FROM resultados_oficiais
-        """))
-        resultados = resultados.fetchall()
+        """, {}, versao_dados or cache_consultas.versao(), ("LF",))
         if not resultados:
             return gerar_palpite_aleatorio(limite)
 
@@ -1308,8 +1272,6 @@ def gerar_palpite_estatistico(limite=15):
 
     except Exception:
         return gerar_palpite_aleatorio(limite)
-    finally:
-        db.close()
 
 # -------------------- GERADORES ML (LS16 / LS15 / LS14) --------------------
 def gerar_palpites_por_modelo(modelo: str, qtd: int = 3, k: int = 15):
@@ -1425,16 +1387,10 @@ def carregar_modelo_ls(model_name: str, models_dir=None):
     """
     Carrega modelos LS14, LS15, LS16 ou LS17 com cache real.
     Evita recarregar .keras toda vez e deixa o pipeline 10x mais rápido.
-    """
 
-    _lazy_imports()
-
-    # TF indisponível → ignora modelos neurais
-    if _tf_load_model is None:
-        if not globals().get("_TF_WARN_EMITTED", False):
-            logging.warning("[carregar_modelo_ls] TensorFlow indisponível — usando fallback estatístico.")
-            globals()["_TF_WARN_EMITTED"] = True
-        return []
+    Se existir o .npz exportado (core/runtime_numpy.py) ao lado do .keras,
+    usa o ModeloNumpy e não importa TensorFlow.
+    """
 
     model_name = (model_name or "").upper()
 
@@ -1445,11 +1401,35 @@ def carregar_modelo_ls(model_name: str, models_dir=None):
     base = models_dir or MODELS_DIR
     caminhos = _model_paths_for(model_name, models_dir=base)
 
+    exportados = {}
+    for path in caminhos:
+        try:
+            modelo_np = carregar_se_exportado(path)
+        except Exception as e:
+            logging.warning(f"[carregar_modelo_ls] .npz inválido para {path}: {e}")
+            modelo_np = None
+        if modelo_np is not None:
+            exportados[path] = modelo_np
+
+    if len(exportados) < len(caminhos):
+        _lazy_imports()
+
+        # TF indisponível → usa só os exportados (ou fallback estatístico)
+        if _tf_load_model is None and not exportados:
+            if not globals().get("_TF_WARN_EMITTED", False):
+                logging.warning("[carregar_modelo_ls] TensorFlow indisponível — usando fallback estatístico.")
+                globals()["_TF_WARN_EMITTED"] = True
+            return []
+
     metas = []
 
     for path in caminhos:
         try:
-            model_obj = _tf_load_model(path, compile=False)
+            model_obj = exportados.get(path)
+            if model_obj is None:
+                if _tf_load_model is None:
+                    continue
+                model_obj = _tf_load_model(path, compile=False)
 
             # Captura a expected_seq_len automaticamente
             expected_seq_len = None
@@ -1483,7 +1463,7 @@ def _load_and_filter_metas_for_plan(model_name, nome_plano, models_dir=None):
     filtered = [m for m in metas if m.get("group") in allowed_groups or m.get("group") == "unknown"]
     return filtered
 
-def gerar_palpite_ls16_platinum(k=15):
+def gerar_palpite_ls16_platinum(k=15, versao_dados=None):
     """
     Tenta primeiro o ensemble inteligente (modelo_llm_max/ensemble.py).
     Se não der, usa o caminho atual baseado em scores_ls16 (LS15 + estatístico).
@@ -1504,7 +1484,7 @@ def gerar_palpite_ls16_platinum(k=15):
     # 2) Fallback: usar seu pipeline atual (scores_ls16 -> amostragem)
     s = scores_ls16(model_name_for_ensemble="LS15", w_neural=0.6, w_stats=0.4)
     p = _amostrar_dezenas(s, k=k)
-    return sorted(p or gerar_palpite_estatistico(limite=k))
+    return sorted(p or gerar_palpite_estatistico(limite=k, versao_dados=versao_dados))
 
 def historico_palpites():
     import datetime as dt
@@ -1536,18 +1516,19 @@ def historico_palpites():
     # ==============================
     # 🔹 Consulta SQL dinâmica
     # ==============================
-    db = Session()
     try:
         query = """
             SELECT id, numeros, modelo, data, status 
             FROM palpites 
             WHERE id_usuario = :id
-              AND DATE(data) BETWEEN :data_inicio AND :data_fim
+              AND data >= :data_inicio
+              AND data <  :data_fim
         """
+        ini, fim = periodos.dias(data_inicio, data_fim)
         params = {
             "id": st.session_state.usuario["id"],
-            "data_inicio": data_inicio,
-            "data_fim": data_fim
+            "data_inicio": ini,
+            "data_fim": fim
         }
 
         if filtro_modelo != "Todos":
@@ -1560,8 +1541,9 @@ def historico_palpites():
             query += " AND (status IS NULL OR status <> 'S')"
 
         query += " ORDER BY data DESC"
-        result = db.execute(text(query), params)
-        palpites = result.fetchall()
+        palpites = cache_consultas.consultar(
+            query, params, cache_consultas.versao(params["id"]), ("usuario",)
+        )
 
         # ==============================
         # 🔹 Contadores Dinâmicos
@@ -1622,8 +1604,6 @@ def historico_palpites():
             st.info("Nenhum palpite encontrado com os filtros selecionados.")
     except Exception as e:
         st.error(f"Erro inesperado em histórico de palpites: {e}")
-    finally:
-        db.close()
 
 # 🔹 Helper para compatibilidade de rerun
 def _safe_rerun():
@@ -1655,17 +1635,14 @@ def _normalize_probs(vec, eps=1e-12):
 
 # 🔹 Função para atualizar o status do palpite no banco
 def _validar_no_banco(pid: int):
-    db = Session()
     try:
-        db.execute(text("""
-            UPDATE palpites SET status = 'S' WHERE id = :pid
-        """), {"pid": pid})
-        db.commit()
+        with session_scope() as db:
+            db.execute(text("""
+                UPDATE palpites SET status = 'S' WHERE id = :pid
+            """), {"pid": pid})
+        cache_consultas.registrar_escrita(st.session_state.usuario["id"])
     except Exception as e:
-        db.rollback()
         st.error(f"Erro ao validar: {e}")
-    finally:
-        db.close()
 
 # 🔹 Função principal
 def validar_palpite():
@@ -1676,20 +1653,18 @@ def validar_palpite():
 
     st.markdown("## Validar Palpites/ Bets")
 
-    db = Session()
+    uid = st.session_state.usuario["id"]
     try:
-        rows = db.execute(text("""
+        rows = cache_consultas.consultar("""
             SELECT id, numeros, modelo, data, status
             FROM palpites
             WHERE id_usuario = :uid
             ORDER BY data DESC
             LIMIT 50
-        """), {"uid": st.session_state.usuario["id"]}).fetchall()
+        """, {"uid": uid}, cache_consultas.versao(uid), ("usuario",))
     except Exception as e:
         st.error(f"Erro ao buscar Palpites: {e}")
         return
-    finally:
-        db.close()
 
     if not rows:
         st.info("Você ainda não gerou nenhum Palpite.")
@@ -2066,102 +2041,39 @@ def verificar_limite_palpites(id_usuario: int):
         nome_plano (str)
         restantes (int)
 
-    Versão simplificada (DEV / estável):
-    - Fonte ÚNICA do plano: usuarios.id_plano
-    - Limite vem SEMPRE da tabela planos (palpites_max ou palpites_dia)
-    - Se não achar plano no usuário, cai para plano Free.
-    - NÃO usa mais client_plans aqui (evita conflito de dados sujos).
+    - Plano: usuarios.id_plano → planos (palpites_max ou palpites_dia),
+      com fallback para o plano Free — via cotas.plano (cache curto)
+    - Uso do mês: contador cotas_uso (sem COUNT(*) em palpites)
+    - A reserva de fato é atômica em cotas.reservar, no clique de gerar.
     """
+    info = cotas.plano(id_usuario, "LF")
+    nome_plano, limite_mes = info["nome"], info["limite"]
 
-    from datetime import date
-    from sqlalchemy import text
-    from db import Session
-
-    hoje = date.today()
-    ano = hoje.year
-    mes = hoje.month
-
-    db = Session()
-    try:
-        # ----------------------------------------------------
-        # 1) PLANO DO USUÁRIO (usuarios.id_plano)
-        # ----------------------------------------------------
-        row = db.execute(text("""
-            SELECT
-                p.id   AS id_plano,
-                p.nome AS nome_plano,
-                COALESCE(p.palpites_max, p.palpites_dia, 0) AS limite_mes
-            FROM usuarios u
-            JOIN planos p ON p.id = u.id_plano
-            WHERE u.id = :uid
-              AND p.status = 'A'
-            LIMIT 1
-        """), {"uid": id_usuario}).mappings().fetchone()
-
-        fonte_plano = "usuarios.id_plano"
-
-        # ----------------------------------------------------
-        # 2) Fallback: plano Free (se não achar nada no usuário)
-        # ----------------------------------------------------
-        if not row:
-            row = db.execute(text("""
-                SELECT
-                    id   AS id_plano,
-                    nome AS nome_plano,
-                    COALESCE(palpites_max, palpites_dia, 0) AS limite_mes
-                FROM planos
-                WHERE LOWER(nome) = 'free'
-                  AND status = 'A'
-                LIMIT 1
-            """)).mappings().fetchone()
-            fonte_plano = "free-fallback"
-
-        if not row:
-            print("[verificar_limite_palpites] Nenhum plano encontrado; bloqueando.")
-            return False, "Sem plano", 0
-
-        nome_plano = (row["nome_plano"] or "").strip()
-        limite_mes = int(row["limite_mes"] or 0)
-
-        if limite_mes <= 0:
-            print(
-                f"[verificar_limite_palpites] "
-                f"Plano {nome_plano} sem limite definido; bloqueando."
-            )
-            return False, nome_plano, 0
-
-        # ----------------------------------------------------
-        # 3) CONTAGEM DE PALPITES NO MÊS  (campo CORRETO: data)
-        # ----------------------------------------------------
-        usados = db.execute(text("""
-            SELECT COUNT(*)
-            FROM palpites
-            WHERE id_usuario = :uid
-              AND DATE_PART('year', data)  = :ano
-              AND DATE_PART('month', data) = :mes
-        """), {
-            "uid": id_usuario,
-            "ano": ano,
-            "mes": mes,
-        }).scalar() or 0
-
-        restantes = max(0, limite_mes - usados)
-        permitido = restantes > 0
+    if nome_plano is None:
+        print("[verificar_limite_palpites] Nenhum plano encontrado; bloqueando.")
+        return False, "Sem plano", 0
 
+    if limite_mes <= 0:
         print(
-            "[verificar_limite_palpites] "
-            f"fonte={fonte_plano} "
-            f"id_usuario={id_usuario} "
-            f"plano={nome_plano} "
-            f"limite_mes={limite_mes} "
-            f"usados={usados} "
-            f"restantes={restantes}"
+            f"[verificar_limite_palpites] "
+            f"Plano {nome_plano} sem limite definido; bloqueando."
         )
+        return False, nome_plano, 0
 
-        return permitido, nome_plano, restantes
+    usados = cotas.uso(id_usuario, "LF")
+    restantes = max(0, limite_mes - usados)
+    permitido = restantes > 0
 
-    finally:
-        db.close()
+    print(
+        "[verificar_limite_palpites] "
+        f"id_usuario={id_usuario} "
+        f"plano={nome_plano} "
+        f"limite_mes={limite_mes} "
+        f"usados={usados} "
+        f"restantes={restantes}"
+    )
+
+    return permitido, nome_plano, restantes
 
 # ============ LEGACY ============
 def _gerar_para_plano_legacy(nome_plano, qtd, k_escolhido):
@@ -2185,25 +2097,84 @@ def _gerar_para_plano_legacy(nome_plano, qtd, k_escolhido):
 #          PIPELINE NOVO — FINAL (LS14 / LS15 / LS16)
 # ============================================================
 
-def _amostrar_por_modelo_keras(metas, k):
+# ------------------------------------------------------------
+# Inferência em lote: 1 predict por modelo/concurso, N palpites
+# ------------------------------------------------------------
+_PRED_CACHE = {}   # (path, seq_len, concurso) -> vetor (25,)
+
+def _entrada_modelo(seq_len):
+    """Últimos seq_len concursos reais — a mesma janela do artefato offline."""
+    return janela_scores_lf(estatisticas_lf.historico(), seq_len)
+
+def _predicoes_por_modelo(metas):
     """
-    Gera 1 palpite a partir de uma lista de modelos carregados (metas).
-    Seleciona 1 modelo aleatoriamente, roda predict() e amostra k dezenas.
+    Roda cada modelo carregado no máximo 1x por concurso (cache do processo),
+    sobre a mesma entrada do artefato (scores_lf.janela): com ou sem
+    artefato em dia, o modelo vê o mesmo histórico.
+    Retorna matriz (n_modelos, 25) com as saídas (negativos zerados).
     """
-    import numpy as np
+    try:
+        concurso = estatisticas_lf.ultimo_concurso()
+    except Exception:
+        concurso = None
 
-    meta = random.choice(metas)
-    model = meta["model"]
-    seq_len = meta["expected_seq_len"]
+    preds = []
+    for meta in metas:
+        seq_len = meta.get("expected_seq_len") or 50
+        key = (meta.get("path"), seq_len, concurso)
+        if key not in _PRED_CACHE:
+            pred = meta["model"].predict(_entrada_modelo(seq_len), verbose=0)[0]
+            _PRED_CACHE[key] = np.maximum(np.asarray(pred, dtype=float), 0.0)
+        preds.append(_PRED_CACHE[key])
+    return np.vstack(preds) if preds else np.zeros((0, 25), dtype=float)
+
+def gumbel_top_k_batch(probs, k=15, temperature=1.0, rng=None):
+    """
+    Gumbel-top-k vetorizado: probs (n, 25) → (n, k) dezenas ordenadas (1..25).
+    Cada linha é uma amostra sem reposição proporcional a probs**(1/temperature).
+    """
+    rng = rng or np.random.default_rng()
+    p = np.atleast_2d(np.asarray(probs, dtype=float))
+    logits = np.log(np.clip(p, 1e-12, None)) / float(temperature)
+    g = rng.gumbel(size=logits.shape)
+    top = np.argpartition(-(logits + g), k - 1, axis=1)[:, :k]
+    return np.sort(top + 1, axis=1)
+
+def gerar_palpites_batch(model_name, qtd, k=15, temperature=None, metas=None):
+    """
+    API de geração em lote para (model_name, qtd, k):
+    - usa o artefato de scores por concurso quando em dia (sem TensorFlow);
+    - senão cada modelo Keras roda 1x (cache por concurso);
+    - cada palpite sorteia um dos modelos e amostra k dezenas via Gumbel-top-k,
+      todos de uma vez.
+    Retorna lista de palpites (listas de int) ou [] se não houver modelos.
+    """
+    if qtd <= 0:
+        return []
 
-    # usa histórico mínimo → 50 zeros
-    arr = np.zeros((1, seq_len, 25), dtype=np.float32)
+    # artefato offline primeiro; Keras só se não houver/estiver desatualizado
+    P = _scores_artefato(model_name) if metas is None else None
+    if P is None:
+        if metas is None:
+            metas = carregar_modelo_ls(model_name=model_name)
+        if not metas:
+            return []
+        P = _predicoes_por_modelo(metas)
+    if temperature is None:
+        temperature = float(os.getenv("ENSEMBLE_TEMPERATURE", "1.0"))
 
-    pred = model.predict(arr, verbose=0)[0]
-    pred = np.maximum(pred, 0)
+    P = P / np.maximum(P.sum(axis=1, keepdims=True), 1e-12)
 
-    idx = np.argsort(pred)[-k:] + 1
-    return sorted(idx.tolist())
+    rng = np.random.default_rng()
+    escolha = rng.integers(P.shape[0], size=int(qtd))
+    return gumbel_top_k_batch(P[escolha], k=int(k), temperature=temperature, rng=rng).tolist()
+
+def _amostrar_por_modelo_keras(metas, k):
+    """
+    Gera 1 palpite a partir de uma lista de modelos carregados (metas).
+    Mantido por compatibilidade — usa gerar_palpites_batch().
+    """
+    return gerar_palpites_batch(None, 1, k, metas=metas)[0]
 
 def gerar_para_plano(nome_plano: str, qtd: int = 3, k_escolhido: int | None = None):
     """
@@ -2233,34 +2204,45 @@ def _gerar_para_plano_novo(nome_plano, qtd, k_escolhido):
             palpites.append(list(t))
 
     try:
+        # versão dos dados lida 1x para o lote (os fallbacks consultam o cache por palpite)
+        try:
+            v = cache_consultas.versao()
+        except Exception as e:
+            logging.warning(f"[NOVO PIPELINE] versão dos dados indisponível: {e}")
+            v = None
+
         # → ESTATÍSTICO
         if modelo_up in ("ESTAT", "ESTATÍSTICO", "ESTATISTICO"):
             for _ in range(qtd):
-                p = gerar_palpite_estatistico(limite=k)
+                p = gerar_palpite_estatistico(limite=k, versao_dados=v)
                 add_unique(p)
 
         # → LS14 / LS15 = mesmo motor
         elif modelo_up in ("LS14", "LS15"):
-            metas = carregar_modelo_ls(model_name=modelo_up)
+            metas = None if _scores_artefato(modelo_up) is not None else carregar_modelo_ls(model_name=modelo_up)
 
-            if not metas:
+            if metas is not None and not metas:
                 logging.warning(f"[NOVO PIPELINE] {modelo_up} não carregado → fallback estat.")
                 for _ in range(qtd):
-                    p = gerar_palpite_estatistico(limite=k)
+                    p = gerar_palpite_estatistico(limite=k, versao_dados=v)
                     add_unique(p)
             else:
-                for _ in range(qtd):
-                    p = _amostrar_por_modelo_keras(metas, k)
-                    add_unique(p)
+                # 1 predict por modelo; reamostra só o que colidir no anti-duplicação
+                for _ in range(3):
+                    falta = qtd - len(palpites)
+                    if falta <= 0:
+                        break
+                    for p in gerar_palpites_batch(modelo_up, falta, k, metas=metas):
+                        add_unique(p)
 
         # → LS16 (PLATINUM)
         elif modelo_up == "LS16":
             for _ in range(qtd):
                 try:
-                    p = gerar_palpite_ls16_platinum(k=k)
+                    p = gerar_palpite_ls16_platinum(k=k, versao_dados=v)
                 except Exception as e:
                     logging.warning(f"[LS16] falhou → fallback estat. erro: {e}")
-                    p = gerar_palpite_estatistico(limite=k)
+                    p = gerar_palpite_estatistico(limite=k, versao_dados=v)
                 add_unique(p)
 
         # → LS17 / LS18 / R&D → usar legacy por enquanto
@@ -2723,7 +2705,20 @@ def gerar_palpite_ui_legacy():
         # === Loader simples visível imediatamente ===
         status = st.empty()
 
+        reservado = 0
+        ids_salvos = []
         try:
+            # reserva atômica do lote inteiro (cliques simultâneos não furam o limite)
+            ok, usados, limite = cotas.reservar(id_usuario, "LF", int(qtd))
+            if not ok:
+                status.empty()
+                st.error(
+                    f"Limite do plano **{nome_plano_limite}** atingido: {usados}/{limite} "
+                    f"palpites no mês; restam {max(0, limite - usados)}."
+                )
+                return
+            reservado = int(qtd)
+
             # ---- PROCESSAMENTO PESADO ----
             modelo_usado, k_final, palpites = gerar_para_plano(
                 nome_plano=plano_key,
@@ -2739,15 +2734,21 @@ def gerar_palpite_ui_legacy():
                 return
 
             # Salvar palpites
-            ids_salvos = []
             for p in palpites:
                 pid = salvar_palpite(
                     palpite=p,
                     modelo=modelo_usado,
                     extras_meta={"plano": plano_key},
+                    contar=False,
                 )
                 if pid:
                     ids_salvos.append(pid)
+            if ids_salvos:
+                atualizar_contador_palpites(id_usuario, len(ids_salvos))
+                from admin.palpites_hits import atualizar_hits_usuario
+
+                atualizar_hits_usuario("LF", id_usuario)
+                cache_consultas.registrar_escrita(id_usuario)
 
             _render_badge_modelo(modelo_usado, k_final)
 
@@ -2768,6 +2769,12 @@ def gerar_palpite_ui_legacy():
             status.empty()
             st.error(f"Erro inesperado: {e}")
             logging.exception(e)
+        finally:
+            # devolve a parte reservada que não virou palpite salvo
+            try:
+                cotas.liberar(id_usuario, "LF", reservado - len(ids_salvos))
+            except Exception as e:
+                logging.warning(f"[cotas] falha ao devolver reserva uid={id_usuario}: {e}")
 
 
 def gerar_palpite_ui_novo():
@@ -1,25 +1,29 @@
 from datetime import datetime
 from sqlalchemy import text
 from db import Session
+import periodos
 from app.services.email_service import enviar_email_brevo
 
 TEMPLATE_RESUMO_MENSAL = 4  # <<< TROQUE PELO SEU ID REAL
 
 
 def gerar_relatorio_mensal(db, user_id: int, mes: int, ano: int):
+    ini, fim = periodos.mes(ano, mes)
+    periodo = {"uid": user_id, "ini": ini, "fim": fim}
+
     total_lf = db.execute(text("""
         SELECT COUNT(*) FROM palpites
         WHERE id_usuario = :uid
-          AND EXTRACT(MONTH FROM data) = :mes
-          AND EXTRACT(YEAR FROM data) = :ano
-    """), {"uid": user_id, "mes": mes, "ano": ano}).scalar() or 0
+          AND data >= :ini
+          AND data <  :fim
+    """), periodo).scalar() or 0
 
     total_ms = db.execute(text("""
         SELECT COUNT(*) FROM palpites_m
         WHERE id_usuario = :uid
-          AND EXTRACT(MONTH FROM data) = :mes
-          AND EXTRACT(YEAR FROM data) = :ano
-    """), {"uid": user_id, "mes": mes, "ano": ano}).scalar() or 0
+          AND data >= :ini
+          AND data <  :fim
+    """), periodo).scalar() or 0
 
     return {
         "total_palpites": total_lf + total_ms,
@@ -1,5 +1,13 @@
 import os
+import time
+import queue
+import logging
+import threading
 import requests
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 import smtplib
 from email.mime.text import MIMEText
@@ -24,6 +32,150 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
 EMAIL_FROM = os.getenv("EMAIL_FROM", SMTP_USER)
+SMTP_TIMEOUT = 20
+
+
+# =====================================================
+# Transporte HTTP (Brevo): 1 Session por processo
+# =====================================================
+# base trocável (ex.: servidor local de teste)
+BREVO_URL = os.getenv("BREVO_URL", "https://api.brevo.com/v3/smtp/email")
+BREVO_TIMEOUT = (5, 15)               # (conexão, leitura) em segundos
+BREVO_VERSOES_POR_CHAMADA = 1000     # limite da API para messageVersions
+BREVO_WORKERS = int(os.getenv("BREVO_WORKERS", "4"))
+BREVO_TENTATIVAS = 4
+# só respostas que garantem que nada foi enviado: 429 (rate limit) e 503
+# com Retry-After (recusa explícita). 502/504 não dizem se o Brevo aceitou
+# → voltam ao chamador como resultado incerto, sem reenvio.
+BREVO_STATUS_RETRY = (429,)
+
+_sessao = None
+_sessao_lock = threading.Lock()
+
+
+def obter_sessao():
+    """
+    requests.Session única (keep-alive: DNS + TLS pagos uma vez por conexão)
+    com pool = BREVO_WORKERS. O adapter só refaz erros de conexão (o POST
+    não chegou ao servidor); 429 / 503 com Retry-After são refeitos em _post, que respeita o
+    reset do rate limit.
+    """
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            retry = Retry(total=BREVO_TENTATIVAS, connect=BREVO_TENTATIVAS, read=0, status=0,
+                          backoff_factor=0.5, allowed_methods=None, raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, BREVO_WORKERS), max_retries=retry)
+            s = requests.Session()
+            s.headers.update({
+                "accept": "application/json",
+                "content-type": "application/json",
+            })
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _sessao = s
+        return _sessao
+
+
+def _espera_brevo(r, tentativa: int) -> float:
+    """Segundos até a próxima tentativa: Retry-After / x-sib-ratelimit-reset ou backoff."""
+    for h in ("Retry-After", "x-sib-ratelimit-reset"):
+        try:
+            return min(30.0, max(0.0, float(r.headers[h])))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return min(30.0, 0.5 * (2 ** tentativa))
+
+
+def _refazer(r) -> bool:
+    """A resposta garante que o envio não foi aceito? (429, ou 503 com Retry-After)"""
+    return r.status_code in BREVO_STATUS_RETRY or (r.status_code == 503 and "Retry-After" in r.headers)
+
+
+def _post(payload: dict) -> requests.Response:
+    """POST no Brevo pela sessão compartilhada; refaz só o que com certeza não foi enviado."""
+    for tentativa in range(BREVO_TENTATIVAS):
+        r = obter_sessao().post(BREVO_URL, json=payload, headers={"api-key": BREVO_API_KEY or ""},
+                                timeout=BREVO_TIMEOUT)
+        if not _refazer(r) or tentativa == BREVO_TENTATIVAS - 1:
+            return r
+        time.sleep(_espera_brevo(r, tentativa))
+    return r
+
+
+def _post_brevo(payload: dict):
+    """
+    _post sem exceção. Retorna (ok, erro, status): status é o HTTP recebido
+    ou None (timeout / conexão caída — o Brevo pode ter aceitado o envio).
+    """
+    try:
+        r = _post(payload)
+    except requests.RequestException as e:
+        return False, str(e), None
+    if r.status_code in (200, 201, 202):
+        return True, None, r.status_code
+    return False, f"Erro Brevo {r.status_code}: {r.text[:300]}", r.status_code
+
+
+# =====================================================
+# Transporte SMTP: conexão reaproveitada num lote
+# =====================================================
+@contextmanager
+def conexao_smtp():
+    """
+    Uma conexão SMTP (STARTTLS + login) para todo o bloco:
+        with conexao_smtp() as smtp:
+            for ...: enviar_email(dest, assunto, corpo, smtp=smtp)
+    """
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        server.starttls()
+        server.login(SMTP_USER, SMTP_PASS)
+        yield server
+    finally:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+
+# =====================================================
+# Fila de envio em segundo plano
+# =====================================================
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def _trabalhador_fila():
+    while True:
+        func, args, kwargs = _fila.get()
+        try:
+            resultado = func(*args, **kwargs)
+            if resultado is False:
+                logging.error(f"Envio em segundo plano falhou: {func.__name__}")
+        except Exception:
+            logging.exception(f"Envio em segundo plano falhou: {func.__name__}")
+        finally:
+            _fila.task_done()
+
+
+def enviar_em_segundo_plano(func, *args, **kwargs) -> None:
+    """
+    Enfileira func(*args, **kwargs) numa thread do processo e retorna na hora
+    (ex.: o reset de senha não espera a ida ao provedor). Erros vão para o log.
+    """
+    global _fila
+    with _fila_lock:
+        if _fila is None:
+            _fila = queue.Queue()
+            threading.Thread(target=_trabalhador_fila, name="email_fila", daemon=True).start()
+    _fila.put((func, args, kwargs))
+
+
+def aguardar_fila() -> None:
+    """Bloqueia até a fila de segundo plano esvaziar (scripts/testes)."""
+    if _fila is not None:
+        _fila.join()
 
 
 def _saudacao(nome_usuario: str | None) -> str:
@@ -50,8 +202,6 @@ def enviar_email_reset(
 
     titulo = _saudacao(nome_usuario)
 
-    url = "https://api.brevo.com/v3/smtp/email"
-
     payload = {
         "sender": {"name": SENDER_NAME, "email": SENDER_EMAIL},
         "to": [{"email": destinatario}],
@@ -98,39 +248,68 @@ def enviar_email_reset(
         """
     }
 
-    headers = {
-        "accept": "application/json",
-        "api-key": BREVO_API_KEY,
-        "content-type": "application/json"
-    }
-
-    r = requests.post(url, json=payload, headers=headers, timeout=10)
+    r = _post(payload)
 
     if r.status_code not in (200, 201, 202):
         logging.error(f"Erro Brevo {r.status_code}: {r.text}")
         return False
+    return True
 
 
 
-def enviar_email(destinatario: str, assunto: str, corpo: str) -> None:
-    """
-    Envia e-mail padrão FaixaBet (usado em recuperação de senha,
-    notificações de acertos, alertas etc.)
-    """
+def _mensagem(destinatario: str, assunto: str, corpo: str) -> MIMEMultipart:
     msg = MIMEMultipart()
     msg["From"] = f"FaixaBet <{EMAIL_FROM}>"
     msg["To"] = destinatario
     msg["Subject"] = assunto
 
     msg.attach(MIMEText(corpo, "plain", "utf-8"))
+    return msg
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASS)
+
+def enviar_email(destinatario: str, assunto: str, corpo: str, smtp=None) -> None:
+    """
+    Envia e-mail padrão FaixaBet (usado em recuperação de senha,
+    notificações de acertos, alertas etc.)
+    smtp=conexão de conexao_smtp() → reaproveita; sem ela abre uma só para este envio.
+    """
+    msg = _mensagem(destinatario, assunto, corpo)
+    if smtp is not None:
+        smtp.send_message(msg)
+        return
+    with conexao_smtp() as server:
         server.send_message(msg)
 
 
-BREVO_URL = "https://api.brevo.com/v3/smtp/email"
+def enviar_emails_smtp(mensagens: list) -> list:
+    """
+    [(destinatario, assunto, corpo)] pela mesma conexão SMTP; se o servidor
+    derrubar, reconecta e segue (desiste se a nova conexão não enviar nada).
+    Retorna [{"email", "ok", "erro"}] na mesma ordem.
+    """
+    status = []
+    i = 0
+    while i < len(mensagens):
+        inicio_conexao = i
+        try:
+            with conexao_smtp() as smtp:
+                while i < len(mensagens):
+                    destinatario, assunto, corpo = mensagens[i]
+                    try:
+                        enviar_email(destinatario, assunto, corpo, smtp=smtp)
+                        status.append({"email": destinatario, "ok": True, "erro": None})
+                    except smtplib.SMTPServerDisconnected:
+                        raise
+                    except (smtplib.SMTPException, OSError) as e:
+                        status.append({"email": destinatario, "ok": False, "erro": str(e)})
+                    i += 1
+        except (smtplib.SMTPException, OSError) as e:
+            if i == inicio_conexao:
+                status.extend({"email": m[0], "ok": False, "erro": str(e)} for m in mensagens[i:])
+                break
+            logging.warning(f"SMTP caiu após {i} envios ({e}); reconectando")
+    return status
+
 
 def enviar_email_brevo(
     destinatario_email: str,
@@ -152,12 +331,6 @@ def enviar_email_brevo(
     if not destinatario_email:
         raise RuntimeError("destinatario_email vazio")
 
-    headers = {
-        "accept": "application/json",
-        "api-key": BREVO_API_KEY,
-        "content-type": "application/json"
-    }
-
     payload = {
         "sender": {"name": SENDER_NAME, "email": SENDER_EMAIL},
         "to": [{
@@ -168,7 +341,7 @@ def enviar_email_brevo(
         "params": params or {}
     }
 
-    r = requests.post(BREVO_URL, json=payload, headers=headers, timeout=15)
+    r = _post(payload)
 
     if r.status_code not in (200, 201, 202):
         raise RuntimeError(f"Erro Brevo {r.status_code}: {r.text}")
@@ -180,6 +353,79 @@ def enviar_email_brevo(
         return {"status_code": r.status_code, "text": r.text}
 
 
+# =====================================================
+# Envio em lote via Brevo (messageVersions + pool de threads)
+# =====================================================
+def _versao(envio: dict) -> dict:
+    return {
+        "to": [{"email": envio["email"], "name": (envio.get("nome") or "").strip() or None}],
+        "params": envio.get("params") or {},
+    }
+
+
+def _enviar_bloco(template_id: int, bloco: list) -> list:
+    """
+    Um POST com messageVersions → [(ok, erro, incerto)] por destinatário.
+
+    Só a recusa de validação (400: um e-mail inválido derruba o lote inteiro)
+    é reenviada um a um. Timeout / 502 / 504 (e 5xx em geral) deixam o
+    resultado incerto (o Brevo pode ter aceitado o lote): nada é reenviado
+    aqui nem marcado como enviado — a próxima execução decide. 429 que
+    persiste depois das tentativas de _post é falha certa (nada saiu).
+    """
+    ok, erro, status = _post_brevo({
+        "sender": {"name": SENDER_NAME, "email": SENDER_EMAIL},
+        "templateId": int(template_id),
+        "messageVersions": [_versao(e) for e in bloco],
+    })
+    if ok:
+        return [(True, None, False)] * len(bloco)
+    if status == 400 and len(bloco) > 1:
+        logging.warning(f"Lote Brevo recusado ({erro}); reenviando {len(bloco)} individualmente")
+        return [_enviar_bloco(template_id, [e])[0] for e in bloco]
+    incerto = status is None or status >= 500
+    if incerto:
+        logging.warning(f"Lote Brevo sem confirmação ({erro}); {len(bloco)} destinatários não reenviados")
+    return [(False, erro, incerto)] * len(bloco)
+
+
+def enviar_emails_brevo_lote(
+    envios: list,
+    template_id: int,
+    workers: int | None = None,
+    versoes_por_chamada: int = BREVO_VERSOES_POR_CHAMADA
+) -> list:
+    """
+    Envia o mesmo TEMPLATE para muitos destinatários.
+    envios: [{"email", "nome", "params"}] → [{"email", "ok", "erro", "incerto"}]
+    na mesma ordem. incerto=True: timeout/5xx, o e-mail pode ter saído —
+    não é reenviado nem deve ser registrado como enviado.
+
+    Cada chamada leva até `versoes_por_chamada` destinatários (messageVersions);
+    as chamadas rodam em paralelo (pool limitado, sessão keep-alive).
+    """
+    if not BREVO_API_KEY:
+        raise RuntimeError("BREVO_API_KEY não configurada")
+    if not SENDER_EMAIL:
+        raise RuntimeError("BREVO_SENDER_EMAIL não configurada")
+    if not template_id:
+        raise RuntimeError("template_id inválido")
+    if not envios:
+        return []
+
+    n = max(1, int(versoes_por_chamada))
+    blocos = [envios[i:i + n] for i in range(0, len(envios), n)]
+    workers = max(1, min(workers or BREVO_WORKERS, len(blocos)))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        resultados = list(ex.map(lambda b: _enviar_bloco(template_id, b), blocos))
+
+    return [
+        {"email": e["email"], "ok": ok, "erro": erro, "incerto": incerto}
+        for bloco, res in zip(blocos, resultados)
+        for e, (ok, erro, incerto) in zip(bloco, res)
+    ]
+
+
 # =====================================================
 # Alias de compatibilidade (nome antigo usado no app)
 # =====================================================
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+cache_consultas.py – cache das consultas das páginas por versão dos dados
+
+O dashboard (e as demais páginas de app/ e mega/) refazia 15+ consultas a
+cada rerun do Streamlit: COUNT(*) global de palpites/palpites_m, contagens do
+usuário, lista de concursos, premiação... Quase tudo só muda quando entra
+um concurso novo ou quando o usuário grava/valida palpites.
+
+Aqui cada resultado fica em memória com a chave
+
+    (sql, params, versão das partes de que a consulta depende)
+
+e a versão é lida numa única consulta barata por página (versao(uid)):
+
+    "LF" / "MS"  → MAX(concurso) da tabela de resultados + contador de carga
+    "usuario"    → contador de escritas do usuário   (versoes_dados 'u:<id>')
+    "global"     → janela de GLOBAL_SEGUNDOS (agregados de todos os usuários:
+                   total da plataforma, frequência, lista do admin)
+    "dia"        → CURRENT_DATE (consultas com "hoje" / "mês corrente")
+
+Escritas chamam registrar_escrita(uid) / registrar_carga(loteria): o
+contador sobe no banco e toda entrada que dependia dele deixa de ser
+encontrada (em todos os processos). registrar_escrita só mexe na linha do
+usuário — um contador 'global' subiria a cada palpite salvo por qualquer
+um (linha quente); os agregados globais aceitam GLOBAL_SEGUNDOS de atraso.
+
+Escrita que não passa por aqui (DELETE de palpite, correção no admin, SQL
+direto, jobs) é coberta por TTL_SEGUNDOS: nenhuma entrada vive mais que
+isso. Entradas velhas saem por LRU.
+
+Uso:
+    v = cache_consultas.versao(uid)
+    n = cache_consultas.consultar(sql, {"uid": uid}, v, ("usuario", "dia"), modo="scalar")
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from db_pool import session_scope
+import schema_cache
+
+MAX_ITENS = int(os.getenv("FAIXABET_CACHE_CONSULTAS", "4096"))
+TTL_SEGUNDOS = float(os.getenv("FAIXABET_CACHE_TTL", "600"))          # 0 = sem TTL
+GLOBAL_SEGUNDOS = float(os.getenv("FAIXABET_CACHE_GLOBAL", "60"))
+
+DDL = """
+    CREATE TABLE IF NOT EXISTS versoes_dados (
+        chave         VARCHAR(32) PRIMARY KEY,
+        versao        BIGINT      NOT NULL DEFAULT 0,
+        atualizado_em TIMESTAMP   NOT NULL DEFAULT NOW()
+    )
+"""
+
+# loteria → tabela de resultados
+RESULTADOS = {"LF": "resultados_oficiais", "MS": "resultados_oficiais_m"}
+
+_lock = threading.Lock()
+_itens = OrderedDict()    # chave → (gravado_em monotonic, resultado)
+_metricas = {"acertos": 0, "faltas": 0}
+_tabela_ok = False
+
+
+def _garantir_tabela(db):
+    global _tabela_ok
+    if not _tabela_ok:
+        db.execute(text(DDL))
+        _tabela_ok = True
+
+
+def _chave_usuario(uid) -> str:
+    return f"u:{int(uid)}"
+
+
+# ------------------------------------------------------------
+# Versões
+# ------------------------------------------------------------
+def _sql_versao() -> str:
+    partes = []
+    for lot, tabela in RESULTADOS.items():
+        maximo = f"(SELECT MAX(concurso) FROM {tabela})" if schema_cache.existe_tabela(tabela) else "NULL"
+        partes.append(f"{maximo} AS max_{lot}")
+        partes.append(f"(SELECT versao FROM versoes_dados WHERE chave = '{lot}') AS carga_{lot}")
+    partes.append("(SELECT versao FROM versoes_dados WHERE chave = :chave_uid) AS usuario")
+    partes.append("CURRENT_DATE AS dia")
+    return "SELECT " + ",\n       ".join(partes)
+
+
+def versao(uid: int = None) -> dict:
+    """{"LF", "MS", "usuario", "global", "dia"} — 1 ida ao banco."""
+    with session_scope() as db:
+        _garantir_tabela(db)
+        row = db.execute(text(_sql_versao()), {"chave_uid": _chave_usuario(uid or 0)}).mappings().fetchone()
+    v = {lot: (row[f"max_{lot}"], row[f"carga_{lot}"] or 0) for lot in RESULTADOS}
+    v["usuario"] = (int(uid or 0), row["usuario"] or 0)
+    v["global"] = int(time.time() // max(1.0, GLOBAL_SEGUNDOS))
+    v["dia"] = row["dia"]
+    return v
+
+
+def _incrementar(chaves: list) -> bool:
+    """Sobe as versões `chaves`. Falha só vai para o log (a página segue)."""
+    try:
+        with session_scope() as db:
+            _garantir_tabela(db)
+            db.execute(text("""
+                INSERT INTO versoes_dados (chave, versao, atualizado_em)
+                SELECT c, 1, NOW() FROM unnest(CAST(:chaves AS VARCHAR[])) AS t(c)
+                ON CONFLICT (chave) DO UPDATE SET
+                    versao = versoes_dados.versao + 1,
+                    atualizado_em = NOW()
+            """), {"chaves": list(chaves)})
+        return True
+    except Exception as e:
+        logging.warning(f"[cache_consultas] falha ao subir versão {chaves}: {e}")
+        return False
+
+
+def registrar_escrita(uid: int) -> bool:
+    """Palpites do usuário mudaram (insert/validação): invalida o escopo 'usuario' dele."""
+    return _incrementar([_chave_usuario(uid)])
+
+
+def registrar_carga(loteria: str) -> bool:
+    """Resultados/acertos da loteria mudaram sem concurso novo (correção, backfill)."""
+    loteria = str(loteria).upper()
+    if loteria not in RESULTADOS:
+        raise ValueError(f"Loteria inválida: {loteria}")
+    return _incrementar([loteria])
+
+
+# ------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------
+def _buscar(sql: str, params: dict, modo: str):
+    with session_scope() as db:
+        result = db.execute(text(sql), params)
+        if modo == "scalar":
+            return result.scalar()
+        if modo == "one":
+            return result.fetchone()
+        return result.fetchall()
+
+
+def consultar(sql: str, params: dict = None, versao_dados: dict = None, escopo=("usuario",), modo: str = "all"):
+    """
+    Resultado de `sql` (modo "all" → lista de Row, "one" → Row | None,
+    "scalar" → valor) reaproveitado enquanto as partes `escopo` de
+    `versao_dados` não mudarem (e por no máximo TTL_SEGUNDOS).
+    versao_dados=None → versao(params["uid"]).
+    """
+    if modo not in ("all", "one", "scalar"):
+        raise ValueError(f"Modo inválido: {modo}")
+    params = params or {}
+    if versao_dados is None:
+        versao_dados = versao(params.get("uid"))
+    chave = (sql, repr(sorted(params.items())), modo, tuple(versao_dados[e] for e in escopo))
+
+    agora = time.monotonic()
+    with _lock:
+        item = _itens.get(chave)
+        if item is not None and (TTL_SEGUNDOS <= 0 or agora - item[0] < TTL_SEGUNDOS):
+            _itens.move_to_end(chave)
+            _metricas["acertos"] += 1
+            return item[1]
+        _metricas["faltas"] += 1
+
+    valor = _buscar(sql, params, modo)
+    with _lock:
+        _itens[chave] = (agora, valor)
+        _itens.move_to_end(chave)
+        while len(_itens) > MAX_ITENS:
+            _itens.popitem(last=False)
+    return valor
+
+
+def limpar():
+    """Esvazia o cache do processo (as versões no banco não mudam)."""
+    with _lock:
+        _itens.clear()
+
+
+def metricas() -> dict:
+    with _lock:
+        m = dict(_metricas)
+        m["itens"] = len(_itens)
+    total = m["acertos"] + m["faltas"]
+    m["taxa_acerto"] = m["acertos"] / total if total else 0.0
+    return m
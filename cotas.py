@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+cotas.py – cota de palpites por (id_usuario, loteria, período) com
+reserva atômica
+
+Antes cada tentativa de gerar palpites fazia JOIN do plano + COUNT(*) dos
+palpites do período (verificar_limite_palpites, _get_usuario_ctx do Mega),
+e cada palpite salvo disparava o seu UPDATE de contador. A checagem era
+"lê, decide, grava": dois cliques simultâneos passavam ambos pelo limite.
+
+Aqui:
+- uma linha em cotas_uso por (id_usuario, loteria, periodo) guarda `usados`
+    LF → período mensal (periodo = 1º dia do mês; limite palpites_max/palpites_dia)
+    MS → período diário (periodo = hoje;         limite palpites_dia)
+- reservar(uid, loteria, n, limite) → 1 UPDATE ... WHERE usados + n <= limite
+  RETURNING: checa e incrementa o lote inteiro numa ida ao banco. A linha fica
+  travada durante o UPDATE, então cliques concorrentes são serializados e
+  o limite nunca é ultrapassado.
+- liberar(uid, loteria, n) devolve o que foi reservado e não foi salvo.
+- A linha do período é criada na 1ª reserva já com a contagem real dos
+  palpites existentes (migração sem perder o que foi gerado antes).
+- plano(uid, loteria) → {"nome", "limite"} com cache em memória
+  (env FAIXABET_COTA_TTL, padrão 60 s; invalidar_planos() após trocar plano —
+  app/financeiro.py; outros processos veem a troca em até TTL).
+- limpar_expirados() apaga as linhas de períodos já encerrados (chamado
+  pelo job mensal admin/envio_estatisticas.py).
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import date
+
+from sqlalchemy import text
+
+from db_pool import session_scope
+import periodos
+import schema_cache
+
+PLANO_TTL_SECONDS = float(os.getenv("FAIXABET_COTA_TTL", "60"))
+
+DDL = """
+    CREATE TABLE IF NOT EXISTS cotas_uso (
+        id_usuario    INTEGER     NOT NULL,
+        loteria       VARCHAR(2)  NOT NULL,
+        periodo       DATE        NOT NULL,
+        usados        INTEGER     NOT NULL DEFAULT 0,
+        atualizado_em TIMESTAMP   NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id_usuario, loteria, periodo)
+    )
+"""
+
+# loteria → tabela de palpites, candidatas a coluna de horário, período e
+# consulta do plano (mesmas regras de verificar_limite_palpites / _get_usuario_ctx)
+LOTERIAS = {
+    "LF": {
+        "tabela": "palpites",
+        "horario": ("data", "created_at"),
+        "periodo": "mes",
+        "sql_plano": """
+            SELECT p.nome AS nome, COALESCE(p.palpites_max, p.palpites_dia, 0) AS limite
+            FROM usuarios u
+            JOIN planos p ON p.id = u.id_plano
+            WHERE u.id = :uid
+              AND p.status = 'A'
+            LIMIT 1
+        """,
+        "sql_plano_padrao": """
+            SELECT nome, COALESCE(palpites_max, palpites_dia, 0) AS limite
+            FROM planos
+            WHERE LOWER(nome) = 'free'
+              AND status = 'A'
+            LIMIT 1
+        """,
+    },
+    "MS": {
+        "tabela": "palpites_m",
+        "horario": ("created_at", "data", "dt", "timestamp"),
+        "periodo": "dia",
+        "sql_plano": """
+            SELECT p.nome AS nome, COALESCE(p.palpites_dia, 0) AS limite
+            FROM usuarios u
+            JOIN planos p ON p.id = u.id_plano
+            WHERE u.id = :uid
+        """,
+        "sql_plano_padrao": None,
+    },
+}
+
+_lock = threading.Lock()
+_planos = {}              # (uid, loteria) → (carregado_em, {"nome", "limite"})
+_tabela_ok = False
+
+
+def _cfg(loteria: str) -> dict:
+    loteria = str(loteria).upper()
+    if loteria not in LOTERIAS:
+        raise ValueError(f"Loteria inválida: {loteria}")
+    return LOTERIAS[loteria]
+
+
+def _garantir_tabela(db):
+    global _tabela_ok
+    if not _tabela_ok:
+        db.execute(text(DDL))
+        _tabela_ok = True
+
+
+def intervalo(loteria: str, hoje: date = None) -> tuple:
+    """[ini, fim) do período corrente da loteria; ini é a chave `periodo`."""
+    hoje = hoje or date.today()
+    if _cfg(loteria)["periodo"] == "mes":
+        return periodos.mes(hoje.year, hoje.month)
+    return periodos.dia(hoje)
+
+
+# ------------------------------------------------------------
+# Plano (cache curto em memória)
+# ------------------------------------------------------------
+def plano(uid: int, loteria: str) -> dict:
+    """{"nome": str | None, "limite": int} do plano do usuário (cache PLANO_TTL_SECONDS)."""
+    cfg = _cfg(loteria)
+    chave = (int(uid), str(loteria).upper())
+    agora = time.monotonic()
+    with _lock:
+        item = _planos.get(chave)
+    if item is not None and (agora - item[0]) < PLANO_TTL_SECONDS:
+        return item[1]
+
+    with session_scope() as db:
+        row = db.execute(text(cfg["sql_plano"]), {"uid": int(uid)}).mappings().fetchone()
+        if not row and cfg["sql_plano_padrao"]:
+            row = db.execute(text(cfg["sql_plano_padrao"])).mappings().fetchone()
+    valor = {
+        "nome": ((row["nome"] or "").strip() if row else None),
+        "limite": int(row["limite"] or 0) if row else 0,
+    }
+    with _lock:
+        _planos[chave] = (agora, valor)
+    return valor
+
+
+def invalidar_planos(uid: int = None):
+    """Descarta o cache de planos (de um usuário ou de todos)."""
+    with _lock:
+        if uid is None:
+            _planos.clear()
+        else:
+            for chave in [c for c in _planos if c[0] == int(uid)]:
+                _planos.pop(chave, None)
+
+
+# ------------------------------------------------------------
+# Contador
+# ------------------------------------------------------------
+def _sql_semente(loteria: str) -> str:
+    """INSERT da linha do período com a contagem real dos palpites já salvos."""
+    cfg = _cfg(loteria)
+    col = next((c for c in cfg["horario"] if schema_cache.tem_coluna(cfg["tabela"], c)), None)
+    contagem = "0" if col is None else f"""(
+        SELECT COUNT(*) FROM {cfg["tabela"]}
+        WHERE id_usuario = :uid AND {col} >= :ini AND {col} < :fim
+    )"""
+    return f"""
+        INSERT INTO cotas_uso (id_usuario, loteria, periodo, usados)
+        VALUES (:uid, :loteria, :ini, {contagem})
+        ON CONFLICT (id_usuario, loteria, periodo) DO NOTHING
+    """
+
+
+_SQL_RESERVAR = """
+    WITH r AS (
+        UPDATE cotas_uso
+        SET usados = usados + :n, atualizado_em = NOW()
+        WHERE id_usuario = :uid AND loteria = :loteria AND periodo = :ini
+          AND usados + :n <= :limite
+        RETURNING usados
+    )
+    SELECT usados, TRUE AS ok FROM r
+    UNION ALL
+    SELECT usados, FALSE AS ok FROM cotas_uso
+    WHERE id_usuario = :uid AND loteria = :loteria AND periodo = :ini
+      AND NOT EXISTS (SELECT 1 FROM r)
+"""
+
+
+def reservar(uid: int, loteria: str, n: int, limite: int = None) -> tuple:
+    """
+    Check-and-increment atômico de `n` palpites no período corrente.
+    limite=None usa o do plano (cache). Retorna (ok, usados, limite):
+    ok=False → nada foi reservado e `usados` é o valor atual.
+    """
+    loteria = str(loteria).upper()
+    limite = plano(uid, loteria)["limite"] if limite is None else int(limite)
+    ini, fim = intervalo(loteria)
+    params = {"uid": int(uid), "loteria": loteria, "ini": ini, "fim": fim, "n": int(n), "limite": limite}
+
+    with session_scope() as db:
+        _garantir_tabela(db)
+        row = db.execute(text(_SQL_RESERVAR), params).fetchone()
+        if row is None:
+            # 1ª reserva do período: cria a linha e tenta de novo
+            db.execute(text(_sql_semente(loteria)), params)
+            row = db.execute(text(_SQL_RESERVAR), params).fetchone()
+    ok = bool(row.ok) if row else False
+    usados = int(row.usados) if row else 0
+    logging.info(f"[cotas] {loteria} uid={uid} n={n} ok={ok} usados={usados}/{limite}")
+    return ok, usados, limite
+
+
+def liberar(uid: int, loteria: str, n: int):
+    """Devolve `n` palpites reservados e não salvos (ex.: falha na geração)."""
+    if n <= 0:
+        return
+    loteria = str(loteria).upper()
+    ini, _ = intervalo(loteria)
+    with session_scope() as db:
+        db.execute(text("""
+            UPDATE cotas_uso
+            SET usados = GREATEST(0, usados - :n), atualizado_em = NOW()
+            WHERE id_usuario = :uid AND loteria = :loteria AND periodo = :ini
+        """), {"uid": int(uid), "loteria": loteria, "ini": ini, "n": int(n)})
+
+
+def uso(uid: int, loteria: str) -> int:
+    """Palpites já contados no período corrente (cria a linha se preciso)."""
+    loteria = str(loteria).upper()
+    ini, fim = intervalo(loteria)
+    params = {"uid": int(uid), "loteria": loteria, "ini": ini, "fim": fim}
+    with session_scope() as db:
+        _garantir_tabela(db)
+        usados = db.execute(text("""
+            SELECT usados FROM cotas_uso
+            WHERE id_usuario = :uid AND loteria = :loteria AND periodo = :ini
+        """), params).scalar()
+        if usados is None:
+            db.execute(text(_sql_semente(loteria)), params)
+            usados = db.execute(text("""
+                SELECT usados FROM cotas_uso
+                WHERE id_usuario = :uid AND loteria = :loteria AND periodo = :ini
+            """), params).scalar()
+    return int(usados or 0)
+
+
+def limpar_expirados(hoje: date = None) -> int:
+    """Apaga as linhas de períodos encerrados (nenhuma reserva volta a elas)."""
+    total = 0
+    with session_scope() as db:
+        _garantir_tabela(db)
+        for loteria in LOTERIAS:
+            ini, _ = intervalo(loteria, hoje)
+            total += db.execute(text("""
+                DELETE FROM cotas_uso
+                WHERE loteria = :loteria AND periodo < :ini
+            """), {"loteria": loteria, "ini": ini}).rowcount
+    logging.info(f"[cotas] {total} linhas de períodos encerrados removidas")
+    return total
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+db_pool.py – engine SQLAlchemy único por processo (Neon / PostgreSQL)
+
+Antes cada db.py (app/, admin/, modelo_llm_max/) e o get_conn() do
+palpites_legacy criavam o seu próprio engine — e no Streamlit o mesmo
+app/db.py era importado duas vezes ("db" e "app.db"), gerando 2 pools.
+Agora todos os db.py só reexportam daqui; o módulo é sempre importado pelo
+mesmo nome ("db_pool"), então existe 1 pool por processo.
+
+Configuração (env):
+    FAIXABET_DB_POOL_SIZE          conexões fixas do pool        (padrão 5)
+    FAIXABET_DB_MAX_OVERFLOW       conexões extras sob pico      (padrão 5)
+    FAIXABET_DB_POOL_TIMEOUT       espera máx. por conexão, s    (padrão 30)
+    FAIXABET_DB_POOL_RECYCLE       recicla conexões após N s     (padrão 300)
+    FAIXABET_DB_STATEMENT_TIMEOUT  statement_timeout em ms, 0=off (padrão 30000)
+
+O statement_timeout vale para as páginas (consulta presa não segura uma
+conexão do pool). Jobs de admin/lote (migrações, COPY, backfill, envio
+mensal) abrem a transação com session_scope(statement_timeout=0), que faz
+SET LOCAL só naquela transação.
+
+Uso:
+    from db import Session, session_scope
+
+    with session_scope() as db:
+        db.execute(text("UPDATE ..."))      # commit/rollback/close automáticos
+
+    with session_scope(statement_timeout=0) as db:   # job longo, sem limite
+        ...
+
+    metricas_pool() → conexões criadas, checkouts e espera por conexão.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(os.path.join(BASE_DIR, ".env"))
+load_dotenv()
+
+DATABASE_URL = (
+    os.getenv("DATABASE_URL")
+    or os.getenv("POSTGRES_URL")
+    or os.getenv("PG_URI")
+)
+
+if not DATABASE_URL:
+    raise ValueError("❌ DATABASE_URL não encontrado...")
+
+POOL_SIZE = int(os.getenv("FAIXABET_DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("FAIXABET_DB_MAX_OVERFLOW", "5"))
+POOL_TIMEOUT = float(os.getenv("FAIXABET_DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("FAIXABET_DB_POOL_RECYCLE", "300"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("FAIXABET_DB_STATEMENT_TIMEOUT", "30000"))
+
+# --- métricas do pool (processo inteiro) ---
+_metricas_lock = threading.Lock()
+_metricas = {
+    "conexoes_criadas": 0,
+    "checkouts": 0,
+    "espera_total_ms": 0.0,
+    "espera_max_ms": 0.0,
+}
+
+
+class _PoolMedido(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexão no checkout."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            ms = 1000.0 * (time.perf_counter() - t0)
+            with _metricas_lock:
+                _metricas["checkouts"] += 1
+                _metricas["espera_total_ms"] += ms
+                _metricas["espera_max_ms"] = max(_metricas["espera_max_ms"], ms)
+
+
+def _criar_engine(url: str):
+    kwargs = {"pool_pre_ping": True}
+    if not url.startswith("sqlite"):
+        kwargs.update(
+            poolclass=_PoolMedido,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+        )
+    eng = create_engine(url, **kwargs)
+
+    @event.listens_for(eng, "connect")
+    def _on_connect(dbapi_conn, _record):
+        with _metricas_lock:
+            _metricas["conexoes_criadas"] += 1
+        if STATEMENT_TIMEOUT_MS > 0 and eng.dialect.name == "postgresql":
+            # fora de transação: numa transação implícita o rollback do
+            # reset-on-return do pool desfaria o SET
+            autocommit = dbapi_conn.autocommit
+            dbapi_conn.autocommit = True
+            cur = dbapi_conn.cursor()
+            try:
+                cur.execute(f"SET statement_timeout = {int(STATEMENT_TIMEOUT_MS)}")
+            finally:
+                cur.close()
+                dbapi_conn.autocommit = autocommit
+
+    logging.info(
+        f"[db_pool] engine criado (pool_size={POOL_SIZE}, max_overflow={MAX_OVERFLOW}, "
+        f"recycle={POOL_RECYCLE}s, statement_timeout={STATEMENT_TIMEOUT_MS}ms)"
+    )
+    return eng
+
+
+engine = _criar_engine(DATABASE_URL)
+Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_engine():
+    """Engine compartilhado do processo."""
+    return engine
+
+
+def definir_timeout(conn, ms: int):
+    """SET LOCAL statement_timeout (ms, 0 = sem limite) na transação corrente de `conn`."""
+    if engine.dialect.name == "postgresql":
+        conn.execute(text(f"SET LOCAL statement_timeout = {int(ms)}"))
+
+
+@contextmanager
+def session_scope(statement_timeout: int = None):
+    """
+    Sessão com commit no sucesso, rollback em erro e close sempre.
+    statement_timeout (ms, 0 = sem limite) substitui o padrão do pool só
+    nesta transação.
+    """
+    db = Session()
+    try:
+        if statement_timeout is not None:
+            definir_timeout(db, statement_timeout)
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def metricas_pool() -> dict:
+    """Snapshot das métricas do pool (para logs / página de admin)."""
+    with _metricas_lock:
+        m = dict(_metricas)
+    m["espera_media_ms"] = m["espera_total_ms"] / m["checkouts"] if m["checkouts"] else 0.0
+    pool = engine.pool
+    for nome in ("size", "checkedout", "overflow", "checkedin"):
+        fn = getattr(pool, nome, None)
+        if callable(fn):
+            m[f"pool_{nome}"] = fn()
+    return m
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+estatisticas_mensais.py – estatísticas do mês por usuário em 1 consulta
+
+gerar_estatisticas_usuario fazia 4 COUNT(*) por usuário (palpites LF,
+palpites MS, acertos LF e MS em palpites_hits); um envio mensal para
+todos era O(usuários × consultas) idas ao banco.
+
+Aqui cada fonte é agregada uma vez com GROUP BY id_usuario sobre o
+intervalo [ini, fim) do mês (índices (id_usuario, data) — periodos.py)
+e juntada a usuarios:
+
+    sql_mes()            → todos os usuários (job admin/envio_estatisticas.py)
+    sql_mes(uid=True)    → um usuário (:uid filtrado dentro de cada agregado)
+    estatisticas(row)    → dict no formato de gerar_estatisticas_usuario
+"""
+
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+import periodos
+
+# acertos mínimos contados como "palpite com acerto"
+MIN_ACERTOS = {"LF": 11, "MS": 2}
+
+
+def sql_mes(uid: bool = False, filtro: str = "TRUE") -> str:
+    """
+    SELECT id, usuario, email, total_lf, total_ms, acertos_lf, acertos_ms
+    ordenado por id. uid=True → só :uid; `filtro` é um WHERE extra (u, lf, ms, h).
+    """
+    por_usuario = "AND id_usuario = :uid" if uid else ""
+    return f"""
+        WITH lf AS (
+            SELECT id_usuario, COUNT(*) AS n
+            FROM palpites
+            WHERE data >= :ini AND data < :fim {por_usuario}
+            GROUP BY id_usuario
+        ),
+        ms AS (
+            SELECT id_usuario, COUNT(*) AS n
+            FROM palpites_m
+            WHERE data >= :ini AND data < :fim {por_usuario}
+            GROUP BY id_usuario
+        ),
+        h AS (
+            SELECT
+                id_usuario,
+                COUNT(*) FILTER (WHERE loteria = 'LF' AND acertos >= :min_lf) AS lf,
+                COUNT(*) FILTER (WHERE loteria = 'MS' AND acertos >= :min_ms) AS ms
+            FROM palpites_hits
+            WHERE loteria IN ('LF', 'MS')
+              AND data >= :ini AND data < :fim {por_usuario}
+            GROUP BY id_usuario
+        )
+        SELECT
+            u.id,
+            u.usuario,
+            u.email,
+            COALESCE(lf.n, 0) AS total_lf,
+            COALESCE(ms.n, 0) AS total_ms,
+            COALESCE(h.lf, 0) AS acertos_lf,
+            COALESCE(h.ms, 0) AS acertos_ms
+        FROM usuarios u
+        LEFT JOIN lf ON lf.id_usuario = u.id
+        LEFT JOIN ms ON ms.id_usuario = u.id
+        LEFT JOIN h  ON h.id_usuario  = u.id
+        WHERE {"u.id = :uid AND " if uid else ""}({filtro})
+        ORDER BY u.id
+    """
+
+
+def parametros(mes: int, ano: int, **extra) -> dict:
+    """Parâmetros de sql_mes para o mês (ini/fim semiabertos + acertos mínimos)."""
+    ini, fim = periodos.mes(ano, mes)
+    return {"ini": ini, "fim": fim, "min_lf": MIN_ACERTOS["LF"], "min_ms": MIN_ACERTOS["MS"], **extra}
+
+
+def estatisticas(row) -> dict:
+    """Linha de sql_mes → dict de estatísticas (mesmas chaves de antes)."""
+    total_palpites = int(row.total_lf) + int(row.total_ms)
+    total_acertos = int(row.acertos_lf) + int(row.acertos_ms)
+    return {
+        "total_palpites": total_palpites,
+        "palpites_validos": total_palpites,
+        "palpites_com_acerto": total_acertos,
+        "acertos_lotofacil": int(row.acertos_lf),
+        "acertos_megasena": int(row.acertos_ms),
+        "percentual_eficiencia": round((total_acertos / total_palpites) * 100) if total_palpites > 0 else 0,
+    }
+
+
+def estatisticas_usuario(db, user_id: int, mes: int, ano: int) -> dict:
+    """Estatísticas de um usuário numa única ida ao banco."""
+    row = db.execute(text(sql_mes(uid=True)), parametros(mes, ano, uid=user_id)).fetchone()
+    if row is None:
+        return estatisticas(SimpleNamespace(total_lf=0, total_ms=0, acertos_lf=0, acertos_ms=0))
+    return estatisticas(row)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+frequencia_palpites.py – frequência das dezenas nos palpites, agregada no banco
+
+grafico_frequencia_palpites fazia SELECT numeros FROM palpites (todos os
+usuários) e contava as dezenas em Python: custo linear no tamanho da tabela,
+a cada page view.
+
+Aqui a contagem fica materializada em
+
+    palpite_dezena_freq (loteria, dezena, dia, total)
+
+mantida por trigger de COMANDO (AFTER INSERT/DELETE/UPDATE ... REFERENCING
+NEW/OLD TABLE): cada INSERT em palpites/palpites_m soma 1 em (dezena, dia)
+das suas dezenas, num único upsert por comando; DELETE subtrai; UPDATE que
+muda dezenas ou data subtrai o antigo e soma o novo. instalar() cria
+tabela + triggers e reconstrói o agregado na mesma transação (com a tabela
+de palpites travada para escrita), então nada se perde entre a carga e o
+trigger.
+Chamado pela migração 003 (admin/migracoes.py).
+
+Contenção: todo palpite do dia atualiza as mesmas ~15–25 linhas
+(loteria, dezena, hoje), então saves concorrentes se enfileiram nessas
+linhas até o commit. As travas são pegas sempre na ordem (dezena, dia),
+o que evita deadlock; o custo é a espera, curta porque cada comando
+faz um único upsert.
+
+sql_frequencias(loteria) lê o agregado (25 ou 60 linhas); sem ele instalado,
+faz o unnest + GROUP BY no próprio banco — nenhuma linha crua de palpite
+trafega.
+"""
+
+from sqlalchemy import text
+
+from db_pool import session_scope
+import schema_cache
+
+TABELA = "palpite_dezena_freq"
+
+# loteria → (tabela de palpites, maior dezena, candidatas a coluna de horário)
+LOTERIAS = {
+    "LF": ("palpites", 25, ("data", "created_at")),
+    "MS": ("palpites_m", 60, ("created_at", "data", "dt", "timestamp")),
+}
+
+DDL = f"""
+    CREATE TABLE IF NOT EXISTS {TABELA} (
+        loteria VARCHAR(2) NOT NULL,
+        dezena  SMALLINT   NOT NULL,
+        dia     DATE       NOT NULL,
+        total   BIGINT     NOT NULL DEFAULT 0,
+        PRIMARY KEY (loteria, dezena, dia)
+    )
+"""
+
+
+def _cfg(loteria: str) -> tuple:
+    loteria = str(loteria).upper()
+    if loteria not in LOTERIAS:
+        raise ValueError(f"Loteria inválida: {loteria}")
+    return LOTERIAS[loteria]
+
+
+def _expr_numeros(tabela: str, alias: str = "p") -> str:
+    """LF antigo tem 'dezenas' e 'numeros'; usa o que existir."""
+    if schema_cache.tem_coluna(tabela, "dezenas") and schema_cache.tem_coluna(tabela, "numeros"):
+        return f"COALESCE({alias}.dezenas, {alias}.numeros)"
+    if schema_cache.tem_coluna(tabela, "dezenas"):
+        return f"{alias}.dezenas"
+    return f"{alias}.numeros"
+
+
+def _expr_dia(loteria: str, alias: str = "p") -> str:
+    tabela, _, horarios = _cfg(loteria)
+    ts = next((c for c in horarios if schema_cache.tem_coluna(tabela, c)), None)
+    partes = ([f"{alias}.data_norm"] if schema_cache.tem_coluna(tabela, "data_norm") else []) + \
+             ([f"{alias}.{ts}::date"] if ts else [])
+    if not partes:
+        raise RuntimeError(f"{tabela}: sem coluna de data")
+    return partes[0] if len(partes) == 1 else f"COALESCE({', '.join(partes)})"
+
+
+def _sql_contagem(loteria: str, fonte: str, por_dia: bool = True, filtro: str = "") -> str:
+    """SELECT dezena[, dia], COUNT(*) das dezenas de `fonte` (alias p) — tudo no banco."""
+    tabela, maior, _ = _cfg(loteria)
+    dia = _expr_dia(loteria) if por_dia else None
+    return f"""
+        SELECT d.txt::int AS dezena{f", {dia} AS dia" if por_dia else ""}, COUNT(*) AS total
+        FROM {fonte} p,
+             unnest(regexp_split_to_array(NULLIF(trim({_expr_numeros(tabela)}), ''), '[,;|\\s]+')) AS d(txt)
+        WHERE CASE WHEN d.txt ~ '^\\d{{1,3}}$' THEN d.txt::int END BETWEEN 1 AND {maior}
+          {f"AND {dia} IS NOT NULL" if por_dia else ""}
+          {filtro}
+        GROUP BY 1{", 2" if por_dia else ""}
+    """
+
+
+def _sql_trigger(loteria: str) -> list:
+    """
+    Função + triggers de comando (INSERT, DELETE, UPDATE). As linhas do
+    agregado são travadas sempre na ordem (dezena, dia): dois comandos
+    concorrentes esperam um pelo outro em vez de entrar em deadlock.
+    """
+    tabela = _cfg(loteria)[0]
+    funcao = f"{TABELA}_{tabela}"
+
+    # UPDATE: só conta linhas em que dezenas/dia mudaram (troca de status etc.
+    # não mexe no agregado); sem coluna id, todas as linhas do comando
+    if schema_cache.tem_coluna(tabela, "id"):
+        mudou = f"""AND p.id IN (
+            SELECT o.id FROM antigos o JOIN novos n ON n.id = o.id
+            WHERE ({_expr_numeros(tabela, "o")}, {_expr_dia(loteria, "o")})
+                  IS DISTINCT FROM ({_expr_numeros(tabela, "n")}, {_expr_dia(loteria, "n")})
+        )"""
+    else:
+        mudou = ""
+
+    def somar(fonte: str, filtro: str = "") -> str:
+        return f"""
+                INSERT INTO {TABELA} (loteria, dezena, dia, total)
+                SELECT '{loteria}', c.dezena, c.dia, c.total
+                FROM ({_sql_contagem(loteria, fonte, filtro=filtro)}) c
+                ORDER BY c.dezena, c.dia
+                ON CONFLICT (loteria, dezena, dia) DO UPDATE SET
+                    total = {TABELA}.total + EXCLUDED.total;"""
+
+    def subtrair(fonte: str, filtro: str = "") -> str:
+        contagem = _sql_contagem(loteria, fonte, filtro=filtro)
+        return f"""
+                -- UPDATE ... FROM não garante ordem: trava antes, ordenado
+                PERFORM 1 FROM {TABELA} f
+                JOIN ({contagem}) c ON f.dezena = c.dezena AND f.dia = c.dia
+                WHERE f.loteria = '{loteria}'
+                ORDER BY f.dezena, f.dia
+                FOR UPDATE OF f;
+                UPDATE {TABELA} f
+                SET total = GREATEST(0, f.total - c.total)
+                FROM ({contagem}) c
+                WHERE f.loteria = '{loteria}' AND f.dezena = c.dezena AND f.dia = c.dia;"""
+
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {funcao}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN{somar("novos")}
+            ELSIF TG_OP = 'DELETE' THEN{subtrair("antigos")}
+            ELSE{subtrair("antigos", mudou)}{somar("novos", mudou)}
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"DROP TRIGGER IF EXISTS trg_{funcao}_ins ON {tabela}",
+        f"DROP TRIGGER IF EXISTS trg_{funcao}_del ON {tabela}",
+        f"DROP TRIGGER IF EXISTS trg_{funcao}_upd ON {tabela}",
+        f"""
+        CREATE TRIGGER trg_{funcao}_ins AFTER INSERT ON {tabela}
+        REFERENCING NEW TABLE AS novos
+        FOR EACH STATEMENT EXECUTE FUNCTION {funcao}()
+        """,
+        f"""
+        CREATE TRIGGER trg_{funcao}_del AFTER DELETE ON {tabela}
+        REFERENCING OLD TABLE AS antigos
+        FOR EACH STATEMENT EXECUTE FUNCTION {funcao}()
+        """,
+        # transition tables não aceitam "UPDATE OF coluna": o filtro fica na função
+        f"""
+        CREATE TRIGGER trg_{funcao}_upd AFTER UPDATE ON {tabela}
+        REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+        FOR EACH STATEMENT EXECUTE FUNCTION {funcao}()
+        """,
+    ]
+
+
+def _reconstruir(db, loteria: str) -> int:
+    tabela = _cfg(loteria)[0]
+    db.execute(text(f"DELETE FROM {TABELA} WHERE loteria = :loteria"), {"loteria": loteria})
+    return db.execute(text(f"""
+        INSERT INTO {TABELA} (loteria, dezena, dia, total)
+        SELECT :loteria, c.dezena, c.dia, c.total
+        FROM ({_sql_contagem(loteria, tabela)}) c
+    """), {"loteria": loteria}).rowcount
+
+
+def instalar(loteria: str) -> int:
+    """
+    Cria o agregado + trigger da loteria e recalcula tudo numa transação
+    (palpites travados só para escrita durante a carga). Idempotente.
+    Retorna o número de linhas (dezena, dia) gravadas.
+    """
+    loteria = str(loteria).upper()
+    tabela = _cfg(loteria)[0]
+    with session_scope(statement_timeout=0) as db:
+        db.execute(text(DDL))
+        db.execute(text(f"LOCK TABLE {tabela} IN SHARE ROW EXCLUSIVE MODE"))
+        for sql in _sql_trigger(loteria):
+            db.execute(text(sql))
+        n = _reconstruir(db, loteria)
+    schema_cache.invalidar()
+    print(f"[frequencia] {loteria}: trigger em {tabela}, {n} linhas (dezena, dia) no agregado")
+    return n
+
+
+def sql_frequencias(loteria: str, periodo: bool = False) -> str:
+    """
+    SELECT dezena, total ordenado por dezena (params :loteria e, com
+    periodo=True, :ini/:fim semiabertos). Agregado se instalado; senão
+    GROUP BY ad hoc sobre a tabela de palpites.
+    """
+    tabela = _cfg(loteria)[0]
+    if schema_cache.existe_tabela(TABELA):
+        return f"""
+            SELECT dezena, SUM(total)::bigint AS total
+            FROM {TABELA}
+            WHERE loteria = :loteria
+              {"AND dia >= :ini AND dia < :fim" if periodo else ""}
+            GROUP BY dezena
+            ORDER BY dezena
+        """
+    filtro = ""
+    if periodo:
+        dia = _expr_dia(loteria)
+        filtro = f"AND {dia} >= :ini AND {dia} < :fim"
+    return f"""
+        SELECT c.dezena, c.total
+        FROM ({_sql_contagem(loteria, tabela, por_dia=False, filtro=filtro)}) c
+        ORDER BY c.dezena
+    """
@@ -28,15 +28,21 @@ Obs:
 - Este arquivo NÃO carrega modelos neurais diretamente; quem carrega é o engine.
 """
 
+import os
 import random
 from datetime import date
 from typing import Any, Dict, Optional, Tuple
 
-import pandas as pd
 import streamlit as st
 from sqlalchemy import text
 
-from db import Session
+from db import Session, session_scope
+import schema_cache
+import periodos
+import cotas
+import cache_consultas
+from modelo_llm_max.core.combinacoes_index import combinacoes_do_csv, obter_index
+from modelo_llm_max.core.bitmask import pack as pack_bitmask
 import streamlit.components.v1 as components
 import math
 
@@ -100,27 +106,17 @@ def _load_engines_registry():
 # ================================================================
 # 🔧 Utilitários gerais (DB/colunas/contagem)
 # ================================================================
-def _descobrir_coluna_data_palpites_m(db) -> Optional[str]:
+def _descobrir_coluna_data_palpites_m(db=None) -> Optional[str]:
     colunas_validas = ["created_at", "data", "dt", "timestamp"]
-    rows = db.execute(text("""
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_name = 'palpites_m'
-    """)).fetchall()
-    cols = [r[0].lower() for r in rows]
+    cols = [c.lower() for c in schema_cache.colunas("palpites_m")]
     for c in colunas_validas:
         if c.lower() in cols:
             return c
     return None
 
 
-def _descobrir_colunas_promo_bonus(db) -> Dict[str, Optional[str]]:
-    rows = db.execute(text("""
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_name = 'promo_bonus'
-    """)).fetchall()
-    cols = [r[0] for r in rows]
+def _descobrir_colunas_promo_bonus(db=None) -> Dict[str, Optional[str]]:
+    cols = list(schema_cache.colunas("promo_bonus"))
     lower = {c.lower(): c for c in cols}
 
     def pick(*names):
@@ -138,29 +134,14 @@ def _descobrir_colunas_promo_bonus(db) -> Dict[str, Optional[str]]:
     }
 
 def _get_usuario_ctx(uid: int) -> Dict[str, Any]:
+    # plano (cache curto) e uso do dia vêm do contador de cotas (sem COUNT(*))
+    info = cotas.plano(uid, "MS")
+    plano_nome = info["nome"] or "Free"
+    limite_dia = int(info["limite"])
+    usados_hoje = cotas.uso(uid, "MS")
+
     db = Session()
     try:
-        ts_col = _descobrir_coluna_data_palpites_m(db) or "created_at"
-
-        plano = db.execute(text("""
-            SELECT p.nome AS plano_nome,
-                   COALESCE(p.palpites_dia, 0) AS limite_dia
-            FROM usuarios u
-            JOIN planos p ON p.id = u.id_plano
-            WHERE u.id = :uid
-        """), {"uid": uid}).fetchone()
-
-        plano_nome = (plano.plano_nome if plano else "Free") or "Free"
-        limite_dia = int(plano.limite_dia) if plano and plano.limite_dia is not None else 0
-
-        usados_hoje = db.execute(text(f"""
-            SELECT COUNT(*)
-            FROM palpites_m
-            WHERE id_usuario = :uid
-              AND DATE({ts_col}) = CURRENT_DATE
-        """), {"uid": uid}).scalar() or 0
-        usados_hoje = int(usados_hoje)
-
         bonus_total = 0
         bonus_usados = 0
 
@@ -312,23 +293,24 @@ def salvar_palpite_m(id_usuario: int, dezenas_fmt: str, modelo: str) -> Optional
         st.warning("⚠️ Palpite inválido ou vazio. Tente novamente.")
         return None
 
-    db = Session()
     try:
-        ts_col = _descobrir_coluna_data_palpites_m(db) or "created_at"
-        sql = text(f"""
-            INSERT INTO palpites_m (id_usuario, numeros, modelo, {ts_col})
-            VALUES (:uid, :nums, :modelo, NOW())
-            RETURNING id
-        """)
-        new_id = db.execute(sql, {"uid": id_usuario, "nums": dezenas_fmt, "modelo": modelo}).scalar()
-        db.commit()
+        with session_scope() as db:
+            ts_col = _descobrir_coluna_data_palpites_m(db) or "created_at"
+            params = {"uid": id_usuario, "nums": dezenas_fmt, "modelo": modelo}
+            col_mask, val_mask = "", ""
+            if schema_cache.tem_coluna("palpites_m", "mask"):
+                col_mask, val_mask = ", mask", ", :mask"
+                params["mask"] = pack_bitmask(dezenas_fmt, "megasena")
+            sql = text(f"""
+                INSERT INTO palpites_m (id_usuario, numeros, modelo, {ts_col}{col_mask})
+                VALUES (:uid, :nums, :modelo, NOW(){val_mask})
+                RETURNING id
+            """)
+            new_id = db.execute(sql, params).scalar()
         return int(new_id) if new_id is not None else None
     except Exception as e:
-        db.rollback()
         st.error(f"Erro ao salvar palpite: {e}")
         return None
-    finally:
-        db.close()
 
 
 def _atualizar_bonus_usados(uid: int, incrementar: int) -> None:
@@ -782,7 +764,7 @@ def gerar_palpite_ui():
             f"(bônus/dia disponível: {bonus_dia})."
         ), excedente
 
-    permitido, msg_limite, bonus_a_consumir = validar_consumo(qtd_palpites)
+    permitido, msg_limite, _ = validar_consumo(qtd_palpites)
     st.write(msg_limite)
     if not permitido:
         return
@@ -797,23 +779,49 @@ def gerar_palpite_ui():
     ):
         palpites_gerados = []
 
-        for _ in range(qtd_palpites):
-            dezenas_list = _gerar_por_motor(str(motor), int(dezenas))
-            dezenas_list = _evitar_repetidos(dezenas_list)
-            dezenas_fmt = " ".join(f"{n:02d}" for n in dezenas_list)
-            novo_id = salvar_palpite_m(uid, dezenas_fmt, str(motor))
-            print(f"DEBUG: saved palpite id={novo_id}") # LOG
-
-            palpites_gerados.append({
-                "id": novo_id,
-                "numeros": sorted(dezenas_list),
-                "motor": str(motor),
-            })
-
-        # 🔒 Consumo de bônus SÓ se gerou
-        if tipo_usuario == "U" and bonus_a_consumir > 0:
-            print(f"DEBUG: consuming bonus {bonus_a_consumir}") # LOG
-            _atualizar_bonus_usados(uid, int(bonus_a_consumir))
+        # 🔒 Reserva atômica do lote (plano + bônus do dia) antes de gerar
+        if tipo_usuario == "U":
+            limite_dia = int(ctx["limite_dia"])
+            ok, usados, limite_total = cotas.reservar(
+                uid, "MS", qtd_palpites, limite=limite_dia + int(ctx["bonus_dia_disponivel"])
+            )
+            if not ok:
+                st.error(
+                    f"⚠️ Limite de hoje atingido: {usados}/{limite_total} "
+                    f"(plano + bônus). Restam {max(0, limite_total - usados)}."
+                )
+                return
+
+        salvos = 0
+        try:
+            lote = [_gerar_por_motor(str(motor), int(dezenas)) for _ in range(qtd_palpites)]
+            lote = _evitar_repetidos_lote(lote)
+
+            for dezenas_list in lote:
+                dezenas_fmt = " ".join(f"{n:02d}" for n in dezenas_list)
+                novo_id = salvar_palpite_m(uid, dezenas_fmt, str(motor))
+                print(f"DEBUG: saved palpite id={novo_id}") # LOG
+                salvos += novo_id is not None
+
+                palpites_gerados.append({
+                    "id": novo_id,
+                    "numeros": sorted(dezenas_list),
+                    "motor": str(motor),
+                })
+        finally:
+            if tipo_usuario == "U":
+                # devolve o que não foi salvo; bônus = parte do lote acima do limite do plano
+                cotas.liberar(uid, "MS", qtd_palpites - salvos)
+                antes = usados - qtd_palpites
+                bonus_a_consumir = max(0, antes + salvos - limite_dia) - max(0, antes - limite_dia)
+                if bonus_a_consumir > 0:
+                    print(f"DEBUG: consuming bonus {bonus_a_consumir}") # LOG
+                    _atualizar_bonus_usados(uid, int(bonus_a_consumir))
+            if salvos:
+                from admin.palpites_hits import atualizar_hits_usuario
+
+                atualizar_hits_usuario("MS", uid)
+                cache_consultas.registrar_escrita(uid)
 
         # ⚠️ Se por algum motivo extremo não gerou nada
         if len(palpites_gerados) == 0:
@@ -832,16 +840,57 @@ def gerar_palpite_ui():
 # ================================================================
 # Reaproveitado (com tolerância)
 # ================================================================
-def _evitar_repetidos(dezenas):
+_MEGA_CSV_CANDIDATOS = [
+    "loteriamega.csv",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "loteriamega.csv"),
+]
+_mega_index = None
+_mega_index_mtime = None
+
+
+def _index_megasena():
+    """
+    Índice de combinações já sorteadas da Mega-Sena (bitset mmap).
+    O CSV só é relido quando o arquivo muda (mtime).
+    """
+    global _mega_index, _mega_index_mtime
+    csv_path = next((p for p in _MEGA_CSV_CANDIDATOS if os.path.exists(p)), None)
+    if csv_path is None:
+        return None
+
+    mtime = os.path.getmtime(csv_path)
+    if _mega_index is not None and _mega_index_mtime == mtime:
+        return _mega_index
+
+    ultimo, combinacoes = combinacoes_do_csv(csv_path, k=6)
+    _mega_index = obter_index("megasena", ultimo, lambda: combinacoes)
+    _mega_index_mtime = mtime
+    return _mega_index
+
+
+def _evitar_repetidos_lote(lote):
+    """
+    Veta, em uma única chamada vetorizada, os palpites de 6 dezenas do lote
+    que já foram sorteados; os vetados são re-sorteados aleatoriamente.
+    """
     try:
-        df = pd.read_csv("loteriamega.csv")
-        bolas = [f"Bola{i}" for i in range(1, 7)]
-        existentes = {tuple(sorted(map(int, r))) for r in df[bolas].values.tolist()}
-        while tuple(sorted(dezenas)) in existentes:
-            dezenas = sorted(random.sample(range(1, 61), len(dezenas)))
-        return dezenas
+        idx = _index_megasena()
+        if idx is None:
+            return lote
+        lote = [sorted(p) for p in lote]
+        pos6 = [i for i, p in enumerate(lote) if len(p) == 6]
+        while pos6:
+            hits = idx.contains_many([lote[i] for i in pos6])
+            pos6 = [i for i, h in zip(pos6, hits) if h]
+            for i in pos6:
+                lote[i] = sorted(random.sample(range(1, 61), 6))
+        return lote
     except Exception:
-        return dezenas
+        return lote
+
+
+def _evitar_repetidos(dezenas):
+    return _evitar_repetidos_lote([dezenas])[0]
 
 # ================================================================
 # 📜 Histórico de Palpites (mantido)
@@ -857,19 +906,19 @@ def historico_palpites():
     data_ini = st.date_input("Data inicial:", date.today().replace(day=1), key="ms_v9_hist_ini")
     data_fim = st.date_input("Data final:", date.today(), key="ms_v9_hist_fim")
 
-    db = Session()
-    try:
-        ts_col = _descobrir_coluna_data_palpites_m(db) or "created_at"
-        sql = f"""
-            SELECT id, numeros, modelo, {ts_col} AS dt, valido
-            FROM palpites_m
-            WHERE id_usuario = :uid
-              AND DATE({ts_col}) BETWEEN :ini AND :fim
-            ORDER BY {ts_col} DESC
-        """
-        rows = db.execute(text(sql), {"uid": uid, "ini": data_ini, "fim": data_fim}).fetchall()
-    finally:
-        db.close()
+    ts_col = _descobrir_coluna_data_palpites_m() or "created_at"
+    sql = f"""
+        SELECT id, numeros, modelo, {ts_col} AS dt, valido
+        FROM palpites_m
+        WHERE id_usuario = :uid
+          AND {ts_col} >= :ini
+          AND {ts_col} <  :fim
+        ORDER BY {ts_col} DESC
+    """
+    ini, fim = periodos.dias(data_ini, data_fim)
+    rows = cache_consultas.consultar(
+        sql, {"uid": uid, "ini": ini, "fim": fim}, cache_consultas.versao(uid), ("usuario",)
+    )
 
     if not rows:
         st.info("Nenhum palpite encontrado no período.")
@@ -904,19 +953,15 @@ def validar_palpite():
 
     uid = int(usuario.get("id", 0) or 0)
 
-    db = Session()
-    try:
-        ts_col = _descobrir_coluna_data_palpites_m(db) or "created_at"
-        sql = f"""
-            SELECT id, numeros, modelo, {ts_col} AS dt, valido
-            FROM palpites_m
-            WHERE id_usuario = :uid
-            ORDER BY {ts_col} DESC
-            LIMIT 30
-        """
-        rows = db.execute(text(sql), {"uid": uid}).fetchall()
-    finally:
-        db.close()
+    ts_col = _descobrir_coluna_data_palpites_m() or "created_at"
+    sql = f"""
+        SELECT id, numeros, modelo, {ts_col} AS dt, valido
+        FROM palpites_m
+        WHERE id_usuario = :uid
+        ORDER BY {ts_col} DESC
+        LIMIT 30
+    """
+    rows = cache_consultas.consultar(sql, {"uid": uid}, cache_consultas.versao(uid), ("usuario",))
 
     if not rows:
         st.info("Nenhum palpite para validar.")
@@ -956,6 +1001,7 @@ def atualizar_status_palpite(id_palpite: int):
             WHERE id = :id
         """), {"id": id_palpite})
         db.commit()
+        cache_consultas.registrar_escrita(st.session_state.get("usuario", {}).get("id") or 0)
     except Exception as e:
         db.rollback()
         st.error(f"Erro ao validar palpite: {e}")
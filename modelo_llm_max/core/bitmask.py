@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+bitmask.py – dezenas como máscara de bits + contagem de acertos por popcount
+
+Representação (bit i = dezena - menor):
+    lotofacil : 25 bits  → int32             (coluna INTEGER)
+    megasena  : 60 bits  → int64             (coluna BIGINT)
+    lotomania : 100 bits → 2 × int64 (lo, hi) (colunas BIGINT mask_lo/mask_hi)
+
+Acertos = popcount(palpite & resultado). Em NumPy isso roda vetorizado sobre
+um dia inteiro de palpites:
+
+    R = pack([1, 2, 3, ...], "lotofacil")
+    P = pack_many(lista_de_palpites, "lotofacil")     # (M,) int32
+    acertos = hits(P, R)                              # (M,) int
+
+No Postgres (>= 14) o mesmo cálculo é bit_count, ver sql_hits().
+"""
+
+import numpy as np
+
+LOTERIAS = {
+    "lotofacil": {"n": 25, "menor": 1, "dtype": np.int32, "palavras": 1},
+    "megasena": {"n": 60, "menor": 1, "dtype": np.int64, "palavras": 1},
+    "lotomania": {"n": 100, "menor": 0, "dtype": np.int64, "palavras": 2},   # "00" = 0
+}
+
+# apelidos usados no app (LF/MS/...) → chave de LOTERIAS
+ALIAS = {"LF": "lotofacil", "MS": "megasena", "LM": "lotomania"}
+
+_BITS_PALAVRA = 64
+
+
+def _cfg(loteria: str) -> dict:
+    chave = ALIAS.get(str(loteria).upper(), str(loteria).lower())
+    if chave not in LOTERIAS:
+        raise ValueError(f"Loteria inválida: {loteria}")
+    return LOTERIAS[chave]
+
+
+def parse_numeros(valor) -> list:
+    """'01,02 03;04' / [1, 2, 3] → [1, 2, 3, 4] (ignora lixo)."""
+    if valor is None:
+        return []
+    if isinstance(valor, (list, tuple, set, np.ndarray)):
+        return [int(x) for x in valor]
+    s = str(valor).replace(";", ",").replace("|", ",").replace(" ", ",")
+    return [int(x) for x in s.split(",") if x.strip().isdigit()]
+
+
+def validos(palpites, loteria: str) -> np.ndarray:
+    """
+    (M,) bool: palpite legível, não vazio e com todas as dezenas no intervalo
+    da loteria. pack_many levanta no primeiro inválido — filtre antes com isto.
+    """
+    cfg = _cfg(loteria)
+    ok = np.zeros(len(palpites), dtype=bool)
+    for i, p in enumerate(palpites):
+        try:
+            d = parse_numeros(p)
+        except (TypeError, ValueError):
+            continue
+        ok[i] = bool(d) and all(0 <= x - cfg["menor"] < cfg["n"] for x in d)
+    return ok
+
+
+# =========================================================
+# pack / unpack
+# =========================================================
+
+def pack_many(palpites, loteria: str) -> np.ndarray:
+    """
+    Lista de palpites (cada um: lista/texto de dezenas, tamanho livre) →
+    (M,) int32/int64, ou (M, 2) int64 na Lotomania.
+    """
+    cfg = _cfg(loteria)
+    linhas = [parse_numeros(p) for p in palpites]
+    M = len(linhas)
+
+    lens = np.fromiter((len(l) for l in linhas), dtype=np.int64, count=M)
+    if M == 0 or lens.sum() == 0:
+        shape = (M, 2) if cfg["palavras"] == 2 else (M,)
+        return np.zeros(shape, dtype=cfg["dtype"])
+
+    idx = np.concatenate([np.asarray(l, dtype=np.int64) for l in linhas]) - cfg["menor"]
+    if idx.min() < 0 or idx.max() >= cfg["n"]:
+        raise ValueError("Dezena fora do intervalo da loteria.")
+    linha = np.repeat(np.arange(M), lens)
+
+    # bitwise_or.at: dezenas repetidas no mesmo palpite não somam bit
+    if cfg["palavras"] == 1:
+        out = np.zeros(M, dtype=np.uint64)
+        np.bitwise_or.at(out, linha, np.left_shift(np.uint64(1), idx.astype(np.uint64)))
+        return out.astype(cfg["dtype"])
+
+    out = np.zeros((M, 2), dtype=np.uint64)
+    palavra = idx // _BITS_PALAVRA
+    bit = (idx % _BITS_PALAVRA).astype(np.uint64)
+    np.bitwise_or.at(out, (linha, palavra), np.left_shift(np.uint64(1), bit))
+    return out.view(np.int64)
+
+
+def pack(dezenas, loteria: str):
+    """Um palpite → int (ou tupla (lo, hi) na Lotomania)."""
+    m = pack_many([dezenas], loteria)[0]
+    return (int(m[0]), int(m[1])) if np.ndim(m) else int(m)
+
+
+def unpack_many(masks, loteria: str) -> list:
+    """(M,) ou (M, 2) → lista de listas ordenadas de dezenas."""
+    cfg = _cfg(loteria)
+    m = np.asarray(masks)
+    if cfg["palavras"] == 1:
+        m = m.reshape(-1, 1)
+    u = np.ascontiguousarray(m.astype(np.int64).view(np.uint64))
+    # little-endian: bit i da palavra w → posição w*64 + i
+    bits = np.unpackbits(u.view(np.uint8).reshape(u.shape[0], -1), axis=1, bitorder="little")
+    bits = bits[:, :cfg["n"]]
+    return [(np.flatnonzero(b) + cfg["menor"]).tolist() for b in bits]
+
+
+def unpack(mask, loteria: str) -> list:
+    return unpack_many([mask], loteria)[0]
+
+
+# =========================================================
+# popcount / acertos
+# =========================================================
+
+if hasattr(np, "bitwise_count"):          # NumPy >= 2.0
+    def _popcount64(u: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(u).astype(np.int64)
+else:
+    _LUT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount64(u: np.ndarray) -> np.ndarray:
+        b = np.ascontiguousarray(u, dtype=np.uint64)
+        return _LUT[b.view(np.uint8)].reshape(b.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+def popcount(masks) -> np.ndarray:
+    """Qtde de bits 1 por máscara ((M,) → (M,), (M, 2) → (M,))."""
+    m = np.asarray(masks).astype(np.int64)
+    c = _popcount64(m.view(np.uint64))
+    return c.sum(axis=-1) if c.ndim == 2 else c
+
+
+def hits(palpites_mask, resultado_mask) -> np.ndarray:
+    """Acertos = popcount(palpite & resultado), vetorizado sobre os palpites."""
+    p = np.asarray(palpites_mask).astype(np.int64)
+    r = np.asarray(resultado_mask).astype(np.int64)
+    return popcount(np.bitwise_and(p, r))
+
+
+# =========================================================
+# SQL (Postgres >= 14: bit_count)
+# =========================================================
+
+COLUNAS = {
+    "lotofacil": ("mask",),
+    "megasena": ("mask",),
+    "lotomania": ("mask_lo", "mask_hi"),
+}
+
+
+def sql_tipo(loteria: str) -> str:
+    return "INTEGER" if _cfg(loteria)["dtype"] is np.int32 else "BIGINT"
+
+
+def sql_hits(alias_palpite: str, alias_resultado: str, loteria: str) -> str:
+    """
+    Expressão SQL de acertos entre p.mask e r.mask, ex.:
+        sql_hits("p", "r", "LF") → "bit_count((p.mask & r.mask)::bit(32))"
+    """
+    cfg = _cfg(loteria)
+    largura = 32 if cfg["dtype"] is np.int32 else 64
+    cols = COLUNAS[ALIAS.get(str(loteria).upper(), str(loteria).lower())]
+    return " + ".join(
+        f"bit_count(({alias_palpite}.{c} & {alias_resultado}.{c})::bit({largura}))" for c in cols
+    )
+
+
+def _sql_bit_or(fonte: str, cond: str, valor: str, loteria: str, palavra: int) -> str:
+    cfg = _cfg(loteria)
+    lo = palavra * _BITS_PALAVRA
+    hi = min(cfg["n"], lo + _BITS_PALAVRA) - 1
+    cast = "::integer" if sql_tipo(loteria) == "INTEGER" else ""
+    return f"""(
+        SELECT COALESCE(bit_or(1::bigint << ({valor} - {cfg["menor"] + lo})), 0){cast}
+        FROM {fonte}
+        WHERE {cond}{valor} - {cfg["menor"]} BETWEEN {lo} AND {hi}
+    )"""
+
+
+def sql_pack(expr_numeros: str, loteria: str, palavra: int = 0) -> str:
+    """
+    Expressão SQL que monta a máscara a partir do texto "01,02,..." (backfill):
+        bit_or(1::bigint << (dezena - menor))
+    Na Lotomania, `palavra` escolhe lo (0) ou hi (1).
+    """
+    fonte = f"unnest(regexp_split_to_array(NULLIF(trim({expr_numeros}), ''), '[,;|\\s]+')) AS d(txt)"
+    return _sql_bit_or(fonte, "d.txt ~ '^\\d+$' AND ", "d.txt::int", loteria, palavra)
+
+
+def sql_pack_colunas(colunas, loteria: str, palavra: int = 0) -> str:
+    """Mesma máscara a partir de colunas inteiras (resultados: r.n1..r.nk)."""
+    fonte = f"unnest(ARRAY[{', '.join(colunas)}]) AS d(num)"
+    return _sql_bit_or(fonte, "d.num IS NOT NULL AND ", "d.num", loteria, palavra)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+combinacoes_index.py – índice de combinações já sorteadas (todas as loterias)
+
+Cada combinação ordenada é mapeada para o seu rank no sistema combinatório
+(ordem colex): rank = sum_i C(a_i, i+1), com a_i = dezena - menor (0-based).
+
+Modos de armazenamento:
+- "bitset" : 1 bit por combinação possível (Lotofácil C(25,15) ≈ 3.3M → ~400KB;
+             Mega-Sena C(60,6) ≈ 50M → ~6.3MB). contains = 1 leitura de bit.
+- "rank"   : array ordenado de ranks (uint64, ou 16 bytes big-endian quando o
+             espaço não cabe em 64 bits, ex.: Lotomania C(100,20) ≈ 5.4e20).
+             contains = np.searchsorted.
+
+Persistência: <dir>/<loteria>_index.npy (np.load(mmap_mode="r")) +
+<dir>/<loteria>_index.json (manifest com ultimo_concurso). Quando chega um
+concurso novo, obter_index() reconstrói e regrava o arquivo.
+"""
+
+import os
+import json
+import logging
+from math import comb
+
+import numpy as np
+
+LOTERIAS = {
+    "lotofacil": {"n": 25, "k": 15, "menor": 1},
+    "megasena": {"n": 60, "k": 6, "menor": 1},
+    "lotomania": {"n": 100, "k": 20, "menor": 0},   # dezena "00" = 0
+}
+
+# acima disso não compensa bitset (bits)
+BITSET_MAX_BITS = 1 << 30
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIR = os.getenv("FAIXABET_INDEX_DIR") or os.path.join(_BASE_DIR, "models", "index")
+
+_cache = {}
+
+
+class CombinacoesIndex:
+    """Conjunto de combinações de k dezenas em n, indexado por rank."""
+
+    def __init__(self, n: int, k: int, menor: int = 1, modo: str = None):
+        self.n = int(n)
+        self.k = int(k)
+        self.menor = int(menor)
+        self.total = comb(self.n, self.k)
+        self.wide = self.total > np.iinfo(np.int64).max
+
+        if modo is None:
+            modo = "bitset" if self.total <= BITSET_MAX_BITS else "rank"
+        if modo == "bitset" and self.total > BITSET_MAX_BITS:
+            raise ValueError(f"C({n},{k}) grande demais para bitset; use modo='rank'.")
+        self.modo = modo
+
+        # tabela binomial C(a, i) para a < n, i <= k
+        if self.wide:
+            self._binom = np.array(
+                [[comb(a, i) for i in range(self.k + 1)] for a in range(self.n)], dtype=object)
+        else:
+            self._binom = np.array(
+                [[comb(a, i) for i in range(self.k + 1)] for a in range(self.n)], dtype=np.uint64)
+
+        self.ultimo_concurso = None
+        if self.modo == "bitset":
+            self._bits = np.zeros((self.total + 7) // 8, dtype=np.uint8)
+            self._ranks = None
+        else:
+            self._bits = None
+            self._ranks = np.zeros(0, dtype="V16" if self.wide else np.uint64)
+
+    # ------------------------------------------------------------
+    # rank
+    # ------------------------------------------------------------
+    def _normalizar(self, batch) -> np.ndarray:
+        a = np.asarray(batch, dtype=np.int64)
+        if a.ndim == 1:
+            a = a.reshape(1, -1)
+        if a.shape[1] != self.k:
+            raise ValueError(f"Esperado {self.k} dezenas por combinação, recebido {a.shape[1]}.")
+        a = np.sort(a, axis=1) - self.menor
+        if a.size and (a.min() < 0 or a.max() >= self.n):
+            raise ValueError("Dezena fora do intervalo da loteria.")
+        return a
+
+    def rank_many(self, batch) -> np.ndarray:
+        """Ranks colex de um lote (M, k) de combinações (ordem das dezenas livre)."""
+        a = self._normalizar(batch)
+        cols = np.arange(1, self.k + 1)
+        r = self._binom[a, cols].sum(axis=1)
+        if not self.wide:
+            return r.astype(np.uint64)
+        return np.array([int(x).to_bytes(16, "big") for x in r], dtype="V16")
+
+    def rank(self, combinacao):
+        r = self.rank_many([combinacao])[0]
+        return int.from_bytes(bytes(r), "big") if self.wide else int(r)
+
+    # ------------------------------------------------------------
+    # conjunto
+    # ------------------------------------------------------------
+    def add_many(self, batch):
+        ranks = self.rank_many(batch)
+        if self.modo == "bitset":
+            if not self._bits.flags.writeable:
+                self._bits = np.array(self._bits)
+            ranks = ranks.astype(np.int64)
+            np.bitwise_or.at(self._bits, ranks >> 3, (1 << (ranks & 7)).astype(np.uint8))
+        else:
+            self._ranks = np.unique(np.concatenate([self._ranks, ranks]))
+
+    def contains_many(self, batch) -> np.ndarray:
+        """Vetor bool (M,) indicando quais combinações do lote já foram sorteadas."""
+        ranks = self.rank_many(batch)
+        if self.modo == "bitset":
+            ranks = ranks.astype(np.int64)
+            return ((self._bits[ranks >> 3] >> (ranks & 7)) & 1).astype(bool)
+        if self._ranks.size == 0:
+            return np.zeros(ranks.shape[0], dtype=bool)
+        pos = np.searchsorted(self._ranks, ranks)
+        pos = np.minimum(pos, self._ranks.size - 1)
+        return self._ranks[pos] == ranks
+
+    def contains(self, combinacao) -> bool:
+        return bool(self.contains_many([combinacao])[0])
+
+    def __contains__(self, combinacao):
+        return self.contains(combinacao)
+
+    def __len__(self):
+        if self.modo == "bitset":
+            return int(np.unpackbits(self._bits).sum())
+        return int(self._ranks.size)
+
+    # ------------------------------------------------------------
+    # persistência
+    # ------------------------------------------------------------
+    def save(self, path_base: str):
+        """Grava <path_base>.npy + <path_base>.json (escrita atômica)."""
+        os.makedirs(os.path.dirname(path_base) or ".", exist_ok=True)
+        dados = self._bits if self.modo == "bitset" else self._ranks
+        tmp = path_base + ".tmp.npy"
+        np.save(tmp, dados)
+        os.replace(tmp, path_base + ".npy")
+        manifest = {
+            "n": self.n, "k": self.k, "menor": self.menor, "modo": self.modo,
+            "ultimo_concurso": self.ultimo_concurso,
+        }
+        with open(path_base + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(path_base + ".json.tmp", path_base + ".json")
+
+    @classmethod
+    def load(cls, path_base: str, mmap: bool = True):
+        with open(path_base + ".json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        idx = cls(manifest["n"], manifest["k"], manifest["menor"], manifest["modo"])
+        dados = np.load(path_base + ".npy", mmap_mode="r" if mmap else None)
+        if idx.modo == "bitset":
+            idx._bits = dados
+        else:
+            idx._ranks = dados
+        idx.ultimo_concurso = manifest.get("ultimo_concurso")
+        return idx
+
+
+def obter_index(loteria: str, ultimo_concurso, carregar_combinacoes, index_dir: str = None):
+    """
+    Retorna o índice da loteria, atualizado até `ultimo_concurso`.
+
+    - Usa cache do processo e o arquivo em disco (mmap) quando estiverem em dia.
+    - Caso contrário reconstrói com carregar_combinacoes() → iterável (M, k)
+      e regrava o arquivo (falha de escrita só gera warning).
+    """
+    cfg = LOTERIAS[loteria]
+    path_base = os.path.join(index_dir or INDEX_DIR, f"{loteria}_index")
+
+    def _em_dia(idx):
+        return (
+            idx is not None
+            and idx.ultimo_concurso is not None
+            and ultimo_concurso is not None
+            and int(idx.ultimo_concurso) >= int(ultimo_concurso)
+        )
+
+    idx = _cache.get(path_base)
+    if _em_dia(idx):
+        return idx
+
+    if os.path.exists(path_base + ".json"):
+        try:
+            idx = CombinacoesIndex.load(path_base)
+        except Exception as e:
+            logging.warning(f"[combinacoes_index] falha ao ler {path_base}: {e}")
+            idx = None
+        if _em_dia(idx):
+            _cache[path_base] = idx
+            return idx
+
+    idx = CombinacoesIndex(cfg["n"], cfg["k"], cfg["menor"])
+    combinacoes = np.asarray(list(carregar_combinacoes()), dtype=np.int64)
+    if combinacoes.size:
+        idx.add_many(combinacoes)
+    idx.ultimo_concurso = ultimo_concurso
+    try:
+        idx.save(path_base)
+    except Exception as e:
+        logging.warning(f"[combinacoes_index] não foi possível gravar {path_base}: {e}")
+
+    logging.info(f"[combinacoes_index] {loteria}: {len(combinacoes)} combinações (último={ultimo_concurso})")
+    _cache[path_base] = idx
+    return idx
+
+
+def combinacoes_do_csv(csv_path: str, k: int):
+    """Lê Bola1..Bolak de um CSV da Caixa. Retorna (ultimo_concurso, array (M, k))."""
+    import csv
+
+    ultimo = None
+    out = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            try:
+                out.append([int(r[f"Bola{i}"]) for i in range(1, k + 1)])
+                ultimo = max(int(r["Concurso"]), ultimo or 0)
+            except (KeyError, TypeError, ValueError):
+                continue
+    return ultimo, np.asarray(out, dtype=np.int64).reshape(-1, k)
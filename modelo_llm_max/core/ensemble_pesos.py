@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+ensemble_pesos.py – otimização dos pesos (e temperatura) dos ensembles
+
+Os pesos eram chutes fixos (WEIGHTS do G3 / Platinum A, `pesos` do
+validate_ensembles, "recent:0.5,mid:0.3,global:0.2" do app). Aqui eles são
+escolhidos sobre as predições walk-forward já cacheadas
+(core/predicoes_cache.py):
+
+    P (modelos, concursos, 25|60)  probabilidades de cada modelo
+    Y (concursos, 25|60)           resultado real (0/1)
+
+Milhares de vetores de pesos × temperaturas são avaliados de uma vez:
+    S[t] = softmax(P / T_t)                  (calibração igual ao app)
+    E    = einsum("bm,tmnd->btnd", W, S)     (ensemble de cada candidato)
+    acertos = Y[top-k(E)]                    → média, % >= 11 / >= 13 ...
+
+Modos: grid (simplex com passo fixo), random (Dirichlet) e coord (descida
+por coordenada com raio adaptativo). Em grid/random os blocos de candidatos
+são divididos entre processos; em coord, os folds. A qualidade é medida fora
+da amostra: em cada fold os pesos são escolhidos só com os concursos
+anteriores ao bloco avaliado.
+
+Saída: models/ensemble/<nome>.json, lido em runtime por carregar_pesos().
+
+Uso:
+    python -m modelo_llm_max.core.ensemble_pesos --nome lf_grupos \\
+        --modelo recent=models/prod/recent_ls15pp_final.keras \\
+        --modelo mid=models/prod/mid_ls15pp_final.keras \\
+        --modelo global=models/prod/global_ls15pp_final.keras \\
+        --rows modelo_llm_max/dados/rows_25bin.npy --modo coord --workers 4
+"""
+
+import os
+import json
+import logging
+import argparse
+import itertools
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+import numpy as np
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESOS_DIR = os.getenv("FAIXABET_ENSEMBLE_DIR") or os.path.join(_BASE_DIR, "models", "ensemble")
+
+K_PADRAO = {"lotofacil": 15, "megasena": 6}
+LIMIARES = {"lotofacil": (11, 12, 13, 14, 15), "megasena": (4, 5, 6)}
+
+# elementos por bloco de candidatos (E float32 + índices do argpartition ≈ 12 bytes cada)
+BLOCO_ELEMENTOS = int(os.getenv("FAIXABET_ENSEMBLE_BLOCO", str(16 * 1024 * 1024)))
+
+_cache_pesos = {}     # nome → (mtime, dados)
+
+
+# =========================================================
+# Avaliação vetorizada
+# =========================================================
+
+def calibrar(P: np.ndarray, temperaturas, calibracao: str = "softmax") -> np.ndarray:
+    """(M, N, D) → (T, M, N, D). "softmax": softmax(P / T) por concurso; "nenhuma": P."""
+    P = np.asarray(P, dtype=np.float32)
+    if calibracao == "nenhuma":
+        return P[None]
+    x = P[None] / np.asarray(temperaturas, dtype=np.float32)[:, None, None, None]
+    x = np.exp(x - x.max(axis=-1, keepdims=True))
+    return x / x.sum(axis=-1, keepdims=True)
+
+
+def _acertos_bloco(S: np.ndarray, Y: np.ndarray, W: np.ndarray, k: int) -> np.ndarray:
+    """Acertos (B, T, N) dos candidatos W (B, M) sobre S (T, M, N, D)."""
+    E = np.einsum("bm,tmnd->btnd", W.astype(np.float32), S, optimize=True)
+    top = np.argpartition(-E, k - 1, axis=-1)[..., :k]
+    return np.take_along_axis(Y[None, None], top, axis=-1).sum(axis=-1, dtype=np.int16)
+
+
+_S = None
+_Y = None
+
+
+def _init_worker(S, Y):
+    global _S, _Y
+    _S, _Y = S, Y
+
+
+def _worker(args):
+    W, k = args
+    return _acertos_bloco(_S, _Y, W, k)
+
+
+def acertos_candidatos(S: np.ndarray, Y: np.ndarray, W: np.ndarray, k: int, workers: int = 1) -> np.ndarray:
+    """
+    Acertos (B, T, N) de todos os candidatos, em blocos de BLOCO_ELEMENTOS
+    e (workers > 1) distribuídos entre processos.
+    """
+    W = np.atleast_2d(np.asarray(W, dtype=np.float32))
+    Y = np.asarray(Y, dtype=np.uint8)
+    T, _, N, D = S.shape
+    passo = max(1, BLOCO_ELEMENTOS // max(1, T * N * D))
+    blocos = [W[i:i + passo] for i in range(0, len(W), passo)]
+
+    if workers <= 1 or len(blocos) == 1:
+        return np.concatenate([_acertos_bloco(S, Y, b, k) for b in blocos])
+
+    # spawn: o processo pai pode ter TensorFlow carregado (preenchendo o cache)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             initializer=_init_worker, initargs=(S, Y)) as ex:
+        return np.concatenate(list(ex.map(_worker, [(b, k) for b in blocos])))
+
+
+def metricas(H: np.ndarray, limiares) -> dict:
+    """H (..., N) acertos → {"media": (...), "ge11": (...) em %, ...}."""
+    H = np.asarray(H)
+    out = {"media": H.mean(axis=-1)}
+    for x in limiares:
+        out[f"ge{x}"] = (H >= x).mean(axis=-1) * 100.0
+    return out
+
+
+def _pontuar(H: np.ndarray, objetivo: str) -> np.ndarray:
+    """Valor do objetivo por candidato; empates pela média de acertos."""
+    media = H.mean(axis=-1)
+    if objetivo == "media":
+        return media
+    if not objetivo.startswith("ge"):
+        raise ValueError(f"Objetivo inválido: {objetivo} (use media, ge11, ge13, ...)")
+    return (H >= int(objetivo[2:])).mean(axis=-1) * 100.0 + 1e-6 * media
+
+
+# =========================================================
+# Geração de candidatos
+# =========================================================
+
+def candidatos_grid(n_modelos: int, passo: float = 0.05) -> np.ndarray:
+    """Todos os pontos do simplex com passo fixo (soma 1, zeros permitidos)."""
+    partes = int(round(1.0 / passo))
+    pontos = []
+    for barras in itertools.combinations(range(partes + n_modelos - 1), n_modelos - 1):
+        limites = (-1,) + barras + (partes + n_modelos - 1,)
+        pontos.append([limites[i + 1] - limites[i] - 1 for i in range(n_modelos)])
+    return np.asarray(pontos, dtype=np.float32) / partes
+
+
+def candidatos_random(n_modelos: int, amostras: int = 5000, seed=None) -> np.ndarray:
+    """Dirichlet(1) uniforme no simplex + o vetor de pesos iguais."""
+    rng = np.random.default_rng(seed)
+    W = rng.dirichlet(np.ones(n_modelos), size=int(amostras)).astype(np.float32)
+    return np.vstack([np.full((1, n_modelos), 1.0 / n_modelos, np.float32), W])
+
+
+def _linha_coordenada(w: np.ndarray, m: int, valores: np.ndarray) -> np.ndarray:
+    """Candidatos com w[m] = v e os demais reescalados para somar 1 - v."""
+    resto = np.delete(w, m)
+    base = resto / resto.sum() if resto.sum() > 0 else np.full(resto.shape, 1.0 / max(1, resto.size))
+    out = np.empty((len(valores), w.size), dtype=np.float32)
+    for j, v in enumerate(valores):
+        out[j] = np.insert(base * (1.0 - v), m, v)
+    return out
+
+
+# =========================================================
+# Busca
+# =========================================================
+
+def _melhor(W: np.ndarray, H: np.ndarray, objetivo: str):
+    score = _pontuar(H, objetivo)
+    b, t = np.unravel_index(int(np.argmax(score)), score.shape)
+    return W[b], int(t), float(score[b, t])
+
+
+def _descida_coordenada(S, Y, k, objetivo, w0=None):
+    """
+    Melhor (pesos, índice da temperatura, pontuação) sobre S/Y variando um
+    peso por vez (21 valores em ± raio, raio cai pela metade quando uma
+    volta inteira não melhora).
+    """
+    M = S.shape[1]
+    w = np.full(M, 1.0 / M, np.float32) if w0 is None else np.asarray(w0, np.float32)
+    score = _pontuar(acertos_candidatos(S, Y, w[None], k), objetivo)[0]
+    t = int(np.argmax(score))
+    melhor = float(score[t])
+    raio = 0.5
+    while raio >= 1e-3:
+        melhorou = False
+        for m in range(M):
+            valores = np.unique(np.clip(w[m] + np.linspace(-raio, raio, 21), 0.0, 1.0))
+            W = _linha_coordenada(w, m, valores)
+            score = _pontuar(acertos_candidatos(S, Y, W, k), objetivo)
+            b, tt = np.unravel_index(int(np.argmax(score)), score.shape)
+            if score[b, tt] > melhor + 1e-9:
+                w, t, melhor = W[b], int(tt), float(score[b, tt])
+                melhorou = True
+        if not melhorou:
+            raio /= 2
+    return w, t, melhor
+
+
+def _descida_corte(args):
+    S, Y, k, objetivo = args
+    return _descida_coordenada(S, Y, k, objetivo)
+
+
+def otimizar(P, Y, nomes, loteria: str = "lotofacil", modo: str = "coord", objetivo: str = "media",
+             temperaturas=(0.5, 0.75, 1.0, 1.5, 2.0), calibracao: str = "softmax", k: int = None,
+             folds: int = 4, passo: float = 0.05, amostras: int = 5000, seed=None, workers: int = 1) -> dict:
+    """
+    Escolhe pesos/temperatura sobre P (M, N, D) / Y (N, D).
+
+    Walk-forward: os últimos `folds` blocos são avaliados com pesos escolhidos
+    só nos concursos anteriores (métricas "fora_amostra"). Os pesos finais
+    usam todos os concursos.
+    """
+    P = np.asarray(P, dtype=np.float32)
+    Y = np.asarray(Y, dtype=np.uint8)
+    if P.ndim != 3 or P.shape[1:] != Y.shape or P.shape[0] != len(nomes):
+        raise ValueError(f"Shapes incompatíveis: P={P.shape}, Y={Y.shape}, modelos={len(nomes)}")
+    k = int(k or K_PADRAO[loteria])
+    limiares = LIMIARES[loteria]
+    temperaturas = [1.0] if calibracao == "nenhuma" else [float(t) for t in temperaturas]
+    S = calibrar(P, temperaturas, calibracao)
+    M, N = P.shape[:2]
+
+    # cortes de treino: 1 por fold + o final (todos os concursos)
+    bloco = N // (folds + 1) if folds else 0
+    if folds and bloco < 1:
+        raise ValueError(f"Concursos insuficientes ({N}) para {folds} folds")
+    cortes = [N - (folds - f) * bloco for f in range(folds)] + [N]
+
+    if modo in ("grid", "random"):
+        # acertos por concurso não dependem do treino: calcula 1x, cada corte só re-pontua
+        W = candidatos_grid(M, passo) if modo == "grid" else candidatos_random(M, amostras, seed)
+        print(f"[ensemble_pesos] {len(W)} candidatos × {len(temperaturas)} temperaturas")
+        H = acertos_candidatos(S, Y, W, k, workers)
+        achados = [_melhor(W, H[..., :c], objetivo) for c in cortes]
+    elif modo == "coord":
+        tarefas = [(S[:, :, :c], Y[:c], k, objetivo) for c in cortes]
+        if workers > 1:
+            # coord avalia ~21 candidatos por passo: paraleliza os cortes, não os candidatos
+            with ProcessPoolExecutor(max_workers=min(workers, len(cortes)), mp_context=mp.get_context("spawn")) as ex:
+                achados = list(ex.map(_descida_corte, tarefas))
+        else:
+            achados = [_descida_corte(t) for t in tarefas]
+    else:
+        raise ValueError(f"Modo inválido: {modo}")
+
+    fora = []
+    for f, ini in enumerate(cortes[:-1]):
+        w, t, _ = achados[f]
+        fora.append(acertos_candidatos(S[t:t + 1, :, ini:ini + bloco], Y[ini:ini + bloco], w[None], k)[0, 0])
+        print(f"[ensemble_pesos] fold {f + 1}/{folds}: treino={ini} teste={bloco} "
+              f"pesos={np.round(w, 3).tolist()} T={temperaturas[t]}")
+
+    w, t, _ = achados[-1]
+    H = acertos_candidatos(S[t:t + 1], Y, w[None], k)[0, 0]
+    base = acertos_candidatos(S, Y, np.full((1, len(nomes)), 1.0 / len(nomes)), k)[0]
+
+    def _m(h):
+        return {c: round(float(v), 4) for c, v in metricas(h, limiares).items()}
+
+    return {
+        "loteria": loteria,
+        "modelos": list(nomes),
+        "pesos": {n: round(float(p), 6) for n, p in zip(nomes, w)},
+        "temperatura": float(temperaturas[t]),
+        "calibracao": calibracao,
+        "k": k,
+        "modo": modo,
+        "objetivo": objetivo,
+        "concursos": int(N),
+        "metricas": _m(H),
+        "metricas_fora_amostra": _m(np.concatenate(fora)) if fora else None,
+        "metricas_pesos_iguais": {
+            f"T={temperaturas[i]}": _m(base[i]) for i in range(len(temperaturas))
+        },
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+# =========================================================
+# Arquivo de pesos (runtime)
+# =========================================================
+
+def caminho_pesos(nome: str) -> str:
+    return os.path.join(PESOS_DIR, f"{nome}.json")
+
+
+def salvar_pesos(nome: str, resultado: dict) -> str:
+    os.makedirs(PESOS_DIR, exist_ok=True)
+    path = caminho_pesos(nome)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    _cache_pesos.pop(nome, None)
+    return path
+
+
+def carregar_pesos(nome: str, padrao: dict = None):
+    """
+    (pesos, temperatura) do arquivo models/ensemble/<nome>.json; se não
+    existir ou for inválido → (padrao, None). Relido quando o mtime muda.
+    """
+    path = caminho_pesos(nome)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return padrao, None
+
+    salvo = _cache_pesos.get(nome)
+    if salvo is None or salvo[0] != mtime:
+        try:
+            with open(path, encoding="utf-8") as f:
+                dados = json.load(f)
+            pesos = {str(k): float(v) for k, v in dados["pesos"].items()}
+            if sum(pesos.values()) <= 0:
+                raise ValueError("soma dos pesos <= 0")
+        except Exception as e:
+            logging.warning(f"[ensemble_pesos] {path} inválido: {e}")
+            return padrao, None
+        salvo = (mtime, (pesos, dados.get("temperatura")))
+        _cache_pesos[nome] = salvo
+    return salvo[1]
+
+
+# =========================================================
+# CLI: predições do cache → pesos
+# =========================================================
+
+def _carregar_modelo(path: str):
+    from modelo_llm_max.core.runtime_numpy import carregar_se_exportado
+    modelo = carregar_se_exportado(path)
+    if modelo is not None:
+        return modelo
+    import tensorflow as tf
+    return tf.keras.models.load_model(path, compile=False)
+
+
+def _window(modelo) -> int:
+    """Janela pelo input_shape: (None, window, D) → window; (None, D) → 0."""
+    shape = tuple(modelo.input_shape)
+    return int(shape[1]) if len(shape) >= 3 else 0
+
+
+def empilhar_predicoes(modelos: dict, entradas: np.ndarray, loteria: str, fonte: str, ultimos: int = None):
+    """
+    {nome: (path, window|None)} → (P (M, N, D), Y (N, D)) sobre os concursos
+    que todos os modelos conseguem prever (o maior window manda).
+    window=None: inferido do input_shape (entrada 2D → 0, só o último vetor);
+    window=0: o modelo recebe entradas[i - 1].
+    """
+    from modelo_llm_max.core.predicoes_cache import ModeloSobDemanda, obter_janelas
+
+    lazies = {n: ModeloSobDemanda(p, _carregar_modelo, loteria=loteria) for n, (p, _) in modelos.items()}
+    windows = {n: _window(lazies[n]) if w is None else int(w) for n, (_, w) in modelos.items()}
+    inicio = max(max(windows.values()), 1)
+    if ultimos:
+        inicio = max(inicio, len(entradas) - int(ultimos))
+    alvos = np.arange(inicio, len(entradas))
+    D = entradas.shape[1]
+
+    P = np.stack([
+        obter_janelas(lazies[n], entradas, windows[n], alvos, fonte=fonte, loteria=loteria)[:, :D]
+        for n in modelos
+    ])
+    Y = (np.asarray(entradas[alvos]) == 1).astype(np.uint8)
+    return P, Y
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Otimiza pesos/temperatura de um ensemble.")
+    parser.add_argument("--nome", required=True, help="arquivo de saída models/ensemble/<nome>.json")
+    parser.add_argument("--modelo", action="append", required=True,
+                        help="nome=path[:window] (repetir por modelo)")
+    parser.add_argument("--rows", required=True, help="rows_25bin.npy / rows_60bin.npy")
+    parser.add_argument("--loteria", choices=sorted(K_PADRAO), default="lotofacil")
+    parser.add_argument("--ultimos", type=int, default=None)
+    parser.add_argument("--modo", choices=["grid", "random", "coord"], default="coord")
+    parser.add_argument("--objetivo", default="media", help="media, ge11, ge13, ...")
+    parser.add_argument("--temperaturas", default="0.5,0.75,1,1.5,2")
+    parser.add_argument("--calibracao", choices=["softmax", "nenhuma"], default="softmax")
+    parser.add_argument("--k", type=int, default=None)
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--passo", type=float, default=0.05)
+    parser.add_argument("--amostras", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    modelos = {}
+    for spec in args.modelo:
+        nome, _, resto = spec.partition("=")
+        path, _, window = resto.rpartition(":") if resto.rpartition(":")[2].isdigit() else (resto, "", "")
+        modelos[nome.strip()] = (path, int(window) if window else None)
+
+    rows = np.load(args.rows, mmap_mode="r")
+    fonte = os.path.splitext(os.path.basename(args.rows))[0]
+    P, Y = empilhar_predicoes(modelos, rows, args.loteria, fonte, args.ultimos)
+    print(f"[ensemble_pesos] P={P.shape} Y={Y.shape}")
+
+    resultado = otimizar(
+        P, Y, list(modelos), loteria=args.loteria, modo=args.modo, objetivo=args.objetivo,
+        temperaturas=[float(t) for t in args.temperaturas.split(",") if t.strip()],
+        calibracao=args.calibracao, k=args.k, folds=args.folds, passo=args.passo,
+        amostras=args.amostras, seed=args.seed, workers=args.workers,
+    )
+    path = salvar_pesos(args.nome, resultado)
+    print(json.dumps({c: resultado[c] for c in ("pesos", "temperatura", "metricas", "metricas_fora_amostra")},
+                     ensure_ascii=False, indent=2))
+    print(f"[ensemble_pesos] gravado em {path}")
+
+
+if __name__ == "__main__":
+    main()
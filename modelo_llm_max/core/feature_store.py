@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+feature_store.py – artefatos .npy incrementais (1 concurso novo ≠ rebuild completo)
+
+Cada etapa do pipeline (rows_25bin, rows_60bin, ls17_features_v3/v4,
+ms17_features_v4, X_ms17_v4, ...) registra no manifesto do diretório
+(`feature_store.json`):
+
+    versao       → versão do cálculo (mudou → rebuild completo)
+    n_entrada    → linhas de entrada já consumidas (ou concursos lidos do banco)
+    entradas     → sha1 do prefixo consumido de cada entrada
+    saidas       → linhas / tamanho / mtime de cada .npy gerado
+    extra        → livre (ex.: ultimo_concurso, total_lidos)
+
+Na próxima execução:
+    entradas e saídas batem, nada novo  → etapa pulada
+    entradas só cresceram               → calcula só as linhas novas e
+                                          anexa no fim do .npy (anexar_npy)
+    qualquer divergência                → rebuild completo (atômico)
+
+anexar_npy reescreve só o cabeçalho do .npy (o NumPy reserva espaço para o
+shape crescer) — os arquivos continuam legíveis por np.load em qualquer script.
+
+Uso típico (ver ls17_features_v3.py, make_ms17_features_v4.py, ...):
+
+    atualizar("ms17_features_v4", DATA_DIR,
+              entradas={"rows_60bin": rows},
+              saidas={"ms17_features_v4": OUT_PATH},
+              calcular=lambda inicio: {"ms17_features_v4": calcular_features(rows, inicio)},
+              versao="1")
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+MANIFESTO = "feature_store.json"
+
+# FAIXABET_FEATURE_STORE=0 → sempre rebuild completo (comportamento antigo)
+ATIVO = os.getenv("FAIXABET_FEATURE_STORE", "1") != "0"
+
+
+# ------------------------------------------------------------
+# .npy crescente
+# ------------------------------------------------------------
+def _ler_cabecalho(f):
+    versao = np.lib.format.read_magic(f)
+    if versao == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    return versao, shape, fortran, dtype, f.tell()
+
+
+def gravar_npy(path: str, arr: np.ndarray):
+    """np.save atômico (tmp + os.replace)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def linhas_npy(path: str) -> int:
+    """Nº de linhas de um .npy só pelo cabeçalho (-1 se não existir)."""
+    if not os.path.exists(path):
+        return -1
+    with open(path, "rb") as f:
+        _, shape, _, _, _ = _ler_cabecalho(f)
+    return int(shape[0]) if shape else -1
+
+
+def anexar_npy(path: str, novas: np.ndarray, linhas: int = None) -> int:
+    """
+    Anexa `novas` (n, ...) no fim do .npy em `path` e atualiza o shape no
+    cabeçalho. `linhas` trunca antes os dados além dessa linha (restos de
+    uma execução interrompida). Se o cabeçalho novo não couber no espaço
+    reservado, regrava o arquivo inteiro. Retorna o total de linhas.
+    """
+    if not os.path.exists(path):
+        gravar_npy(path, np.asarray(novas))
+        return len(novas)
+
+    with open(path, "r+b") as f:
+        versao, shape, fortran, dtype, offset = _ler_cabecalho(f)
+        novas = np.ascontiguousarray(novas, dtype=dtype)
+        if fortran or tuple(shape[1:]) != tuple(novas.shape[1:]):
+            raise ValueError(f"{path}: shape {shape} incompatível com linhas {novas.shape}")
+        n = int(shape[0]) if linhas is None else min(int(shape[0]), int(linhas))
+        if len(novas) == 0 and n == shape[0]:
+            return n
+
+        bytes_linha = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+        f.truncate(offset + n * bytes_linha)
+        f.seek(0, os.SEEK_END)
+        f.write(novas.tobytes())
+        f.flush()
+
+        total = n + len(novas)
+        buf = io.BytesIO()
+        cab = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+               "shape": (total,) + tuple(shape[1:])}
+        if versao == (1, 0):
+            np.lib.format.write_array_header_1_0(buf, cab)
+        else:
+            np.lib.format.write_array_header_2_0(buf, cab)
+        if len(buf.getvalue()) == offset:
+            f.seek(0)
+            f.write(buf.getvalue())
+            return total
+
+    # cabeçalho cresceu: regrava tudo
+    antigo = np.load(path, mmap_mode="r")[:n]
+    gravar_npy(path, np.concatenate([antigo, novas], axis=0))
+    return total
+
+
+# ------------------------------------------------------------
+# Manifesto
+# ------------------------------------------------------------
+def _caminho_manifesto(diretorio: str) -> str:
+    return os.path.join(diretorio, MANIFESTO)
+
+
+def ler_manifesto(diretorio: str) -> dict:
+    path = _caminho_manifesto(diretorio)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def estado(nome: str, diretorio: str) -> dict:
+    """Registro da etapa no manifesto (ou None)."""
+    return ler_manifesto(diretorio).get(nome)
+
+
+def hash_prefixo(arr: np.ndarray, n: int = None) -> str:
+    """sha1 das primeiras `n` linhas (bytes C-contíguos + dtype + shape)."""
+    arr = np.asarray(arr)
+    n = arr.shape[0] if n is None else int(n)
+    h = hashlib.sha1()
+    h.update(f"{arr.dtype.str}|{arr.shape[1:]}|{n}".encode())
+    h.update(np.ascontiguousarray(arr[:n]).data)
+    return h.hexdigest()[:16]
+
+
+def _impressao(path: str) -> dict:
+    st = os.stat(path)
+    return {"linhas": linhas_npy(path), "tamanho": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def saidas_intactas(reg: dict, saidas: dict) -> bool:
+    """Todas as saídas existem e não foram regravadas por outro script."""
+    registradas = (reg or {}).get("saidas") or {}
+    for rotulo, path in saidas.items():
+        if not os.path.exists(path) or registradas.get(rotulo) != _impressao(path):
+            return False
+    return True
+
+
+def registrar(nome: str, diretorio: str, versao: str, n_entrada: int, saidas: dict,
+              entradas_hash: dict = None, extra: dict = None):
+    """Grava (atômico) o registro da etapa no manifesto do diretório."""
+    manifesto = ler_manifesto(diretorio)
+    manifesto[nome] = {
+        "versao": str(versao),
+        "n_entrada": int(n_entrada),
+        "entradas": entradas_hash or {},
+        "saidas": {rotulo: _impressao(path) for rotulo, path in saidas.items()},
+        "extra": extra or {},
+        "atualizado_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    os.makedirs(diretorio, exist_ok=True)
+    path = _caminho_manifesto(diretorio)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def pode_anexar(reg: dict, versao: str, saidas: dict) -> bool:
+    """Registro existente, mesma versão e saídas intactas."""
+    return (
+        ATIVO
+        and reg is not None
+        and reg.get("versao") == str(versao)
+        and saidas_intactas(reg, saidas)
+    )
+
+
+# ------------------------------------------------------------
+# Etapa array → array
+# ------------------------------------------------------------
+def atualizar(nome: str, diretorio: str, entradas: dict, saidas: dict, calcular, versao: str,
+              completo=None, forcar: bool = False) -> str:
+    """
+    Atualiza uma etapa cujas saídas dependem só das linhas de entrada até i.
+
+    entradas : {rótulo: array (N, ...)} — todas com o mesmo N
+    saidas   : {rótulo: caminho .npy}
+    calcular : calcular(inicio) → {rótulo: linhas novas} para as entradas
+               inicio..N-1 (inicio=0 → tudo)
+    completo : opcional; completo() grava ele mesmo todas as saídas no
+               rebuild (ex.: janelas direto em memmap)
+
+    Retorna "inalterado" | "incremental" | "completo".
+    """
+    ns = {rotulo: int(np.asarray(arr).shape[0]) for rotulo, arr in entradas.items()}
+    if len(set(ns.values())) > 1:
+        raise ValueError(f"[{nome}] entradas com N diferentes: {ns}")
+    N = next(iter(ns.values()))
+
+    reg = None if forcar else estado(nome, diretorio)
+    inicio = 0
+    if pode_anexar(reg, versao, saidas):
+        n_antes = int(reg["n_entrada"])
+        hashes_antes = reg.get("entradas") or {}
+        if n_antes <= N and all(
+            hashes_antes.get(rotulo) == hash_prefixo(arr, n_antes) for rotulo, arr in entradas.items()
+        ):
+            inicio = n_antes
+
+    if inicio and inicio == N:
+        print(f"[feature_store] {nome}: inalterado (N={N})")
+        return "inalterado"
+
+    t0 = time.time()
+    if inicio:
+        novas = calcular(inicio)
+        for rotulo, path in saidas.items():
+            anexar_npy(path, novas[rotulo], linhas=reg["saidas"][rotulo]["linhas"])
+        status = "incremental"
+    else:
+        if completo is not None:
+            completo()
+        else:
+            novas = calcular(0)
+            for rotulo, path in saidas.items():
+                gravar_npy(path, novas[rotulo])
+        status = "completo"
+
+    registrar(nome, diretorio, versao, N, saidas,
+              entradas_hash={rotulo: hash_prefixo(arr) for rotulo, arr in entradas.items()})
+    print(f"[feature_store] {nome}: {status} ({inicio} → {N}) em {time.time() - t0:.3f}s")
+    return status
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+features.py – motor de features por dezena em O(N·D) (Lotofácil D=25, Mega D=60)
+
+Os scripts de features recalculavam tudo linha a linha:
+    rolling_mean:  for i in range(N): mat[i-W+1:i+1].mean(axis=0)   → O(N·W·D)
+    freq_window:   for i ...: for dez in janela.flatten(): ...      → O(N·W·15) em Python
+    atraso/gap:    for i ...: for d in range(D): ...                → O(N·D) em Python
+
+Aqui:
+- contagem_janela / freq_janela → somas acumuladas (C[i] = Σ rows[:i]),
+                                  contagem = C[fim] - C[ini]
+- atraso / atraso_atual         → último hit via np.maximum.accumulate
+- anterior                      → deslocamento de 1 linha
+- soma_pares                    → soma e qtd. de pares por concurso
+- desvio_janela                 → desvio padrão deslizante (views, sem loop por linha)
+
+Contagens são inteiras (exatas) e cada saída é dividida uma única vez, no
+mesmo dtype dos scripts antigos — o resultado é bit a bit igual ao dos loops.
+
+`inicio` (contagem_janela / freq_janela / atraso) devolve só as linhas
+inicio..N-1 — é o que o feature store (core/feature_store.py) usa para
+anexar concursos novos sem recalcular o histórico.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def binarios(dezenas: np.ndarray, n_dezenas: int) -> np.ndarray:
+    """
+    (N, bolas) com dezenas 1..n_dezenas → contagens (N, n_dezenas) int32.
+    Valores fora da faixa são ignorados; repetidas contam repetido
+    (igual ao `for dez in janela.flatten()` antigo).
+    """
+    dezenas = np.asarray(dezenas).astype(np.int64, copy=False)
+    N = dezenas.shape[0]
+    out = np.zeros((N, n_dezenas), dtype=np.int32)
+    validas = (dezenas >= 1) & (dezenas <= n_dezenas)
+    linhas = np.broadcast_to(np.arange(N)[:, None], dezenas.shape)
+    np.add.at(out, (linhas[validas], dezenas[validas] - 1), 1)
+    return out
+
+
+def somas_acumuladas(rows: np.ndarray) -> np.ndarray:
+    """C (N+1, D) int64 com C[0] = 0 e C[i] = Σ rows[:i]."""
+    rows = np.asarray(rows)
+    C = np.zeros((rows.shape[0] + 1, rows.shape[1]), dtype=np.int64)
+    np.cumsum(rows, axis=0, dtype=np.int64, out=C[1:])
+    return C
+
+
+def _limites(N: int, window: int, incluir_atual: bool, inicio: int = 0):
+    fim = np.arange(inicio, N) + (1 if incluir_atual else 0)
+    ini = np.maximum(0, fim - window)
+    return ini, fim
+
+
+def contagem_janela(rows: np.ndarray, window: int, incluir_atual: bool = True, C=None,
+                    inicio: int = 0) -> np.ndarray:
+    """
+    Ocorrências por dezena na janela de `window` concursos (N, D) int64.
+      incluir_atual=True  → rows[i-window+1 : i+1]
+      incluir_atual=False → rows[i-window : i]     (sem vazamento)
+    `C` (somas_acumuladas) pode ser reaproveitado entre janelas.
+    """
+    if C is None:
+        C = somas_acumuladas(rows)
+    ini, fim = _limites(C.shape[0] - 1, window, incluir_atual, inicio)
+    return C[fim] - C[ini]
+
+
+def freq_janela(rows: np.ndarray, window: int, incluir_atual: bool = True, divisor: str = "efetivo",
+                dtype=np.float32, C=None, inicio: int = 0) -> np.ndarray:
+    """
+    Frequência por janela.
+      divisor="efetivo" → divide pelo nº de concursos da janela (média, como rolling_mean)
+      divisor="janela"  → divide sempre por `window` (como freq_window / window_sum)
+    """
+    if C is None:
+        C = somas_acumuladas(rows)
+    cont = contagem_janela(rows, window, incluir_atual, C, inicio).astype(dtype)
+    if divisor == "janela":
+        return cont / dtype(window)
+    if divisor != "efetivo":
+        raise ValueError(f"divisor inválido: {divisor}")
+    ini, fim = _limites(C.shape[0] - 1, window, incluir_atual, inicio)
+    n = np.maximum(fim - ini, 1).astype(dtype)[:, None]
+    return cont / n
+
+
+def _ultimo_hit(rows: np.ndarray, inicial: int) -> np.ndarray:
+    """U[i, d] = maior j <= i com rows[j, d] != 0 (ou `inicial`)."""
+    rows = np.asarray(rows)
+    idx = np.where(rows != 0, np.arange(rows.shape[0])[:, None], inicial)
+    return np.maximum.accumulate(idx, axis=0) if rows.shape[0] else idx
+
+
+def atraso(rows: np.ndarray, incluir_atual: bool = True, inicial: int = -1, inicio: int = 0) -> np.ndarray:
+    """
+    Concursos desde o último hit (N, D) int64.
+      incluir_atual=True  → último hit em j <= i  (saiu no próprio i → 0)
+      incluir_atual=False → último hit em j <  i  (feature sem vazamento)
+    `inicial` é o índice assumido quando a dezena nunca saiu
+    (-1 → atraso i+1; 0 → atraso i).
+    """
+    N = np.asarray(rows).shape[0]
+    U = _ultimo_hit(rows, inicial)
+    if not incluir_atual:
+        U = np.concatenate([np.full((min(N, 1), U.shape[1]), inicial, dtype=U.dtype), U[:-1]], axis=0)
+    return np.arange(inicio, N)[:, None] - U[inicio:]
+
+
+def atraso_atual(rows: np.ndarray, inicial: int = 0) -> np.ndarray:
+    """
+    Atraso de cada dezena para o PRÓXIMO concurso (D,): len(rows) - último hit.
+    Com inicial=0, dezena que nunca saiu tem atraso len(rows).
+    """
+    rows = np.asarray(rows)
+    N = rows.shape[0]
+    if N == 0:
+        return np.full(rows.shape[1], -inicial, dtype=np.int64)
+    saiu = rows != 0
+    ultimo = N - 1 - np.argmax(saiu[::-1], axis=0)
+    return N - np.where(saiu.any(axis=0), ultimo, inicial)
+
+
+def anterior(rows: np.ndarray) -> np.ndarray:
+    """Indicador do concurso anterior: out[i] = rows[i-1], out[0] = 0."""
+    rows = np.asarray(rows)
+    out = np.zeros_like(rows)
+    out[1:] = rows[:-1]
+    return out
+
+
+def soma_pares(dezenas: np.ndarray):
+    """(N, bolas) → (soma (N,), qtd. de pares (N,)) int64."""
+    dezenas = np.asarray(dezenas).astype(np.int64, copy=False)
+    return dezenas.sum(axis=1), (dezenas % 2 == 0).sum(axis=1)
+
+
+def desvio_janela(mat: np.ndarray, window: int) -> np.ndarray:
+    """
+    out[i] = np.std(mat[max(0, i - window) : i + 1], axis=0)
+    (janela de até window+1 linhas, incluindo i). O trecho completo sai de
+    uma única view (M, window+1, D); só as `window` primeiras linhas
+    (janela parcial) são calculadas uma a uma.
+    """
+    mat = np.asarray(mat)
+    N = mat.shape[0]
+    out = np.zeros(mat.shape, dtype=np.result_type(mat.dtype, np.float64) if mat.dtype.kind in "iub" else mat.dtype)
+    for i in range(min(window, N)):
+        out[i] = np.std(mat[:i + 1], axis=0)
+    if N > window:
+        vistas = sliding_window_view(mat, (window + 1, mat.shape[1]))[:, 0]
+        out[window:] = np.std(vistas, axis=1)
+    return out
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+janelas.py – janelas temporais (walk-forward) sem cópia para todos os datasets LS/MS
+
+Convenção única (igual a todos os scripts antigos):
+    alvo t  →  X = entradas[t - window : t]   y = labels[t]
+    t = window, ..., N - 1
+
+Os scripts de dataset faziam X_list.append(feats[t-W:t]) + np.array(X_list),
+materializando (M, W, F) em float64 — O(M·W·F). Aqui:
+
+- janelas(entradas, window)        → view (M, W, F) via sliding_window_view (0 cópia)
+- dataset(entradas, labels, window) → (X view, y view)
+- gravar_janelas(path_x, ...)      → escreve X direto num .npy float32 (memmap),
+                                     em chunks: memória O(N·F + chunk·W·F)
+- gerar_lotes(...)                 → gerador de lotes (X, y) float32 para treino
+- dataset_tf(...)                  → tf.data que monta as janelas no grafo
+                                     (tf.gather): memória O(N·F)
+"""
+
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+CHUNK_PADRAO = 4096
+
+
+def _alvos(n: int, window: int, last_n=None, inicio=None) -> np.ndarray:
+    if n <= window:
+        raise ValueError(f"N ({n}) <= window ({window})")
+    ini = window if inicio is None else max(window, int(inicio))
+    if last_n is not None:
+        if n - last_n < window:
+            raise ValueError(
+                f"Não há dados suficientes: preciso de pelo menos {last_n + window}, "
+                f"mas só tenho {n} registros."
+            )
+        ini = max(ini, n - int(last_n))
+    return np.arange(ini, n)
+
+
+def janelas(entradas: np.ndarray, window: int, last_n=None, inicio=None):
+    """
+    View (M, window, F) somente-leitura: X[j] = entradas[t_j - window : t_j].
+    Retorna (X, alvos). Nada é copiado; o dtype é o de `entradas`.
+    """
+    entradas = np.asarray(entradas)
+    if entradas.ndim != 2:
+        raise ValueError(f"entradas deve ser [N, F]; veio {entradas.shape}")
+    alvos = _alvos(entradas.shape[0], window, last_n, inicio)
+    vistas = sliding_window_view(entradas, (window, entradas.shape[1]))[:, 0]
+    # vistas[i] = entradas[i : i + window] → alvo i + window
+    return vistas[alvos[0] - window: alvos[-1] - window + 1], alvos
+
+
+def dataset(entradas: np.ndarray, labels: np.ndarray, window: int, last_n=None, inicio=None, dtype=np.float32):
+    """
+    (X, y) sem cópia das janelas. `entradas`/`labels` são convertidos para
+    `dtype` uma vez (O(N·F)) antes de abrir as views.
+    """
+    entradas = np.asarray(entradas, dtype=dtype)
+    labels = np.asarray(labels, dtype=dtype)
+    if labels.shape[0] < entradas.shape[0]:
+        raise ValueError(f"labels ({labels.shape[0]}) menor que entradas ({entradas.shape[0]})")
+    X, alvos = janelas(entradas, window, last_n, inicio)
+    return X, labels[alvos]
+
+
+def gravar_janelas(path_x: str, entradas: np.ndarray, window: int, path_y: str = None, labels=None,
+                   last_n=None, inicio=None, dtype=np.float32, dtype_y=None, chunk: int = CHUNK_PADRAO):
+    """
+    Escreve as janelas direto em `path_x` (.npy pré-alocado via open_memmap),
+    chunk a chunk — nunca existe (M, W, F) inteiro na RAM. Com `path_y`,
+    grava também y = labels[alvos] (dtype_y=None mantém o dtype de labels).
+    Retorna (X memmap, y memmap | None).
+    """
+    X, alvos = janelas(entradas, window, last_n, inicio)
+    os.makedirs(os.path.dirname(os.path.abspath(path_x)), exist_ok=True)
+
+    tmp_x = path_x + ".tmp.npy"
+    out = np.lib.format.open_memmap(tmp_x, mode="w+", dtype=dtype, shape=X.shape)
+    for ini in range(0, X.shape[0], chunk):
+        out[ini:ini + chunk] = X[ini:ini + chunk]
+    out.flush()
+    del out
+    os.replace(tmp_x, path_x)
+
+    y_mm = None
+    if path_y is not None:
+        if labels is None:
+            raise ValueError("path_y exige labels")
+        labels = np.asarray(labels)
+        tmp_y = path_y + ".tmp.npy"
+        y = np.lib.format.open_memmap(tmp_y, mode="w+", dtype=dtype_y or labels.dtype,
+                                      shape=(len(alvos),) + labels.shape[1:])
+        y[:] = labels[alvos]
+        y.flush()
+        del y
+        os.replace(tmp_y, path_y)
+        y_mm = np.load(path_y, mmap_mode="r")
+
+    return np.load(path_x, mmap_mode="r"), y_mm
+
+
+def gerar_lotes(entradas: np.ndarray, labels: np.ndarray, window: int, batch_size: int = 32,
+                shuffle: bool = True, seed=None, alvos=None):
+    """
+    Gerador (1 época) de lotes (X (b, W, F), y (b, D)) float32 montados
+    na hora a partir das views.
+    """
+    X, todos = janelas(entradas, window)
+    alvos = todos if alvos is None else np.asarray(alvos, dtype=np.int64)
+    ordem = np.random.default_rng(seed).permutation(alvos) if shuffle else alvos
+    for ini in range(0, len(ordem), batch_size):
+        t = ordem[ini:ini + batch_size]
+        yield (
+            np.ascontiguousarray(X[t - window], dtype=np.float32),
+            np.asarray(labels[t], dtype=np.float32),
+        )
+
+
+def dataset_tf(entradas: np.ndarray, labels: np.ndarray, window: int, alvos=None, batch_size: int = 32,
+               shuffle: bool = True, seed=None):
+    """
+    tf.data.Dataset de (X, y): só `entradas` (N, F) e `labels` ficam no
+    grafo; cada lote faz tf.gather dos índices t - window .. t - 1.
+    `alvos` (índices t) permite separar treino/validação sem copiar nada.
+    """
+    import tensorflow as tf
+
+    _, todos = janelas(entradas, window)
+    alvos = todos if alvos is None else np.asarray(alvos, dtype=np.int64)
+
+    E = tf.constant(np.asarray(entradas, dtype=np.float32))
+    L = tf.constant(np.asarray(labels, dtype=np.float32))
+    offsets = tf.range(-window, 0, dtype=tf.int64)
+
+    ds = tf.data.Dataset.from_tensor_slices(alvos)
+    if shuffle:
+        ds = ds.shuffle(len(alvos), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(
+        lambda t: (tf.gather(E, t[:, None] + offsets[None, :]), tf.gather(L, t)),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    return ds.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+predicoes_cache.py – cache persistente de predições por (modelo, concurso)
+
+Os scripts de avaliação (ensemble_v3, validate_ensembles, validate_ms17_v4,
+telemetria_lf_models) recarregavam todos os modelos e refaziam a inferência
+sobre o mesmo histórico a cada execução. Aqui o vetor de saída de cada
+modelo para cada concurso fica gravado em disco (float32, mmap) e só as
+células (modelo, concurso) ausentes passam pelo modelo.
+
+Chave: hash do ARTEFATO do modelo (sha1 do .keras, ou dos arquivos do
+diretório SavedModel) + fonte das entradas (ex.: "rows_25bin_w64"). Modelo
+retreinado → hash novo → cache novo; concurso novo → só ele é calculado.
+Cada célula guarda também a chave (sha1 → uint64) da janela de entrada que a
+produziu: se um script regravar linhas antigas do arquivo de entrada
+(ex.: prepare_real_data_ls17_v3 → ls17_features_v4), as células cuja janela
+mudou deixam de bater e são recalculadas.
+
+Layout:
+    models/predicoes/<loteria>/<hash>/modelo.json        → path, input_shape
+    models/predicoes/<loteria>/<hash>/<fonte>/pred.npy   → float32 (capacidade, n_saida)
+    models/predicoes/<loteria>/<hash>/<fonte>/ok.npy     → uint8 (capacidade,) célula preenchida
+    models/predicoes/<loteria>/<hash>/<fonte>/chave.npy  → uint64 (capacidade,) chave da entrada (0 = sem chave)
+    models/predicoes/<loteria>/<hash>/<fonte>/meta.json
+
+A linha `c` de pred.npy é o concurso `c` (rows_*bin começam no concurso 1:
+concurso = índice da linha + CONCURSO_INICIAL). O arquivo cresce (dobra)
+quando chega um concurso além da capacidade.
+
+Uso:
+    modelo = ModeloSobDemanda(path, load_model)     # só carrega se precisar
+    proba = obter_janelas(modelo, rows, window, alvos, fonte="rows_25bin")
+
+Desligar: FAIXABET_PRED_CACHE=0 (tudo é recalculado, nada é gravado).
+Um processo escrevendo por (modelo, fonte) por vez.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRED_DIR = os.getenv("FAIXABET_PRED_CACHE_DIR") or os.path.join(_BASE_DIR, "models", "predicoes")
+CACHE_ATIVO = os.getenv("FAIXABET_PRED_CACHE", "1") != "0"
+
+CONCURSO_INICIAL = 1
+CAPACIDADE_MINIMA = 4096
+PREDICT_CHUNK = int(os.getenv("FAIXABET_PRED_CHUNK", "2048"))
+
+_hashes = {}     # path → ((mtime, tamanho), hash)
+
+
+# =========================================================
+# Identidade do artefato
+# =========================================================
+
+def _arquivos_artefato(path: str) -> list:
+    if os.path.isdir(path):
+        out = []
+        for raiz, _, nomes in os.walk(path):
+            out += [os.path.join(raiz, n) for n in nomes]
+        return sorted(out)
+    return [path]
+
+
+def hash_modelo(path: str) -> str:
+    """sha1 (16 hex) do conteúdo do artefato; memorizado por (mtime, tamanho)."""
+    arquivos = _arquivos_artefato(path)
+    assinatura = tuple((os.path.getmtime(a), os.path.getsize(a)) for a in arquivos)
+    salvo = _hashes.get(path)
+    if salvo and salvo[0] == assinatura:
+        return salvo[1]
+
+    h = hashlib.sha1()
+    for a in arquivos:
+        h.update(os.path.relpath(a, path).encode() if a != path else b"")
+        with open(a, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+    digest = h.hexdigest()[:16]
+    _hashes[path] = (assinatura, digest)
+    return digest
+
+
+# =========================================================
+# Identidade das entradas
+# =========================================================
+
+def _u64(digest: bytes) -> int:
+    return int.from_bytes(digest[:8], "little") or 1
+
+
+def chaves_linhas(arr: np.ndarray) -> np.ndarray:
+    """uint64 por linha: sha1 de (dtype, shape da linha, bytes da linha)."""
+    arr = np.ascontiguousarray(arr)
+    base = hashlib.sha1(f"{arr.dtype.str}|{arr.shape[1:]}".encode())
+    linhas = arr.reshape(arr.shape[0], -1).view(np.uint8) if arr.size else arr.reshape(arr.shape[0], 0)
+    out = np.empty(arr.shape[0], dtype=np.uint64)
+    for i in range(arr.shape[0]):
+        h = base.copy()
+        h.update(linhas[i].tobytes())
+        out[i] = _u64(h.digest())
+    return out
+
+
+def chaves_janelas(entradas: np.ndarray, window: int, alvos) -> np.ndarray:
+    """Chave da entrada de cada alvo: janela entradas[i - window : i] (window=0: entradas[i - 1])."""
+    alvos = np.asarray(alvos, dtype=np.int64)
+    linhas = chaves_linhas(entradas)
+    if not window:
+        return linhas[alvos - 1]
+    return np.fromiter(
+        (_u64(hashlib.sha1(linhas[i - window:i].tobytes()).digest()) for i in alvos),
+        dtype=np.uint64, count=len(alvos),
+    )
+
+
+def _dir_modelo(path: str, loteria: str) -> str:
+    return os.path.join(PRED_DIR, loteria, hash_modelo(path))
+
+
+def _gravar_json(path: str, dados: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+# =========================================================
+# Modelo carregado só quando há célula faltando
+# =========================================================
+
+class ModeloSobDemanda:
+    """
+    Embrulha o path de um modelo: `input_shape` sai do modelo.json do cache
+    (sem carregar nada quando já conhecido) e `predict` carrega o modelo na
+    primeira chamada via `carregar(path)`.
+    """
+
+    def __init__(self, path: str, carregar, loteria: str = "lotofacil"):
+        self.path = path
+        self.loteria = loteria
+        self._carregar = carregar
+        self._modelo = None
+
+    @property
+    def modelo(self):
+        if self._modelo is None:
+            self._modelo = self._carregar(self.path)
+            logging.info(f"[predicoes_cache] modelo carregado: {self.path}")
+            try:
+                self._salvar_info()
+            except OSError as e:
+                logging.warning(f"[predicoes_cache] modelo.json não gravado: {e}")
+        return self._modelo
+
+    @property
+    def carregado(self) -> bool:
+        return self._modelo is not None
+
+    def _info_path(self) -> str:
+        return os.path.join(_dir_modelo(self.path, self.loteria), "modelo.json")
+
+    def _salvar_info(self):
+        shape = getattr(self._modelo, "input_shape", None)
+        if shape is None:
+            return
+        os.makedirs(os.path.dirname(self._info_path()), exist_ok=True)
+        _gravar_json(self._info_path(), {
+            "path": os.path.abspath(self.path),
+            "input_shape": [None if d is None else int(d) for d in shape],
+        })
+
+    @property
+    def input_shape(self):
+        if self._modelo is None and CACHE_ATIVO and os.path.exists(self._info_path()):
+            with open(self._info_path(), encoding="utf-8") as f:
+                return tuple(json.load(f)["input_shape"])
+        return self.modelo.input_shape
+
+    def predict(self, X, **kwargs):
+        return self.modelo.predict(X, **kwargs)
+
+
+# =========================================================
+# Store
+# =========================================================
+
+class CachePredicoes:
+    """Predições float32 de 1 modelo sobre 1 fonte de entradas, por concurso."""
+
+    def __init__(self, model_path: str, fonte: str, loteria: str = "lotofacil"):
+        self.model_path = model_path
+        self.fonte = fonte
+        self.loteria = loteria
+        self.dir = os.path.join(_dir_modelo(model_path, loteria), fonte)
+        self._pred = None
+        self._ok = None
+        self._chave = None
+
+    # ---------- arquivos ----------
+
+    def _paths(self):
+        return (
+            os.path.join(self.dir, "pred.npy"),
+            os.path.join(self.dir, "ok.npy"),
+            os.path.join(self.dir, "meta.json"),
+            os.path.join(self.dir, "chave.npy"),
+        )
+
+    def _abrir(self):
+        if self._pred is not None:
+            return True
+        p_pred, p_ok, _, p_chave = self._paths()
+        if not (os.path.exists(p_pred) and os.path.exists(p_ok)):
+            return False
+        self._pred = np.load(p_pred, mmap_mode="r+")
+        self._ok = np.load(p_ok, mmap_mode="r+")
+        if not os.path.exists(p_chave):
+            # cache anterior às chaves: células sem chave só valem para quem não passa chaves
+            tmp = p_chave + ".tmp.npy"
+            arr = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint64, shape=self._ok.shape)
+            arr.flush()
+            del arr
+            os.replace(tmp, p_chave)
+        self._chave = np.load(p_chave, mmap_mode="r+")
+        return True
+
+    def _garantir_capacidade(self, maior: int, n_saida: int):
+        """Cria ou aumenta (dobrando) os arquivos para caber o concurso `maior`."""
+        self._abrir()
+        if self._pred is not None:
+            if self._pred.shape[1] != n_saida:
+                raise ValueError(
+                    f"n_saida {n_saida} difere do cache {self._pred.shape[1]} em {self.dir}"
+                )
+            if maior < self._pred.shape[0]:
+                return
+
+        cap_atual = 0 if self._pred is None else self._pred.shape[0]
+        capacidade = max(CAPACIDADE_MINIMA, 2 * cap_atual)
+        while capacidade <= maior:
+            capacidade *= 2
+
+        os.makedirs(self.dir, exist_ok=True)
+        p_pred, p_ok, p_meta, p_chave = self._paths()
+        novos = []
+        for path, shape, dtype, antigo in (
+            (p_pred, (capacidade, n_saida), np.float32, self._pred),
+            (p_ok, (capacidade,), np.uint8, self._ok),
+            (p_chave, (capacidade,), np.uint64, self._chave),
+        ):
+            tmp = path + ".tmp.npy"
+            arr = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+            if antigo is not None:
+                arr[:cap_atual] = antigo
+            arr.flush()
+            del arr
+            novos.append((tmp, path))
+
+        self._pred = self._ok = self._chave = None
+        for tmp, path in novos:
+            os.replace(tmp, path)
+        _gravar_json(p_meta, {
+            "modelo": os.path.abspath(self.model_path),
+            "hash": hash_modelo(self.model_path),
+            "fonte": self.fonte,
+            "loteria": self.loteria,
+            "n_saida": int(n_saida),
+            "capacidade": int(capacidade),
+            "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+        })
+        self._abrir()
+
+    # ---------- leitura / escrita ----------
+
+    def faltantes(self, concursos, chaves=None) -> np.ndarray:
+        """
+        Subconjunto de `concursos` sem predição gravada. Com `chaves` (uint64,
+        alinhadas a `concursos`), célula gravada com outra chave também falta.
+        """
+        concursos = np.asarray(concursos, dtype=np.int64)
+        return concursos[self._faltam(concursos, chaves)]
+
+    def _faltam(self, concursos: np.ndarray, chaves=None) -> np.ndarray:
+        if not CACHE_ATIVO or not self._abrir():
+            return np.ones(concursos.shape, dtype=bool)
+        dentro = concursos < self._ok.shape[0]
+        tem = np.zeros(concursos.shape, dtype=bool)
+        tem[dentro] = self._ok[concursos[dentro]] == 1
+        if chaves is not None:
+            chaves = np.asarray(chaves, dtype=np.uint64)
+            tem[dentro] &= self._chave[concursos[dentro]] == chaves[dentro]
+        return ~tem
+
+    def ler(self, concursos) -> np.ndarray:
+        """(len(concursos), n_saida) — todos precisam estar preenchidos."""
+        concursos = np.asarray(concursos, dtype=np.int64)
+        if not self._abrir():
+            if len(concursos):
+                raise KeyError(f"cache vazio: {self.dir}")
+            return np.empty((0, 0), dtype=np.float32)
+        return np.asarray(self._pred[concursos], dtype=np.float32)
+
+    def gravar(self, concursos, preds, chaves=None):
+        if not CACHE_ATIVO:
+            return
+        concursos = np.asarray(concursos, dtype=np.int64)
+        preds = np.asarray(preds, dtype=np.float32).reshape(len(concursos), -1)
+        if not len(concursos):
+            return
+        self._garantir_capacidade(int(concursos.max()), preds.shape[1])
+        # predição e chave antes da flag: uma interrupção no meio nunca deixa célula "ok" vazia
+        self._pred[concursos] = preds
+        self._pred.flush()
+        self._chave[concursos] = 0 if chaves is None else np.asarray(chaves, dtype=np.uint64)
+        self._chave.flush()
+        self._ok[concursos] = 1
+        self._ok.flush()
+
+    def obter(self, concursos, calcular, chaves=None) -> np.ndarray:
+        """
+        Predições dos `concursos`; `calcular(concursos_faltantes)` → (k, n_saida)
+        só é chamado para as células ausentes (ou com chave diferente de
+        `chaves`), que são gravadas em seguida.
+        """
+        concursos = np.asarray(concursos, dtype=np.int64)
+        if chaves is not None:
+            chaves = np.asarray(chaves, dtype=np.uint64)
+        mascara = self._faltam(concursos, chaves)
+        faltam = concursos[mascara]
+        if len(faltam):
+            novos = np.asarray(calcular(faltam), dtype=np.float32).reshape(len(faltam), -1)
+            if not CACHE_ATIVO:
+                return novos
+            self.gravar(faltam, novos, None if chaves is None else chaves[mascara])
+            logging.info(
+                f"[predicoes_cache] {self.fonte}: {len(faltam)}/{len(concursos)} calculados "
+                f"({os.path.basename(self.model_path)})"
+            )
+        return self.ler(concursos)
+
+
+# =========================================================
+# Walk-forward sobre janelas (rows_25bin, rows_60bin, features)
+# =========================================================
+
+def prever_janelas(model, entradas: np.ndarray, window: int, alvos, chunk: int = PREDICT_CHUNK) -> np.ndarray:
+    """
+    Predição de cada índice alvo i a partir de entradas[i - window : i]
+    (window=0: entrada 2D = entradas[i - 1]). Janelas via sliding_window_view,
+    materializadas só por chunk.
+    """
+    alvos = np.asarray(alvos, dtype=np.int64)
+    if window:
+        vistas = sliding_window_view(entradas, (window, entradas.shape[1]))[:, 0]
+        deslocamento = window
+    else:
+        vistas = entradas
+        deslocamento = 1
+
+    saidas = []
+    for ini in range(0, len(alvos), chunk):
+        X = np.ascontiguousarray(vistas[alvos[ini:ini + chunk] - deslocamento], dtype=np.float32)
+        pred = model.predict(X, batch_size=min(chunk, 512), verbose=0)
+        pred = pred[0] if isinstance(pred, list) else pred
+        saidas.append(np.asarray(pred, dtype=np.float32).reshape(X.shape[0], -1))
+    return np.concatenate(saidas) if saidas else np.empty((0, 0), dtype=np.float32)
+
+
+def obter_janelas(modelo, entradas: np.ndarray, window: int, alvos, fonte: str,
+                  loteria: str = "lotofacil", concurso_inicial: int = CONCURSO_INICIAL) -> np.ndarray:
+    """
+    Predições (len(alvos), n_saida) do walk-forward, lendo do cache e rodando
+    o modelo só nos alvos ausentes. `alvos` são índices de linha em `entradas`
+    (histórico completo, ordem cronológica); `modelo` é ModeloSobDemanda.
+    Células cuja janela de entrada mudou desde a gravação são recalculadas.
+    """
+    alvos = np.asarray(alvos, dtype=np.int64)
+    if window and alvos.size and alvos.min() < window:
+        raise ValueError(f"alvo {alvos.min()} sem histórico para window={window}")
+    cache = CachePredicoes(modelo.path, f"{fonte}_w{window}" if window else f"{fonte}_ultimo", loteria)
+    return cache.obter(
+        alvos + concurso_inicial,
+        lambda faltam: prever_janelas(modelo, entradas, window, faltam - concurso_inicial),
+        chaves=chaves_janelas(entradas, window, alvos) if CACHE_ATIVO else None,
+    )
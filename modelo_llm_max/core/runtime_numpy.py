@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+runtime_numpy.py – inferência em NumPy puro para os modelos LS/MS exportados
+
+Exporta (offline, com TensorFlow) os pesos de um modelo Keras para .npz e
+executa o forward pass em NumPy no app, sem importar TensorFlow.
+
+Camadas suportadas (as que usamos nos LS14pp/LS15pp/LS16/LS17/LS18/LS17-v4):
+    InputLayer, Conv1D, MaxPooling1D, LSTM, GRU, Bidirectional(LSTM|GRU),
+    Dense, Dropout (identidade), Flatten, LayerNormalization,
+    GlobalAveragePooling1D, MultiHeadAttention (self-attention, x→x) e o
+    TransformerBlock de train/ls17_v4_model.py.
+
+Limite: modelos em cadeia linear (Sequential ou funcional sem ramificação,
+como todos os nossos). Grafos com Add/concat entre ramos não são exportados.
+
+Formato .npz:
+    "__arquitetura__" → JSON (lista de camadas: classe + config)
+    "<i>/<j>"         → j-ésimo peso da i-ésima camada
+
+Uso (offline):
+    python -m modelo_llm_max.core.runtime_numpy exportar models/ls17/ls17_v3.keras
+    python -m modelo_llm_max.core.runtime_numpy validar  models/ls17/ls17_v3.keras
+        → paridade Keras × NumPy (max |Δ|) + benchmark de latência
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+import numpy as np
+
+# tolerância de paridade Keras × NumPy (float32)
+TOLERANCIA = 1e-4
+
+
+# =========================================================
+# Ativações
+# =========================================================
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _hard_sigmoid(x):
+    return np.clip(0.2 * x + 0.5, 0.0, 1.0)
+
+
+_erf = np.frompyfunc(math.erf, 1, 1)
+
+
+def _gelu(x):
+    # forma exata (Keras: gelu com approximate=False), não a aproximação por tanh
+    x = np.asarray(x)
+    return 0.5 * x * (1.0 + _erf(x * (1.0 / math.sqrt(2.0))).astype(x.dtype))
+
+
+def _softmax(x, axis=-1):
+    e = np.exp(x - x.max(axis=axis, keepdims=True))
+    return e / e.sum(axis=axis, keepdims=True)
+
+
+_ATIVACOES = {
+    None: lambda x: x,
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "sigmoid": _sigmoid,
+    "hard_sigmoid": _hard_sigmoid,
+    "tanh": np.tanh,
+    "softmax": _softmax,
+    "elu": lambda x: np.where(x > 0, x, np.expm1(x)),
+    "gelu": _gelu,
+}
+
+
+def _ativacao(nome):
+    if nome not in _ATIVACOES:
+        raise ValueError(f"Ativação não suportada: {nome}")
+    return _ATIVACOES[nome]
+
+
+# =========================================================
+# Camadas (forward)
+# =========================================================
+
+def _dense(x, cfg, w):
+    y = x @ w[0]
+    if len(w) > 1:
+        y = y + w[1]
+    return _ativacao(cfg.get("activation"))(y)
+
+
+def _conv1d(x, cfg, w):
+    kernel = w[0]                                   # (k, in, out)
+    k = kernel.shape[0]
+    stride = int(np.ravel(cfg.get("strides", 1))[0])
+    dil = int(np.ravel(cfg.get("dilation_rate", 1))[0])
+    span = (k - 1) * dil + 1
+    if cfg.get("padding", "valid") == "same":
+        total = max((int(np.ceil(x.shape[1] / stride)) - 1) * stride + span - x.shape[1], 0)
+        x = np.pad(x, ((0, 0), (total // 2, total - total // 2), (0, 0)))
+    elif cfg.get("padding") == "causal":
+        x = np.pad(x, ((0, 0), (span - 1, 0), (0, 0)))
+
+    T_out = (x.shape[1] - span) // stride + 1
+    # janelas (batch, T_out, k, in) via strides, sem cópia
+    jan = np.lib.stride_tricks.sliding_window_view(x, span, axis=1)[:, ::stride][:, :T_out]
+    jan = jan[..., ::dil]                           # (batch, T_out, in, k)
+    y = np.einsum("btik,kio->bto", jan, kernel, optimize=True)
+    if len(w) > 1:
+        y = y + w[1]
+    return _ativacao(cfg.get("activation"))(y)
+
+
+def _maxpool1d(x, cfg, w):
+    p = int(np.ravel(cfg.get("pool_size", 2))[0])
+    s = int(np.ravel(cfg.get("strides") or p)[0])
+    if cfg.get("padding", "valid") == "same":
+        T_out = int(np.ceil(x.shape[1] / s))
+        total = max((T_out - 1) * s + p - x.shape[1], 0)
+        x = np.pad(x, ((0, 0), (total // 2, total - total // 2), (0, 0)), constant_values=-np.inf)
+    T_out = (x.shape[1] - p) // s + 1
+    jan = np.lib.stride_tricks.sliding_window_view(x, p, axis=1)[:, ::s][:, :T_out]
+    return jan.max(axis=-1)
+
+
+def _lstm(x, cfg, w, reverso=False):
+    W, U, b = w[0], w[1], (w[2] if len(w) > 2 else 0.0)
+    u = U.shape[0]
+    act = _ativacao(cfg.get("activation", "tanh"))
+    rec = _ativacao(cfg.get("recurrent_activation", "sigmoid"))
+    if reverso:
+        x = x[:, ::-1]
+    xw = x @ W + b                                  # todas as projeções de entrada de uma vez
+    h = np.zeros((x.shape[0], u), dtype=x.dtype)
+    c = np.zeros_like(h)
+    seq = []
+    for t in range(x.shape[1]):
+        z = xw[:, t] + h @ U
+        i, f, g, o = z[:, :u], z[:, u:2 * u], z[:, 2 * u:3 * u], z[:, 3 * u:]
+        c = rec(f) * c + rec(i) * act(g)
+        h = rec(o) * act(c)
+        seq.append(h)
+    if cfg.get("return_sequences"):
+        out = np.stack(seq, axis=1)
+        return out[:, ::-1] if reverso else out
+    return h
+
+
+def _gru(x, cfg, w, reverso=False):
+    W, U = w[0], w[1]
+    b = w[2] if len(w) > 2 else np.zeros((2, W.shape[1]), dtype=W.dtype)
+    u = U.shape[0]
+    act = _ativacao(cfg.get("activation", "tanh"))
+    rec = _ativacao(cfg.get("recurrent_activation", "sigmoid"))
+    reset_after = cfg.get("reset_after", True)
+    b_in, b_rec = (b[0], b[1]) if b.ndim == 2 else (b, np.zeros_like(b))
+    if reverso:
+        x = x[:, ::-1]
+    xw = x @ W + b_in
+    h = np.zeros((x.shape[0], u), dtype=x.dtype)
+    seq = []
+    for t in range(x.shape[1]):
+        xz, xr, xh = xw[:, t, :u], xw[:, t, u:2 * u], xw[:, t, 2 * u:]
+        if reset_after:
+            hu = h @ U + b_rec
+            z = rec(xz + hu[:, :u])
+            r = rec(xr + hu[:, u:2 * u])
+            hh = act(xh + r * hu[:, 2 * u:])
+        else:
+            z = rec(xz + h @ U[:, :u])
+            r = rec(xr + h @ U[:, u:2 * u])
+            hh = act(xh + (r * h) @ U[:, 2 * u:])
+        h = z * h + (1.0 - z) * hh
+        seq.append(h)
+    if cfg.get("return_sequences"):
+        out = np.stack(seq, axis=1)
+        return out[:, ::-1] if reverso else out
+    return h
+
+
+_RECORRENTES = {"LSTM": _lstm, "GRU": _gru}
+
+
+def _bidirectional(x, cfg, w):
+    fn = _RECORRENTES[cfg["camada"]]
+    n = len(w) // 2
+    fwd = fn(x, cfg["config"], w[:n])
+    bwd = fn(x, cfg["config"], w[n:], reverso=True)
+    modo = cfg.get("merge_mode", "concat")
+    if modo == "concat":
+        return np.concatenate([fwd, bwd], axis=-1)
+    if modo == "sum":
+        return fwd + bwd
+    if modo == "mul":
+        return fwd * bwd
+    if modo == "ave":
+        return (fwd + bwd) / 2.0
+    raise ValueError(f"merge_mode não suportado: {modo}")
+
+
+def _layernorm(x, cfg, w):
+    eps = cfg.get("epsilon", 1e-3)
+    mu = x.mean(axis=-1, keepdims=True)
+    var = x.var(axis=-1, keepdims=True)
+    y = (x - mu) / np.sqrt(var + eps)
+    i = 0
+    if cfg.get("scale", True):
+        y = y * w[i]
+        i += 1
+    if cfg.get("center", True):
+        y = y + w[i]
+    return y
+
+
+def _mha(x, cfg, w):
+    """Self-attention (query = value = key = x), pesos na ordem do Keras."""
+    if len(w) == 8:
+        qk, qb, kk, kb, vk, vb, ok, ob = w
+    else:
+        qk, kk, vk, ok = w
+        qb = kb = vb = ob = 0.0
+    q = np.einsum("btd,dhk->bthk", x, qk) + qb
+    k = np.einsum("btd,dhk->bthk", x, kk) + kb
+    v = np.einsum("btd,dhk->bthk", x, vk) + vb
+    scores = np.einsum("bqhk,bshk->bhqs", q, k) / np.sqrt(q.shape[-1])
+    att = _softmax(scores, axis=-1)
+    ctx = np.einsum("bhqs,bshk->bqhk", att, v)
+    return np.einsum("bqhk,hkd->bqd", ctx, ok) + ob
+
+
+def _transformer_block(x, cfg, w):
+    """TransformerBlock de train/ls17_v4_model.py (pós-norma, dropout = identidade)."""
+    n_att = cfg["n_att"]
+    att = _mha(x, {}, w[:n_att])
+    d1k, d1b, d2k, d2b, g1, b1, g2, b2 = w[n_att:]
+    ln = {"epsilon": cfg.get("epsilon", 1e-6)}
+    out1 = _layernorm(x + att, ln, [g1, b1])
+    ffn = np.maximum(out1 @ d1k + d1b, 0.0) @ d2k + d2b
+    return _layernorm(out1 + ffn, ln, [g2, b2])
+
+
+_CAMADAS = {
+    "Dense": _dense,
+    "Conv1D": _conv1d,
+    "MaxPooling1D": _maxpool1d,
+    "LSTM": _lstm,
+    "GRU": _gru,
+    "Bidirectional": _bidirectional,
+    "LayerNormalization": _layernorm,
+    "MultiHeadAttention": _mha,
+    "TransformerBlock": _transformer_block,
+    "GlobalAveragePooling1D": lambda x, cfg, w: x.mean(axis=1),
+    "Flatten": lambda x, cfg, w: x.reshape(x.shape[0], -1),
+    "Dropout": lambda x, cfg, w: x,
+    "SpatialDropout1D": lambda x, cfg, w: x,
+    "Activation": lambda x, cfg, w: _ativacao(cfg.get("activation"))(x),
+}
+
+
+# =========================================================
+# Modelo NumPy
+# =========================================================
+
+class ModeloNumpy:
+    """
+    Modelo exportado em .npz. Interface compatível com o que o app usa do
+    Keras: predict(X, verbose=0) e inputs[0].shape.
+    """
+
+    def __init__(self, camadas, pesos, input_shape, nome=""):
+        self.camadas = camadas
+        self.pesos = pesos
+        self.input_shape = tuple(input_shape)      # (None, T, F)
+        self.name = nome
+
+    @property
+    def inputs(self):
+        return [type("Entrada", (), {"shape": self.input_shape})()]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            arq = json.loads(str(z["__arquitetura__"]))
+            pesos = [
+                [z[f"{i}/{j}"].astype(np.float32) for j in range(c["n_pesos"])]
+                for i, c in enumerate(arq["camadas"])
+            ]
+        shape = tuple(None if d is None else int(d) for d in arq["input_shape"])
+        return cls(arq["camadas"], pesos, shape, arq.get("nome", os.path.basename(path)))
+
+    def __call__(self, X):
+        x = np.asarray(X, dtype=np.float32)
+        for camada, w in zip(self.camadas, self.pesos):
+            x = _CAMADAS[camada["classe"]](x, camada["config"], w)
+        return x
+
+    def predict(self, X, batch_size=256, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] <= batch_size:
+            return self(X)
+        return np.concatenate([self(X[i:i + batch_size]) for i in range(0, X.shape[0], batch_size)])
+
+
+def caminho_npz(keras_path):
+    """models/ls17/ls17_v3.keras → models/ls17/ls17_v3.npz"""
+    return os.path.splitext(keras_path)[0] + ".npz"
+
+
+def carregar_se_exportado(keras_path):
+    """ModeloNumpy do .npz irmão do .keras (se existir e for mais novo), senão None."""
+    npz = caminho_npz(keras_path)
+    if not os.path.exists(npz):
+        return None
+    if os.path.exists(keras_path) and os.path.getmtime(npz) < os.path.getmtime(keras_path):
+        return None
+    return ModeloNumpy.load(npz)
+
+
+# =========================================================
+# Exportação (offline — requer TensorFlow)
+# =========================================================
+
+_CFG_CHAVES = (
+    "activation", "recurrent_activation", "return_sequences", "padding", "strides",
+    "dilation_rate", "pool_size", "epsilon", "center", "scale", "reset_after",
+)
+
+
+def _cfg(layer):
+    full = layer.get_config()
+    return {k: full[k] for k in _CFG_CHAVES if k in full}
+
+
+def _spec(layer):
+    classe = layer.__class__.__name__
+    if classe == "InputLayer":
+        return None
+
+    if classe == "Bidirectional":
+        interna = layer.forward_layer
+        nome = interna.__class__.__name__
+        if nome not in _RECORRENTES:
+            raise ValueError(f"Bidirectional({nome}) não suportado")
+        w = layer.forward_layer.get_weights() + layer.backward_layer.get_weights()
+        cfg = {"camada": nome, "config": _cfg(interna), "merge_mode": layer.merge_mode}
+        return classe, cfg, w
+
+    if classe == "TransformerBlock":
+        w_att = layer.att.get_weights()
+        d1, d2 = [l for l in layer.ffn.layers if l.__class__.__name__ == "Dense"]
+        w = (w_att + d1.get_weights() + d2.get_weights()
+             + layer.ln1.get_weights() + layer.ln2.get_weights())
+        return classe, {"n_att": len(w_att), "epsilon": float(layer.ln1.epsilon)}, w
+
+    if classe not in _CAMADAS:
+        raise ValueError(f"Camada não suportada pelo runtime NumPy: {classe} ({layer.name})")
+    return classe, _cfg(layer), layer.get_weights()
+
+
+def exportar(model, out_path):
+    """Grava o modelo Keras `model` em `out_path` (.npz)."""
+    camadas, arrays = [], {}
+    for layer in model.layers:
+        spec = _spec(layer)
+        if spec is None:
+            continue
+        classe, cfg, w = spec
+        i = len(camadas)
+        for j, a in enumerate(w):
+            arrays[f"{i}/{j}"] = np.asarray(a, dtype=np.float32)
+        camadas.append({"classe": classe, "nome": layer.name, "config": cfg, "n_pesos": len(w)})
+
+    shape = [None if d is None else int(d) for d in model.inputs[0].shape]
+    arq = {"nome": model.name, "input_shape": shape, "camadas": camadas}
+    arrays["__arquitetura__"] = np.array(json.dumps(arq))
+    np.savez(out_path, **arrays)
+    return out_path
+
+
+def _carregar_keras(path):
+    import tensorflow as tf
+    custom = {}
+    try:
+        from modelo_llm_max.loterias.lotofacil.train.ls17_v4_model import TransformerBlock
+        custom["TransformerBlock"] = TransformerBlock
+    except Exception:
+        pass
+    return tf.keras.models.load_model(path, compile=False, custom_objects=custom)
+
+
+def validar(keras_path, n=64, repeticoes=20, seed=0):
+    """
+    Paridade Keras × NumPy em entradas aleatórias binárias + benchmark.
+    Retorna dict com max_abs_diff e latências (ms por chamada de 1 amostra).
+    """
+    model = _carregar_keras(keras_path)
+    npz = exportar(model, caminho_npz(keras_path))
+    modelo_np = ModeloNumpy.load(npz)
+
+    _, T, F = modelo_np.input_shape
+    rng = np.random.default_rng(seed)
+    X = (rng.random((n, T, F)) < 0.4).astype(np.float32)
+
+    y_k = np.asarray(model.predict(X, verbose=0), dtype=np.float32)
+    y_n = modelo_np.predict(X)
+    diff = float(np.max(np.abs(y_k - y_n)))
+
+    def _bench(fn):
+        fn(X[:1])
+        t0 = time.perf_counter()
+        for _ in range(repeticoes):
+            fn(X[:1])
+        return 1000.0 * (time.perf_counter() - t0) / repeticoes
+
+    res = {
+        "modelo": keras_path,
+        "max_abs_diff": diff,
+        "ok": diff <= TOLERANCIA,
+        "ms_keras": _bench(lambda x: model.predict(x, verbose=0)),
+        "ms_numpy": _bench(modelo_np.predict),
+    }
+    print(f"[runtime_numpy] {keras_path}")
+    print(f"  max |keras - numpy| = {diff:.2e}  ({'OK' if res['ok'] else 'FALHOU'}, tol={TOLERANCIA:g})")
+    print(f"  latência 1 amostra : keras {res['ms_keras']:.2f} ms | numpy {res['ms_numpy']:.2f} ms")
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runtime NumPy para modelos LS/MS.")
+    parser.add_argument("acao", choices=["exportar", "validar"])
+    parser.add_argument("modelos", nargs="+", help="arquivos .keras")
+    args = parser.parse_args()
+
+    falhas = 0
+    for path in args.modelos:
+        if args.acao == "exportar":
+            print("[runtime_numpy] exportado:", exportar(_carregar_keras(path), caminho_npz(path)))
+        else:
+            falhas += 0 if validar(path)["ok"] else 1
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
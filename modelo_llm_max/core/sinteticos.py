@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+sinteticos.py – dados sintéticos de pré-treino em shards float32 (streaming)
+
+Os geradores antigos (synthetic_pretrain_ls17*.py, Mega v3) alocavam
+(samples, seq_len, F) inteiro em float64 e faziam loop por amostra e por
+dezena quente: --samples 20000 --seq_len 120 → ~2.9 GB antes do cast.
+
+Aqui cada shard (`chunk` amostras) é gerado de uma vez, vetorizado:
+    - dezenas/colunas quentes (k variável) → máscara via argsort de chaves
+      aleatórias por linha (sorteio sem reposição em lote)
+    - tendências (b, seq_len) = slope[:, None] * linspace
+    - X += máscara[:, None, :] * tendência[:, :, None]
+e gravado em float32 (X_00000.npy / y_00000.npy) + manifest.json.
+Memória de pico ≈ 1 shard, independente de --samples.
+
+Shards são independentes: cada um usa np.random.default_rng com a
+sua SeedSequence (seed.spawn) — mesmo resultado com 1 ou N processos.
+
+Leitura:
+    ler_lotes(diretorio, batch_size)  → gerador (X, y)
+    dataset_tf(diretorio, batch_size) → tf.data (from_generator)
+    juntar(diretorio, path_x, path_y) → .npy único (legado), via memmap
+"""
+
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CHUNK_PADRAO = 1024
+MANIFESTO = "manifest.json"
+
+# receita → parâmetros (mesmas distribuições dos scripts antigos)
+RECEITAS = {
+    # synthetic_pretrain_ls17_v3.py: ruído N(0,0.3); 5..9 dezenas quentes com
+    # tendência 0→U(0.4,1.5); y = dezenas quentes
+    "ls17_v3": {"tipo": "tendencia", "n_features": 150, "n_labels": 25, "ruido": 0.3,
+                "k_hot": (5, 10), "slope": (0.4, 1.5)},
+    # synthetic_pretrain_ls17_mega_v3.py: idem com 60 labels, 3..6 quentes
+    "mega_v3": {"tipo": "tendencia", "n_features": 150, "n_labels": 60, "ruido": 0.3,
+                "k_hot": (3, 7), "slope": (0.3, 1.5)},
+    # synthetic_pretrain_ls17-x3.py: ruído N(0,1); 8 colunas sobem 0→1.5,
+    # 8 descem 1→0; y one-hot aleatório
+    "ls17_x3": {"tipo": "sobe_desce", "n_features": 100, "n_labels": 25, "ruido": 1.0,
+                "k_hot": 8, "k_cold": 8},
+    # synthetic_pretrain_ls17.py: 8 colunas = tendência 0→1.5 (+ ruído
+    # N(0,0.07) em tudo); y = 15 dezenas aleatórias
+    "ls17_v2": {"tipo": "fixa", "n_features": 100, "n_labels": 25, "ruido": 0.07,
+                "k_hot": 8, "k_y": 15},
+}
+
+
+# ------------------------------------------------------------
+# Geração vetorizada
+# ------------------------------------------------------------
+def _mascara_k(rng, b: int, n: int, k) -> np.ndarray:
+    """(b, n) bool com k[i] posições distintas por linha (k int ou (b,))."""
+    k = np.broadcast_to(np.asarray(k), (b,))
+    ordem = np.argsort(rng.random((b, n)), axis=1)
+    kmax = int(k.max()) if b else 0
+    mask = np.zeros((b, n), dtype=bool)
+    np.put_along_axis(mask, ordem[:, :kmax], np.arange(kmax)[None, :] < k[:, None], axis=1)
+    return mask
+
+
+def gerar_lote(receita: str, b: int, seq_len: int, rng) -> tuple:
+    """(X (b, seq_len, F) float32, y (b, L) float32) de uma receita."""
+    r = RECEITAS[receita]
+    F, L = r["n_features"], r["n_labels"]
+    X = rng.standard_normal((b, seq_len, F), dtype=np.float32)
+    X *= np.float32(r["ruido"])
+    y = np.zeros((b, L), dtype=np.float32)
+
+    if r["tipo"] == "tendencia":
+        k = rng.integers(r["k_hot"][0], r["k_hot"][1], size=b)
+        quentes = _mascara_k(rng, b, L, k)                              # (b, L)
+        slope = rng.uniform(r["slope"][0], r["slope"][1], size=b).astype(np.float32)
+        trend = slope[:, None] * np.linspace(0, 1, seq_len, dtype=np.float32)[None, :]  # (b, T)
+        X[:, :, :L] += quentes[:, None, :] * trend[:, :, None]
+        y[quentes] = 1.0
+
+    elif r["tipo"] == "sobe_desce":
+        sobe = _mascara_k(rng, b, F, r["k_hot"])
+        desce = _mascara_k(rng, b, F, r["k_cold"])
+        up = np.linspace(0, 1.5, seq_len, dtype=np.float32)
+        dn = np.linspace(1.0, 0.0, seq_len, dtype=np.float32)
+        X += sobe[:, None, :] * up[None, :, None]
+        X -= desce[:, None, :] * dn[None, :, None]
+        y[np.arange(b), rng.integers(0, L, size=b)] = 1.0
+
+    elif r["tipo"] == "fixa":
+        quentes = _mascara_k(rng, b, F, r["k_hot"])
+        trend = np.linspace(0, 1.5, seq_len, dtype=np.float32)
+        X += quentes[:, None, :] * trend[None, :, None]
+        y[_mascara_k(rng, b, L, r["k_y"])] = 1.0
+
+    else:
+        raise ValueError(f"Tipo de receita inválido: {r['tipo']}")
+
+    return X, y
+
+
+# ------------------------------------------------------------
+# Shards
+# ------------------------------------------------------------
+def _nome_shard(k: int) -> tuple:
+    return f"X_{k:05d}.npy", f"y_{k:05d}.npy"
+
+
+def _salvar(path: str, arr: np.ndarray):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def _gerar_shard(tarefa) -> dict:
+    receita, k, n, seq_len, semente, diretorio = tarefa
+    rng = np.random.default_rng(semente)
+    X, y = gerar_lote(receita, n, seq_len, rng)
+    nome_x, nome_y = _nome_shard(k)
+    _salvar(os.path.join(diretorio, nome_x), X)
+    _salvar(os.path.join(diretorio, nome_y), y)
+    return {"x": nome_x, "y": nome_y, "n": int(n)}
+
+
+def gerar(receita: str, n_samples: int, seq_len: int, diretorio: str, chunk: int = CHUNK_PADRAO,
+          workers: int = 1, seed: int = None) -> dict:
+    """
+    Gera `n_samples` amostras em shards de até `chunk` em `diretorio`
+    (workers > 1 → ProcessPoolExecutor spawn). Retorna o manifesto.
+    """
+    if receita not in RECEITAS:
+        raise ValueError(f"Receita inválida: {receita} (opções: {sorted(RECEITAS)})")
+    os.makedirs(diretorio, exist_ok=True)
+
+    raiz = np.random.SeedSequence(seed)
+    tamanhos = [min(chunk, n_samples - ini) for ini in range(0, n_samples, chunk)]
+    sementes = raiz.spawn(len(tamanhos))
+    tarefas = [(receita, k, n, seq_len, sementes[k], diretorio) for k, n in enumerate(tamanhos)]
+
+    inicio = time.time()
+    if workers > 1 and len(tarefas) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tarefas)), mp_context=mp.get_context("spawn")) as ex:
+            shards = list(ex.map(_gerar_shard, tarefas))
+    else:
+        shards = [_gerar_shard(t) for t in tarefas]
+
+    r = RECEITAS[receita]
+    manifesto = {
+        "receita": receita,
+        "seed": raiz.entropy if seed is None else int(seed),
+        "seq_len": int(seq_len),
+        "n_features": r["n_features"],
+        "n_labels": r["n_labels"],
+        "dtype": "float32",
+        "total": int(n_samples),
+        "shards": shards,
+    }
+    # remove shards antigos de uma geração maior
+    k = len(shards)
+    while os.path.exists(os.path.join(diretorio, _nome_shard(k)[0])):
+        for nome in _nome_shard(k):
+            os.remove(os.path.join(diretorio, nome))
+        k += 1
+
+    path = os.path.join(diretorio, MANIFESTO)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+    print(f"[sintético] {receita}: {n_samples} amostras em {len(shards)} shards "
+          f"({time.time() - inicio:.1f}s) → {diretorio}")
+    return manifesto
+
+
+def ler_manifesto(diretorio: str) -> dict:
+    path = os.path.join(diretorio, MANIFESTO)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"manifest.json não encontrado em {diretorio}")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ------------------------------------------------------------
+# Leitura em streaming
+# ------------------------------------------------------------
+def ler_lotes(diretorio: str, batch_size: int = 32, shuffle: bool = True, seed=None):
+    """
+    Gerador (1 época) de lotes (X, y) float32. Abre um shard por vez
+    (mmap); com shuffle embaralha a ordem dos shards e as amostras
+    dentro de cada shard.
+    """
+    manifesto = ler_manifesto(diretorio)
+    rng = np.random.default_rng(seed)
+    shards = manifesto["shards"]
+    ordem = rng.permutation(len(shards)) if shuffle else range(len(shards))
+    for s in ordem:
+        X = np.load(os.path.join(diretorio, shards[s]["x"]), mmap_mode="r")
+        y = np.load(os.path.join(diretorio, shards[s]["y"]), mmap_mode="r")
+        idx = rng.permutation(len(X)) if shuffle else np.arange(len(X))
+        for ini in range(0, len(idx), batch_size):
+            t = np.sort(idx[ini:ini + batch_size])
+            yield np.asarray(X[t]), np.asarray(y[t])
+        del X, y
+
+
+def dataset_tf(diretorio: str, batch_size: int = 32, shuffle: bool = True, seed=None):
+    """tf.data.Dataset de lotes (X, y) lidos shard a shard (memória ≈ 1 shard)."""
+    import tensorflow as tf
+
+    m = ler_manifesto(diretorio)
+    ds = tf.data.Dataset.from_generator(
+        lambda: ler_lotes(diretorio, batch_size, shuffle, seed),
+        output_signature=(
+            tf.TensorSpec((None, m["seq_len"], m["n_features"]), tf.float32),
+            tf.TensorSpec((None, m["n_labels"]), tf.float32),
+        ),
+    )
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def juntar(diretorio: str, path_x: str, path_y: str):
+    """
+    Concatena os shards nos .npy únicos antigos (synthetic_*_x/y.npy) via
+    open_memmap — memória ≈ 1 shard.
+    """
+    m = ler_manifesto(diretorio)
+    destinos = []
+    for path, dim in ((path_x, (m["seq_len"], m["n_features"])), (path_y, (m["n_labels"],))):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        destinos.append(np.lib.format.open_memmap(path + ".tmp.npy", mode="w+", dtype=np.float32,
+                                                  shape=(m["total"],) + dim))
+    ini = 0
+    for s in m["shards"]:
+        destinos[0][ini:ini + s["n"]] = np.load(os.path.join(diretorio, s["x"]), mmap_mode="r")
+        destinos[1][ini:ini + s["n"]] = np.load(os.path.join(diretorio, s["y"]), mmap_mode="r")
+        ini += s["n"]
+    for d in destinos:
+        d.flush()
+    del destinos
+    os.replace(path_x + ".tmp.npy", path_x)
+    os.replace(path_y + ".tmp.npy", path_y)
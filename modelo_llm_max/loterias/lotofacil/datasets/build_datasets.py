@@ -15,13 +15,21 @@ Mega-Sena:
 Se ainda não tiver o rows_60bin.npy da Mega:
  - Ajuste prepare_real_data_db.py para gerar
  - Ou rode temporariamente só para lotofacil (loteria="lotofacil")
+
+X é uma view float32 das janelas (core/janelas.py), sem cópia (M, W, D).
 """
 
 import os
+import sys
 import numpy as np
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "dados")
 
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import janelas
+
 
 # ------------------------ helpers básicos ------------------------
 
@@ -55,35 +63,12 @@ def _build_sequences(arr: np.ndarray, window: int, last_n: int | None):
     Constrói janelas (X) e labels (y) a partir de uma matriz binária arr (N, D),
     onde cada linha é um concurso e cada coluna uma dezena (one-hot).
     """
-    total = arr.shape[0]
-
     # Se last_n for informado, usamos apenas os últimos (last_n + window) registros
-    if last_n is not None:
-        tamanho_min = last_n + window
-        if total < tamanho_min:
-            raise ValueError(
-                f"Não há dados suficientes: preciso de pelo menos {tamanho_min}, "
-                f"mas só tenho {total} registros."
-            )
-        start = total - tamanho_min
-    else:
-        start = 0
-
-    arr = arr[start:]
-    print(f"[build_datasets] Base recortada: {arr.shape[0]} linhas após aplicar last_n/window.")
-
-    X_list, y_list = [], []
-    for i in range(len(arr) - window):
-        bloco = arr[i:i + window]   # (window, D)
-        alvo = arr[i + window]      # (D,)
-        X_list.append(bloco)
-        y_list.append(alvo)
-
-    X = np.stack(X_list)
-    y = np.stack(y_list)
+    X, y = janelas.dataset(arr, arr, window, last_n=last_n)
+    print(f"[build_datasets] Base recortada: {X.shape[0] + window} linhas após aplicar last_n/window.")
 
     print(f"[build_datasets] OK → X={X.shape}, y={y.shape}")
-    return X.astype("float32"), y.astype("float32")
+    return X, y
 
 
 # ------------------------ LOTOFÁCIL ------------------------
@@ -164,13 +149,7 @@ def build_dataset_ls17(last_n=None, window=150):
             f"Ajuste os parâmetros."
         )
 
-    X, y = [], []
-    for i in range(window, len(rows)):
-        X.append(rows[i - window:i])
-        y.append(rows[i])
-
-    X = np.array(X, dtype=np.float32)
-    y = np.array(y, dtype=np.float32)
+    X, y = janelas.dataset(rows, rows, window)
 
     print(f"[build_dataset_ls17] OK → X={X.shape}, y={y.shape}")
     return X, y
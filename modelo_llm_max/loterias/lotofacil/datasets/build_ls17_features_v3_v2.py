@@ -37,9 +37,16 @@ Requisitos:
 
 import numpy as np
 import os
+import sys
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 
+_REPO_ROOT = os.path.abspath(os.path.join(BASE, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+# janelas/atraso em O(N·25) via somas acumuladas (antes: loops Python por linha)
+from modelo_llm_max.core import features as motor
+
 # 🌎 Pasta global de dados: modelo_llm_max/dados
 DADOS = os.path.abspath(os.path.join(BASE, "..", "..", "..", "dados"))
 
@@ -59,28 +66,13 @@ def load_file(name: str):
 
 def freq_window(real_arr, win):
     """
-    Frequência normalizada da janela dos últimos 'win' concursos.
+    Frequência normalizada da janela dos últimos 'win' concursos
+    (real_arr[i-win:i], sem o próprio i), dividida sempre por 'win'.
     real_arr -> matriz (N,15)
     Retorna matriz (N,25)
     """
-    N = real_arr.shape[0]
-    freq = np.zeros((N, 25), dtype=float)
-
-    for i in range(N):
-        ini = max(0, i - win)
-        janela = real_arr[ini:i]
-
-        if len(janela) == 0:
-            continue
-
-        for dez in janela.flatten():
-            if 1 <= dez <= 25:
-                freq[i, dez - 1] += 1
-
-        # normaliza pela janela completa
-        freq[i] /= win
-
-    return freq
+    contagens = motor.binarios(real_arr, 25)
+    return motor.freq_janela(contagens, win, incluir_atual=False, divisor="janela", dtype=np.float64)
 
 
 def atraso(real_arr):
@@ -90,18 +82,7 @@ def atraso(real_arr):
     Retorna matriz (N,25)
     """
     N = real_arr.shape[0]
-    atrasos = np.zeros((N, 25), dtype=float)
-
-    last_seen = np.full(25, -1)
-
-    for i in range(N):
-        for d in range(1, 26):
-            if d in real_arr[i]:
-                last_seen[d - 1] = i
-
-        atrasos[i] = (i - last_seen) / N
-
-    return atrasos
+    return motor.atraso(motor.binarios(real_arr, 25), incluir_atual=True, inicial=-1) / N
 
 
 def volatilidade(real_arr, win=50):
@@ -109,16 +90,7 @@ def volatilidade(real_arr, win=50):
     Volatilidade local: desvio padrão da frequência
     numa janela de 'win' concursos.
     """
-    N = real_arr.shape[0]
-    vol = np.zeros((N, 25), dtype=float)
-
-    freq = freq_window(real_arr, win)
-
-    for i in range(N):
-        ini = max(0, i - win)
-        vol[i] = np.std(freq[ini:i+1], axis=0)
-
-    return vol
+    return motor.desvio_janela(freq_window(real_arr, win), win)
 
 
 # ---------------------------------------------------------
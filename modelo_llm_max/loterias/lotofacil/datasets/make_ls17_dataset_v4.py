@@ -8,17 +8,26 @@ Entrada:
     - dados/rows_25bin.npy       -> (N, 25)
 
 Saída:
-    - dados/X_ls17_v4.npy        -> (M, W, 300)
+    - dados/X_ls17_v4.npy        -> (M, W, 300) float32
     - dados/y_ls17_v4.npy        -> (M, 25)
 
+As janelas são escritas direto no .npy (core/janelas.py), sem montar
+(M, W, 300) na memória.
+
 Uso:
     python make_ls17_dataset_v4.py
 """
 
 import os
+import sys
 import numpy as np
 BASE = os.path.dirname(os.path.abspath(__file__))
 
+_REPO_ROOT = os.path.abspath(os.path.join(BASE, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.janelas import gravar_janelas
+
 # 🌎 Caminho correto para a pasta global de dados
 DADOS = os.path.abspath(os.path.join(BASE, "..", "..", "..", "dados"))
 print(f"[PATH] Pasta de dados: {DADOS}")
@@ -30,7 +39,7 @@ def load(name):
     path = os.path.join(DADOS, name)
     if not os.path.exists(path):
         raise FileNotFoundError(f"[ERRO] não encontrado: {path}")
-    arr = np.load(path)
+    arr = np.load(path, mmap_mode="r")
     print(f"[LOAD] {name} -> {arr.shape}")
     return arr
 
@@ -43,16 +52,11 @@ def main():
     if labels.shape[0] != N:
         raise ValueError("Features e labels têm N diferente.")
 
-    X_list, y_list = [], []
-    for t in range(WINDOW, N):
-        X_list.append(feats[t-WINDOW:t])
-        y_list.append(labels[t])
-
-    X = np.array(X_list)
-    y = np.array(y_list)
-
-    np.save(os.path.join(DADOS, "X_ls17_v4.npy"), X)
-    np.save(os.path.join(DADOS, "y_ls17_v4.npy"), y)
+    # X[t] = feats[t-WINDOW:t], y[t] = labels[t]
+    X, y = gravar_janelas(
+        os.path.join(DADOS, "X_ls17_v4.npy"), feats, WINDOW,
+        path_y=os.path.join(DADOS, "y_ls17_v4.npy"), labels=labels,
+    )
 
     print(f"[OK] X_ls17_v4.npy -> {X.shape}")
     print(f"[OK] y_ls17_v4.npy -> {y.shape}")
@@ -2,11 +2,16 @@
 ensemble_g3.py — fAIxaBet Gold
 ------------------------------
 Combina LS14, LS15, LS16.
+
+Pesos: models/ensemble/g3.json quando existir (core/ensemble_pesos.py,
+--calibracao nenhuma: média ponderada das probabilidades brutas).
 """
 
 import numpy as np
 from tensorflow.keras.models import load_model
 
+from modelo_llm_max.core.ensemble_pesos import carregar_pesos
+
 def load_gold(models_dir="models"):
     return {
         "ls14": load_model(f"{models_dir}/ls14/ls14pp_final.keras"),
@@ -14,10 +19,11 @@ def load_gold(models_dir="models"):
         "ls16": load_model(f"{models_dir}/ls16/ls16_final.keras"),
     }
 
-WEIGHTS = {"ls14": 0.2, "ls15": 0.3, "ls16": 0.5}
+WEIGHTS_PADRAO = {"ls14": 0.2, "ls15": 0.3, "ls16": 0.5}
+WEIGHTS, _ = carregar_pesos("g3", WEIGHTS_PADRAO)
 
 def ensemble_gold_pred(models, arr):
     out = np.zeros((25,), float)
     for name, model in models.items():
-        out += model.predict(arr, verbose=0)[0] * WEIGHTS[name]
+        out += model.predict(arr, verbose=0)[0] * WEIGHTS.get(name, 0.0)
     return out / sum(WEIGHTS.values())
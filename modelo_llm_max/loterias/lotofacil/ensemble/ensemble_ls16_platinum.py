@@ -10,6 +10,9 @@ Gera palpites usando um ensemble simples de 3 modelos:
 Combinação:
     p_final = w14 * p14 + w15 * p15 + w16 * p16
 
+    Pesos de models/ensemble/ls16_platinum.json quando existir
+    (core/ensemble_pesos.py --calibracao nenhuma); senão WEIGHTS_PADRAO.
+
 Saída:
     - Palpites impressos no console
 
@@ -19,6 +22,7 @@ Uso:
 """
 
 import os
+import sys
 import argparse
 import numpy as np
 import tensorflow as tf
@@ -39,11 +43,17 @@ MODEL_PATHS = {
     "ls16"  : os.path.join(MODELS_ROOT, "ls16",   "ls16_platinum.keras"),
 }
 
-WEIGHTS = {
+_REPO_ROOT = os.path.abspath(os.path.join(BASE, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.ensemble_pesos import carregar_pesos
+
+WEIGHTS_PADRAO = {
     "ls14pp": 0.3,
     "ls15pp": 0.4,
     "ls16"  : 0.3,
 }
+WEIGHTS, _ = carregar_pesos("ls16_platinum", WEIGHTS_PADRAO)
 
 WINDOW = 50     # janela usada pelo LS15++ (a maior do conjunto)
 DEZENAS_POR_JOGO = 15
@@ -79,9 +89,9 @@ def gerar_palpite(modelos, rows: np.ndarray):
     p16 = modelos["ls16"].predict(X,   verbose=0)[0]
 
     p_final = (
-        WEIGHTS["ls14pp"] * p14 +
-        WEIGHTS["ls15pp"] * p15 +
-        WEIGHTS["ls16"]   * p16
+        WEIGHTS.get("ls14pp", 0.0) * p14 +
+        WEIGHTS.get("ls15pp", 0.0) * p15 +
+        WEIGHTS.get("ls16", 0.0)   * p16
     )
 
     return proba_to_dezenas(p_final)
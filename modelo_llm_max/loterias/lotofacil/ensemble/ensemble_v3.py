@@ -20,15 +20,18 @@ Lotofácil:
 Saídas:
   - Ranking em console
   - CSV em admin/tests_v3/
+
+Predições: lidas do cache por (modelo, concurso) (core/predicoes_cache.py);
+o modelo só é carregado/executado nos concursos que ainda não estão lá.
 """
 
 import os
+import sys
 import argparse
 from datetime import datetime
 
 import numpy as np
 import pandas as pd
-from tensorflow.keras.models import load_model
 
 # ---------------------------------------------------------
 # Paths
@@ -39,6 +42,12 @@ MODELS_DIR = os.path.join(BASE_DIR, "models", "prod")
 OUT_DIR = os.path.join(BASE_DIR, "admin", "tests_v3")
 os.makedirs(OUT_DIR, exist_ok=True)
 
+_REPO_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.predicoes_cache import ModeloSobDemanda, obter_janelas
+from modelo_llm_max.core import janelas
+
 
 # ---------------------------------------------------------
 # Helpers
@@ -46,16 +55,7 @@ os.makedirs(OUT_DIR, exist_ok=True)
 def make_sequences(rows: np.ndarray, window: int):
     if rows.ndim != 2:
         raise ValueError(f"rows deve ser [N, F]; veio {rows.shape}")
-    n, f = rows.shape
-    if n <= window:
-        raise ValueError(f"N ({n}) <= window ({window})")
-
-    X = []
-    y = []
-    for i in range(n - window):
-        X.append(rows[i:i + window])
-        y.append(rows[i + window])
-    return np.asarray(X, np.float32), np.asarray(y, np.float32)
+    return janelas.dataset(rows, rows, window)
 
 
 def binarize_topk(probs: np.ndarray, k: int):
@@ -98,12 +98,23 @@ def metrics_to_row(name: str, m: dict):
     }
 
 
-def safe_load_model(path: str):
+def _load_keras(path: str):
+    from tensorflow.keras.models import load_model
+    return load_model(path)
+
+
+def safe_load_model(path: str, loteria: str = "lotofacil"):
+    """
+    ModeloSobDemanda: input_shape vem do cache quando o artefato já foi
+    visto; o Keras só é carregado se faltar alguma predição.
+    """
     if not os.path.exists(path):
         print(f"[AVISO] Modelo não encontrado: {path}")
         return None
     try:
-        return load_model(path)
+        model = ModeloSobDemanda(path, _load_keras, loteria=loteria)
+        _ = model.input_shape
+        return model
     except Exception as e:
         print(f"[ERRO] Falha ao carregar {path}: {e}")
         return None
@@ -129,9 +140,12 @@ def avaliar_lotofacil(lf_window: int, limit: int, n_test: int):
         print(f"[ERRO] rows_25bin.npy não encontrado em {rows_path}")
         return None
 
-    rows = np.load(rows_path)  # (N, 25)
+    rows_full = np.load(rows_path, mmap_mode="r")  # (N, 25)
+    rows = np.asarray(rows_full)
+    offset = 0
     if limit and limit < len(rows):
         rows = rows[-limit:]
+        offset = len(rows_full) - limit
 
     # Apenas para log geral
     X_base, y_base = make_sequences(rows, lf_window)
@@ -171,24 +185,25 @@ def avaliar_lotofacil(lf_window: int, limit: int, n_test: int):
                 print(f"[AVISO] {name}: ls17_features_final.npy não encontrado, pulando.")
                 continue
 
-            data = np.load(lf_final_path)  # (N, 125)
+            data = np.load(lf_final_path, mmap_mode="r")  # (N, 125)
             feats = data[:, :100]
             labels = data[:, 100:]         # (N, 25)
 
             if feats.shape[1] != 100 or labels.shape[1] != 25:
                 print(f"[AVISO] {name}: shapes inesperados em ls17_features_final.npy {data.shape}")
                 continue
+            if len(feats) <= w_model:
+                print(f"[AVISO] {name}: N ({len(feats)}) <= window ({w_model}); pulando.")
+                continue
 
-            X_all, _ = make_sequences(feats, w_model)
-            y_all = labels[w_model:]
-
-            if n_test and n_test < len(X_all):
-                X_m = X_all[-n_test:]
-                y_m = y_all[-n_test:]
-            else:
-                X_m, y_m = X_all, y_all
+            # alvo i = feats[i - w_model : i] → labels[i]
+            alvos = np.arange(w_model, len(feats))
+            if n_test and n_test < len(alvos):
+                alvos = alvos[-n_test:]
+            entradas, fonte = feats, "ls17_features_final"
+            y_m = np.asarray(labels[alvos], np.float32)
 
-            print(f"[{name}] window={w_model}  X={X_m.shape}, y={y_m.shape}")
+            print(f"[{name}] window={w_model}  X=({len(alvos)}, {w_model}, {feats.shape[1]}), y={y_m.shape}")
 
         else:
             # LS14/15 usam rows_25bin (25 features)
@@ -196,16 +211,20 @@ def avaliar_lotofacil(lf_window: int, limit: int, n_test: int):
                 print(f"[AVISO] {name}: f_model={f_model} mas rows tem {rows.shape[1]} colunas; pulando.")
                 continue
 
-            X_all, y_all = make_sequences(rows, w_model)
-            if n_test and n_test < len(X_all):
-                X_m = X_all[-n_test:]
-                y_m = y_all[-n_test:]
-            else:
-                X_m, y_m = X_all, y_all
+            if len(rows) <= w_model:
+                print(f"[AVISO] {name}: N ({len(rows)}) <= window ({w_model}); pulando.")
+                continue
+
+            # mesmas janelas de make_sequences(rows, w_model), em índices absolutos
+            alvos = np.arange(offset + w_model, len(rows_full))
+            if n_test and n_test < len(alvos):
+                alvos = alvos[-n_test:]
+            entradas, fonte = rows_full, "rows_25bin"
+            y_m = np.asarray(rows_full[alvos], np.float32)
 
-            print(f"[{name}] window={w_model}  X={X_m.shape}, y={y_m.shape}")
+            print(f"[{name}] window={w_model}  X=({len(alvos)}, {w_model}, {f_model}), y={y_m.shape}")
 
-        probs = model.predict(X_m, verbose=0)  # (N, 25)
+        probs = obter_janelas(model, entradas, w_model, alvos, fonte=fonte)  # (N, 25)
         y_pred_bin = binarize_topk(probs, k=15)
         metrics = compute_metrics(y_m, y_pred_bin)
 
@@ -288,9 +307,12 @@ def avaliar_mega(limit: int, n_test: int):
         print(f"[AVISO] rows_60bin.npy não encontrado; pulando Mega-Sena.")
         return None
 
-    rows = np.load(rows_path)
+    rows_full = np.load(rows_path, mmap_mode="r")
+    rows = np.asarray(rows_full)
+    offset = 0
     if limit and limit < len(rows):
         rows = rows[-limit:]
+        offset = len(rows_full) - limit
 
     modelos_info = [
         ("ls14pp-recent-mega", "recent_ls14pp_mega_final.keras"),
@@ -305,7 +327,7 @@ def avaliar_mega(limit: int, n_test: int):
     first_info = None
     for name, fname in modelos_info:
         path = os.path.join(MODELS_DIR, fname)
-        m = safe_load_model(path)
+        m = safe_load_model(path, loteria="megasena")
         if m is not None:
             first_model = m
             first_info = (name, fname)
@@ -320,14 +342,14 @@ def avaliar_mega(limit: int, n_test: int):
         print(f"[AVISO] Modelo Mega-Sena com F={f} (esperado 60); pulando.")
         return None
 
-    X_all, y_all = make_sequences(rows, window)
-    if n_test and n_test < len(X_all):
-        X = X_all[-n_test:]
-        y = y_all[-n_test:]
-    else:
-        X, y = X_all, y_all
+    if len(rows) <= window:
+        raise ValueError(f"N ({len(rows)}) <= window ({window})")
+    alvos = np.arange(offset + window, len(rows_full))
+    if n_test and n_test < len(alvos):
+        alvos = alvos[-n_test:]
+    y = np.asarray(rows_full[alvos], np.float32)
 
-    print(f"[Mega] window={window}  X={X.shape}, y={y.shape}")
+    print(f"[Mega] window={window}  X=({len(alvos)}, {window}, {f}), y={y.shape}")
 
     def compute_metrics_mega(y_true, y_pred_bin):
         hits = (y_true * y_pred_bin).sum(axis=1)
@@ -347,12 +369,12 @@ def avaliar_mega(limit: int, n_test: int):
     for name, fname in modelos_info:
         if first_info and fname == first_info[1]:
             continue
-        m = safe_load_model(os.path.join(MODELS_DIR, fname))
+        m = safe_load_model(os.path.join(MODELS_DIR, fname), loteria="megasena")
         if m is not None:
             modelos_loaded.append((name, fname, m))
 
     for name, fname, model in modelos_loaded:
-        probs = model.predict(X, verbose=0)
+        probs = obter_janelas(model, rows_full, window, alvos, fonte="rows_60bin", loteria="megasena")
         y_pred_bin = binarize_topk(probs, k=6)
         mtr = compute_metrics_mega(y, y_pred_bin)
         print(
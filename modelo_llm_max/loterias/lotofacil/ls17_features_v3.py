@@ -12,68 +12,72 @@
 #
 # Pré-requisitos (gerados por prepare_real_data_db.py):
 #   dados/rows_25bin.npy  -> (N, 25)
+#
+# Janelas e gaps saem de somas acumuladas / último hit vetorizado
+# (core/features.py): O(N·25), mesmo resultado dos loops antigos.
+# Incremental (core/feature_store.py): com rows_25bin só crescendo,
+# calcula e anexa apenas os concursos novos.
+# FAIXABET_FEATURE_STORE=0 força o rebuild completo.
 # ============================================================
 
 import os
+import sys
 import numpy as np
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DADOS_DIR = os.path.join(BASE_DIR, "dados")
 
-def rolling_mean(mat: np.ndarray, window: int) -> np.ndarray:
+_REPO_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import features as motor
+from modelo_llm_max.core import feature_store
+
+VERSAO_FEATURES = "1"
+
+def rolling_mean(mat: np.ndarray, window: int, C=None, inicio: int = 0) -> np.ndarray:
     """
-    Média deslizante simples por coluna.
+    Média deslizante simples por coluna (janela rows[i-window+1 : i+1]).
     mat: [N, F]
-    retorna: [N, F]
+    retorna: [N - inicio, F] float32
     """
-    N, F = mat.shape
-    out = np.zeros((N, F), dtype=np.float32)
-    for i in range(N):
-        start = max(0, i - window + 1)
-        out[i] = mat[start:i+1].mean(axis=0)
-    return out.astype(np.float32)
-
-def main():
-    rows_path = os.path.join(DADOS_DIR, "rows_25bin.npy")
-    if not os.path.exists(rows_path):
-        raise FileNotFoundError(f"rows_25bin.npy não encontrado em {rows_path}")
+    return motor.freq_janela(mat, window, incluir_atual=True, divisor="efetivo", dtype=np.float32,
+                             C=C, inicio=inicio)
 
-    rows = np.load(rows_path).astype(np.float32)  # (N, 25)
-    N, F = rows.shape
-    if F != 25:
-        raise ValueError(f"rows_25bin.npy deve ter 25 colunas, veio {F}")
+def calcular_features(rows: np.ndarray, inicio: int = 0) -> np.ndarray:
+    """
+    rows_25bin (N,25) → linhas inicio..N-1 de ls17_features_v3 (175 colunas).
+    Cada linha i só depende de rows[:i+1], então inicio>0 dá exatamente
+    o fim do cálculo completo.
+    """
+    rows = np.asarray(rows, dtype=np.float32)
+    N = rows.shape[0]
 
-    print(f"[LS17-v3] rows_25bin.npy -> shape={rows.shape}")
+    C = motor.somas_acumuladas(rows)             # [N+1,25] int, reaproveitado por todas as janelas
 
     # ---------- 1) Freq global acumulada ----------
-    cum_hits = np.cumsum(rows, axis=0)           # [N,25]
-    t_idx = np.arange(1, N + 1, dtype=np.float32)[:, None]  # [N,1]
-    freq_global = cum_hits / t_idx               # [N,25]
+    cum_hits = C[inicio + 1:].astype(np.float32)                    # [n,25]
+    t_idx = np.arange(inicio + 1, N + 1, dtype=np.float32)[:, None]  # [n,1]
+    freq_global = cum_hits / t_idx               # [n,25]
 
     # ---------- 2) Freq 30 últimos concursos ----------
-    freq_30 = rolling_mean(rows, window=30)      # [N,25]
+    freq_30 = rolling_mean(rows, window=30, C=C, inicio=inicio)      # [n,25]
 
     # ---------- 3) Freq 90 últimos concursos ----------
-    freq_90 = rolling_mean(rows, window=90)      # [N,25]
+    freq_90 = rolling_mean(rows, window=90, C=C, inicio=inicio)      # [n,25]
 
     # ---------- 4) Gaps (concursos desde o último hit) ----------
-    gaps = np.zeros_like(rows, dtype=np.float32)
-    last_hit = np.full(F, -1, dtype=np.int32)
-
-    for i in range(N):
-        mask = rows[i].astype(bool)
-        last_hit[mask] = i
-        gaps[i] = i - last_hit   # se nunca saiu -> grande positivo
+    # se nunca saiu -> i + 1
+    gaps = motor.atraso(rows, incluir_atual=True, inicial=-1, inicio=inicio).astype(np.float32)
 
     gaps_norm = np.tanh(gaps / 30.0)             # normaliza em [-1,1]
 
     # ---------- 5) Indicador se saiu no concurso anterior ----------
-    prev = np.zeros_like(rows, dtype=np.float32)
-    prev[1:] = rows[:-1]
+    prev = motor.anterior(rows)[inicio:]
 
     # ---------- 6) Momentum: freq_10 - freq_40 ----------
-    freq_10 = rolling_mean(rows, window=10)
-    freq_40 = rolling_mean(rows, window=40)
+    freq_10 = rolling_mean(rows, window=10, C=C, inicio=inicio)
+    freq_40 = rolling_mean(rows, window=40, C=C, inicio=inicio)
     momentum = freq_10 - freq_40                 # [-1,1] aprox
 
     # Empilha: 6 blocos de 25 = 150 features
@@ -82,18 +86,37 @@ def main():
         axis=1
     ).astype(np.float32)
 
-    assert features.shape == (N, 150), f"Esperado (N,150), veio {features.shape}"
+    assert features.shape == (N - inicio, 150), f"Esperado (n,150), veio {features.shape}"
 
     # Labels = própria rows_25bin (último concurso como label)
-    labels = rows.astype(np.float32)             # (N,25)
+    labels = rows[inicio:].astype(np.float32)    # (n,25)
 
-    data = np.concatenate([features, labels], axis=1)  # (N, 150+25=175)
+    return np.concatenate([features, labels], axis=1)  # (n, 150+25=175)
 
-    out_path = os.path.join(DADOS_DIR, "ls17_features_v3.npy")
-    np.save(out_path, data)
+def main():
+    rows_path = os.path.join(DADOS_DIR, "rows_25bin.npy")
+    if not os.path.exists(rows_path):
+        raise FileNotFoundError(f"rows_25bin.npy não encontrado em {rows_path}")
 
-    print("[LS17-v3] ls17_features_v3.npy gerado com sucesso!")
-    print(f"          shape={data.shape}")
+    rows = np.load(rows_path)                    # (N, 25)
+    N, F = rows.shape
+    if F != 25:
+        raise ValueError(f"rows_25bin.npy deve ter 25 colunas, veio {F}")
+
+    print(f"[LS17-v3] rows_25bin.npy -> shape={rows.shape}")
+
+    # só os concursos novos são calculados e anexados (core/feature_store.py)
+    out_path = os.path.join(DADOS_DIR, "ls17_features_v3.npy")
+    feature_store.atualizar(
+        "ls17_features_v3", DADOS_DIR,
+        entradas={"rows_25bin": rows},
+        saidas={"ls17_features_v3": out_path},
+        calcular=lambda inicio: {"ls17_features_v3": calcular_features(rows, inicio)},
+        versao=VERSAO_FEATURES,
+    )
+
+    print("[LS17-v3] ls17_features_v3.npy atualizado!")
+    print(f"          shape=({N}, 175)")
     print(f"          arquivo: {out_path}")
 
 if __name__ == "__main__":
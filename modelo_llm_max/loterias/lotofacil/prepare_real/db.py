@@ -1,13 +1,18 @@
 # db.py
+# Reexporta o engine único do processo (db_pool.py na raiz do projeto).
+# Vale para "from db import Session" (prepare_real_data_db.py).
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import sys
 
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+if _RAIZ not in sys.path:
+    sys.path.insert(0, _RAIZ)
 
-if not DATABASE_URL:
-    raise ValueError("❌ DATABASE_URL não encontrado...")
+from db_pool import (  # noqa: E402,F401
+    DATABASE_URL,
+    engine,
+    Session,
+    get_engine,
+    session_scope,
+    metricas_pool,
+)
@@ -26,18 +26,50 @@ Dependências:
       resultados_oficiais   (Lotofácil)
       resultados_oficiais_m (Mega-Sena)
 
+Incremental (core/feature_store.py):
+  o manifesto dados/feature_store.json guarda o último concurso lido e
+  quantas linhas do banco já foram consumidas. Numa execução normal só
+  os concursos novos são lidos e anexados aos .npy; se o histórico do
+  banco mudou (contagem diferente), a versão mudou ou algum .npy foi
+  regravado por outro script, tudo é refeito do zero.
+
 Uso:
   python prepare_real_data_db.py
+  python prepare_real_data_db.py --completo     (ignora o manifesto)
 """
 
 import os
+import sys
 import json
+import argparse
 import numpy as np
 from sqlalchemy import text
 from db import Session
 
 OUT_DIR = os.path.join(os.path.dirname(__file__), "dados")
 
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import feature_store
+from modelo_llm_max.core.features import binarios
+
+VERSAO_ROWS = "1"
+
+# artefatos .npy com 1 linha por concurso (anexáveis)
+SAIDAS_LF = {
+    "rows_struct": os.path.join(OUT_DIR, "rows_struct.npy"),
+    "rows": os.path.join(OUT_DIR, "rows.npy"),
+    "winners": os.path.join(OUT_DIR, "winners.npy"),
+    "rows_25bin": os.path.join(OUT_DIR, "rows_25bin.npy"),
+}
+SAIDAS_MS = {
+    "rows_60bin": os.path.join(OUT_DIR, "rows_60bin.npy"),
+}
+
+_FILTRO_LF = "n1 BETWEEN 1 AND 25 AND n15 BETWEEN 1 AND 25"
+_FILTRO_MS = "n1 BETWEEN 1 AND 60 AND n6 BETWEEN 1 AND 60"
+
 # -------------------------------------------------------------------
 # Estrutura tipada para LOTOFÁCIL
 # -------------------------------------------------------------------
@@ -64,9 +96,43 @@ def _ensure_dir(path: str):
 # -------------------------------------------------------------------
 # LOTOFÁCIL — leitura do banco
 # -------------------------------------------------------------------
-def _fetch_rows_lotofacil():
+def _contar(tabela: str, filtro: str, ate: int):
+    """(COUNT(*), MAX(concurso)) das linhas com concurso <= ate."""
+    db = Session()
+    try:
+        return tuple(db.execute(
+            text(f"SELECT COUNT(*), MAX(concurso) FROM {tabela} WHERE {filtro} AND concurso <= :ate"),
+            {"ate": int(ate)},
+        ).fetchone())
+    finally:
+        db.close()
+
+
+def _ponto_de_retomada(nome: str, saidas: dict, tabela: str, filtro: str, completo: bool):
+    """
+    Registro da etapa se dá para continuar de onde parou, senão None.
+    Confere no banco que as linhas já consumidas continuam as mesmas
+    (contagem e último concurso) — correções antigas forçam rebuild.
     """
-    Busca colunas principais + winners da tabela resultados_oficiais.
+    if completo:
+        return None
+    reg = feature_store.estado(nome, OUT_DIR)
+    if not feature_store.pode_anexar(reg, VERSAO_ROWS, saidas):
+        return None
+    extra = reg.get("extra") or {}
+    if extra.get("ultimo_lido") is None:
+        return None
+    total, ultimo = _contar(tabela, filtro, extra["ultimo_lido"])
+    if int(total) != int(extra.get("total_lidos", -1)) or ultimo != extra["ultimo_lido"]:
+        print(f"[feature_store] {nome}: histórico do banco mudou → rebuild completo")
+        return None
+    return reg
+
+
+def _fetch_rows_lotofacil(desde: int = None):
+    """
+    Busca colunas principais + winners da tabela resultados_oficiais
+    (só concurso > desde, se informado).
 
     Esperado:
       - concurso (int)
@@ -77,7 +143,7 @@ def _fetch_rows_lotofacil():
     """
     db = Session()
     try:
-        sql = text("""
+        sql = text(f"""
             SELECT
                 concurso,
                 COALESCE(data_norm::date, NULL) AS data_norm,
@@ -90,10 +156,11 @@ def _fetch_rows_lotofacil():
                 NULLIF(ganhadores_14, NULL) AS g14,
                 NULLIF(ganhadores_15, NULL) AS g15
             FROM resultados_oficiais
-            WHERE n1 BETWEEN 1 AND 25 AND n15 BETWEEN 1 AND 25
+            WHERE {_FILTRO_LF}
+              {"AND concurso > :desde" if desde is not None else ""}
             ORDER BY concurso ASC;
         """)
-        return db.execute(sql).fetchall()
+        return db.execute(sql, {"desde": desde} if desde is not None else {}).fetchall()
     finally:
         db.close()
 
@@ -153,26 +220,13 @@ def _validate_and_features(nums):
 # -------------------------------------------------------------------
 # Geração de artefatos da LOTOFÁCIL
 # -------------------------------------------------------------------
-def _build_lotofacil():
+def _processar_lotofacil(rows_sql):
     """
-    Extrai LOTOFÁCIL de resultados_oficiais e gera:
-
-      - rows_struct.npy  (DTYPE_LOTO)
-      - rows.npy         (legado: [concurso, 15 dezenas])
-      - rep_map.npy      (mapa de paridade, ex: "8p_7i")
-      - winners.npy      ([concurso, g11, g12, g13, g14, g15])
-      - rows_25bin.npy   ([N,25] one-hot)  ← base para LS14/LS15
-      - meta.json        (resumo da extração)
+    Linhas do SQL → (struct DTYPE_LOTO, winners (n,6), rep_map parcial, inválidos).
     """
-    print("🔄 [Lotofácil] Iniciando extração...")
-    _ensure_dir(OUT_DIR)
-
-    rows_sql = _fetch_rows_lotofacil()
-    total_lidos = len(rows_sql)
-
     rep_map: dict[str, int] = {}
     winners_list = []
-    struct = np.zeros(total_lidos, dtype=DTYPE_LOTO)
+    struct = np.zeros(len(rows_sql), dtype=DTYPE_LOTO)
     usados = 0
     invalidados = 0
 
@@ -225,12 +279,11 @@ def _build_lotofacil():
         np.array(winners_list, dtype=np.int32)
         if winners_list else np.zeros((0, 6), dtype=np.int32)
     )
+    return struct, winners, rep_map, invalidados
 
-    # ------------------------------------------------------------------
-    # Salvar artefatos clássicos
-    # ------------------------------------------------------------------
-    np.save(os.path.join(OUT_DIR, "rows_struct.npy"), struct)
 
+def _artefatos_lotofacil(struct, winners) -> dict:
+    """Arrays por concurso (mesmas chaves de SAIDAS_LF) para as linhas de `struct`."""
     # Legado: [concurso, 15 dezenas]
     if len(struct):
         legacy_rows = np.column_stack([
@@ -239,23 +292,81 @@ def _build_lotofacil():
         ])
     else:
         legacy_rows = np.zeros((0, 16), dtype=np.int32)
-    np.save(os.path.join(OUT_DIR, "rows.npy"), legacy_rows)
 
-    # rep_map + winners
+    # matriz binária (N,25) → rows_25bin.npy
+    # Cada linha é um concurso; colunas 1..25 viram bits 0/1
+    bin25 = binarios(struct["numeros"], 25).astype(np.int8)
+
+    return {
+        "rows_struct": struct,
+        "rows": legacy_rows,
+        "winners": winners,
+        "rows_25bin": bin25,
+    }
+
+
+# -------------------------------------------------------------------
+# Geração de artefatos da LOTOFÁCIL
+# -------------------------------------------------------------------
+def _build_lotofacil(completo: bool = False):
+    """
+    Extrai LOTOFÁCIL de resultados_oficiais e gera:
+
+      - rows_struct.npy  (DTYPE_LOTO)
+      - rows.npy         (legado: [concurso, 15 dezenas])
+      - rep_map.npy      (mapa de paridade, ex: "8p_7i")
+      - winners.npy      ([concurso, g11, g12, g13, g14, g15])
+      - rows_25bin.npy   ([N,25] one-hot)  ← base para LS14/LS15
+      - meta.json        (resumo da extração)
+
+    Com manifesto válido, lê só concurso > último lido e anexa.
+    """
+    print("🔄 [Lotofácil] Iniciando extração...")
+    _ensure_dir(OUT_DIR)
+
+    reg = _ponto_de_retomada("lf_rows", SAIDAS_LF, "resultados_oficiais", _FILTRO_LF, completo)
+    extra = (reg or {}).get("extra") or {}
+    desde = extra.get("ultimo_lido") if reg else None
+
+    rows_sql = _fetch_rows_lotofacil(desde)
+    if reg and not rows_sql:
+        print(f"✅ [Lotofácil] Nenhum concurso novo após {desde} — artefatos inalterados")
+        return
+
+    struct, winners, rep_novo, invalidados = _processar_lotofacil(rows_sql)
+    novos = _artefatos_lotofacil(struct, winners)
+
+    if reg:
+        # Anexa só os concursos novos
+        for nome, path in SAIDAS_LF.items():
+            feature_store.anexar_npy(path, novos[nome], linhas=reg["saidas"][nome]["linhas"])
+        rep_map = np.load(os.path.join(OUT_DIR, "rep_map.npy"), allow_pickle=True).item()
+        for chave, n in rep_novo.items():
+            rep_map[chave] = rep_map.get(chave, 0) + n
+        total_lidos = int(extra.get("total_lidos", 0)) + len(rows_sql)
+        invalidados += int(extra.get("invalidos", 0))
+        struct = np.load(SAIDAS_LF["rows_struct"], mmap_mode="r")
+    else:
+        # ------------------------------------------------------------------
+        # Salvar artefatos clássicos (rebuild completo)
+        # ------------------------------------------------------------------
+        for nome, path in SAIDAS_LF.items():
+            feature_store.gravar_npy(path, novos[nome])
+        rep_map = rep_novo
+        total_lidos = len(rows_sql)
+
+    # rep_map (dict pequeno, sempre regravado)
     np.save(os.path.join(OUT_DIR, "rep_map.npy"), rep_map)
-    np.save(os.path.join(OUT_DIR, "winners.npy"), winners)
 
-    # ------------------------------------------------------------------
-    # NOVO: matriz binária (N,25) → rows_25bin.npy
-    # Cada linha é um concurso; colunas 1..25 viram bits 0/1
-    # ------------------------------------------------------------------
-    n_valid = len(struct)
-    bin25 = np.zeros((n_valid, 25), dtype=np.int8)
-    for i, nums in enumerate(struct["numeros"]):
-        for x in nums:
-            if 1 <= x <= 25:
-                bin25[i, x - 1] = 1
-    np.save(os.path.join(OUT_DIR, "rows_25bin.npy"), bin25)
+    ultimo_lido = int(rows_sql[-1][0]) if rows_sql else None
+    feature_store.registrar(
+        "lf_rows", OUT_DIR, VERSAO_ROWS, total_lidos, SAIDAS_LF,
+        extra={
+            "ultimo_lido": ultimo_lido if ultimo_lido is not None else desde,
+            "total_lidos": total_lidos,
+            "invalidos": invalidados,
+        },
+    )
 
     # Meta
     meta = {
@@ -280,8 +391,8 @@ def _build_lotofacil():
     with open(os.path.join(OUT_DIR, "meta.json"), "w", encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
 
-    print("✅ [Lotofácil] Extração finalizada")
-    print(f" • Lidos do SQL:  {total_lidos}")
+    print("✅ [Lotofácil] Extração finalizada" + (" (incremental)" if reg else ""))
+    print(f" • Lidos do SQL:  {len(rows_sql)}")
     print(f" • Válidos:       {len(struct)}")
     print(f" • Inválidos:     {invalidados}")
     print(f" • Artefatos:     rows_struct.npy, rows.npy, rep_map.npy, winners.npy, rows_25bin.npy")
@@ -291,7 +402,7 @@ def _build_lotofacil():
 # -------------------------------------------------------------------
 # MEGA-SENA — geração de rows_60bin.npy
 # -------------------------------------------------------------------
-def _build_mega_rows():
+def _build_mega_rows(completo: bool = False):
     """
     Extrai resultados da MEGA-SENA e gera rows_60bin.npy.
 
@@ -302,24 +413,35 @@ def _build_mega_rows():
       - concurso (int)
       - data (text ou date)  ← não é usada para o binário
       - n1..n6 (int)
+
+    Com manifesto válido, lê só concurso > último lido e anexa.
     """
     print("\n🔄 [Mega-Sena] Gerando rows_60bin.npy...")
 
+    reg = _ponto_de_retomada("ms_rows", SAIDAS_MS, "resultados_oficiais_m", _FILTRO_MS, completo)
+    extra = (reg or {}).get("extra") or {}
+    desde = extra.get("ultimo_lido") if reg else None
+
     db = Session()
     try:
-        sql = text("""
+        sql = text(f"""
             SELECT
                 concurso,
                 data,
                 n1,n2,n3,n4,n5,n6
             FROM resultados_oficiais_m
-            WHERE n1 BETWEEN 1 AND 60 AND n6 BETWEEN 1 AND 60
+            WHERE {_FILTRO_MS}
+              {"AND concurso > :desde" if desde is not None else ""}
             ORDER BY concurso ASC;
         """)
-        rows = db.execute(sql).fetchall()
+        rows = db.execute(sql, {"desde": desde} if desde is not None else {}).fetchall()
     finally:
         db.close()
 
+    if reg and not rows:
+        print(f"✅ [Mega-Sena] Nenhum concurso novo após {desde} — rows_60bin.npy inalterado")
+        return
+
     if not rows:
         print("⚠ [Mega-Sena] Nenhum resultado encontrado em resultados_oficiais_m.")
         print("   rows_60bin.npy NÃO será gerado.")
@@ -344,30 +466,46 @@ def _build_mega_rows():
                 vec[idx] = 1
         bin_rows.append(vec)
 
-    if not bin_rows:
+    if not bin_rows and not reg:
         print("⚠ [Mega-Sena] Todas as linhas foram invalidadas. rows_60bin.npy não gerado.")
         return
 
-    arr = np.stack(bin_rows, axis=0)
-    np.save(os.path.join(OUT_DIR, "rows_60bin.npy"), arr)
+    arr = np.stack(bin_rows, axis=0) if bin_rows else np.zeros((0, 60), dtype=np.int8)
+    path = SAIDAS_MS["rows_60bin"]
+    if reg:
+        total = feature_store.anexar_npy(path, arr, linhas=reg["saidas"]["rows_60bin"]["linhas"])
+        total_lidos = int(extra.get("total_lidos", 0)) + len(rows)
+    else:
+        feature_store.gravar_npy(path, arr)
+        total = arr.shape[0]
+        total_lidos = len(rows)
+
+    feature_store.registrar(
+        "ms_rows", OUT_DIR, VERSAO_ROWS, total_lidos, SAIDAS_MS,
+        extra={"ultimo_lido": int(rows[-1][0]), "total_lidos": total_lidos},
+    )
 
-    print("✅ [Mega-Sena] rows_60bin.npy gerado com sucesso.")
-    print(f" • Concursos válidos: {arr.shape[0]}")
+    print("✅ [Mega-Sena] rows_60bin.npy gerado com sucesso." + (" (incremental)" if reg else ""))
+    print(f" • Concursos válidos: {total}")
     print(f" • Inválidos:         {inval}")
-    print(f" • Arquivo:           {os.path.join(OUT_DIR, 'rows_60bin.npy')}")
+    print(f" • Arquivo:           {path}")
 
 # -------------------------------------------------------------------
 # MAIN
 # -------------------------------------------------------------------
 def main():
+    parser = argparse.ArgumentParser(description="Gera os artefatos .npy a partir do banco.")
+    parser.add_argument("--completo", action="store_true", help="ignora o manifesto e refaz tudo")
+    args = parser.parse_args()
+
     _ensure_dir(OUT_DIR)
 
     # 1) Lotofácil (base principal)
-    _build_lotofacil()
+    _build_lotofacil(args.completo)
 
     # 2) Mega-Sena (não derruba o processo se der erro)
     try:
-        _build_mega_rows()
+        _build_mega_rows(args.completo)
     except Exception as e:
         print(f"⚠ [Mega-Sena] Erro ao gerar rows_60bin.npy: {e}")
         print("   → Ajuste a função _build_mega_rows() se o schema for diferente.")
@@ -9,9 +9,13 @@ Entrada (todos em modelo_llm_max/dados):
 
 Saída:
     - ls17_features_v4.npy   -> features unificadas (N, F2+F3)
+
+Incremental (core/feature_store.py): se v2/v3 só ganharam linhas no fim,
+apenas essas linhas são concatenadas e anexadas em ls17_features_v4.npy.
 """
 
 import os
+import sys
 import numpy as np
 
 # === Paths ===
@@ -21,6 +25,13 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DADOS_DIR = os.path.join(BASE_DIR, "..", "..", "..", "dados")
 DADOS_DIR = os.path.abspath(DADOS_DIR)
 
+_REPO_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import feature_store
+
+VERSAO_FEATURES = "1"
+
 
 def load_file(name: str) -> np.ndarray:
     """
@@ -33,7 +44,7 @@ def load_file(name: str) -> np.ndarray:
     if not os.path.exists(path):
         raise FileNotFoundError(f"[ERRO] Arquivo não encontrado: {path}")
 
-    arr = np.load(path)
+    arr = np.load(path, mmap_mode="r")
     print(f"[OK] {name} shape={arr.shape}")
     return arr
 
@@ -53,16 +64,22 @@ def main():
             f"v2={feats_v2.shape[0]}  v3={feats_v3.shape[0]}"
         )
 
-    # Concatena feature sets ao longo do eixo das features
-    feats_v4 = np.concatenate([feats_v2, feats_v3], axis=1)
-    print(f"[OK] feats_v4 shape={feats_v4.shape}")
-
     # Salva no diretório global de dados
     out_name = "ls17_features_v4.npy"
     out_path = os.path.join(DADOS_DIR, out_name)
     out_path = os.path.abspath(out_path)
 
-    np.save(out_path, feats_v4)
+    # Concatena feature sets ao longo do eixo das features (só as linhas novas)
+    feature_store.atualizar(
+        "ls17_features_v4", DADOS_DIR,
+        entradas={"ls17_features": feats_v2, "ls17_features_v3": feats_v3},
+        saidas={"ls17_features_v4": out_path},
+        calcular=lambda inicio: {
+            "ls17_features_v4": np.concatenate([feats_v2[inicio:], feats_v3[inicio:]], axis=1)
+        },
+        versao=VERSAO_FEATURES,
+    )
+    print(f"[OK] feats_v4 shape=({feats_v2.shape[0]}, {feats_v2.shape[1] + feats_v3.shape[1]})")
     print(f"✅ [DONE] {out_name} salvo em: {out_path}")
 
 
@@ -2,10 +2,13 @@
 synthetic_pretrain_ls17.py — FaixaBet v2.7
 Gera X sintético (100 features) e Y (25 bins) para pré-treino LS17-v2.
 
-Evita broadcasting complexo para evitar erros.
+Geração vetorizada em shards float32 (core/sinteticos.py, receita "ls17_x3"):
+8 colunas sobem, 8 descem, y one-hot; memória ≈ 1 shard (--chunk),
+--workers processos com sementes independentes.
 """
 
 import os
+import sys
 import argparse
 import numpy as np
 
@@ -13,46 +16,25 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DADOS_DIR = os.path.join(BASE_DIR, "dados")
 os.makedirs(DADOS_DIR, exist_ok=True)
 
+_REPO_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import sinteticos
+
+RECEITA = "ls17_x3"
+SHARDS_DIR = os.path.join(DADOS_DIR, "synthetic_ls17_x3")
+
 # ------------------------------------------------------------
-#  NOVA VERSÃO ULTRA SEGUDA DO GERADOR SINTÉTICO
+#  Gerador em memória (lote único)
 # ------------------------------------------------------------
-def generate_synthetic_xy(n_samples=20000, seq_len=120):
+def generate_synthetic_xy(n_samples=20000, seq_len=120, seed=None):
     """
-    Gera dataset sintético robusto, SEM indexing complexo.
     X: (N, seq_len, 100)
     y: (N, 25)
+    Para volumes grandes use main() (shards).
     """
-
     print(f"[sintético] Gerando {n_samples} sequências sintéticas...")
-
-    # X base totalmente randômico
-    X = np.random.normal(0, 1, size=(n_samples, seq_len, 100)).astype(np.float32)
-
-    # 🔥 criar "tendências simples", SEM broadcasting
-    trend_up = np.linspace(0, 1.5, seq_len).astype(np.float32)
-    trend_dn = np.linspace(1.0, 0.0, seq_len).astype(np.float32)
-
-    for i in range(n_samples):
-
-        # algumas features sobem, outras descem
-        hot_cols = np.random.choice(100, size=8, replace=False)
-        cold_cols = np.random.choice(100, size=8, replace=False)
-
-        for col in hot_cols:
-            X[i, :, col] += trend_up
-
-        for col in cold_cols:
-            X[i, :, col] -= trend_dn
-
-    # 🔥 Agora o alvo Y: (N, 25) — one-hot
-    probs = np.random.rand(n_samples, 25)
-    probs /= probs.sum(axis=1, keepdims=True)
-
-    y = np.zeros_like(probs, dtype=np.float32)
-    idx = np.argmax(probs, axis=1)
-    y[np.arange(n_samples), idx] = 1.0
-
-    return X, y
+    return sinteticos.gerar_lote(RECEITA, n_samples, seq_len, np.random.default_rng(seed))
 
 
 # CLI
@@ -60,6 +42,10 @@ def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--samples", type=int, default=20000)
     p.add_argument("--seq_len", type=int, default=120)
+    p.add_argument("--chunk", type=int, default=sinteticos.CHUNK_PADRAO, help="amostras por shard")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--so_shards", action="store_true", help="não gera o .npy único legado")
     return p.parse_args()
 
 
@@ -70,13 +56,14 @@ def main():
     print("   Pré-treino sintético LS17-v2")
     print("========================================")
 
-    X, y = generate_synthetic_xy(args.samples, args.seq_len)
-
-    np.save(os.path.join(DADOS_DIR, "synthetic_ls17_x.npy"), X)
-    np.save(os.path.join(DADOS_DIR, "synthetic_ls17_y.npy"), y)
+    sinteticos.gerar(RECEITA, args.samples, args.seq_len, SHARDS_DIR,
+                     chunk=args.chunk, workers=args.workers, seed=args.seed)
 
-    print("\n✔ synthetic_ls17_x.npy salvo!")
-    print("✔ synthetic_ls17_y.npy salvo!")
+    if not args.so_shards:
+        sinteticos.juntar(SHARDS_DIR, os.path.join(DADOS_DIR, "synthetic_ls17_x.npy"),
+                          os.path.join(DADOS_DIR, "synthetic_ls17_y.npy"))
+        print("\n✔ synthetic_ls17_x.npy salvo!")
+        print("✔ synthetic_ls17_y.npy salvo!")
     print("\nAgora execute:")
     print("   python train_ls17_v2.py --pretrain --window 120 --last_n 2500")
 
@@ -1,63 +1,34 @@
 # ============================================================
 # synthetic_pretrain_ls17.py — Versão FINAL (IMPOSSÍVEL DE FALHAR)
+#
+# Geração vetorizada em shards float32 (core/sinteticos.py, receita
+# "ls17_v2"): memória ≈ 1 shard (--chunk), --workers processos com
+# sementes independentes. Shards em dados/synthetic_ls17_v2/.
 # ============================================================
 
 import numpy as np
 import argparse
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DADOS_DIR = os.path.join(BASE_DIR, "dados")
 os.makedirs(DADOS_DIR, exist_ok=True)
 
-# ============================================================
-#   Função robusta SEM indexação avançada, SEM broadcasting
-# ============================================================
-def generate_synthetic_xy(n_samples: int, seq_len: int):
-    n_feats = 100
-    n_labels = 25
-    k_hot = 8
-
-    # Matrizes finais
-    X = np.zeros((n_samples, seq_len, n_feats), dtype=np.float32)
-    Y = np.zeros((n_samples, n_labels), dtype=np.float32)
-
-    for i in range(n_samples):
-
-        # --------------------------------------------------
-        # Escolhe features "quentes"
-        # --------------------------------------------------
-        hot_idx = np.random.choice(n_feats, size=k_hot, replace=False)
+_REPO_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import sinteticos
 
-        # --------------------------------------------------
-        # Gera tendência crescente
-        # SEM broadcasting: shape explicitamente controlado
-        # --------------------------------------------------
-        trend = np.linspace(0, 1.5, seq_len, dtype=np.float32)  # (120,)
-        
-        # --------------------------------------------------
-        # INSERIR tendência sem usar X[i,:,hot_idx]
-        # Fazemos feature por feature (100% seguro)
-        # --------------------------------------------------
-        for h_i, feat in enumerate(hot_idx):
-            # Cada feature recebe a tendência
-            X[i, :, feat] = trend
+RECEITA = "ls17_v2"
+SHARDS_DIR = os.path.join(DADOS_DIR, "synthetic_ls17_v2")
 
-        # --------------------------------------------------
-        # Ruído estável
-        # --------------------------------------------------
-        noise = np.random.normal(0, 0.07, size=(seq_len, n_feats)).astype(np.float32)
-        X[i] += noise
-
-        # --------------------------------------------------
-        # Gera labels sintéticas (15 marcadas)
-        # --------------------------------------------------
-        y_idx = np.random.choice(n_labels, size=15, replace=False)
-        y = np.zeros(n_labels, dtype=np.float32)
-        y[y_idx] = 1.0
-        Y[i] = y
-
-    return X, Y
+# ============================================================
+#   8 features com tendência 0→1.5 + ruído N(0, 0.07); 15 labels
+# ============================================================
+def generate_synthetic_xy(n_samples: int, seq_len: int, seed=None):
+    """(X (n, seq_len, 100), Y (n, 25)) float32 em memória — para volumes pequenos."""
+    return sinteticos.gerar_lote(RECEITA, n_samples, seq_len, np.random.default_rng(seed))
 
 
 # ============================================================
@@ -67,6 +38,10 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--samples", type=int, default=20000)
     parser.add_argument("--seq_len", type=int, default=120)
+    parser.add_argument("--chunk", type=int, default=sinteticos.CHUNK_PADRAO, help="amostras por shard")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--so_shards", action="store_true", help="não gera o .npy único legado")
     args = parser.parse_args()
 
     print("========================================")
@@ -74,13 +49,14 @@ def main():
     print("========================================")
     print(f"[sintético] Gerando {args.samples} sequências sintéticas...")
 
-    X, Y = generate_synthetic_xy(args.samples, args.seq_len)
-
-    np.save(os.path.join(DADOS_DIR, "synthetic_ls17_x.npy"), X)
-    np.save(os.path.join(DADOS_DIR, "synthetic_ls17_y.npy"), Y)
+    sinteticos.gerar(RECEITA, args.samples, args.seq_len, SHARDS_DIR,
+                     chunk=args.chunk, workers=args.workers, seed=args.seed)
 
-    print("✔ synthetic_ls17_x.npy salvo")
-    print("✔ synthetic_ls17_y.npy salvo")
+    if not args.so_shards:
+        sinteticos.juntar(SHARDS_DIR, os.path.join(DADOS_DIR, "synthetic_ls17_x.npy"),
+                          os.path.join(DADOS_DIR, "synthetic_ls17_y.npy"))
+        print("✔ synthetic_ls17_x.npy salvo")
+        print("✔ synthetic_ls17_y.npy salvo")
     print("\nAgora execute:")
     print("   python train_ls17_v2.py --pretrain --window 120 --last_n 2500")
 
@@ -1,45 +1,37 @@
 """
 Pré-treino sintético LS17-v3 — 150 features profissionais
 Compatível com qualquer versão do NumPy
+
+Geração vetorizada em shards float32 (core/sinteticos.py, receita "ls17_v3"):
+memória ≈ 1 shard (--chunk), --workers processos com sementes independentes.
+
+Saídas (dados/):
+    synthetic_ls17_v3/            → X_*.npy, y_*.npy + manifest.json (streaming)
+    synthetic_ls17_x.npy / _y.npy → .npy único legado (omitido com --so_shards)
 """
 
 import numpy as np
 import os
+import sys
 import argparse
 
 BASE = os.path.dirname(__file__)
 DADOS = os.path.join(BASE, "dados")
 
-def save(arr, name):
-    np.save(os.path.join(DADOS, name), arr)
-    print(f"[OK] {name} salvo. shape={arr.shape}")
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import sinteticos
+
+RECEITA = "ls17_v3"
+SHARDS_DIR = os.path.join(DADOS, "synthetic_ls17_v3")
 
 # --------------------------------------
-# Gerador sintético anti-broadcast-error
+# Gerador sintético (em memória, lote único)
 # --------------------------------------
-def generate_synthetic_xy(n_samples, seq_len, n_features=150, n_labels=25):
-
-    X = np.random.normal(0, 0.3, size=(n_samples, seq_len, n_features))
-    y = np.zeros((n_samples, n_labels), dtype=np.float32)
-
-    for i in range(n_samples):
-
-        # dezenas “quentes” aleatórias
-        k_hot = np.random.randint(5, 10)
-        hot_idx = np.random.choice(n_labels, k_hot, replace=False)
-
-        # tendência crescente / decrescente
-        slope = np.random.uniform(0.4, 1.5)
-        trend = np.linspace(0, slope, seq_len).reshape(seq_len, 1)
-
-        # aplica tendência
-        for h in hot_idx:
-            X[i, :, h] += trend[:, 0]
-
-        # gera rótulo sintético
-        y[i, hot_idx] = 1.0
-
-    return X.astype(np.float32), y.astype(np.float32)
+def generate_synthetic_xy(n_samples, seq_len, n_features=150, n_labels=25, seed=None):
+    """(X (n, seq_len, 150), y (n, 25)) float32 — para volumes pequenos; use main() para shards."""
+    return sinteticos.gerar_lote(RECEITA, n_samples, seq_len, np.random.default_rng(seed))
 
 # --------------------------------------
 # Main
@@ -48,6 +40,10 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--samples", type=int, default=20000)
     parser.add_argument("--seq_len", type=int, default=120)
+    parser.add_argument("--chunk", type=int, default=sinteticos.CHUNK_PADRAO, help="amostras por shard")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--so_shards", action="store_true", help="não gera o .npy único legado")
     args = parser.parse_args()
 
     print("========================================")
@@ -56,10 +52,13 @@ def main():
 
     print(f"[sintético] Gerando {args.samples} sequências...")
 
-    X, y = generate_synthetic_xy(args.samples, args.seq_len)
+    sinteticos.gerar(RECEITA, args.samples, args.seq_len, SHARDS_DIR,
+                     chunk=args.chunk, workers=args.workers, seed=args.seed)
 
-    save(X, "synthetic_ls17_x.npy")
-    save(y, "synthetic_ls17_y.npy")
+    if not args.so_shards:
+        sinteticos.juntar(SHARDS_DIR, os.path.join(DADOS, "synthetic_ls17_x.npy"),
+                          os.path.join(DADOS, "synthetic_ls17_y.npy"))
+        print(f"[OK] synthetic_ls17_x.npy / synthetic_ls17_y.npy salvos. shape=({args.samples}, {args.seq_len}, 150)")
 
     print("\nAgora execute:")
     print(" python train_ls17_v3.py --pretrain --window 120 --last_n 2500\n")
@@ -17,6 +17,12 @@ Entrega:
 
 Uso:
     python telemetria_lf_models.py --model ls14pp --last_n 500
+    python telemetria_lf_models.py --model all --workers 3
+
+As janelas do walk-forward saem de sliding_window_view (sem cópia) e vão
+para o modelo em lotes (1 predict por chunk), não 1 predict por concurso.
+As predições ficam no cache por (modelo, concurso) — core/predicoes_cache.py —
+e só os concursos ainda não previstos por aquele artefato passam pelo modelo.
 
 Modelos suportados:
     - ls14      -> models/ls14/ls14_base.keras
@@ -28,9 +34,12 @@ Modelos suportados:
 """
 
 import os
+import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
 import numpy as np
-import tensorflow as tf
 
 try:
     from tabulate import tabulate
@@ -48,6 +57,10 @@ MODELS_ROOT = os.path.join(ROOT, "models")
 
 ROWS_PATH = os.path.join(DADOS, "rows_25bin.npy")
 
+if os.path.dirname(ROOT) not in sys.path:
+    sys.path.insert(0, os.path.dirname(ROOT))
+from modelo_llm_max.core.predicoes_cache import ModeloSobDemanda, obter_janelas, prever_janelas
+
 MODEL_CONFIG = {
     "ls14": {
         "path": os.path.join(MODELS_ROOT, "ls14",   "ls14_base.keras"),
@@ -76,6 +89,56 @@ MODEL_CONFIG = {
 }
 
 
+# janelas por chamada de predict (limita memória: 2048 × 64 × 25 float32 ≈ 13MB)
+PREDICT_CHUNK = int(os.getenv("TELEMETRIA_PREDICT_CHUNK", "2048"))
+
+
+def _carregar_modelo(path: str):
+    """ModeloNumpy (.npz exportado) quando existir; senão Keras."""
+    try:
+        from modelo_llm_max.core.runtime_numpy import carregar_se_exportado
+        modelo = carregar_se_exportado(path)
+        if modelo is not None:
+            return modelo
+    except Exception as e:
+        print(f"[WARN] runtime NumPy indisponível para {path}: {e}")
+
+    import tensorflow as tf
+    return tf.keras.models.load_model(path, compile=False)
+
+
+def predizer_janelas(model, rows: np.ndarray, window: int, chunk: int = PREDICT_CHUNK) -> np.ndarray:
+    """
+    Probabilidades (N - window, 25) para todos os passos do walk-forward:
+    linha j = predição do concurso window + j a partir de rows[j : j + window].
+
+    As janelas vêm de sliding_window_view (sem cópia); só cada chunk é
+    materializado em float32 para o predict. Sem cache (ver run_backtest).
+    """
+    return prever_janelas(model, rows, window, np.arange(window, len(rows)), chunk)[:, :25]
+
+
+def estatisticas_acertos(hits_array: np.ndarray) -> dict:
+    """Média, distribuição 0..15 e % >= 11..14 (vetorizado)."""
+    hits_array = np.asarray(hits_array, dtype=np.int64)
+    total = int(hits_array.size)
+    contagem = np.bincount(hits_array, minlength=16)[:16]
+    ge = contagem[::-1].cumsum()[::-1]        # ge[k] = #jogos com >= k acertos
+
+    def pct_ge(k):
+        return 100.0 * ge[k] / total if total > 0 else 0.0
+
+    return {
+        "mean_hits": float(hits_array.mean()) if total else 0.0,
+        "pct_ge_11": pct_ge(11),
+        "pct_ge_12": pct_ge(12),
+        "pct_ge_13": pct_ge(13),
+        "pct_ge_14": pct_ge(14),
+        "total_jogos": total,
+        "dist": {k: int(contagem[k]) for k in range(0, 16)},
+    }
+
+
 def run_backtest(model_key: str, last_n: int | None = None):
     if model_key not in MODEL_CONFIG:
         raise ValueError(f"Modelo desconhecido: {model_key}")
@@ -89,53 +152,52 @@ def run_backtest(model_key: str, last_n: int | None = None):
     if not os.path.exists(ROWS_PATH):
         raise FileNotFoundError(f"[ERRO] rows_25bin.npy não encontrado em: {ROWS_PATH}")
 
-    rows = np.load(ROWS_PATH)
+    rows = np.load(ROWS_PATH, mmap_mode="r")
     print("[LOAD] rows_25bin:", rows.shape)
 
+    inicio = window
     if last_n is not None and last_n > 0:
         if last_n + window > len(rows):
             raise ValueError(f"last_n muito grande, rows tem só {len(rows)} linhas")
-        rows = rows[-(last_n + window):]
+        inicio = len(rows) - last_n
         print(f"[INFO] Usando últimos {last_n} concursos para avaliação.")
+    alvos = np.arange(inicio, len(rows))
 
-    model = tf.keras.models.load_model(path)
-    print(f"[LOAD] Modelo {model_key} <- {path}")
     print(f"[INFO] WINDOW={window}")
 
-    hits_list = []
+    # walk-forward: predizer concurso i a partir de [i-window:i]. Predições já
+    # feitas por este artefato vêm do cache; o modelo só roda nos concursos novos.
+    model = ModeloSobDemanda(path, _carregar_modelo)
+    proba = obter_janelas(model, rows, window, alvos, fonte="rows_25bin")[:, :25]
+    if model.carregado:
+        print(f"[LOAD] Modelo {model_key} <- {path}")
+    true_next = np.asarray(rows[inicio:]) == 1
+    pred_bin = proba >= 0.5
 
-    # walk-forward: predizer concurso i a partir de [i-window:i]
-    for i in range(window, len(rows)):
-        hist = rows[i - window:i]
-        true_next = rows[i]
+    hits_array = np.sum(pred_bin & true_next, axis=1)
+    return estatisticas_acertos(hits_array)
 
-        X = hist.reshape(1, window, 25)
-        proba = model.predict(X, verbose=0)[0]
-        pred_bin = (proba >= 0.5).astype(int)
 
-        hits = int(np.sum((pred_bin == 1) & (true_next == 1)))
-        hits_list.append(hits)
+def _run_backtest_worker(args):
+    model_key, last_n = args
+    try:
+        return model_key, run_backtest(model_key, last_n), None
+    except Exception as e:
+        return model_key, None, str(e)
 
-    hits_array = np.array(hits_list)
-    mean_hits = hits_array.mean()
 
-    # distribuição
-    dist = {k: int(np.sum(hits_array == k)) for k in range(0, 16)}
+def run_backtest_all(last_n: int | None = None, workers: int | None = None, models=None):
+    """Avalia vários modelos do MODEL_CONFIG em processos paralelos."""
+    models = list(models or MODEL_CONFIG)
+    workers = workers or min(len(models), os.cpu_count() or 1)
+    tarefas = [(k, last_n) for k in models]
 
-    total = len(hits_array)
-    def pct_ge(k):
-        return 100.0 * np.sum(hits_array >= k) / total if total > 0 else 0.0
+    if workers <= 1:
+        return [_run_backtest_worker(t) for t in tarefas]
 
-    stats = {
-        "mean_hits": float(mean_hits),
-        "pct_ge_11": pct_ge(11),
-        "pct_ge_12": pct_ge(12),
-        "pct_ge_13": pct_ge(13),
-        "pct_ge_14": pct_ge(14),
-        "total_jogos": total,
-        "dist": dist,
-    }
-    return stats
+    # spawn: TensorFlow não é seguro com fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as ex:
+        return list(ex.map(_run_backtest_worker, tarefas))
 
 
 def print_stats(model_key: str, stats: dict):
@@ -162,10 +224,20 @@ def print_stats(model_key: str, stats: dict):
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--model", required=True, help="Modelo: ls14, ls14pp, ls15pp, ls16, ls17, ls18")
+    parser.add_argument("--model", required=True,
+                        help="Modelo: ls14, ls14pp, ls15pp, ls16, ls17, ls18 ou all")
     parser.add_argument("--last_n", type=int, default=None, help="Quantidade de concursos recentes a usar (opcional)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos paralelos no modo --model all")
     args = parser.parse_args()
 
+    if args.model == "all":
+        for model_key, stats, erro in run_backtest_all(args.last_n, args.workers):
+            if erro:
+                print(f"\n=== TELEMETRIA {model_key.upper()} === [ERRO] {erro}")
+            else:
+                print_stats(model_key, stats)
+        return
+
     stats = run_backtest(args.model, args.last_n)
     print_stats(args.model, stats)
 
@@ -7,18 +7,30 @@
 #
 # Calcula média de acertos de 11 a 15 dezenas.
 #
+# As predições de cada modelo por concurso vêm do cache
+# (core/predicoes_cache.py): os modelos são compartilhados entre S2/G3/V4 e
+# só rodam nos concursos ainda não previstos pelo mesmo artefato.
+#
 # Autor: fAIxaBet — 2025-12
 
 import numpy as np
-from tensorflow.keras.models import load_model
 import os
+import sys
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 DADOS = os.path.join(BASE, "..", "..", "..", "dados")
 MODELS = os.path.join(BASE, "..", "..", "..", "models")
 
+_REPO_ROOT = os.path.abspath(os.path.join(BASE, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.predicoes_cache import ModeloSobDemanda, obter_janelas
+from modelo_llm_max.core.ensemble_pesos import carregar_pesos
+
 # -------------------------------------------------------------------
 # CONFIGURAÇÃO DOS CONJUNTOS DE MODELOS
+# (pesos abaixo = padrão; models/ensemble/<s2|g3|v4>.json, gerado por
+#  core/ensemble_pesos.py --calibracao nenhuma, tem prioridade)
 # -------------------------------------------------------------------
 
 ENSEMBLES = {
@@ -52,12 +64,18 @@ ENSEMBLES = {
 # CARREGA MODELOS
 # -------------------------------------------------------------------
 
+def _load_keras(path: str):
+    from tensorflow.keras.models import load_model
+    return load_model(path)
+
+
 def load_all(models_paths: dict):
+    """ModeloSobDemanda por nome: o Keras só carrega se faltar predição no cache."""
     modelos = {}
     for name, path in models_paths.items():
         if not os.path.exists(path):
             raise FileNotFoundError(f"Modelo ausente: {path}")
-        modelos[name] = load_model(path)
+        modelos[name] = ModeloSobDemanda(path, _load_keras)
     return modelos
 
 
@@ -65,16 +83,18 @@ def load_all(models_paths: dict):
 # LÓGICA DO ENSEMBLE (igual ao palpites.py)
 # -------------------------------------------------------------------
 
-def combine(models, pesos, X_seq, last_vec):
-    total = np.zeros(25, dtype=float)
+def predizer(name, model, feats, alvos, W):
+    """(len(alvos), 25): ls17_v4 vê feats[i-W:i]; os demais só feats[i-1]."""
+    window = W if name == "ls17_v4" else 0
+    return obter_janelas(model, feats, window, alvos, fonte="ls17_features_v4")[:, :25]
+
+
+def combine(models, pesos, feats, alvos, W):
+    total = np.zeros((len(alvos), 25), dtype=float)
     soma = sum(pesos.values())
 
     for name, model in models.items():
-        if name == "ls17_v4":
-            prob = model.predict(X_seq, verbose=0)[0]
-        else:
-            prob = model.predict(last_vec, verbose=0)[0]
-
+        prob = predizer(name, model, feats, alvos, W)
         total += prob * pesos.get(name, 1.0)
 
     return total / soma
@@ -89,24 +109,18 @@ def validar_ensemble(tipo: str):
 
     config = ENSEMBLES[tipo]
     modelos = load_all(config["paths"])
-    pesos = config["pesos"]
+    pesos, _ = carregar_pesos(tipo.lower(), config["pesos"])
+    print(f"   pesos: {pesos}")
 
-    rows = np.load(os.path.join(DADOS, "rows_25bin.npy"))
-    feats = np.load(os.path.join(DADOS, "ls17_features_v4.npy"))
+    rows = np.load(os.path.join(DADOS, "rows_25bin.npy"), mmap_mode="r")
+    feats = np.load(os.path.join(DADOS, "ls17_features_v4.npy"), mmap_mode="r")
 
     W = 32
-    acertos = []
-
-    for i in range(W, len(rows)):
-        seq = feats[i-W:i][None, ...]     # (1,32,F)
-        last = feats[i-1][None, ...]      # (1,F)
-        real = np.where(rows[i] == 1)[0]
-
-        prob = combine(modelos, pesos, seq, last)
-        dezenas = prob.argsort()[-15:]
+    alvos = np.arange(W, len(rows))
 
-        hit = len(set(dezenas) & set(real))
-        acertos.append(hit)
+    prob = combine(modelos, pesos, feats, alvos, W)          # (N - W, 25)
+    dezenas = np.argsort(prob, axis=1)[:, -15:]
+    acertos = np.take_along_axis(np.asarray(rows[alvos]) == 1, dezenas, axis=1).sum(axis=1)
 
     media = np.mean(acertos)
     mx = np.max(acertos)
@@ -8,43 +8,61 @@ Entrada:
     - dados/rows_60bin.npy        (N, 60)
 
 Saída:
-    - dados/X_ms17_v4.npy
+    - dados/X_ms17_v4.npy  (float32, escrito direto via core/janelas.py)
     - dados/y_ms17_v4.npy
+
+Incremental (core/feature_store.py): com features/labels só crescendo,
+apenas as janelas dos alvos novos são montadas e anexadas.
 """
 
 import os
+import sys
 import numpy as np
 
 BASE = os.path.dirname(os.path.abspath(__file__))
+
+_REPO_ROOT = os.path.abspath(os.path.join(BASE, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.janelas import gravar_janelas, janelas
+from modelo_llm_max.core import feature_store
 DADOS = os.path.join(BASE, "..", "..", "..", "dados")
 
 WINDOW = 32  # janela temporal
 
+VERSAO_DATASET = "1"
+
 def load(name):
     p = os.path.join(DADOS, name)
     print("[LOAD]", p)
-    return np.load(p)
+    return np.load(p, mmap_mode="r")
 
 def main():
     feats = load("ms17_features_v4.npy")
     labels = load("rows_60bin.npy")
 
     N = min(feats.shape[0], labels.shape[0])
-    X, Y = [], []
-
-    for i in range(WINDOW, N):
-        X.append(feats[i-WINDOW:i])   # shape (WINDOW, F)
-        Y.append(labels[i])           # shape (60,)
-
+    feats, labels = feats[:N], labels[:N]
+    path_x = os.path.join(DADOS, "X_ms17_v4.npy")
+    path_y = os.path.join(DADOS, "y_ms17_v4.npy")
 
-    X = np.array(X)
-    Y = np.array(Y)
+    def novas_janelas(inicio):
+        # alvos t >= inicio (entradas novas): X[t] = feats[t-WINDOW:t]
+        X_novo, alvos = janelas(feats, WINDOW, inicio=inicio)
+        return {"X": np.asarray(X_novo, dtype=np.float32), "y": np.asarray(labels[alvos])}
 
-    np.save(os.path.join(DADOS, "X_ms17_v4.npy"), X)
-    np.save(os.path.join(DADOS, "y_ms17_v4.npy"), Y)
+    # X[i] = feats[i-WINDOW:i] (WINDOW, F), Y[i] = labels[i] (60,)
+    feature_store.atualizar(
+        "X_ms17_v4", DADOS,
+        entradas={"ms17_features_v4": feats, "rows_60bin": labels},
+        saidas={"X": path_x, "y": path_y},
+        calcular=novas_janelas,
+        completo=lambda: gravar_janelas(path_x, feats, WINDOW, path_y=path_y, labels=labels),
+        versao=VERSAO_DATASET,
+    )
 
-    print("[OK] X_ms17_v4.npy", X.shape)
-    print("[OK] y_ms17_v4.npy", Y.shape)
+    print("[OK] X_ms17_v4.npy", np.load(path_x, mmap_mode="r").shape)
+    print("[OK] y_ms17_v4.npy", np.load(path_y, mmap_mode="r").shape)
 
 if __name__ == "__main__":
     main()
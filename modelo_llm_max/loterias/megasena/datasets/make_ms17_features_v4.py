@@ -9,9 +9,12 @@ Regras:
 ✔ X e Y são gerados JUNTOS
 ✔ Mesmo N, mesmo loop
 ✔ Caminhos de dados detectados automaticamente
+✔ step_features roda 1x por concurso (N × 66) e as janelas são escritas
+  direto no .npy (core/janelas.py), sem montar (N, 32, 66) na memória
 """
 
 import os
+import sys
 import numpy as np
 
 # ============================================================
@@ -20,6 +23,11 @@ import numpy as np
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 
+_REPO_ROOT = os.path.abspath(os.path.join(BASE, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.janelas import gravar_janelas
+
 # Diretórios candidatos onde o rows_60bin.npy pode existir
 ROWS_DIRS = [
     os.path.join(BASE, "..", "dados"),
@@ -114,31 +122,18 @@ def main():
     print(f"[OK] rows carregado: {rows.shape}")
 
     # ---------- Construção do dataset ----------
-    X_list = []
-    Y_list = []
-
-    for t in range(WINDOW, N):
-        window = rows[t-WINDOW:t]  # (32,60)
-        x = np.stack([step_features(window[i]) for i in range(WINDOW)], axis=0)
-        y = rows[t].astype(np.float32)
-
-        X_list.append(x)
-        Y_list.append(y)
-
-    X = np.stack(X_list, axis=0)  # (N-WINDOW, 32, 66)
-    Y = np.stack(Y_list, axis=0)  # (N-WINDOW, 60)
-
-    print(f"[OK] X gerado: {X.shape}")
-    print(f"[OK] Y gerado: {Y.shape}")
+    # features por concurso (1x cada); X[t] = steps[t-WINDOW:t], Y[t] = rows[t]
+    steps = np.stack([step_features(rows[i]) for i in range(N)], axis=0)  # (N, 66)
 
-    # ---------- Salvar ----------
     os.makedirs(OUT_DIR, exist_ok=True)
 
     out_x = os.path.join(OUT_DIR, "X_ms17_v4.npy")
     out_y = os.path.join(OUT_DIR, "Y_ms17_v4.npy")
 
-    np.save(out_x, X)
-    np.save(out_y, Y)
+    X, Y = gravar_janelas(out_x, steps, WINDOW, path_y=out_y, labels=rows, dtype_y=np.float32)
+
+    print(f"[OK] X gerado: {X.shape}")
+    print(f"[OK] Y gerado: {Y.shape}")
 
     print(f"[SAVE] {out_x}")
     print(f"[SAVE] {out_y}")
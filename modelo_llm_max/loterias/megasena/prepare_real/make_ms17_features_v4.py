@@ -9,13 +9,22 @@ Saída (em modelo_llm_max/dados_m/):
 Regras importantes:
 - SEM vazamento: features do índice i usam apenas histórico até i-1
 - i=0 fica zerado
+- incremental (core/feature_store.py): só os concursos novos são
+  calculados e anexados em ms17_features_v4.npy
 """
 
 import os
+import sys
 import numpy as np
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "..", ".."))
+
+_REPO_ROOT = os.path.dirname(ROOT_DIR)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import features as motor
+from modelo_llm_max.core import feature_store
 DATA_DIR = os.path.join(ROOT_DIR, "dados_m")
 
 ROWS_PATH = os.path.join(DATA_DIR, "rows_60bin.npy")
@@ -24,11 +33,16 @@ OUT_PATH  = os.path.join(DATA_DIR, "ms17_features_v4.npy")
 # janelas de frequência (por dezena)
 WINS = [10, 25, 50, 100]  # 4 * 60 = 240
 
-def main():
-    if not os.path.exists(ROWS_PATH):
-        raise FileNotFoundError(f"Não encontrei: {ROWS_PATH}. Rode primeiro prepare_real_ms17.py")
+VERSAO_FEATURES = "1"
 
-    rows = np.load(ROWS_PATH).astype(np.int8)   # (N,60)
+def calcular_features(rows: np.ndarray, inicio: int = 0) -> np.ndarray:
+    """
+    rows (N,60) binário → X (N-inicio,310) float32 (linhas inicio..N-1),
+    tudo vetorizado em O(N·60): janelas por somas acumuladas e atraso por
+    último hit acumulado (core/features.py). Mesmo resultado do antigo
+    loop por concurso.
+    """
+    rows = np.asarray(rows, dtype=np.int8)
     N = rows.shape[0]
     assert rows.shape[1] == 60
 
@@ -37,79 +51,68 @@ def main():
     #  - atraso por dezena (delay): 60  => 300
     #  - stats globais: 10            => 310
     F = 310
-    X = np.zeros((N, F), dtype=np.float32)
-
-    # rastreio de atraso: last_seen[d] = último índice em que d apareceu
-    last_seen = np.full(60, -1, dtype=np.int32)
-
-    # somas cumulativas para frequências rápidas
-    cumsum = np.cumsum(rows, axis=0).astype(np.int32)  # (N,60)
-
-    def window_sum(i, w):
-        # soma das ocorrências na janela [i-w, i-1]
-        if i <= 0:
-            return np.zeros(60, dtype=np.int32)
-        a = max(0, i - w)
-        b = i - 1
-        if a == 0:
-            return cumsum[b]
-        return cumsum[b] - cumsum[a - 1]
-
-    for i in range(N):
-        if i == 0:
-            # primeira linha sem histórico
-            continue
-
-        feats = []
-
-        # 1) frequências normalizadas por janela (240)
-        for w in WINS:
-            ws = window_sum(i, w).astype(np.float32) / float(w)
-            feats.append(ws)
-
-        feats = np.concatenate(feats, axis=0)  # (240,)
-
-        # 2) atraso (delay) por dezena (60)
-        # delay = quantos concursos desde que a dezena apareceu pela última vez
-        delay = np.zeros(60, dtype=np.float32)
-        for d in range(60):
-            if last_seen[d] < 0:
-                delay[d] = float(i)  # nunca saiu: atraso = i
-            else:
-                delay[d] = float(i - last_seen[d])
-
-        # normaliza delay pra ficar em escala “boa” (0..1 aprox)
-        delay_norm = np.clip(delay / 200.0, 0.0, 2.0)
-
-        # 3) stats globais (10)
-        hist = rows[:i]  # até i-1
-        freq_global = hist.mean(axis=0)  # (60,)
-        # estatísticas agregadas
-        stats = np.array([
-            float(i) / 4000.0,                 # progresso (normalizado)
-            float(hist.sum()) / float(i*6),    # sanity (deve ~1.0)
-            float(freq_global.mean()),         # média das frequências
-            float(freq_global.std()),          # desvio padrão das frequências
-            float((delay < 20).mean()),        # % dezenas “recentes”
-            float((delay > 80).mean()),        # % dezenas “atrasadas”
-            float(delay.mean() / 200.0),       # delay médio norm
-            float(delay.std() / 200.0),        # delay std norm
-            float(hist[-10:].mean()),          # densidade últimos 10
-            float(hist[-50:].mean()),          # densidade últimos 50
-        ], dtype=np.float32)
-
-        # monta vetor final (310)
-        x = np.concatenate([feats, delay_norm, stats], axis=0)
-        assert x.shape[0] == 310
-        X[i] = x
-
-        # atualiza last_seen com o concurso i (após extrair features)
-        hit = rows[i].nonzero()[0]
-        for d in hit:
-            last_seen[d] = i
-
-    np.save(OUT_PATH, X)
-    print("✅ ms17_features_v4.npy gerado:", X.shape, "->", OUT_PATH)
+    X = np.zeros((N - inicio, F), dtype=np.float32)
+    # primeira linha sem histórico (fica zerada)
+    ini = max(1, inicio)
+    if ini >= N:
+        return X
+
+    # somas cumulativas: C[i] = ocorrências em rows[:i]
+    C = motor.somas_acumuladas(rows)              # (N+1,60)
+    i = np.arange(ini, N)                         # linhas com histórico
+    i_col = i[:, None]
+
+    # 1) frequências normalizadas por janela [i-w, i-1] (240)
+    feats = np.concatenate([
+        motor.freq_janela(rows, w, incluir_atual=False, divisor="janela", dtype=np.float32, C=C, inicio=ini)
+        for w in WINS
+    ], axis=1)
+
+    # 2) atraso (delay) por dezena (60)
+    # delay = quantos concursos desde a última aparição (nunca saiu: atraso = i)
+    delay = motor.atraso(rows, incluir_atual=False, inicial=0, inicio=ini).astype(np.float32)
+    delay_norm = np.clip(delay / 200.0, 0.0, 2.0)
+
+    # 3) stats globais (10)
+    freq_global = C[i] / i_col.astype(np.float64)     # hist.mean(axis=0), hist = rows[:i]
+    total = C[i].sum(axis=1)                          # hist.sum()
+    tot_acum = np.concatenate([[0], np.cumsum(rows.sum(axis=1, dtype=np.int64))])
+    ult10 = tot_acum[i] - tot_acum[np.maximum(0, i - 10)]
+    ult50 = tot_acum[i] - tot_acum[np.maximum(0, i - 50)]
+
+    stats = np.stack([
+        i / 4000.0,                                       # progresso (normalizado)
+        total / (i * 6.0),                                # sanity (deve ~1.0)
+        freq_global.mean(axis=1),                         # média das frequências
+        freq_global.std(axis=1),                          # desvio padrão das frequências
+        (delay < 20).mean(axis=1),                        # % dezenas “recentes”
+        (delay > 80).mean(axis=1),                        # % dezenas “atrasadas”
+        (delay.mean(axis=1) / 200.0).astype(np.float64),  # delay médio norm
+        (delay.std(axis=1) / 200.0).astype(np.float64),   # delay std norm
+        ult10 / (np.minimum(i, 10) * 60.0),               # densidade últimos 10
+        ult50 / (np.minimum(i, 50) * 60.0),               # densidade últimos 50
+    ], axis=1).astype(np.float32)
+
+    # monta vetor final (310); i=0 fica zerado
+    X[ini - inicio:] = np.concatenate([feats, delay_norm, stats], axis=1)
+    return X
+
+
+def main():
+    if not os.path.exists(ROWS_PATH):
+        raise FileNotFoundError(f"Não encontrei: {ROWS_PATH}. Rode primeiro prepare_real_ms17.py")
+
+    rows = np.load(ROWS_PATH).astype(np.int8)   # (N,60)
+    assert rows.shape[1] == 60
+
+    feature_store.atualizar(
+        "ms17_features_v4", DATA_DIR,
+        entradas={"rows_60bin": rows},
+        saidas={"ms17_features_v4": OUT_PATH},
+        calcular=lambda inicio: {"ms17_features_v4": calcular_features(rows, inicio)},
+        versao=VERSAO_FEATURES,
+    )
+    print("✅ ms17_features_v4.npy gerado:", (rows.shape[0], 310), "->", OUT_PATH)
 
 if __name__ == "__main__":
     main()
@@ -10,12 +10,21 @@ Y: (N, 60)
   - X_ms17_v4.npy        (N-32, 32, 66)
   - Y_ms17_v4.npy        (N-32, 60)
   - X_ms17_v4_flat.npy   (N-32, 2112)  [opcional]
+
+step_features roda 1x por concurso; as janelas vão direto para o .npy
+(core/janelas.py).
 """
 
 import os
+import sys
 import numpy as np
 
 BASE = os.path.dirname(os.path.abspath(__file__))
+
+_REPO_ROOT = os.path.abspath(os.path.join(BASE, "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.janelas import gravar_janelas
 DADOS = os.path.join(BASE, "dados")
 
 ROWS_FILE = "rows_60bin.npy"
@@ -101,29 +110,16 @@ def main():
     print(f"[OK] rows carregado: {rows.shape}")
 
     # Construção do dataset
-    X_list = []
-    Y_list = []
-
     # Para prever o concurso t, usa os 32 anteriores: [t-WINDOW, ..., t-1]
-    # Então t começa em WINDOW e vai até N-1
-    for t in range(WINDOW, N):
-        window_rows = rows[t-WINDOW:t]  # (32,60)
-        x_steps = np.stack([step_features(window_rows[i]) for i in range(WINDOW)], axis=0)  # (32,66)
-        y = rows[t].astype(np.float32)  # (60,)
-        X_list.append(x_steps)
-        Y_list.append(y)
+    # Então t começa em WINDOW e vai até N-1. Features de cada concurso 1x só.
+    steps = np.stack([step_features(rows[i]) for i in range(N)], axis=0)  # (N,66)
 
-    X = np.stack(X_list, axis=0).astype(np.float32)  # (N-WINDOW, 32, 66)
-    Y = np.stack(Y_list, axis=0).astype(np.float32)  # (N-WINDOW, 60)
+    x_out = os.path.join(DADOS, "X_ms17_v4.npy")
+    y_out = os.path.join(DADOS, "Y_ms17_v4.npy")
+    X, Y = gravar_janelas(x_out, steps, WINDOW, path_y=y_out, labels=rows, dtype_y=np.float32)
 
     print(f"[OK] X gerado: {X.shape} (esperado (N,32,66))")
     print(f"[OK] Y gerado: {Y.shape} (esperado (N,60))")
-
-    # Salvar
-    x_out = os.path.join(DADOS, "X_ms17_v4.npy")
-    y_out = os.path.join(DADOS, "Y_ms17_v4.npy")
-    np.save(x_out, X)
-    np.save(y_out, Y)
     print(f"[SAVE] {x_out}")
     print(f"[SAVE] {y_out}")
 
@@ -1,56 +1,53 @@
 """
 Pré-treino sintético LS17-Mega-v3 — 150 feats → 60 labels
 Anti-broadcast para qualquer NumPy
+
+Geração vetorizada em shards float32 (core/sinteticos.py, receita "mega_v3"):
+memória ≈ 1 shard (--chunk), --workers processos com sementes independentes.
 """
 
 import numpy as np
-import argparse, os
+import argparse, os, sys
 
 BASE = os.path.dirname(__file__)
 DADOS = os.path.join(os.path.dirname(__file__), "prepare_real", "dados")
 
-def save(arr, name):
-    os.makedirs(DADOS, exist_ok=True)   # <-- garante a pasta
-    np.save(os.path.join(DADOS, name), arr)
-
-
-def generate_synth(n_samples, seq_len, n_feat=150, n_lab=60):
-
-    X = np.random.normal(0, 0.3, (n_samples, seq_len, n_feat))
-    y = np.zeros((n_samples, n_lab), dtype=np.float32)
-
-    for i in range(n_samples):
-
-        k_hot = np.random.randint(3, 7)
-        hot = np.random.choice(n_lab, k_hot, replace=False)
-
-        slope = np.random.uniform(0.3, 1.5)
-        trend = np.linspace(0, slope, seq_len).reshape(seq_len)
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core import sinteticos
 
-        for h in hot:
-            X[i, :, h] += trend
+RECEITA = "mega_v3"
+SHARDS_DIR = os.path.join(DADOS, "synthetic_ls17_mega")
 
-        y[i, hot] = 1
 
-    return X, y
+def generate_synth(n_samples, seq_len, n_feat=150, n_lab=60, seed=None):
+    """(X (n, seq_len, 150), y (n, 60)) float32 em memória — para volumes pequenos."""
+    return sinteticos.gerar_lote(RECEITA, n_samples, seq_len, np.random.default_rng(seed))
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--samples", type=int, default=20000)
     p.add_argument("--seq_len", type=int, default=150)
+    p.add_argument("--chunk", type=int, default=sinteticos.CHUNK_PADRAO, help="amostras por shard")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--so_shards", action="store_true", help="não gera o .npy único legado")
     args = p.parse_args()
 
     print("==============================")
     print(" Pré-treino sintético Mega v3 ")
     print("==============================")
 
-    X, y = generate_synth(args.samples, args.seq_len)
+    sinteticos.gerar(RECEITA, args.samples, args.seq_len, SHARDS_DIR,
+                     chunk=args.chunk, workers=args.workers, seed=args.seed)
 
-    save(X, "synthetic_ls17_mega_x.npy")
-    save(y, "synthetic_ls17_mega_y.npy")
+    if not args.so_shards:
+        sinteticos.juntar(SHARDS_DIR, os.path.join(DADOS, "synthetic_ls17_mega_x.npy"),
+                          os.path.join(DADOS, "synthetic_ls17_mega_y.npy"))
 
     print("\nExecute agora:")
     print(" python train_ls17_mega_v3.py --pretrain\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
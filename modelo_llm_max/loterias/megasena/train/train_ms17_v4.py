@@ -5,6 +5,7 @@
 # Autor: fAIxaBet — 2025-12
 
 import os
+import sys
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models, optimizers
@@ -21,6 +22,10 @@ MODEL_PATH = os.path.join(MODEL_DIR, "ms17_v4_transformer.keras")
 
 os.makedirs(MODEL_DIR, exist_ok=True)
 
+if os.path.dirname(ROOT) not in sys.path:
+    sys.path.insert(0, os.path.dirname(ROOT))
+from modelo_llm_max.core.janelas import dataset_tf
+
 # ============================================================
 # ⚙️ Parâmetros
 # ============================================================
@@ -88,25 +93,24 @@ def main():
     rows60 = np.load(os.path.join(DADOS, "rows_60bin.npy"))          # (N, 60)
     feats  = np.load(os.path.join(DADOS, "ms17_features_v4.npy"))   # (N, F)
 
-    X, Y = [], []
-    for i in range(W, len(rows60)):
-        X.append(feats[i - W:i])
-        Y.append(rows60[i])
-
-    X = np.array(X)
-    Y = np.array(Y)
+    # janelas montadas por lote no tf.data (X[i] = feats[i-W:i], Y[i] = rows60[i]);
+    # validação = últimos 15% dos alvos, como o validation_split anterior
+    N = min(len(feats), len(rows60))
+    alvos = np.arange(W, N)
+    n_val = max(1, int(len(alvos) * 0.15))
+    treino = dataset_tf(feats[:N], rows60[:N], W, alvos=alvos[:-n_val], batch_size=BATCH_SIZE, shuffle=True)
+    valid = dataset_tf(feats[:N], rows60[:N], W, alvos=alvos[-n_val:], batch_size=BATCH_SIZE, shuffle=False)
 
-    print(f"[DATA] X={X.shape} | Y={Y.shape}")
+    print(f"[DATA] X=({len(alvos)}, {W}, {feats.shape[1]}) | Y=({len(alvos)}, {rows60.shape[1]})")
 
-    model = build_model(input_shape=X.shape[1:])
+    model = build_model(input_shape=(W, feats.shape[1]))
     model.summary()
 
     print("[TRAIN] Iniciando treinamento...")
     model.fit(
-        X, Y,
+        treino,
+        validation_data=valid,
         epochs=EPOCHS,
-        batch_size=BATCH_SIZE,
-        validation_split=0.15,
         verbose=2
     )
 
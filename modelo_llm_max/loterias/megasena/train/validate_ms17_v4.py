@@ -9,14 +9,21 @@ Validação OFICIAL – Mega-Sena MS17-v4 (FaixaBet) — versão robusta
 ✅ Mensagens auto-explicativas para TODOS os erros
 ✅ Validação Top-K + baseline
 ✅ Smoke test antes do predict completo
+✅ Predições por concurso no cache (core/predicoes_cache.py): o modelo só
+   é carregado/executado para concursos ainda não previstos pelo artefato
 """
 
 import os
+import sys
 import glob
 import numpy as np
-import tensorflow as tf
 from datetime import datetime
 
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.predicoes_cache import CachePredicoes, ModeloSobDemanda, CONCURSO_INICIAL, chaves_linhas
+
 # ============================================================
 # CONFIG
 # ============================================================
@@ -248,7 +255,7 @@ def carregar_dados(model):
 
     print(f"[OK] X final para predict: {X.shape}")
 
-    return X, Y
+    return X, Y, escolhido
 
 # ============================================================
 # MAIN
@@ -265,21 +272,41 @@ def main():
             "➡️ Verifique se o treino gerou o .keras e se o caminho está correto."
         )
 
-    print("[LOAD] Carregando modelo...")
-    model = tf.keras.models.load_model(MODEL_PATH)
-    print("[OK] Modelo carregado")
-
-    # dados (já ajusta shape)
-    X, Y = carregar_dados(model)
+    def _load_keras(path):
+        import tensorflow as tf
+        return tf.keras.models.load_model(path)
 
-    # smoke test
-    print("\n[SMOKE] Teste rápido com 2 amostras...")
-    _ = model.predict(X[:2], verbose=0)
-    print("[OK] Smoke test passou")
+    # input_shape sai do cache se o artefato já foi validado antes
+    model = ModeloSobDemanda(MODEL_PATH, _load_keras, loteria="megasena")
 
-    # predict completo
+    # dados (já ajusta shape)
+    X, Y, feature_path = carregar_dados(model)
+
+    # amostra j (features até t=j) prevê rows[j+1]
+    concursos = np.arange(len(X)) + 1 + CONCURSO_INICIAL
+    cache = CachePredicoes(MODEL_PATH, f"ms17_{os.path.splitext(os.path.basename(feature_path))[0]}", "megasena")
+    # chave por amostra: linhas regravadas no arquivo de features invalidam só as suas células
+    chaves = chaves_linhas(X)
+    faltam = cache.faltantes(concursos, chaves)
+    print(f"\n[CACHE] {len(concursos) - len(faltam)}/{len(concursos)} previsões já em cache")
+
+    if len(faltam):
+        print("[LOAD] Carregando modelo...")
+        _ = model.modelo
+        print("[OK] Modelo carregado")
+
+        # smoke test
+        print("\n[SMOKE] Teste rápido com 2 amostras...")
+        _ = model.predict(X[:2], verbose=0)
+        print("[OK] Smoke test passou")
+
+    # predict só do que falta
     print("\n[RUN] Gerando previsões...")
-    preds = model.predict(X, verbose=0)
+    preds = cache.obter(
+        concursos,
+        lambda c: model.predict(X[c - 1 - CONCURSO_INICIAL], verbose=0),
+        chaves=chaves,
+    )
 
     if preds.shape != Y.shape:
         _die(
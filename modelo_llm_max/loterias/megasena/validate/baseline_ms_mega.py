@@ -7,8 +7,16 @@ Baseline estatístico para Mega-Sena:
 - sampling k=6
 """
 
+import os
+import sys
+
 import numpy as np
 
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from modelo_llm_max.core.features import atraso_atual
+
 def compute_baseline_scores(rows, idx, w=100, alpha=0.7, beta=0.3):
     """
     rows: (N,60) binário
@@ -26,19 +34,8 @@ def compute_baseline_scores(rows, idx, w=100, alpha=0.7, beta=0.3):
     # frequência global
     freq_g = hist.mean(axis=0)
 
-    # atraso (delay)
-    last_seen = np.full(60, -1, dtype=np.int32)
-    for i in range(hist.shape[0]):
-        hit = hist[i].nonzero()[0]
-        for d in hit:
-            last_seen[d] = i
-
-    delay = np.zeros(60, dtype=np.float32)
-    for d in range(60):
-        if last_seen[d] < 0:
-            delay[d] = float(hist.shape[0])
-        else:
-            delay[d] = float(hist.shape[0] - last_seen[d])
+    # atraso (delay): concursos desde a última aparição (nunca saiu: idx)
+    delay = atraso_atual(hist, inicial=0).astype(np.float32)
 
     delay_penalty = np.exp(-delay / 50.0)  # quanto mais recente, maior
 
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+scores_lf.py – artefatos de scores por concurso (Lotofácil, sem TensorFlow no app)
+
+Mesmo padrão do MS17_V5 (ms17_v4_rank.npy): a inferência Keras roda OFFLINE
+após cada concurso novo e grava, para cada modelo, o vetor float32[25] de
+probabilidades do próximo concurso. O app só faz np.load(mmap_mode="r").
+
+Layout (versionado):
+    models/lotofacil/scores/v1/c<concurso>.npy   → float32 (n_modelos, 25)
+    models/lotofacil/scores/v1/latest.json       → manifest (concurso, modelos)
+
+Chaves de modelo: "ls14pp/recent", "ls14pp/mid", "ls14pp/global",
+"ls15pp/recent", ..., "ls16", "ls17", "ls18".
+
+Uso offline (após prepare_real_data_db.py):
+    python -m modelo_llm_max.scores_lf --rows dados/rows_25bin.npy --concurso 3500
+
+A carga de resultados (admin/carga_resultados.py, com hits=True) regrava o
+artefato a cada concurso novo; o app ignora artefato atrás do último concurso.
+"""
+
+import os
+import json
+import logging
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from modelo_llm_max.load_models import MODELS_DIR
+
+SCORES_VERSAO = 1
+SCORES_DIR = os.path.join(MODELS_DIR, "lotofacil", "scores", f"v{SCORES_VERSAO}")
+MANIFEST = os.path.join(SCORES_DIR, "latest.json")
+
+# família → loader de load_models (nome da função)
+FAMILIAS = {
+    "ls14pp": "load_ls14pp",
+    "ls15pp": "load_ls15pp",
+    "ls16": "load_ls16",
+    "ls17": "load_ls17",
+    "ls18": "load_ls18",
+}
+
+# nomes usados no app (palpites_legacy) → família
+ALIAS_APP = {
+    "LS14": "ls14pp",
+    "LS15": "ls15pp",
+    "LS16": "ls16",
+    "LS17": "ls17",
+    "LS18": "ls18",
+}
+
+_cache = {"mtime": None, "manifest": None, "scores": None}
+
+
+# =========================================================
+# Leitura (app / Streamlit) — nunca importa TensorFlow
+# =========================================================
+
+def _carregar_manifest():
+    if not os.path.exists(MANIFEST):
+        return None, None
+    mtime = os.path.getmtime(MANIFEST)
+    if _cache["mtime"] == mtime:
+        return _cache["manifest"], _cache["scores"]
+
+    with open(MANIFEST, encoding="utf-8") as f:
+        manifest = json.load(f)
+    scores = np.load(os.path.join(SCORES_DIR, manifest["arquivo"]), mmap_mode="r")
+    if scores.shape != (len(manifest["modelos"]), 25):
+        raise ValueError(f"Shape inválido do artefato: {scores.shape}")
+
+    _cache.update({"mtime": mtime, "manifest": manifest, "scores": scores})
+    return manifest, scores
+
+
+def carregar_scores(modelo: str, concurso_min=None):
+    """
+    Retorna (chaves, matriz float32 (n, 25)) da família `modelo`
+    ("LS14"/"ls14pp"/...) ou None se não houver artefato ou se ele estiver
+    desatualizado (manifest.concurso < concurso_min) — nesse caso o chamador
+    deve cair para o Keras.
+    """
+    familia = ALIAS_APP.get(str(modelo).upper(), str(modelo).lower())
+    try:
+        manifest, scores = _carregar_manifest()
+    except Exception as e:
+        logging.warning(f"[scores_lf] artefato ilegível: {e}")
+        return None
+    if manifest is None:
+        return None
+
+    if concurso_min is not None and int(manifest["concurso"]) < int(concurso_min):
+        logging.info(
+            f"[scores_lf] artefato desatualizado (c{manifest['concurso']} < c{concurso_min}) → fallback Keras"
+        )
+        return None
+
+    linhas = [i for i, m in enumerate(manifest["modelos"]) if m.split("/")[0] == familia]
+    if not linhas:
+        return None
+    return [manifest["modelos"][i] for i in linhas], np.asarray(scores[linhas], dtype=np.float32)
+
+
+# =========================================================
+# Escrita (offline) — TensorFlow só aqui
+# =========================================================
+
+def rows_25bin(bolas) -> np.ndarray:
+    """Linhas (n1..n15) em ordem cronológica → matriz binária (N, 25) uint8."""
+    b = np.asarray(bolas, dtype=np.int16).reshape(-1, 15)
+    X = np.zeros((b.shape[0], 25), dtype=np.uint8)
+    X[np.arange(b.shape[0])[:, None], b - 1] = 1
+    return X
+
+
+def janela(rows_25bin, T: int) -> np.ndarray:
+    """
+    (1, T, 25) float32 com os últimos T concursos reais (zeros à esquerda se
+    faltar histórico). Entrada única dos modelos: o artefato e o fallback
+    Keras do app (palpites_legacy._entrada_modelo) usam esta função.
+    """
+    T = int(T)
+    hist = np.asarray(rows_25bin[-T:], dtype=np.float32)
+    if hist.shape[0] < T:
+        pad = np.zeros((T - hist.shape[0], 25), dtype=np.float32)
+        hist = np.vstack([pad, hist])
+    return hist.reshape(1, T, 25)
+
+
+def _janela_para_modelo(model, rows_25bin):
+    """Monta (1, T, 25) com os últimos T concursos reais (T do input do modelo)."""
+    shape = model.inputs[0].shape
+    if len(shape) != 3 or int(shape[-1]) != 25:
+        raise ValueError(f"input não suportado: {shape}")
+    return janela(rows_25bin, int(shape[1]) if shape[1] is not None else 50)
+
+
+def exportar_scores(rows_25bin, concurso: int, familias=None):
+    """
+    Roda cada modelo 1x sobre o histórico até `concurso` e grava o artefato.
+    Retorna o caminho do manifest.
+    """
+    from modelo_llm_max import load_models
+
+    modelos, vetores = [], []
+    for familia in familias or FAMILIAS:
+        try:
+            carregado = getattr(load_models, FAMILIAS[familia])()
+        except Exception as e:
+            print(f"[scores_lf] {familia}: não carregado ({e})")
+            continue
+
+        itens = carregado.items() if isinstance(carregado, dict) else [(None, carregado)]
+        for grupo, model in itens:
+            chave = f"{familia}/{grupo}" if grupo else familia
+            try:
+                pred = model.predict(_janela_para_modelo(model, rows_25bin), verbose=0)
+                pred = np.asarray(pred[0] if isinstance(pred, list) else pred, dtype=np.float32)[0]
+                if pred.shape != (25,) or not np.all(np.isfinite(pred)):
+                    raise ValueError(f"saída inválida {pred.shape}")
+            except Exception as e:
+                print(f"[scores_lf] {chave}: ignorado ({e})")
+                continue
+            modelos.append(chave)
+            vetores.append(np.maximum(pred, 0.0))
+            print(f"[scores_lf] {chave}: ok")
+
+    if not modelos:
+        raise RuntimeError("Nenhum modelo gerou scores.")
+
+    os.makedirs(SCORES_DIR, exist_ok=True)
+    arquivo = f"c{int(concurso)}.npy"
+    np.save(os.path.join(SCORES_DIR, arquivo), np.vstack(vetores).astype(np.float32))
+
+    manifest = {
+        "versao": SCORES_VERSAO,
+        "concurso": int(concurso),
+        "arquivo": arquivo,
+        "modelos": modelos,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    tmp = MANIFEST + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, MANIFEST)
+    print(f"[scores_lf] artefato gravado: {arquivo} ({len(modelos)} modelos)")
+    return MANIFEST
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta scores por concurso (Lotofácil).")
+    parser.add_argument("--rows", required=True, help="rows_25bin.npy (ordem cronológica)")
+    parser.add_argument("--concurso", type=int, default=None,
+                        help="último concurso contido em --rows (padrão: meta.json ao lado)")
+    parser.add_argument("--familias", default="all", help="ls14pp,ls15pp,ls16,ls17,ls18 ou all")
+    args = parser.parse_args()
+
+    rows = np.load(args.rows)
+    concurso = args.concurso
+    if concurso is None:
+        with open(os.path.join(os.path.dirname(args.rows), "meta.json"), encoding="utf-8") as f:
+            concurso = int(json.load(f)["ultimo_concurso"])
+
+    familias = None if args.familias == "all" else [f.strip() for f in args.familias.split(",")]
+    exportar_scores(rows, concurso, familias)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,25 @@
 # utils_ls_models.py
 import numpy as np
 
+from modelo_llm_max.core.janelas import janelas
+
+def _binarios_e_padding(rows, n_numbers=25, n_output=15):
+    """
+    rows (lista de {'numbers': [...]}) → matriz binária (N, n_numbers) float32
+    e padding (N, n_output): as len(numbers[:n_output]) primeiras posições = 1.
+    """
+    listas = [list(r['numbers']) for r in rows]
+    lens = np.fromiter((len(l) for l in listas), dtype=np.int64, count=len(listas))
+    nums = np.concatenate([np.asarray(l, dtype=np.int64) for l in listas]) if lens.sum() else np.zeros(0, np.int64)
+    linha = np.repeat(np.arange(len(listas)), lens)
+    ok = (nums >= 1) & (nums <= n_numbers)
+
+    binario = np.zeros((len(listas), n_numbers), dtype=np.float32)
+    binario[linha[ok], nums[ok] - 1] = 1.0
+    padded = (np.arange(n_output)[None, :] < np.minimum(lens, n_output)[:, None]).astype(np.float32)
+    return binario, padded
+
+
 def build_dataset_ls14pp(rows, rep_map=None, window=50):
     """
     Constrói datasets híbridos LS14PP com padding seguro.
@@ -8,42 +27,13 @@ def build_dataset_ls14pp(rows, rep_map=None, window=50):
         X_seq: (n_samples, window, 25)
         X_hist, X_freq, X_atraso, X_global: (n_samples, 15)
         y: (n_samples, 15)
+    X_seq é view (sem cópia) das janelas da matriz binária (core/janelas.py).
     """
-    n_samples = len(rows) - window
-    n_numbers = 25  # total de dezenas da Lotofácil
-    n_output = 15   # número de dezenas por input
-
-    X_seq = np.zeros((n_samples, window, n_numbers), dtype=np.float32)
-    X_hist = np.zeros((n_samples, n_output), dtype=np.float32)
-    X_freq = np.zeros((n_samples, n_output), dtype=np.float32)
-    X_atraso = np.zeros((n_samples, n_output), dtype=np.float32)
-    X_global = np.zeros((n_samples, n_output), dtype=np.float32)
-    y = np.zeros((n_samples, n_output), dtype=np.float32)
-
-    for i in range(n_samples):
-        window_rows = rows[i:i+window]
-
-        # Preencher X_seq
-        for j, row in enumerate(window_rows):
-            for num in row['numbers']:
-                if 1 <= num <= n_numbers:
-                    X_seq[i, j, num-1] = 1.0
+    binario, padded = _binarios_e_padding(rows)
+    X_seq, alvos = janelas(binario, window)
+    padded = padded[alvos]
 
-        # Última linha do window
-        last_row = rows[i + window]
-        nums = last_row['numbers'][:n_output]
-        
-        # Padding seguro: garante exatamente 15 posições
-        padded = np.zeros(n_output, dtype=np.float32)
-        padded[:len(nums)] = 1.0
-
-        X_hist[i] = padded
-        X_freq[i] = padded
-        X_atraso[i] = padded
-        X_global[i] = padded
-        y[i] = padded
-
-    return X_seq, X_hist, X_freq, X_atraso, X_global, y
+    return X_seq, padded.copy(), padded.copy(), padded.copy(), padded.copy(), padded
 
 
 def build_dataset_ls15pp(rows, window=50):
@@ -54,37 +44,11 @@ def build_dataset_ls15pp(rows, window=50):
         X_freq, X_atraso, X_global: (n_samples, 15)
         y: (n_samples, 15)
     """
-    n_samples = len(rows) - window
-    n_numbers = 25
-    n_output = 15
-
-    X_seq = np.zeros((n_samples, window, n_numbers), dtype=np.float32)
-    X_freq = np.zeros((n_samples, n_output), dtype=np.float32)
-    X_atraso = np.zeros((n_samples, n_output), dtype=np.float32)
-    X_global = np.zeros((n_samples, n_output), dtype=np.float32)
-    y = np.zeros((n_samples, n_output), dtype=np.float32)
-
-    for i in range(n_samples):
-        window_rows = rows[i:i+window]
-
-        # Preencher X_seq
-        for j, row in enumerate(window_rows):
-            for num in row['numbers']:
-                if 1 <= num <= n_numbers:
-                    X_seq[i, j, num-1] = 1.0
-
-        last_row = rows[i + window]
-        nums = last_row['numbers'][:n_output]
-
-        padded = np.zeros(n_output, dtype=np.float32)
-        padded[:len(nums)] = 1.0
-
-        X_freq[i] = padded
-        X_atraso[i] = padded
-        X_global[i] = padded
-        y[i] = padded
+    binario, padded = _binarios_e_padding(rows)
+    X_seq, alvos = janelas(binario, window)
+    padded = padded[alvos]
 
-    return X_seq, X_freq, X_atraso, X_global, y
+    return X_seq, padded.copy(), padded.copy(), padded.copy(), padded
 
 
 def to_binary(numbers, size=25):
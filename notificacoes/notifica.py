@@ -1,32 +1,53 @@
+import time
 import streamlit as st
 from datetime import date, timedelta
 from sqlalchemy import text
 
 from app.db import Session
-from services.email_service import enviar_email_brevo
+import schema_cache
+import periodos
+from modelo_llm_max.core import bitmask
+from services.email_service import enviar_emails_brevo_lote
 
 LOT_CONFIG = {
     "Lotofácil": {
         "tabela_palpites": "palpites",
         "tabela_resultados": "resultados_oficiais",
         "resultado_data_tipo": "text",   # 👈 IMPORTANTE
-        "col_data_palpites": "data_norm",
+        "horario_palpites": ("data", "created_at"),
         "min_acertos_default": 11,
         "template_brevo": 7,
         "total_dezenas": 15,
+        "loteria_bitmask": "lotofacil",
     },
     "Mega-Sena": {
         "tabela_palpites": "palpites_m",
         "tabela_resultados": "resultados_oficiais_m",
         "resultado_data_tipo": "date",   # 👈 IMPORTANTE
-        "col_data_palpites": "data_norm",
+        "horario_palpites": ("created_at", "data", "dt", "timestamp"),
         "min_acertos_default": 4,
         "template_brevo": 8,
         "total_dezenas": 6,
+        "loteria_bitmask": "megasena",
     }
 }
 
 
+def _filtro_dia_palpites(cfg: dict) -> str:
+    """
+    WHERE do dia (:data, :ini/:fim) nos palpites. data_norm pode estar NULL
+    (gravação sem ela / backfill da migração 002 incompleto): essas linhas
+    usam o horário original, em vez de sumirem da notificação.
+    """
+    tabela = cfg["tabela_palpites"]
+    ts = next((c for c in cfg["horario_palpites"] if schema_cache.tem_coluna(tabela, c)), None)
+    if not schema_cache.tem_coluna(tabela, "data_norm"):
+        return f"p.{ts} >= :ini AND p.{ts} < :fim"
+    if ts is None:
+        return "p.data_norm = :data"
+    return f"(p.data_norm = :data OR (p.data_norm IS NULL AND p.{ts} >= :ini AND p.{ts} < :fim))"
+
+
 def tela_notificacoes_acertos(loteria_atual_sidebar: str | None = None):
     st.subheader("📢 Notificações de Acertos")
 
@@ -97,30 +118,32 @@ def executar_notificacoes(
 
     try:
         # --------------------------------------------------
-        # 1) RESULTADO OFICIAL (TEXT misto → CASE)
+        # 1) RESULTADO OFICIAL (data_norm DATE indexada; linhas ainda sem
+        #    data_norm caem na data original: TEXT misto → CASE, ou DATE)
         # --------------------------------------------------
         if cfg["resultado_data_tipo"] == "text":
             # Lotofácil (data TEXT misto)
-            res = db.execute(text(f"""
-                SELECT *
-                FROM {cfg["tabela_resultados"]}
-                WHERE
-                    CASE
-                        WHEN data ~ '^\\d{{4}}-\\d{{2}}-\\d{{2}}$'
-                            THEN to_date(data, 'YYYY-MM-DD')
-                        WHEN data ~ '^\\d{{2}}/\\d{{2}}/\\d{{4}}$'
-                            THEN to_date(data, 'DD/MM/YYYY')
-                        ELSE NULL
-                    END = :data
-            """), {"data": data_concurso}).fetchone()
+            data_legado = """
+                CASE
+                    WHEN data ~ '^\\d{4}-\\d{2}-\\d{2}$'
+                        THEN to_date(data, 'YYYY-MM-DD')
+                    WHEN data ~ '^\\d{2}/\\d{2}/\\d{4}$'
+                        THEN to_date(data, 'DD/MM/YYYY')
+                    ELSE NULL
+                END
+            """
         else:
             # Mega-Sena (data DATE)
-            res = db.execute(text(f"""
-                SELECT *
-                FROM {cfg["tabela_resultados"]}
-                WHERE data = :data
-            """), {"data": data_concurso}).fetchone()
-
+            data_legado = "data"
+        if schema_cache.tem_coluna(cfg["tabela_resultados"], "data_norm"):
+            filtro_res = f"data_norm = :data OR (data_norm IS NULL AND {data_legado} = :data)"
+        else:
+            filtro_res = f"{data_legado} = :data"
+        res = db.execute(text(f"""
+            SELECT *
+            FROM {cfg["tabela_resultados"]}
+            WHERE {filtro_res}
+        """), {"data": data_concurso}).fetchone()
 
         if not res:
             st.error("❌ Resultado oficial não encontrado.")
@@ -130,8 +153,9 @@ def executar_notificacoes(
         resultado = set(res[2:2 + cfg["total_dezenas"]])
 
         # --------------------------------------------------
-        # 2) PALPITES (usa data_norm DATE)
+        # 2) PALPITES (data_norm DATE; sem ela, intervalo no horário original)
         # --------------------------------------------------
+        ini, fim = periodos.dia(data_concurso)
         palpites = db.execute(text(f"""
             SELECT
                 p.id,
@@ -141,62 +165,99 @@ def executar_notificacoes(
                 u.nome_completo
             FROM {cfg["tabela_palpites"]} p
             JOIN usuarios u ON u.id = p.id_usuario
-            WHERE p.{cfg["col_data_palpites"]} = :data
+            WHERE {_filtro_dia_palpites(cfg)}
               AND NOT EXISTS (
                   SELECT 1
                   FROM notificacoes_palpite n
                   WHERE n.id_palpite = p.id
               )
-        """), {"data": data_concurso}).fetchall()
+        """), {"data": data_concurso, "ini": ini, "fim": fim}).fetchall()
+
+        if not palpites:
+            st.info("Nenhum palpite elegível.")
+            return
 
+        # --------------------------------------------------
+        # 3) ACERTOS do dia inteiro em 1 AND + popcount vetorizado
+        # --------------------------------------------------
+        # palpite malformado/fora do intervalo não derruba o dia inteiro
+        ok = bitmask.validos([p.numeros for p in palpites], cfg["loteria_bitmask"])
+        if not ok.all():
+            ruins = [p.id for p, v in zip(palpites, ok) if not v]
+            print(f"⚠️ [notifica] {loteria}: {len(ruins)} palpites inválidos ignorados (ex.: ids {ruins[:10]})")
+            palpites = [p for p, v in zip(palpites, ok) if v]
         if not palpites:
             st.info("Nenhum palpite elegível.")
             return
 
-        enviados = 0
+        acertos_todos = bitmask.hits(
+            bitmask.pack_many([p.numeros for p in palpites], cfg["loteria_bitmask"]),
+            bitmask.pack(sorted(resultado), cfg["loteria_bitmask"]),
+        )
+        vencedores = [
+            (p, acertos)
+            for p, acertos in zip(palpites, acertos_todos.tolist())
+            if acertos >= min_acertos
+        ]
+
         st.markdown("### 📋 Prévia")
+        if not vencedores:
+            st.info(f"Nenhum palpite com {min_acertos}+ acertos.")
+            return
+        st.dataframe(
+            [{"id_usuario": p.id_usuario, "nome": p.nome_completo, "acertos": a} for p, a in vencedores],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+        if dry_run:
+            st.info(f"🧪 Simulação concluída: {len(vencedores)} notificações (nenhum e-mail enviado).")
+            return
 
-        for p in palpites:
-            numeros = {int(x) for x in p.numeros.split(",")}
-            acertos = len(resultado.intersection(numeros))
-
-            if acertos < min_acertos:
-                continue
-
-            st.write(f" {p.id_usuario} - {p.nome_completo} — 🎯 {acertos} acertos")
-
-            if not dry_run:
-                enviar_email_brevo(
-                    destinatario_email=p.email,
-                    destinatario_nome=p.nome_completo,
-                    template_id=cfg["template_brevo"],
-                    params={
-                        "NOME": p.nome_completo,
-                        "DATA": data_concurso.strftime("%d/%m/%Y"),
-                        "ACERTOS": acertos,
-                        "LOTERIA": loteria
-                    }
-                )
-
-                db.execute(text("""
-                    INSERT INTO notificacoes_palpite
-                        (id_palpite, id_usuario, acertos, canal)
-                    VALUES
-                        (:pid, :uid, :acertos, :canal)
-                """), {
-                    "pid": p.id,
-                    "uid": p.id_usuario,
-                    "acertos": acertos,
-                    "canal": "email"
-                })
-
-                enviados += 1
-
-        if not dry_run:
+        # --------------------------------------------------
+        # 4) E-MAILS em lote (messageVersions, pool + keep-alive)
+        # --------------------------------------------------
+        inicio = time.time()
+        data_fmt = data_concurso.strftime("%d/%m/%Y")
+        envios = [{
+            "email": p.email,
+            "nome": p.nome_completo,
+            "params": {"NOME": p.nome_completo, "DATA": data_fmt, "ACERTOS": acertos, "LOTERIA": loteria},
+        } for p, acertos in vencedores]
+        status = enviar_emails_brevo_lote(envios, cfg["template_brevo"])
+
+        # --------------------------------------------------
+        # 5) REGISTRO de uma vez (só os enviados; os demais ficam para a próxima)
+        # --------------------------------------------------
+        enviados = [(p, a) for (p, a), s in zip(vencedores, status) if s["ok"]]
+        if enviados:
+            db.execute(text("""
+                INSERT INTO notificacoes_palpite (id_palpite, id_usuario, acertos, canal)
+                SELECT pid, uid, acertos, 'email'
+                FROM unnest(
+                    CAST(:pids AS BIGINT[]),
+                    CAST(:uids AS BIGINT[]),
+                    CAST(:acertos AS INTEGER[])
+                ) AS t(pid, uid, acertos)
+            """), {
+                "pids": [p.id for p, _ in enviados],
+                "uids": [p.id_usuario for p, _ in enviados],
+                "acertos": [a for _, a in enviados],
+            })
             db.commit()
-            st.success(f"✅ {enviados} notificações enviadas!")
-        else:
-            st.info("🧪 Simulação concluída (nenhum e-mail enviado).")
+
+        falhas = [s for s in status if not s["ok"]]
+        incertos = [s for s in falhas if s.get("incerto")]
+        st.success(f"✅ {len(enviados)} notificações enviadas! ({time.time() - inicio:.1f}s)")
+        if incertos:
+            # timeout/5xx: o Brevo pode ter entregue → não registrado, próxima execução decide
+            print(f"⚠️ [notifica] {loteria}: {len(incertos)} envios sem confirmação do Brevo: {incertos[0]['erro']}")
+            st.warning(f"⚠️ {len(incertos)} sem confirmação do Brevo (timeout/erro do servidor); "
+                       f"não registrados — entram na próxima execução.")
+        if len(falhas) > len(incertos):
+            recusados = [s for s in falhas if not s.get("incerto")]
+            st.error(f"❌ {len(recusados)} falharam (serão reenviadas na próxima execução): "
+                     f"{recusados[0]['erro']}")
 
     except Exception as e:
         db.rollback()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+periodos.py – intervalos semiabertos [ini, fim) para filtros de data
+
+Filtros como
+    DATE_PART('year', data) = :ano AND DATE_PART('month', data) = :mes
+    EXTRACT(MONTH FROM data) = :mes
+    DATE(data) BETWEEN :ini AND :fim
+aplicam uma função na coluna: o Postgres não usa o índice (id_usuario, data)
+e lê todos os palpites do usuário. A forma indexável é
+
+    data >= :ini AND data < :fim
+
+com ini/fim calculados aqui (datas; o Postgres converte a constante para o
+tipo da coluna — timestamp ou date — e o índice continua utilizável).
+Os planos são conferidos por admin/migracoes.py --verificar.
+"""
+
+from datetime import date, timedelta
+
+
+def mes(ano: int, mes: int) -> tuple:
+    """(1º dia do mês, 1º dia do mês seguinte)."""
+    ini = date(int(ano), int(mes), 1)
+    fim = date(ini.year + 1, 1, 1) if ini.month == 12 else date(ini.year, ini.month + 1, 1)
+    return ini, fim
+
+
+def dia(d: date) -> tuple:
+    """(d, d + 1 dia)."""
+    return d, d + timedelta(days=1)
+
+
+def dias(ini: date, fim: date) -> tuple:
+    """Intervalo fechado de dias [ini, fim] (date_input) → [ini, fim + 1)."""
+    return ini, fim + timedelta(days=1)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+schema_cache.py – cache de metadados do schema (colunas por tabela)
+
+Os helpers de descoberta dinâmica de colunas (_existing_cols,
+_descobrir_coluna_data_palpites_m, _descobrir_colunas_promo_bonus,
+_detect_premiacao_cols, ...) consultavam information_schema a cada chamada.
+Aqui as colunas de TODAS as tabelas do schema são lidas em 1 consulta e
+mantidas no processo.
+
+- colunas(tabela)         → tupla com os nomes (ordem do banco)
+- tem_coluna(tabela, col) → bool (case-insensitive)
+- existe_tabela(tabela)   → bool
+- invalidar()             → força recarga na próxima chamada (ex.: após migração)
+
+invalidar() só vale para o processo atual; os demais workers enxergam uma
+migração quando o cache expira, após SCHEMA_TTL_SECONDS
+(env FAIXABET_SCHEMA_TTL, padrão 60s; 0 = nunca). A recarga é 1 consulta,
+então um TTL curto custa pouco.
+"""
+
+import os
+import time
+import logging
+import threading
+
+from sqlalchemy import text, inspect
+
+from db_pool import engine
+
+SCHEMA_TTL_SECONDS = float(os.getenv("FAIXABET_SCHEMA_TTL", "60"))
+SCHEMA = os.getenv("FAIXABET_DB_SCHEMA", "public")
+
+_lock = threading.Lock()
+_colunas = None           # {tabela_lower: (col1, col2, ...)}
+_carregado_em = 0.0
+
+
+def _carregar() -> dict:
+    out = {}
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT table_name, column_name
+                FROM information_schema.columns
+                WHERE table_schema = :s
+                ORDER BY table_name, ordinal_position
+            """), {"s": SCHEMA}).fetchall()
+        for tabela, col in rows:
+            out.setdefault(tabela.lower(), []).append(col)
+    else:
+        insp = inspect(engine)
+        for tabela in insp.get_table_names():
+            out[tabela.lower()] = [c["name"] for c in insp.get_columns(tabela)]
+    return {t: tuple(cols) for t, cols in out.items()}
+
+
+def _garantir():
+    global _colunas, _carregado_em
+    agora = time.monotonic()
+    expirado = SCHEMA_TTL_SECONDS > 0 and (agora - _carregado_em) > SCHEMA_TTL_SECONDS
+    if _colunas is not None and not expirado:
+        return _colunas
+
+    with _lock:
+        if _colunas is None or (SCHEMA_TTL_SECONDS > 0 and (agora - _carregado_em) > SCHEMA_TTL_SECONDS):
+            _colunas = _carregar()
+            _carregado_em = time.monotonic()
+            logging.info(f"[schema_cache] {len(_colunas)} tabelas carregadas")
+    return _colunas
+
+
+def colunas(tabela: str) -> tuple:
+    """Colunas da tabela (tupla vazia se não existir)."""
+    return _garantir().get(str(tabela).lower(), ())
+
+
+def existe_tabela(tabela: str) -> bool:
+    return str(tabela).lower() in _garantir()
+
+
+def tem_coluna(tabela: str, coluna: str) -> bool:
+    return str(coluna).lower() in {c.lower() for c in colunas(tabela)}
+
+
+def invalidar():
+    """Descarta o cache; a próxima chamada relê o schema."""
+    global _colunas
+    with _lock:
+        _colunas = None
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Raspagem incremental contra um servidor HTTP local (stub da API da Caixa):
+retomada a partir do último concurso do CSV e gravação por append.
+
+    python -m pytest tests/test_raspar_loteria.py -q
+"""
+
+import csv
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from admin import raspar_loteria as rl
+
+
+def _concurso(n):
+    return {
+        "numero": n,
+        "dataApuracao": f"{n:02d}/01/2024",
+        "listaDezenas": [f"{d:02d}" for d in range(1, 16)],
+        "listaRateioPremio": [
+            {"descricaoFaixa": "15 acertos", "numeroDeGanhadores": n, "valorPremio": 1000.0 + n},
+        ],
+    }
+
+
+class _Stub(BaseHTTPRequestHandler):
+    publicados = 5
+    informa_ultimo = True
+    pedidos = []
+
+    def do_GET(self):
+        partes = self.path.rstrip("/").split("/")
+        _Stub.pedidos.append(self.path)
+        if partes[-1] == "lotofacil":
+            corpo = _concurso(_Stub.publicados) if _Stub.informa_ultimo else None
+        else:
+            n = int(partes[-1])
+            corpo = _concurso(n) if n <= _Stub.publicados else None
+        if corpo is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        dados = json.dumps(corpo).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    _Stub.publicados, _Stub.informa_ultimo, _Stub.pedidos = 5, True, []
+
+    csv_path = str(tmp_path / "loteria.csv")
+    monkeypatch.setitem(rl.API_BASE, "lotofacil", f"http://127.0.0.1:{servidor.server_port}/api/lotofacil")
+    monkeypatch.setitem(rl.CSV_FILE, "lotofacil", csv_path)
+    yield csv_path
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _concursos(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return [int(r["Concurso"]) for r in csv.DictReader(f)]
+
+
+def test_retoma_do_ultimo_e_anexa(api):
+    for n in (1, 2):
+        rl.salvar_csv_lotofacil(api, rl.parse_lotofacil(_concurso(n)))
+    with open(api, "rb") as f:
+        inicio = f.read()
+
+    registros = []
+    assert rl.atualizar_loteria("lotofacil", workers=2, registros=registros) == 3
+    assert [int(r["Concurso"]) for r in registros] == [3, 4, 5]
+    assert _concursos(api) == [1, 2, 3, 4, 5]
+    with open(api, "rb") as f:
+        assert f.read().startswith(inicio)   # append: o que já existia não foi reescrito
+    assert rl.ler_indice(api)["ultimo"] == 5
+    assert not any(p.endswith(("/1", "/2")) for p in _Stub.pedidos)
+
+    # nada publicado além do CSV → nenhuma busca por concurso
+    _Stub.pedidos = []
+    assert rl.atualizar_loteria("lotofacil", workers=2) == 0
+    assert _Stub.pedidos == ["/api/lotofacil"]
+
+    # concurso novo → só ele é buscado e anexado
+    _Stub.publicados = 6
+    assert rl.atualizar_loteria("lotofacil", workers=2) == 1
+    assert _concursos(api) == [1, 2, 3, 4, 5, 6]
+
+
+def test_sonda_ate_o_primeiro_inexistente(api):
+    _Stub.informa_ultimo = False
+    assert rl.atualizar_loteria("lotofacil", workers=3) == 5
+    assert _concursos(api) == [1, 2, 3, 4, 5]
+    assert rl.ler_indice(api)["ultimo"] == 5
+
+
+def test_tentativas_por_sessao():
+    curta, longa = rl.obter_sessao(tentativas=2), rl.obter_sessao(tentativas=5)
+    assert curta is rl.obter_sessao(tentativas=2) and curta is not longa
+    assert curta.get_adapter("http://x").max_retries.total == 2
+    assert longa.get_adapter("http://x").max_retries.total == 5